@@ -19,6 +19,8 @@
  */
 
 const cloud = require('wx-server-sdk');
+const fs = require('fs');
+const path = require('path');
 
 cloud.init({
   env: cloud.DYNAMIC_CURRENT_ENV
@@ -27,6 +29,82 @@ cloud.init({
 const db = cloud.database();
 const _ = db.command;
 
+// scripts/build-meal-set-baselines.py 生成的基准值网格（稠密数组 + 坐标索引），数据库中没有匹配记录时使用
+const GRID_FILE = path.join(__dirname, 'meal-set-baseline-grid.json');
+let baselineGrid;
+
+function loadBaselineGrid() {
+  if (baselineGrid === undefined) {
+    try {
+      const data = JSON.parse(fs.readFileSync(GRID_FILE, 'utf8'));
+      baselineGrid = {
+        ...data,
+        values: Buffer.from(data.valueData, 'base64'),
+        breakdown: Buffer.from(data.breakdownData, 'base64'),
+        soup: Buffer.from(data.soupData, 'base64')
+      };
+    } catch (error) {
+      baselineGrid = null;
+    }
+  }
+  return baselineGrid;
+}
+
+/**
+ * 从基准值网格查询：网格中没有的地区按全国平均，结构未指定时取 standard
+ */
+function lookupGridBaseline(mealTime, region, energyType, mealStructure = 'standard') {
+  const grid = loadBaselineGrid();
+  if (!grid) {
+    return null;
+  }
+  const { coords, components } = grid;
+  const t = coords.mealTime.indexOf(mealTime);
+  const e = coords.energyType.indexOf(energyType);
+  const s = coords.mealStructure.indexOf(mealStructure);
+  if (t < 0 || e < 0 || s < 0) {
+    return null;
+  }
+  const found = coords.region.indexOf(region);
+  const r = found >= 0 ? found : coords.region.indexOf('national_average');
+  // 按 region × mealTime × energyType × mealStructure 行优先排列，每格 float32
+  const offset = ((r * coords.mealTime.length + t) * coords.energyType.length + e) * coords.mealStructure.length + s;
+  const value = grid.values.readFloatLE(offset * 4);
+  const round = (x) => Math.round(x * 100) / 100;
+  const breakdown = {};
+  components.forEach((key, k) => {
+    breakdown[key] = round(grid.breakdown.readFloatLE((offset * components.length + k) * 4));
+  });
+  const category = {
+    mealTime,
+    region: coords.region[r],
+    energyType,
+    mealStructure,
+    hasSoup: grid.hasSoup[grid.soup[r * coords.mealTime.length + t]]
+  };
+  return {
+    baselineId: null,
+    category,
+    carbonFootprint: {
+      value: round(value),
+      uncertainty: round(value * grid.uncertaintyRatio),
+      confidenceInterval: {
+        lower: round(Math.max(value * (1 - grid.uncertaintyRatio), 0)),
+        upper: round(value * (1 + grid.uncertaintyRatio))
+      },
+      unit: 'kg CO₂e'
+    },
+    breakdown,
+    source: {
+      type: 'calculation',
+      organization: '平台',
+      report: '一餐饭基准值因子计算',
+      methodology: '典型餐食结构 × 因子库食材 / 能源因子（按地区回退到全国平均）'
+    },
+    status: 'active'
+  };
+}
+
 /**
  * 获取默认基准值（当精确匹配失败时）
  */
@@ -58,6 +136,17 @@ async function getDefaultBaseline(mealTime, region, energyType) {
     };
   }
   
+  // 数据库中没有全国平均基准值时，使用因子计算的基准值网格
+  const gridBaseline = lookupGridBaseline(mealTime, region, energyType);
+  if (gridBaseline) {
+    return {
+      success: true,
+      data: gridBaseline,
+      isDefault: true,
+      message: '数据库中没有匹配的基准值，使用因子计算的基准值网格'
+    };
+  }
+
   // 如果还是没有，返回错误
   return {
     success: false,
@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+每日统计（daily_stats）流式聚合脚本
+用 daily_stats.py 从 meals 的 JSONL 流（导出文件或持续追加的事件日志）按 (userId, 日期) 聚合，
+写出 upsert 批次（JSONL，每行一条）:
+    {"userId": ..., "date": {"$date": 本地 0 点}, "op": "inc" | "set", "data": {"totalMeals": n, "mealTypes.lunch": n, ...}}
+op 为 inc 时按 _.inc 累加，为 set 时直接写入；没有匹配的文档时新建。data 只含由 meals 得到的字段，
+不会覆盖 order-sync / restaurant-order-sync 写入的 shopping.* / restaurant.* / carbonCredits.*
+
+增量模式（默认）：从检查点记录的字节偏移继续读，内存中的分组数超过 --max-groups 或读完一批餐食时
+写出一个 inc 批次，再原子更新检查点。批次文件名带有它覆盖的字节范围，写出批次后、更新检查点前中断时，
+重新运行会认领已写出的批次而不是重复累加；--follow 持续跟踪文件追加，可作为常驻的聚合进程。
+    <out>/checkpoint.json                  输入文件、已处理到的偏移、批次数
+    <out>/batches/inc-<起>-<止>.jsonl       inc 批次
+
+重建模式（--rebuild）：对 --from / --to 日期范围（本地日期，含两端）从头重新聚合，写出 set 批次，修复漂移。
+多进程按字节范围并行解析，部分结果按 userId 哈希分桶落盘后再逐桶汇总，内存与文件大小无关；
+--existing 传入 daily_stats 导出时，范围内已有文档但已没有餐食的 (userId, 日期) 写出全 0
+    <out>/rebuild.json                     日期范围、读取到的偏移（可作为增量模式的起点）
+    <out>/updates/set-NNNNN.jsonl          set 批次（每个桶一个）
+
+用法:
+    python scripts/aggregate-daily-stats.py --meals export/meals.jsonl --out /tmp/daily-stats
+    python scripts/aggregate-daily-stats.py --meals logs/meals.jsonl --out /tmp/daily-stats --follow --poll 2
+    python scripts/aggregate-daily-stats.py --meals export/meals.jsonl --out /tmp/daily-rebuild --rebuild \\
+        --from 2025-06-01 --to 2025-06-30 --existing export/daily_stats.jsonl --workers 8
+"""
+
+import argparse
+import glob
+import json
+import os
+import shutil
+import signal
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from daily_stats import (DEFAULT_BUCKETS, DEFAULT_MAX_GROUPS, DEFAULT_TZ_OFFSET, REDUCTION, WIDTH, Aggregator,
+                         LocalDate, bucket_of, complete_size, head_crc, iter_line_blocks, line_ranges, meal_fields,
+                         update_lines)
+from json_stream import atomic_write_json, atomic_write_lines, iter_records
+
+CHECKPOINT_VERSION = 1
+DEFAULT_BATCH_MEALS = 200000
+HEAD_SIZE = 4096
+
+
+def batch_path(out_dir, start, end):
+    return os.path.join(out_dir, 'batches', f"inc-{start:015d}-{end:015d}.jsonl")
+
+
+def load_checkpoint(args):
+    """读取检查点并认领中断时已写出的批次；输入文件被替换或截断时退出"""
+    path = os.path.join(args.out, 'checkpoint.json')
+    checkpoint = None
+    if not args.fresh and os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            checkpoint = json.load(f)
+        if checkpoint.get('version') != CHECKPOINT_VERSION or checkpoint.get('tzOffset') != args.tz_offset:
+            print('❌ 检查点的版本或时区与本次参数不一致，请使用 --fresh 重新开始')
+            sys.exit(1)
+    if checkpoint is None:
+        shutil.rmtree(os.path.join(args.out, 'batches'), ignore_errors=True)
+        checkpoint = {'version': CHECKPOINT_VERSION, 'meals': os.path.abspath(args.meals), 'tzOffset': args.tz_offset,
+                      'offset': args.start_offset, 'headSize': 0, 'head': 0, 'batches': 0, 'mealCount': 0, 'skipped': 0}
+    os.makedirs(os.path.join(args.out, 'batches'), exist_ok=True)
+
+    size = os.path.getsize(args.meals)
+    if size < checkpoint['offset'] or (checkpoint['headSize'] and
+                                       head_crc(args.meals, checkpoint['headSize']) != checkpoint['head']):
+        print(f"❌ {args.meals} 已被截断或替换（检查点偏移 {checkpoint['offset']}，文件大小 {size}），请使用 --fresh 重新开始")
+        sys.exit(1)
+
+    claimed = False
+    while True:
+        found = glob.glob(os.path.join(args.out, 'batches', f"inc-{checkpoint['offset']:015d}-*.jsonl"))
+        if not found:
+            break
+        end = int(os.path.basename(found[0])[len('inc-') + 16:-len('.jsonl')])
+        print(f"🔄 认领中断前已写出的批次 {os.path.basename(found[0])}")
+        checkpoint['mealCount'] += sum(record['data']['totalMeals'] for record in iter_records(found[0]))
+        checkpoint['skipped'] += count_skipped(args.meals, checkpoint['offset'], end, LocalDate(args.tz_offset))
+        checkpoint['offset'] = end
+        checkpoint['batches'] += 1
+        claimed = True
+    if claimed:
+        # 认领的结果立即落盘：之后没有新的餐食时不会再写检查点，否则每次运行都会重新认领同样的批次
+        atomic_write_json(path, checkpoint)
+    return path, checkpoint
+
+
+def count_skipped(meals, start, end, local_date):
+    """批次文件中没有记录跳过的行数，认领时重新扫描该批次的字节范围"""
+    skipped = 0
+    for lines, _ in iter_line_blocks(meals, start, end):
+        skipped += sum(1 for line in lines if line.strip() and meal_fields(line, local_date) is None)
+    return skipped
+
+
+def run_incremental(args):
+    checkpoint_path, checkpoint = load_checkpoint(args)
+    local_date = LocalDate(args.tz_offset)
+    aggregator = Aggregator(local_date)
+    started = time.perf_counter()
+    start_meals = checkpoint['mealCount']
+    print(f"🔄 从偏移 {checkpoint['offset']} 开始聚合 {args.meals}（已写出 {checkpoint['batches']} 个批次）")
+
+    def emit(end):
+        """把内存中的分组写成一个 inc 批次，然后更新检查点"""
+        groups = aggregator.drain()
+        path = batch_path(args.out, checkpoint['offset'], end)
+        count = atomic_write_lines(path, update_lines(groups, 'inc', local_date, args.date_strings), encoded=True)
+        checkpoint.update(offset=end, batches=checkpoint['batches'] + 1,
+                          mealCount=checkpoint['mealCount'] + aggregator.meals,
+                          skipped=checkpoint['skipped'] + aggregator.skipped)
+        if checkpoint['headSize'] < HEAD_SIZE:
+            checkpoint['headSize'] = min(HEAD_SIZE, end)
+            checkpoint['head'] = head_crc(args.meals, checkpoint['headSize'])
+        aggregator.meals = aggregator.skipped = 0
+        atomic_write_json(checkpoint_path, checkpoint)
+        elapsed = time.perf_counter() - started
+        done = checkpoint['mealCount'] - start_meals
+        print(f"  ✓ {os.path.basename(path)}: {count} 条 upsert，本次已处理 {done} 条餐食"
+              f"（{done / max(elapsed, 1e-9):,.0f} 条/秒）")
+
+    position = checkpoint['offset']
+    while True:
+        end = complete_size(args.meals)
+        for lines, position in iter_line_blocks(args.meals, position, end):
+            aggregator.add_lines(lines)
+            if len(aggregator.groups) >= args.max_groups or aggregator.meals >= args.batch_meals:
+                emit(position)
+        if aggregator.meals or aggregator.skipped:
+            emit(position)
+        if not args.follow:
+            break
+        time.sleep(args.poll)
+
+    elapsed = time.perf_counter() - started
+    done = checkpoint['mealCount'] - start_meals
+    print(f"\n✅ 本次处理 {done} 条餐食，耗时 {elapsed:.2f}s（{done / max(elapsed, 1e-9):,.0f} 条/秒）")
+    print(f"📊 累计 {checkpoint['mealCount']} 条餐食、{checkpoint['batches']} 个批次，已处理到偏移 {checkpoint['offset']}")
+    if checkpoint['skipped']:
+        print(f"⚠️  累计跳过无法解析的行 {checkpoint['skipped']} 条")
+    print(f"📁 inc 批次: {os.path.join(args.out, 'batches')}")
+
+
+def spill_path(out_dir, bucket, part):
+    return os.path.join(out_dir, 'spill', f"bucket-{bucket:05d}", f"part-{part:05d}.tsv")
+
+
+def spill(aggregator, out_dir, part, buckets, handles):
+    """把部分结果按 userId 哈希追加到各桶的临时文件：userId、日期、各累加值以制表符分隔"""
+    for (user, day), values in aggregator.groups.items():
+        bucket = bucket_of(user, buckets)
+        out = handles.get(bucket)
+        if out is None:
+            out = handles[bucket] = open(spill_path(out_dir, bucket, part), 'ab')
+        out.write(b'\t'.join([user, day] + [repr(value).encode() for value in values]) + b'\n')
+    aggregator.groups = {}
+
+
+def map_range(task):
+    """进程池任务：解析一段字节范围内的餐食，部分结果落盘；返回 (餐食数, 跳过行数)"""
+    meals, start, end, part, out_dir, buckets, tz_offset, date_from, date_to, max_groups = task
+    aggregator = Aggregator(LocalDate(tz_offset), date_from, date_to)
+    handles = {}
+    try:
+        for lines, _ in iter_line_blocks(meals, start, end):
+            aggregator.add_lines(lines)
+            if len(aggregator.groups) >= max_groups:
+                spill(aggregator, out_dir, part, buckets, handles)
+        spill(aggregator, out_dir, part, buckets, handles)
+    finally:
+        for out in handles.values():
+            out.close()
+    return aggregator.meals, aggregator.skipped
+
+
+def map_existing(task):
+    """进程池任务：范围内已有的 daily_stats 文档记为 0，汇总后没有餐食的写出全 0；返回文档数"""
+    path, part, out_dir, buckets, tz_offset, date_from, date_to = task
+    local_date = LocalDate(tz_offset)
+    aggregator = Aggregator(local_date)
+    handles = {}
+    count = 0
+    try:
+        for doc in iter_records(path):
+            stamp = doc.get('date')
+            if isinstance(stamp, dict):
+                stamp = stamp.get('$date')
+            day = local_date(stamp) if isinstance(stamp, str) and doc.get('userId') else None
+            if day is None or (date_from and day < date_from) or (date_to and day > date_to):
+                continue
+            aggregator.merge((str(doc['userId']).encode(), day), [0] * WIDTH)
+            count += 1
+        spill(aggregator, out_dir, part, buckets, handles)
+    finally:
+        for out in handles.values():
+            out.close()
+    return count
+
+
+def reduce_bucket(task):
+    """进程池任务：汇总一个桶的全部部分结果，写出 set 批次；返回 upsert 条数"""
+    out_dir, bucket, tz_offset, date_strings = task
+    local_date = LocalDate(tz_offset)
+    aggregator = Aggregator(local_date)
+    for path in sorted(glob.glob(os.path.join(out_dir, 'spill', f"bucket-{bucket:05d}", '*.tsv'))):
+        with open(path, 'rb') as f:
+            for line in f:
+                fields = line.rstrip(b'\n').split(b'\t')
+                values = [int(value) for value in fields[2:REDUCTION + 2]] + [float(fields[REDUCTION + 2])] + \
+                    [int(value) for value in fields[REDUCTION + 3:]]
+                aggregator.merge((fields[0], fields[1]), values)
+    path = os.path.join(out_dir, 'updates', f"set-{bucket:05d}.jsonl")
+    return atomic_write_lines(path, update_lines(aggregator.drain(), 'set', local_date, date_strings), encoded=True)
+
+
+def run_tasks(function, tasks, workers):
+    if workers <= 1:
+        return [function(task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(function, tasks))
+
+
+def run_rebuild(args):
+    date_from = args.date_from.encode() if args.date_from else None
+    date_to = args.date_to.encode() if args.date_to else None
+    for name in ('spill', 'updates', 'rebuild.json'):
+        target = os.path.join(args.out, name)
+        if os.path.isdir(target):
+            shutil.rmtree(target)
+        elif os.path.exists(target):
+            os.remove(target)
+    for bucket in range(args.buckets):
+        os.makedirs(os.path.dirname(spill_path(args.out, bucket, 0)), exist_ok=True)
+    os.makedirs(os.path.join(args.out, 'updates'))
+
+    end = complete_size(args.meals)
+    ranges = line_ranges(args.meals, max(1, args.workers) * 4, args.start_offset, end)
+    span = f"{args.date_from or '最早'} ~ {args.date_to or '最晚'}"
+    print(f"🔄 重建 {span} 的 daily_stats：{end - args.start_offset:,} 字节分 {len(ranges)} 段，"
+          f"{args.buckets} 个桶，{args.workers} 个进程")
+    started = time.perf_counter()
+    tasks = [(args.meals, lo, hi, part, args.out, args.buckets, args.tz_offset, date_from, date_to,
+              max(1, args.max_groups // max(1, args.workers)))
+             for part, (lo, hi) in enumerate(ranges)]
+    results = run_tasks(map_range, tasks, args.workers)
+    meals = sum(result[0] for result in results)
+    skipped = sum(result[1] for result in results)
+    parsed = time.perf_counter() - started
+    print(f"  ✓ 解析 {meals} 条范围内餐食，耗时 {parsed:.2f}s（{end - args.start_offset:,} 字节，"
+          f"{(end - args.start_offset) / max(parsed, 1e-9) / 1e6:.1f} MB/秒）")
+
+    existing = 0
+    if args.existing:
+        tasks = [(path, len(ranges) + n, args.out, args.buckets, args.tz_offset, date_from, date_to)
+                 for n, path in enumerate(args.existing)]
+        existing = sum(run_tasks(map_existing, tasks, args.workers))
+        print(f"  ✓ 范围内已有 daily_stats 文档 {existing} 条")
+
+    tasks = [(args.out, bucket, args.tz_offset, args.date_strings) for bucket in range(args.buckets)]
+    upserts = sum(run_tasks(reduce_bucket, tasks, args.workers))
+    shutil.rmtree(os.path.join(args.out, 'spill'))
+    elapsed = time.perf_counter() - started
+
+    atomic_write_json(os.path.join(args.out, 'rebuild.json'), {
+        'meals': os.path.abspath(args.meals), 'from': args.date_from, 'to': args.date_to, 'tzOffset': args.tz_offset,
+        'startOffset': args.start_offset, 'offset': end, 'mealCount': meals, 'skipped': skipped,
+        'existing': existing, 'upserts': upserts,
+    })
+    print(f"\n✅ 重建完成: {meals} 条餐食 → {upserts} 条 set upsert，耗时 {elapsed:.2f}s")
+    if skipped:
+        print(f"⚠️  跳过无法解析的行 {skipped} 条")
+    print(f"📊 已读取到偏移 {end}，之后的餐食可用 --start-offset {end} 增量聚合")
+    print(f"📁 set 批次: {os.path.join(args.out, 'updates')}")
+
+
+def _raise_interrupt(signum, frame):
+    raise KeyboardInterrupt()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='从 meals 事件流按 (userId, 日期) 聚合 daily_stats，支持断点续读和按日期范围重建')
+    parser.add_argument('--meals', required=True, help='meals 的 JSONL 导出或事件日志')
+    parser.add_argument('--out', required=True, help='输出目录（批次、检查点）')
+    parser.add_argument('--rebuild', action='store_true', help='重建模式：对日期范围从头聚合，写出 set 批次')
+    parser.add_argument('--from', dest='date_from', help='重建的起始日期 YYYY-MM-DD（本地日期，含）')
+    parser.add_argument('--to', dest='date_to', help='重建的结束日期 YYYY-MM-DD（本地日期，含）')
+    parser.add_argument('--existing', nargs='+', help='daily_stats 导出，重建时把范围内已没有餐食的文档清零')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='重建模式的进程数')
+    parser.add_argument('--buckets', type=int, default=DEFAULT_BUCKETS, help='重建模式按 userId 分桶的桶数')
+    parser.add_argument('--follow', action='store_true', help='增量模式：读到文件末尾后继续等待追加')
+    parser.add_argument('--poll', type=float, default=1.0, help='--follow 时检查文件追加的间隔（秒）')
+    parser.add_argument('--batch-meals', type=int, default=DEFAULT_BATCH_MEALS, help='增量模式每个批次最多包含的餐食数')
+    parser.add_argument('--max-groups', type=int, default=DEFAULT_MAX_GROUPS, help='内存中最多保留的 (userId, 日期) 分组数')
+    parser.add_argument('--start-offset', type=int, default=0, help='从该字节偏移开始读（首次运行或重建时生效）')
+    parser.add_argument('--tz-offset', type=float, default=DEFAULT_TZ_OFFSET, help='本地时区相对 UTC 的小时数')
+    parser.add_argument('--date-strings', action='store_true', help='date 写成 YYYY-MM-DD 字符串而不是本地 0 点的 $date')
+    parser.add_argument('--fresh', action='store_true', help='增量模式丢弃检查点和已写出的批次，从头开始')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.meals):
+        print(f"❌ 文件不存在: {args.meals}")
+        sys.exit(1)
+    if args.meals.endswith('.gz'):
+        print('❌ 按字节偏移断点续读需要未压缩的 JSONL')
+        sys.exit(1)
+    for value in (args.date_from, args.date_to):
+        if value and (len(value) != 10 or value[4] != '-' or value[7] != '-'):
+            print(f"❌ 日期格式应为 YYYY-MM-DD: {value}")
+            sys.exit(1)
+    os.makedirs(args.out, exist_ok=True)
+
+    if args.rebuild:
+        run_rebuild(args)
+        return
+    if args.date_from or args.date_to or args.existing:
+        print('❌ --from / --to / --existing 只用于 --rebuild')
+        sys.exit(1)
+    # 常驻进程用 SIGTERM 结束时同样输出汇总；未写出的分组没有进入检查点，下次运行会重新读取
+    signal.signal(signal.SIGTERM, _raise_interrupt)
+    try:
+        run_incremental(args)
+    except KeyboardInterrupt:
+        print('\n⚠️  已中断，下次运行从检查点继续')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+索引基准测试
+把文档载入本地内存文档库（docstore.py），按查询形态日志生成具体查询，
+对比每个查询在全部索引可用与隐藏单个索引时的延迟、扫描键数和扫描文档数
+
+用法:
+    python scripts/benchmark-indexes.py scripts/query-shapes.sample.jsonl --documents 100000
+    python scripts/benchmark-indexes.py queries.jsonl --data meals=meals.jsonl --data daily_stats=daily_stats.jsonl
+"""
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+
+from docstore import DocumentStore, get_values
+from index_catalog import indexes_by_collection, load_indexes, load_query_shapes
+from synthetic_data import generate_documents
+
+
+def load_jsonl(path, limit=None):
+    with open(path, 'r', encoding='utf-8') as f:
+        for i, line in enumerate(f):
+            if limit is not None and i >= limit:
+                break
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def build_query(shape, sample):
+    """用样本文档的字段值把查询形态实例化为具体查询"""
+    query = {}
+    for field in shape.equality:
+        values = get_values(sample, field)
+        value = values[0]
+        query[field] = value[0] if isinstance(value, list) and value else value
+    for field in shape.range:
+        value = get_values(sample, field)[0]
+        query[field] = {'$gte': value}
+    return query
+
+
+def run_queries(coll, queries, repeat):
+    """返回每个查询的 (中位延迟毫秒, 执行计划摘要)"""
+    results = []
+    for query, sort, limit in queries:
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            coll.find(query, sort, limit)
+            timings.append((time.perf_counter() - started) * 1000)
+        explain = coll.explain(query, sort, limit)
+        results.append((statistics.median(timings), explain))
+    return results
+
+
+def _plan_index(explain):
+    stage = explain['queryPlanner']['winningPlan']
+    while 'inputStage' in stage:
+        stage = stage['inputStage']
+    return stage.get('indexName', 'COLLSCAN')
+
+
+def benchmark_collection(store, name, shapes, repeat, rng):
+    coll = store.collection(name)
+    docs = list(coll.docs.values())
+    if not docs:
+        return None
+
+    queries = []
+    for shape in shapes:
+        # 尽量选取包含全部过滤字段的样本文档
+        for _ in range(50):
+            sample = rng.choice(docs)
+            if all(get_values(sample, f) != [None] for f in shape.equality + shape.range):
+                break
+        queries.append((build_query(shape, sample), shape.sort, shape.limit))
+
+    baseline = run_queries(coll, queries, repeat)
+    report = {
+        'collection': name,
+        'documents': len(docs),
+        'queries': [
+            {'query': q, 'sort': list(sort), 'limit': limit, 'index': _plan_index(e),
+             'medianMillis': round(ms, 3),
+             'keysExamined': e['executionStats']['totalKeysExamined'],
+             'docsExamined': e['executionStats']['totalDocsExamined']}
+            for (q, sort, limit), (ms, e) in zip(queries, baseline)
+        ],
+        'indexes': [],
+    }
+    baseline_total = sum(ms for ms, _ in baseline)
+
+    for index in list(coll.indexes.values()):
+        if index.name == '_id_':
+            continue
+        coll.hide_index(index.name)
+        hidden = run_queries(coll, queries, repeat)
+        coll.hide_index(index.name, False)
+        hidden_total = sum(ms for ms, _ in hidden)
+        report['indexes'].append({
+            'index': index.name,
+            'usedBy': sum(1 for _, e in baseline if _plan_index(e) == index.name),
+            'totalMillisWith': round(baseline_total, 3),
+            'totalMillisWithout': round(hidden_total, 3),
+            'slowdown': round(hidden_total / baseline_total, 2) if baseline_total else None,
+            'docsExaminedWithout': sum(e['executionStats']['totalDocsExamined'] for _, e in hidden),
+        })
+    report['indexes'].sort(key=lambda r: -(r['totalMillisWithout'] - r['totalMillisWith']))
+    return report
+
+
+def print_report(report):
+    print(f"\n📦 {report['collection']}（{report['documents']} 条文档）")
+    for q in report['queries']:
+        print(f"  - {q['index']:<36} {q['medianMillis']:>9.3f}ms  keys {q['keysExamined']:<8} docs {q['docsExamined']:<8} "
+              f"{json.dumps(q['query'], ensure_ascii=False)} sort={q['sort']} limit={q['limit']}")
+    print("  隐藏单个索引后的总延迟:")
+    for r in report['indexes']:
+        mark = '🔥' if r['usedBy'] else '  '
+        print(f"   {mark} {r['index']:<36} {r['totalMillisWith']:>9.3f}ms → {r['totalMillisWithout']:>9.3f}ms"
+              f"  (×{r['slowdown']}, 被 {r['usedBy']} 个查询使用)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='在本地内存文档库中对声明的索引做基准测试')
+    parser.add_argument('queries', help='查询形态 JSONL 文件')
+    parser.add_argument('--data', action='append', default=[], metavar='COLLECTION=PATH',
+                        help='集合数据 JSONL 文件，可重复指定')
+    parser.add_argument('--documents', type=int, default=50000, help='未提供数据文件时每个集合生成的文档数（synthetic_data.py）')
+    parser.add_argument('--collection', help='只测试指定集合')
+    parser.add_argument('--repeat', type=int, default=5, help='每个查询重复执行次数')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', dest='json_output', help='把完整报告写入 JSON 文件')
+    args = parser.parse_args()
+
+    shapes = load_query_shapes(args.queries)
+    if args.collection:
+        shapes = [shape for shape in shapes if shape.collection == args.collection]
+    if not shapes:
+        print("❌ 没有可测试的查询形态")
+        sys.exit(1)
+
+    data_files = dict(item.split('=', 1) for item in args.data)
+    grouped = indexes_by_collection(load_indexes())
+    store = DocumentStore()
+    rng = random.Random(args.seed)
+    reports = []
+
+    for name in sorted({shape.collection for shape in shapes}):
+        specs = grouped.get(name, [])
+        started = time.perf_counter()
+        if name in data_files:
+            docs = load_jsonl(data_files[name])
+        else:
+            docs = generate_documents(name, 0, args.documents, args.seed)
+        store.apply_index_specs(specs)
+        store.collection(name).insert_many(docs)
+        print(f"⏳ {name}: 载入 {store.collection(name).count()} 条文档并建立 {len(specs)} 个索引，"
+              f"耗时 {time.perf_counter() - started:.1f}s")
+
+        report = benchmark_collection(store, name, [s for s in shapes if s.collection == name], args.repeat, rng)
+        if report:
+            reports.append(report)
+            print_report(report)
+
+    if args.json_output:
+        with open(args.json_output, 'w', encoding='utf-8') as f:
+            json.dump(reports, f, ensure_ascii=False, indent=2)
+        print(f"\n📁 报告已保存至: {args.json_output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+植物解锁索引基准测试
+以 plant-data.json 为模板合成不同规模的植物目录（默认 60 → 60000 种），
+对比解锁索引（plant_index.py）与逐个扫描全部模板的查询耗时，
+并校验两种方式返回的解锁集合一致；另外测量生长阶段批量解析（GrowthResolver）的吞吐
+
+用法:
+    python scripts/benchmark-plant-index.py
+    python scripts/benchmark-plant-index.py --sizes 60,1000,10000 --queries 500
+    python scripts/benchmark-plant-index.py --sizes 60 --gardens 5000000
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+from plant_index import LEVEL_ORDER, GrowthResolver, UnlockIndex, scan_unlocked
+
+PLANT_DATA_FILE = os.path.join(os.path.dirname(__file__), '../cloudfunctions/plant-templates/plant-data.json')
+
+
+def synthesize_catalogue(templates, size, rng):
+    """复制模板并随机扰动阈值，生成指定数量的植物（前置植物链保持指向同一批次内的植物）"""
+    plants = []
+    for batch in range((size + len(templates) - 1) // len(templates)):
+        suffix = '' if batch == 0 else f"_{batch}"
+        for template in templates:
+            if len(plants) >= size:
+                break
+            req = dict(template['unlockRequirements'])
+            scale = 1 if batch == 0 else rng.uniform(0.5, 2.0)
+            req['totalPoints'] = int(req.get('totalPoints', 0) * scale)
+            req['totalCarbon'] = int(req.get('totalCarbon', 0) * scale * rng.uniform(0.9, 1.1))
+            if req.get('prerequisitePlants'):
+                req['prerequisitePlants'] = [name + suffix for name in req['prerequisitePlants']]
+            plants.append({
+                'plantId': template['plantId'] + suffix,
+                'name': template['name'] + suffix,
+                'unlockRequirements': req,
+                'status': 'active',
+            })
+    return plants
+
+
+def make_users(count, rng):
+    users = []
+    for _ in range(count):
+        level = rng.choice(LEVEL_ORDER)
+        points = int(rng.paretovariate(1.2) * 300)
+        users.append((level, points, int(points * rng.uniform(0.05, 0.15))))
+    return users
+
+
+def time_per_query(func, users):
+    timings = []
+    for level, points, carbon in users:
+        started = time.perf_counter()
+        func(level, points, carbon)
+        timings.append((time.perf_counter() - started) * 1e6)
+    return statistics.median(timings)
+
+
+def benchmark_growth(templates, gardens, seed):
+    """逐个解析与 NumPy 批量解析的吞吐对比，返回 (逐个 次/秒, 批量 次/秒)"""
+    import numpy as np
+
+    resolver = GrowthResolver.from_plants(templates)
+    rng = np.random.default_rng(seed)
+    codes = rng.integers(0, len(resolver.plant_ids), gardens)
+    days = rng.uniform(0, 150, gardens)
+    carbon = rng.uniform(0, 400, gardens)
+
+    sample = min(gardens, 100000)
+    plant_ids = [resolver.plant_ids[code] for code in codes[:sample]]
+    started = time.perf_counter()
+    scalar = [resolver.resolve(plant_ids[i], days[i], carbon[i])['stageIndex'] for i in range(sample)]
+    scalar_rate = sample / (time.perf_counter() - started)
+
+    started = time.perf_counter()
+    stage_index, _, _ = resolver.resolve_batch(codes, days, carbon)
+    batch_rate = gardens / (time.perf_counter() - started)
+
+    if list(stage_index[:sample]) != scalar:
+        print("❌ 批量解析结果与逐个解析不一致")
+        sys.exit(1)
+    return scalar_rate, batch_rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description='对比植物解锁索引与全量扫描的查询耗时')
+    parser.add_argument('--sizes', default='60,600,6000,60000', help='植物目录规模，逗号分隔')
+    parser.add_argument('--queries', type=int, default=300, help='每个规模的随机用户数')
+    parser.add_argument('--gardens', type=int, default=1000000, help='生长阶段批量解析的花园数，0 表示跳过')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子')
+    parser.add_argument('--json', dest='json_output', help='把结果写入 JSON 文件')
+    args = parser.parse_args()
+
+    with open(PLANT_DATA_FILE, 'r', encoding='utf-8') as f:
+        templates = json.load(f)
+
+    rng = random.Random(args.seed)
+    users = make_users(args.queries, rng)
+    results = []
+    print("🌱 植物解锁查询基准（中位耗时，微秒/次）")
+    print(f"  {'植物数':>8}{'建索引ms':>10}{'二分定位':>12}{'索引查询':>10}{'全量扫描':>12}{'加速比':>8}")
+    for size in (int(s) for s in args.sizes.split(',')):
+        plants = synthesize_catalogue(templates, size, rng)
+        started = time.perf_counter()
+        index = UnlockIndex.from_plants(plants)
+        build_ms = (time.perf_counter() - started) * 1000
+
+        for level, points, carbon in users[:20]:
+            if sorted(index.query(level, points, carbon)['unlocked']) != sorted(scan_unlocked(plants, level, points, carbon)):
+                print(f"❌ 规模 {size} 的查询结果与全量扫描不一致: {level} {points} {carbon}")
+                sys.exit(1)
+
+        # 只做二分定位，不物化解锁列表，耗时应与目录规模基本无关
+        locate_us = time_per_query(lambda l, p, c: index.unlock_positions(l, p), users)
+        index_us = time_per_query(index.query, users)
+        scan_us = time_per_query(lambda l, p, c: scan_unlocked(plants, l, p, c), users)
+        results.append({
+            'plants': size, 'buildMs': round(build_ms, 2), 'locateMicros': round(locate_us, 2),
+            'indexMicros': round(index_us, 2), 'scanMicros': round(scan_us, 2),
+        })
+        print(f"  {size:>8}{build_ms:>10.1f}{locate_us:>12.1f}{index_us:>10.1f}{scan_us:>12.1f}{scan_us / index_us:>7.0f}x")
+
+    print("\n✅ 索引查询结果与全量扫描一致")
+    print("   定位耗时只随 log(n) 增长；索引查询额外包含解锁列表的切片复制，与结果集大小成正比")
+
+    growth = None
+    if args.gardens:
+        scalar_rate, batch_rate = benchmark_growth(templates, args.gardens, args.seed)
+        growth = {'gardens': args.gardens, 'scalarPerSecond': round(scalar_rate), 'batchPerSecond': round(batch_rate)}
+        print(f"\n🌿 生长阶段解析（{args.gardens} 个花园）")
+        print(f"   - 逐个 bisect: {scalar_rate:,.0f} 次/秒")
+        print(f"   - NumPy 批量: {batch_rate:,.0f} 次/秒（{batch_rate / scalar_rate:.0f}x）")
+
+    if args.json_output:
+        with open(args.json_output, 'w', encoding='utf-8') as f:
+            json.dump({'unlock': results, 'growth': growth}, f, ensure_ascii=False, indent=2)
+        print(f"📁 结果已保存至: {args.json_output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+食谱筛选索引基准测试
+以 recipe-data.json 为模板合成不同规模的食谱库（默认 50 → 100000 道），
+随机生成组合筛选条件，对比位图索引（recipe_filter_index.py）与逐条扫描列表的耗时，
+并校验两种方式的结果一致；另外测量结果集分面计数的耗时
+
+用法:
+    python scripts/benchmark-recipe-filter.py
+    python scripts/benchmark-recipe-filter.py --sizes 50,10000,100000 --queries 200
+"""
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+
+from recipe_filter_index import FACETS, RECIPES_FILE, RecipeFilterIndex, facet_values, scan_filter
+
+
+def synthesize_recipes(templates, size, rng):
+    """复制模板并随机扰动烹饪时长、季节和标签"""
+    seasons = ['spring', 'summer', 'autumn', 'winter']
+    tags = sorted({tag for recipe in templates for tag in recipe.get('tags') or []})
+    recipes = []
+    for i in range(size):
+        template = templates[i % len(templates)]
+        recipe = dict(template, recipeId=f"{template['recipeId']}_{i}")
+        if i >= len(templates):
+            recipe['cookingTime'] = max(5, int(template.get('cookingTime', 30) * rng.uniform(0.5, 2.0)))
+            recipe['season'] = ','.join(sorted(rng.sample(seasons, rng.randint(1, 2))))
+            recipe['tags'] = [tag for tag in template.get('tags') or [] if rng.random() > 0.2] + rng.sample(tags, 1)
+        recipes.append(recipe)
+    return recipes
+
+
+def make_queries(recipes, count, rng):
+    """随机组合 1~3 个维度的析取条件，部分附带必含食材、排除条件和时长范围"""
+    values = {facet: set() for facet in FACETS}
+    for recipe in recipes[:1000]:
+        for facet, vs in facet_values(recipe).items():
+            values[facet].update(vs)
+    values = {facet: sorted(vs) for facet, vs in values.items() if vs}
+    queries = []
+    for _ in range(count):
+        facets = rng.sample(sorted(values), rng.randint(1, 3))
+        query = {'any_of': {f: rng.sample(values[f], min(len(values[f]), rng.randint(1, 3))) for f in facets}}
+        if rng.random() < 0.3:
+            query['all_of'] = {'ingredient': rng.sample(values['ingredient'], 1)}
+        if rng.random() < 0.3:
+            query['exclude'] = {'tags': rng.sample(values['tags'], 1)}
+        if rng.random() < 0.5:
+            low = rng.choice([None, 10, 20])
+            query['cooking_time'] = (low, rng.choice([25, 40, 60, None]))
+        queries.append(query)
+    return queries
+
+
+def time_per_query(func, queries):
+    start = time.perf_counter()
+    results = [func(query) for query in queries]
+    return (time.perf_counter() - start) / len(queries), results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='食谱筛选位图索引基准测试')
+    parser.add_argument('--sizes', default='50,1000,10000,100000', help='逗号分隔的食谱库规模')
+    parser.add_argument('--queries', type=int, default=200, help='每个规模的查询数')
+    parser.add_argument('--seed', type=int, default=42, help='随机种子')
+    parser.add_argument('--json', dest='json_output', help='把结果写入 JSON 文件')
+    args = parser.parse_args()
+
+    with open(RECIPES_FILE, 'r', encoding='utf-8') as f:
+        templates = json.load(f)
+    rng = random.Random(args.seed)
+
+    rows = []
+    for size in [int(s) for s in args.sizes.split(',')]:
+        recipes = synthesize_recipes(templates, size, rng)
+        start = time.perf_counter()
+        index = RecipeFilterIndex.build(recipes)
+        build_time = time.perf_counter() - start
+        queries = make_queries(recipes, args.queries, rng)
+
+        index_time, index_results = time_per_query(lambda q: index.filter(**q), queries)
+        scan_time, scan_results = time_per_query(lambda q: scan_filter(recipes, **q), queries)
+        mismatches = sum(1 for a, b in zip(index_results, scan_results) if a.to_array().tolist() != b)
+        facet_time, _ = time_per_query(lambda r: index.facet_counts(r, ['tags', 'season', 'difficulty']),
+                                       index_results)
+        rows.append({
+            'recipes': size,
+            'buildMs': round(build_time * 1000, 2),
+            'indexUs': round(index_time * 1e6, 1),
+            'scanUs': round(scan_time * 1e6, 1),
+            'facetUs': round(facet_time * 1e6, 1),
+            'speedup': round(scan_time / index_time, 1),
+            'avgHits': round(statistics.mean(len(r) for r in scan_results), 1),
+            'mismatches': mismatches,
+        })
+        print(f"📊 {size:>7} 道: 建索引 {build_time * 1000:8.1f} ms，位图 {index_time * 1e6:8.1f} µs/次，"
+              f"扫描 {scan_time * 1e6:10.1f} µs/次（{scan_time / index_time:6.1f}x），"
+              f"分面计数 {facet_time * 1e6:8.1f} µs/次，不一致 {mismatches}")
+
+    if args.json_output:
+        with open(args.json_output, 'w', encoding='utf-8') as f:
+            json.dump(rows, f, ensure_ascii=False, indent=2)
+        print(f"📁 结果已保存至: {args.json_output}")
+
+    if any(row['mismatches'] for row in rows):
+        print("❌ 位图索引与逐条扫描的结果不一致")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
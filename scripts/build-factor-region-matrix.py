@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+因子 × 地区矩阵构建脚本
+用 factor_region_matrix.py 把因子表（默认为 dedupe-factors.py 生成的 merged-factors.json）与区域电网因子
+预先展开为 因子 × 地区 矩阵，回退到 national_average 的结果和胜出来源都已写在格子里，
+写出 cloudfunctions/restaurant-menu-carbon/factor-region-matrix.json；
+输出文件已存在时只重算内容有变化的行（--full 强制全部重算）
+
+用法:
+    python scripts/build-factor-region-matrix.py
+    python scripts/build-factor-region-matrix.py --factors ../cloudfunctions/database/all-reliable-factors.json --full
+    python scripts/build-factor-region-matrix.py --lookup 电力@east_china --lookup 大米@northwest
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+from factor_dedup import MERGED_FACTORS_FILE
+from factor_region_matrix import (EXACT_REGION, LEVELS, REGION_MATRIX_FILE, RegionFactorMatrix, grid_factor_records,
+                                  load_factor_records, load_region_config)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='预先展开因子的地区回退，生成 因子 × 地区 矩阵')
+    parser.add_argument('--factors', nargs='+', default=[MERGED_FACTORS_FILE], help='因子文件（同一地区有多条时先出现的优先）')
+    parser.add_argument('--output', default=REGION_MATRIX_FILE, help='矩阵输出路径')
+    parser.add_argument('--full', action='store_true', help='忽略已有矩阵，全部重算')
+    parser.add_argument('--no-grid', action='store_true', help='不加入 carbon-baseline-init 中的区域电网因子')
+    parser.add_argument('--lookup', action='append', default=[], metavar='NAME[@REGION]', help='构建后查询因子，可重复指定')
+    args = parser.parse_args()
+
+    regions, mapping, grid = load_region_config()
+    records = load_factor_records(args.factors)
+    if not args.no_grid:
+        records += grid_factor_records(grid)
+
+    previous = None
+    if not args.full and os.path.exists(args.output):
+        try:
+            previous = RegionFactorMatrix.load(args.output)
+        except (ValueError, KeyError) as e:
+            print(f"⚠️  已有矩阵无法复用（{e}），全部重算")
+
+    start = time.perf_counter()
+    matrix, stats = RegionFactorMatrix.build(records, regions, mapping, previous=previous)
+    elapsed = time.perf_counter() - start
+    print(f"✅ {stats['rows']} 个因子 × {len(matrix.regions)} 个地区，耗时 {elapsed * 1000:.1f} ms"
+          f"（复用 {stats['reused']} 行，重算 {stats['rebuilt']} 行）")
+    counts = np.bincount(matrix.levels.ravel(), minlength=len(LEVELS))
+    print('📊 ' + '，'.join(f"{level} {count}" for level, count in zip(LEVELS, counts)))
+    for col, region in enumerate(matrix.regions):
+        exact = int((matrix.levels[:, col] == EXACT_REGION).sum())
+        print(f"  - {region}: 本地区因子 {exact}")
+
+    matrix.save(args.output)
+    print(f"📁 矩阵已保存至: {args.output}（{os.path.getsize(args.output) / 1024:.1f} KB）")
+
+    if args.lookup:
+        loaded = RegionFactorMatrix.load(args.output)
+        for query in args.lookup:
+            name, _, region = query.partition('@')
+            start = time.perf_counter()
+            result = loaded.lookup(name, region or None)
+            elapsed = time.perf_counter() - start
+            if result is None:
+                print(f"❌ {query}: 没有匹配的因子")
+            else:
+                print(f"🔍 {query}: {result['name']} {result['factorValue']} {result['unit']}，"
+                      f"{result['matchLevel']}（{result['source']} {result['year'] or ''} {result['region']}），"
+                      f"{elapsed * 1e6:.1f} µs")
+
+
+if __name__ == '__main__':
+    main()
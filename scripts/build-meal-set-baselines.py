@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+一餐饭基准值网格生成脚本
+用 meal_set_baselines.py 由典型餐食结构和 因子 × 地区 矩阵（build-factor-region-matrix.py 生成）一次算出
+地区 × 餐次（mealTime）× 用能方式（energyType）× 结构（mealStructure）的全部基准值，写出:
+    cloudfunctions/database/meal-set-baselines.json                     meal_set_baselines 导入数据
+    cloudfunctions/meal-set-baseline-query/meal-set-baseline-grid.json   稠密查询数组 + 坐标索引
+因子更新后重新构建矩阵、再运行本脚本即可；--regions 读取 region_configs 导出，把地区扩展到市 / 县级。
+输出不依赖运行时间：版本号必须指定，生效 / 失效日期默认取版本号的年份，createdAt / updatedAt 取生效日期
+
+用法:
+    python scripts/build-meal-set-baselines.py --version 2026.10
+    python scripts/build-meal-set-baselines.py --version 2026.10 --regions export/region_configs.jsonl --compact
+    python scripts/build-meal-set-baselines.py --version 2027.01 --effective-date 2027-01-01 --expiry-date 2027-12-31
+    python scripts/build-meal-set-baselines.py --version 2026.10 --dry-run --show lunch@south_china@gas --show dinner@CN_SOUTH_GZ@electric@full
+"""
+
+import argparse
+import os
+import re
+import time
+
+import numpy as np
+
+from factor_region_matrix import REGION_MATRIX_FILE, RegionFactorMatrix
+from json_stream import ArrayWriter, iter_records
+from meal_set_baselines import (DEFAULT_STRUCTURE, ENERGY_TYPES, GRID_FILE, IMPORT_FILE, MEAL_STRUCTURES, MEAL_TIMES,
+                                BaselineGrid, MealSetBaselineGrid, RegionTable)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='由因子库计算 地区 × 餐次 × 用能方式 × 结构 的一餐饭基准值网格')
+    parser.add_argument('--matrix', default=REGION_MATRIX_FILE, help='build-factor-region-matrix.py 生成的因子矩阵')
+    parser.add_argument('--regions', nargs='+', default=[], help='region_configs 导出（JSON 数组或 JSONL），用于扩展细分地区')
+    parser.add_argument('--output', default=IMPORT_FILE, help='导入数据输出路径')
+    parser.add_argument('--grid', default=GRID_FILE, help='查询数组输出路径')
+    parser.add_argument('--version', required=True, help='基准值版本号（YYYY.MM，如 2026.10）')
+    parser.add_argument('--effective-date', help='生效日期（默认为版本年份的 1 月 1 日，同时作为 createdAt / updatedAt）')
+    parser.add_argument('--expiry-date', help='失效日期（默认为版本年份次年的 12 月 31 日）')
+    parser.add_argument('--compact', action='store_true', help='导入数据写成紧凑格式（地区很多时文件小、写得快）')
+    parser.add_argument('--dry-run', action='store_true', help='只计算并输出统计，不写文件')
+    parser.add_argument('--show', action='append', default=[], metavar='MEALTIME@REGION@ENERGY[@STRUCTURE]',
+                        help='构建后查询基准值，可重复指定')
+    args = parser.parse_args()
+    if not re.match(r'^\d{4}\.\d{2}$', args.version):
+        parser.error(f"--version 应为 YYYY.MM: {args.version}")
+    year = int(args.version[:4])
+    args.effective_date = args.effective_date or f"{year}-01-01"
+    args.expiry_date = args.expiry_date or f"{year + 1}-12-31"
+
+    if not os.path.exists(args.matrix):
+        print(f"❌ 因子矩阵不存在: {args.matrix}，请先运行 build-factor-region-matrix.py")
+        return
+    matrix = RegionFactorMatrix.load(args.matrix)
+    table = RegionTable.build(record for path in args.regions for record in iter_records(path))
+
+    start = time.perf_counter()
+    grid = BaselineGrid.build(matrix, table)
+    elapsed = time.perf_counter() - start
+    print(f"✅ {len(grid.regions)} 个地区 × {len(MEAL_TIMES)} 个餐次 × {len(ENERGY_TYPES)} 种用能方式 × "
+          f"{len(MEAL_STRUCTURES)} 种结构 = {grid.values.size} 个基准值，耗时 {elapsed * 1000:.1f} ms")
+    if grid.missing:
+        print(f"⚠️  因子库中没有以下因子（按 0 计算）: {', '.join(grid.missing)}")
+    for t, meal_time in enumerate(MEAL_TIMES):
+        values = grid.values[:, t]
+        print(f"📊 {meal_time}: {values.min():.2f} ~ {values.max():.2f} kg CO₂e（均值 {values.mean():.2f}）")
+
+    if not args.dry_run:
+        start = time.perf_counter()
+        grid.save(args.grid)
+        with ArrayWriter(args.output, indent=None if args.compact else 2) as writer:
+            writer.write_all(grid.documents(args.version, args.effective_date, args.expiry_date))
+        elapsed = time.perf_counter() - start
+        print(f"📁 导入数据: {args.output}（{writer.count} 条，{os.path.getsize(args.output) / 1024:.1f} KB）")
+        print(f"📁 查询数组: {args.grid}（{os.path.getsize(args.grid) / 1024:.1f} KB），写出耗时 {elapsed:.2f}s")
+
+    loaded = MealSetBaselineGrid.load(args.grid) if not args.dry_run else MealSetBaselineGrid(grid.to_dict())
+    for query in args.show:
+        parts = query.split('@')
+        if len(parts) not in (3, 4):
+            print(f"❌ {query}: 格式应为 餐次@地区@用能方式[@结构]")
+            continue
+        result = loaded.lookup(parts[0], parts[1], parts[2], parts[3] if len(parts) == 4 else DEFAULT_STRUCTURE)
+        if result is None:
+            print(f"❌ {query}: 餐次、用能方式或结构不在网格中")
+            continue
+        note = '（网格中没有该地区，使用全国平均）' if result['isDefault'] and parts[1] != result['region'] else ''
+        ci = result['confidenceInterval']
+        print(f"\n🔍 {query}: {result['value']} kg CO₂e [{ci['lower']}, {ci['upper']}]，{result['hasSoup']}{note}")
+        top = sorted(((k, v) for k, v in result['breakdown'].items() if v), key=lambda x: -x[1])
+        print('   ' + '，'.join(f"{k} {v}" for k, v in top))
+    if np.isnan(grid.values).any():
+        print('⚠️  部分地区缺少能源因子，基准值为 NaN')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+肉类 → 素食替代 减排矩阵构建脚本
+用 meat_swap_matrix.py 把 meat-data.json 中全部 veganAlternatives 解析到植物性食材（因子库 + 食材库），
+预先算出 产品 × 替代品 的减排量 / 蛋白质差值 / 热量差值矩阵和每个产品、每个 comparisonGroup 的最佳替换，
+写出 cloudfunctions/meat-data-import/meat-swap-matrix.json
+
+用法:
+    python scripts/build-meat-swap-matrix.py
+    python scripts/build-meat-swap-matrix.py --top 3 --show 牛肉（牛腩） --show beef
+    python scripts/build-meat-swap-matrix.py --factors ../cloudfunctions/database/all-reliable-factors.json --dry-run
+"""
+
+import argparse
+import os
+import time
+
+from factor_dedup import MERGED_FACTORS_FILE
+from meat_swap_matrix import (DEFAULT_TOP, ESTIMATED_LEVELS, MEAT_DATA_FILE, MOCK_MEAT_BASE, SWAP_MATRIX_FILE,
+                              PlantCatalog, SwapMatrix, load_meats, non_vegan_alternatives)
+from recipe_carbon import INGREDIENTS_FILE
+
+
+def main():
+    parser = argparse.ArgumentParser(description='预先计算肉类产品 × 素食替代品的减排与营养差值矩阵')
+    parser.add_argument('--meats', default=MEAT_DATA_FILE, help='肉类数据文件')
+    parser.add_argument('--factors', default=MERGED_FACTORS_FILE, help='因子文件（只使用植物类因子）')
+    parser.add_argument('--ingredients', default=INGREDIENTS_FILE, help='食材库文件（营养数据，补充因子库中没有的食材）')
+    parser.add_argument('--output', default=SWAP_MATRIX_FILE, help='矩阵输出路径')
+    parser.add_argument('--top', type=int, default=DEFAULT_TOP, help='每个产品 / 分组写出的最佳替换个数')
+    parser.add_argument('--show', action='append', default=[], metavar='PRODUCT|GROUP', help='构建后显示某产品或分组的最佳替换，可重复指定')
+    parser.add_argument('--dry-run', action='store_true', help='只输出统计，不写矩阵文件')
+    args = parser.parse_args()
+
+    meats = load_meats(args.meats)
+    catalog = PlantCatalog.from_files(args.factors, args.ingredients)
+
+    start = time.perf_counter()
+    matrix = SwapMatrix.build(meats, catalog)
+    elapsed = time.perf_counter() - start
+    rows, cols = matrix.carbon_saved.shape
+    print(f"✅ {rows} 个肉类产品 × {cols} 个替代品，耗时 {elapsed * 1000:.1f} ms（列出的组合 {int(matrix.listed.sum())} 个）")
+
+    levels = {}
+    for alt in matrix.alternatives:
+        levels[alt['level'] or 'unresolved'] = levels.get(alt['level'] or 'unresolved', 0) + 1
+    print('📊 替代品解析: ' + '，'.join(f"{level} {count}" for level, count in sorted(levels.items(), key=lambda x: -x[1])))
+    invalid = non_vegan_alternatives(meats)
+    if invalid:
+        print(f"❌ 数据错误，veganAlternatives 中含动物成分（已排除）: {', '.join(f'{product} → {name}' for product, name in invalid)}")
+    estimated = sum(1 for alt in matrix.alternatives if alt['level'] in ESTIMATED_LEVELS)
+    if estimated:
+        print(f"ℹ️  {estimated} 个仿肉按 {MOCK_MEAT_BASE} 估算，排序时排在解析到具体食材的替代品之后（estimated: true）")
+    unresolved = matrix.unresolved()
+    if unresolved:
+        print(f"⚠️  未能解析的替代品（不参与排序）: {', '.join(unresolved)}")
+    no_swap = [product['name'] for product, ranking in zip(matrix.products, matrix.rankings) if not ranking]
+    if no_swap:
+        print(f"⚠️  没有可用替代品的产品: {', '.join(no_swap)}")
+
+    if not args.dry_run:
+        matrix.save(args.output, args.top)
+        print(f"📁 矩阵已保存至: {args.output}（{os.path.getsize(args.output) / 1024:.1f} KB）")
+
+    loaded = SwapMatrix.load(args.output) if not args.dry_run else matrix
+    for query in args.show:
+        swaps = loaded.best_swaps(query, args.top)
+        if swaps is None:
+            swaps = loaded.group_swaps(query, args.top)
+        if swaps is None:
+            print(f"❌ {query}: 没有该产品或分组")
+            continue
+        print(f"\n🔍 {query} 的最佳替换:")
+        for swap in swaps:
+            extra = ''
+            if 'proteinDelta' in swap:
+                extra = f"，蛋白质 {swap['proteinDelta']:+} g/100g，热量 {swap['calorieDelta']:+} kcal/100g"
+            basis = f"按 {swap['resolvedName']} 估算" if swap.get('estimated') else f"按 {swap['resolvedName']}"
+            print(f"  - {swap['alternative']}（{basis}）: 每 kg 减排 {swap['carbonSaved']} kgCO2e{extra}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+食谱筛选索引生成脚本
+用 recipe_filter_index.py 为 recipe-data.json 生成位图筛选索引，
+写到同目录的 recipe-filter-index.json，并输出各筛选维度的取值数与示例查询
+
+用法:
+    python scripts/build-recipe-filter-index.py
+    python scripts/build-recipe-filter-index.py --recipes /tmp/recipes.json --output /tmp/recipe-filter-index.json
+"""
+
+import argparse
+import json
+import time
+
+from json_stream import atomic_write_json
+from recipe_filter_index import FILTER_INDEX_FILE, RECIPES_FILE, RecipeFilterIndex
+
+
+def main():
+    parser = argparse.ArgumentParser(description='生成食谱筛选位图索引')
+    parser.add_argument('--recipes', default=RECIPES_FILE, help='食谱数据文件')
+    parser.add_argument('--output', default=FILTER_INDEX_FILE, help='索引输出路径')
+    args = parser.parse_args()
+
+    with open(args.recipes, 'r', encoding='utf-8') as f:
+        recipes = json.load(f)
+
+    start = time.perf_counter()
+    index = RecipeFilterIndex.build(recipes)
+    print(f"✅ {len(recipes)} 道食谱建索引耗时 {(time.perf_counter() - start) * 1000:.1f} ms")
+    for facet, values in index.facets.items():
+        size = sum(bitmap.size_in_bytes() for bitmap in values.values())
+        print(f"  - {facet}: {len(values)} 个取值，位图 {size} 字节")
+
+    hits = index.filter({'season': ['winter']}, cooking_time=(None, 30))
+    print(f"📊 示例: 冬季且 30 分钟内的食谱 {len(hits)} 道，难度分布 {index.facet_counts(hits, ['difficulty'])['difficulty']}")
+
+    atomic_write_json(args.output, index.to_dict(), indent=None)
+    print(f"📁 索引已保存至: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
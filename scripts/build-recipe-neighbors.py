@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+相似食谱近邻表生成脚本
+用 recipe_similarity.py 为 recipe-data.json 中的每道食谱计算前 k 个相似食谱，
+写出紧凑的近邻表 cloudfunctions/recipe/recipe-neighbors.json 供 recipe 云函数随包发布；
+同时与逐对计算 Jaccard 的结果对比召回率，并统计单次查询耗时
+
+用法:
+    python scripts/build-recipe-neighbors.py
+    python scripts/build-recipe-neighbors.py --k 8 --perms 256 --bands 128
+    python scripts/build-recipe-neighbors.py --synthetic 100000 --output /tmp/neighbors.json   # 合成食谱测规模
+    python scripts/build-recipe-neighbors.py --query 豆腐,青椒,酱油
+"""
+
+import argparse
+import json
+import random
+import time
+
+from recipe_similarity import (DEFAULT_BANDS, DEFAULT_NUM_PERM, NEIGHBOR_TABLE_FILE, SimilarityIndex,
+                               exact_neighbors, jaccard, recipe_tokens, write_neighbor_table)
+
+RECIPES_FILE = NEIGHBOR_TABLE_FILE.replace('recipe/recipe-neighbors.json', 'recipe-data-import/recipe-data.json')
+
+
+def synthesize_recipes(recipes, count, seed=42):
+    """以现有食谱为模板，随机增删替换食材和标签，生成 count 道合成食谱（模拟用户投稿）"""
+    rng = random.Random(seed)
+    names = sorted({line['name'] for recipe in recipes for line in recipe.get('ingredients') or []})
+    tags = sorted({tag for recipe in recipes for tag in recipe.get('tags') or []})
+    out = []
+    for i in range(count):
+        base = rng.choice(recipes)
+        lines = [line for line in base.get('ingredients') or [] if rng.random() > 0.2]
+        lines += [{'name': rng.choice(names), 'amount': 10, 'unit': 'g'} for _ in range(rng.randint(0, 3))]
+        out.append({
+            'recipeId': f"user_recipe_{i:07d}",
+            'ingredients': lines,
+            'tags': [tag for tag in base.get('tags') or [] if rng.random() > 0.3] + rng.sample(tags, 1),
+            'cuisine': base.get('cuisine'),
+        })
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description='生成相似食谱近邻表')
+    parser.add_argument('--recipes', default=RECIPES_FILE, help='食谱数据文件')
+    parser.add_argument('--synthetic', type=int, default=0, help='改用 N 道合成食谱（测试规模，不写默认输出）')
+    parser.add_argument('--k', type=int, default=5, help='每道食谱保留的近邻数')
+    parser.add_argument('--perms', type=int, default=DEFAULT_NUM_PERM, help='MinHash 签名长度')
+    parser.add_argument('--bands', type=int, default=DEFAULT_BANDS, help='LSH 分段数（越多召回越高、候选越多）')
+    parser.add_argument('--min-similarity', type=float, default=0.1, help='低于该相似度的近邻不写入近邻表')
+    parser.add_argument('--sample', type=int, default=200, help='核对召回率与查询耗时的抽样食谱数')
+    parser.add_argument('--query', help='按逗号分隔的食材列表查询相似食谱')
+    parser.add_argument('--output', help=f"近邻表输出路径（默认 {NEIGHBOR_TABLE_FILE}）")
+    args = parser.parse_args()
+
+    with open(args.recipes, 'r', encoding='utf-8') as f:
+        recipes = json.load(f)
+    if args.synthetic:
+        recipes = synthesize_recipes(recipes, args.synthetic)
+
+    start = time.perf_counter()
+    index = SimilarityIndex(recipes, num_perm=args.perms, bands=args.bands)
+    build_time = time.perf_counter() - start
+    print(f"✅ {len(recipes)} 道食谱建索引耗时 {build_time:.2f}s（签名 {args.perms}，分段 {args.bands}）")
+
+    if args.query:
+        start = time.perf_counter()
+        result = index.query(args.query.split(','), k=args.k)
+        elapsed = time.perf_counter() - start
+        print(f"📊 查询耗时 {elapsed * 1000:.3f} ms")
+        for recipe_id, score in result:
+            print(f"  - {recipe_id}: {score:.2f}")
+        return
+
+    # 抽样核对：LSH 查询耗时，以及召回率（逐对 Jaccard 的前 k 个中被找到的比例，与第 k 名并列的也算命中）
+    rng = random.Random(0)
+    sample = rng.sample(range(len(recipes)), min(args.sample, len(recipes)))
+    start = time.perf_counter()
+    approx = {row: index.neighbors(index.ids[row], k=args.k) for row in sample}
+    query_time = (time.perf_counter() - start) / max(len(sample), 1)
+    token_sets = [recipe_tokens(recipe) - index.stop_tokens for recipe in recipes]
+    start = time.perf_counter()
+    hits = total = 0
+    for row in sample:
+        exact = [score for score, _ in exact_neighbors(token_sets, row, args.k) if score >= args.min_similarity]
+        if not exact:
+            continue
+        found = [jaccard(token_sets[row], token_sets[index.position[recipe_id]]) for recipe_id, _ in approx[row]]
+        hits += min(len(exact), sum(1 for score in found if score >= exact[-1]))
+        total += len(exact)
+    scan_time = (time.perf_counter() - start) / max(len(sample), 1)
+    print(f"📊 单次查询 {query_time * 1000:.3f} ms（逐对比较 {scan_time * 1000:.2f} ms），"
+          f"召回率 {hits / max(total, 1):.1%}")
+
+    start = time.perf_counter()
+    table = index.neighbor_table(args.k, args.min_similarity)
+    print(f"✅ 近邻表生成耗时 {time.perf_counter() - start:.2f}s")
+
+    output = args.output or (None if args.synthetic else NEIGHBOR_TABLE_FILE)
+    if output:
+        write_neighbor_table(table, output)
+        print(f"📁 近邻表已保存至: {output}")
+
+
+if __name__ == '__main__':
+    main()
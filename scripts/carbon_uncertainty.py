@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+碳足迹不确定度（蒙特卡洛）模块
+因子记录的 uncertainty 为 95% 置信区间的半宽（占因子值的百分比），按对数正态分布抽样：
+σ = ln(1 + uncertainty/100) / 1.96，乘数 exp(σz - σ²/2) 的期望为 1，抽样均值与点估计一致。
+每次抽样为全部因子各抽一个乘数，同一因子在所有菜品中共用（同一次抽样里使用同一因子的菜品同涨同跌）。
+菜品按块计算：块内把 菜品 × 因子 的用量整理为稠密小矩阵，与 抽样 × 因子 的抽样值矩阵相乘得到 菜品 × 抽样 的碳足迹，
+再按菜品求分位数（均值和标准差由因子抽样的均值、协方差直接算出）；块的大小由内存上限决定，10 万菜品 × 1 万次抽样也只占几百 MB
+"""
+
+import numpy as np
+
+from menu_recalc import default_waste_rate
+from recipe_carbon import UNRESOLVED, FactorTable, RecipeMatrix, cooking_multipliers, load_cooking_factors
+
+DEFAULT_SAMPLES = 10000
+# 缺少 uncertainty 的因子（如食材库 carbonFootprint 中的估算值）按该不确定度抽样
+DEFAULT_UNCERTAINTY = 30.0
+DEFAULT_MEMORY_MB = 256
+PERCENTILES = (5, 95)
+# 95% 置信区间对应的标准正态分位数
+_Z95 = 1.959963984540054
+
+
+def lognormal_sigma(uncertainty):
+    """不确定度（%，95% 置信区间半宽）→ 对数正态分布的 σ"""
+    return np.log1p(np.asarray(uncertainty, dtype=np.float64) / 100.0) / _Z95
+
+
+def menu_item_as_recipe(item):
+    """
+    菜单项的食材格式 { ingredientName, quantity, unit, wasteRate } 转为食谱格式 { name, amount, unit }；
+    用量按 (1 + 损耗率) 计入，与 restaurant-menu-carbon 的 Σ(M_i × EF_i × (1 + W_i)) 一致；
+    缺少 wasteRate 时与 menu_recalc 一样按食材 category 取默认损耗率（蔬菜 20%，其余 10%）
+    """
+    lines = []
+    for line in item.get('ingredients') or []:
+        quantity = line.get('quantity', line.get('amount'))
+        try:
+            waste_rate = line.get('wasteRate') or default_waste_rate(line.get('category') or None)
+            amount = float(quantity) * (1 + float(waste_rate))
+        except (TypeError, ValueError):
+            amount = 0
+        lines.append({'name': line.get('ingredientName') or line.get('name'), 'amount': amount, 'unit': line.get('unit') or 'g'})
+    return {'ingredients': lines}
+
+
+class MonteCarloEngine:
+    """
+    用法:
+        engine = MonteCarloEngine.from_table(table, samples=10000)
+        stats = engine.run(matrix.rows, matrix.cols, weights, len(recipes))
+        stats['mean'], stats['p5'], stats['p95']
+    同样的 seed 得到同样的结果，与分块大小无关（每个因子的乘数由 (seed, 因子列号) 单独决定）
+    """
+
+    def __init__(self, values, sigma, samples=DEFAULT_SAMPLES, seed=1, memory_mb=DEFAULT_MEMORY_MB,
+                 percentiles=PERCENTILES):
+        self.values = np.asarray(values, dtype=np.float64)
+        self.sigma = np.asarray(sigma, dtype=np.float64)
+        self.samples = samples
+        self.seed = seed
+        self.memory_bytes = int(memory_mb * (1 << 20))
+        self.percentiles = list(percentiles)
+
+    @classmethod
+    def from_table(cls, table, default_uncertainty=DEFAULT_UNCERTAINTY, **options):
+        uncertainties = np.where(np.isnan(table.uncertainties), default_uncertainty, table.uncertainties)
+        return cls(table.values, lognormal_sigma(uncertainties), **options)
+
+    def _column_samples(self, col):
+        """因子 col 的 samples 个抽样值（float32）"""
+        sigma = self.sigma[col]
+        z = np.random.default_rng([self.seed, int(col)]).standard_normal(self.samples)
+        return (self.values[col] * np.exp(sigma * z - sigma * sigma / 2)).astype(np.float32)
+
+    def _factor_samples(self, columns):
+        """抽样 × 因子 的抽样值矩阵（只含用到的因子列）"""
+        out = np.empty((self.samples, len(columns)), dtype=np.float32)
+        for j, col in enumerate(columns):
+            out[:, j] = self._column_samples(col)
+        return out
+
+    def _chunk_size(self, count):
+        # 每个菜品在块内占用：抽样结果 float32 一行，另留两倍余量给矩阵乘法和 partition 的临时空间
+        per_item = self.samples * 4 * 3
+        return max(1, min(count, self.memory_bytes // per_item))
+
+    def run(self, rows, cols, weights, count):
+        """
+        rows / cols / weights 为 菜品 × 因子 稀疏矩阵（COO）：第几个菜品、因子列号、用量（kg，已含烹饪系数等乘数）；
+        返回 {'point', 'mean', 'std', 'p5', 'p95'}（键名随 percentiles），每项为长度 count 的数组
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        cols = np.asarray(cols, dtype=np.int64)
+        weights = np.asarray(weights, dtype=np.float64)
+        keep = (cols != UNRESOLVED) & ~np.isnan(weights)
+        rows, cols, weights = rows[keep], cols[keep], weights[keep]
+        if len(rows) > 1 and np.any(rows[1:] < rows[:-1]):
+            order = np.argsort(rows, kind='stable')
+            rows, cols, weights = rows[order], cols[order], weights[order]
+
+        result = {'point': np.bincount(rows, weights=weights * self.values[cols], minlength=count)}
+        for key in ['mean', 'std'] + [f"p{p:g}" for p in self.percentiles]:
+            result[key] = np.zeros(count, dtype=np.float64)
+        if not len(rows):
+            return result
+
+        # 所有用到的因子的抽样值能放进一半内存上限时一次生成，否则每块只生成该块用到的因子
+        used = np.unique(cols)
+        cached = self.samples * len(used) * 4 <= self.memory_bytes // 2
+        if cached:
+            all_samples = self._factor_samples(used)
+            position = np.full(len(self.values), -1, dtype=np.int64)
+            position[used] = np.arange(len(used))
+
+        # 各分位数在排序后抽样中的位置：下标 low 与小数部分 frac
+        positions = []
+        for p in self.percentiles:
+            index = p / 100 * (self.samples - 1)
+            low = int(np.floor(index))
+            positions.append((low, index - low if low + 1 < self.samples else 0.0))
+        kth = sorted({low + step for low, frac in positions for step in ((0, 1) if frac else (0,))})
+
+        chunk = self._chunk_size(count)
+        bounds = np.searchsorted(rows, np.arange(0, count + chunk, chunk))
+        for n, start in enumerate(range(0, count, chunk)):
+            stop = min(start + chunk, count)
+            lo, hi = bounds[n], bounds[n + 1]
+            if lo == hi:
+                continue
+            chunk_cols, local_col = np.unique(cols[lo:hi], return_inverse=True)
+            width = len(chunk_cols)
+            # 块内的 菜品 × 因子 用量矩阵（同一菜品同一因子的多行用量相加）
+            amounts = np.bincount((rows[lo:hi] - start) * width + local_col, weights=weights[lo:hi],
+                                  minlength=(stop - start) * width).reshape(stop - start, width)
+            factor_samples = all_samples[:, position[chunk_cols]] if cached else self._factor_samples(chunk_cols)
+            # 碳足迹对因子是线性的：均值和方差直接由因子抽样的均值、协方差得到，不必对 抽样 × 菜品 矩阵求
+            centered = factor_samples - factor_samples.mean(axis=0, dtype=np.float64).astype(np.float32)
+            covariance = (centered.T @ centered).astype(np.float64) / self.samples
+            result['mean'][start:stop] = amounts @ factor_samples.mean(axis=0, dtype=np.float64)
+            result['std'][start:stop] = np.sqrt(np.maximum(np.einsum('if,fg,ig->i', amounts, covariance, amounts), 0))
+            # 菜品 × 抽样（每行连续），分位数用 partition 取相邻两个次序统计量再线性插值（与 np.percentile 默认方法一致）
+            totals = amounts.astype(np.float32) @ factor_samples.T
+            totals.partition(kth, axis=1)
+            for p, (low, frac) in zip(self.percentiles, positions):
+                values = totals[:, low].astype(np.float64)
+                if frac:
+                    values += frac * (totals[:, low + 1] - totals[:, low])
+                result[f"p{p:g}"][start:stop] = values
+        return result
+
+
+def recipe_intervals(recipes, table=None, cooking_factors=None, resolver=None, normalizer=None,
+                     default_uncertainty=DEFAULT_UNCERTAINTY, **options):
+    """
+    食谱碳足迹的蒙特卡洛区间（含烹饪方式系数），返回 (统计结果, RecipeMatrix)；
+    菜单项先用 menu_item_as_recipe() 转换，并传入 cooking_factors={}（菜单项的能耗另行计算，不乘烹饪系数）
+    """
+    table = table or FactorTable.from_files()
+    cooking_factors = cooking_factors if cooking_factors is not None else load_cooking_factors()
+    matrix = RecipeMatrix(recipes, table, resolver, normalizer)
+    if cooking_factors:
+        multipliers, _ = cooking_multipliers(recipes, cooking_factors)
+    else:
+        multipliers = np.ones(len(recipes), dtype=np.float64)
+    weights = np.where(matrix.resolved, matrix.kg, np.nan) * multipliers[matrix.rows]
+    engine = MonteCarloEngine.from_table(table, default_uncertainty, **options)
+    return engine.run(matrix.rows, matrix.cols, weights, len(recipes)), matrix
@@ -0,0 +1,233 @@
+/**
+ * CloudBase 数据库本地模拟服务的客户端（配合 scripts/cloudbase-emulator.py 使用）
+ *
+ * 提供与 wx-server-sdk / @cloudbase/node-sdk 相同写法的数据库接口子集，便于在本地和 CI 中
+ * 不连网运行云函数的数据访问代码：
+ *
+ *   const db = require('./cloudbase-emulator-client').database({ url: 'http://127.0.0.1:8787' })
+ *   const _ = db.command
+ *   const res = await db.collection('meals')
+ *     .where({ userId: 'u1', mealDate: _.gte('2024-01-01').and(_.lt('2024-02-01')) })
+ *     .orderBy('mealDate', 'desc')
+ *     .limit(20)
+ *     .get()
+ *
+ * 支持: where / orderBy / skip / limit / field / get / count / add / update / remove /
+ *       doc(id).get / set / update / remove，command 的查询与更新操作符，db.serverDate()，db.RegExp()
+ * 可用环境变量 CLOUDBASE_EMULATOR_URL 指定服务地址；source 会写入模拟服务的计时记录，便于区分调用方
+ */
+
+const DEFAULT_URL = process.env.CLOUDBASE_EMULATOR_URL || 'http://127.0.0.1:8787';
+
+/**
+ * command 操作符：序列化为 { $op: 参数 }，查询条件可用 .and() / .or() 组合
+ */
+class Command {
+  constructor(op, value) {
+    this.op = op;
+    this.value = value;
+  }
+
+  and(...others) {
+    return new Command('$and', [this, ...flatten(others)]);
+  }
+
+  or(...others) {
+    return new Command('$or', [this, ...flatten(others)]);
+  }
+
+  toJSON() {
+    return { [this.op]: encode(this.value) };
+  }
+}
+
+class RegExpValue {
+  constructor({ regexp, options = '' }) {
+    this.regexp = regexp;
+    this.options = options;
+  }
+
+  toJSON() {
+    return { $regex: this.regexp, $options: this.options };
+  }
+}
+
+class ServerDate {
+  toJSON() {
+    return { $serverDate: {} };
+  }
+}
+
+function flatten(items) {
+  return items.length === 1 && Array.isArray(items[0]) ? items[0] : items;
+}
+
+/**
+ * 转为线上协议：Date → { $date: ISO 字符串 }，command / RegExp 由 toJSON 处理
+ */
+function encode(value) {
+  if (value instanceof Date) {
+    return { $date: value.toISOString() };
+  }
+  if (value instanceof Command || value instanceof RegExpValue || value instanceof ServerDate) {
+    return value.toJSON();
+  }
+  if (Array.isArray(value)) {
+    return value.map(encode);
+  }
+  if (value && typeof value === 'object') {
+    const out = {};
+    for (const [key, item] of Object.entries(value)) {
+      if (item !== undefined) {
+        out[key] = encode(item);
+      }
+    }
+    return out;
+  }
+  return value;
+}
+
+const command = {
+  eq: (value) => new Command('$eq', value),
+  neq: (value) => new Command('$neq', value),
+  gt: (value) => new Command('$gt', value),
+  gte: (value) => new Command('$gte', value),
+  lt: (value) => new Command('$lt', value),
+  lte: (value) => new Command('$lte', value),
+  in: (values) => new Command('$in', values),
+  nin: (values) => new Command('$nin', values),
+  exists: (value) => new Command('$exists', value),
+  size: (value) => new Command('$size', value),
+  and: (...conditions) => new Command('$and', flatten(conditions)),
+  or: (...conditions) => new Command('$or', flatten(conditions)),
+  set: (value) => new Command('$set', value),
+  remove: () => new Command('$remove', true),
+  inc: (value) => new Command('$inc', value),
+  mul: (value) => new Command('$mul', value),
+  min: (value) => new Command('$min', value),
+  max: (value) => new Command('$max', value),
+  push: (value) => new Command('$push', value),
+  pop: () => new Command('$pop', 1),
+  shift: () => new Command('$shift', true),
+  unshift: (value) => new Command('$unshift', value),
+  pull: (value) => new Command('$pull', value),
+  pullAll: (values) => new Command('$pullAll', values),
+  addToSet: (value) => new Command('$addToSet', value)
+};
+
+/**
+ * 顶层的 _.or([...]) / _.and([...]) 作为 where 条件时直接展开为 { $or: [...] }
+ */
+function encodeWhere(condition) {
+  return encode(condition || {});
+}
+
+class Query {
+  constructor(db, name, state = {}) {
+    this.db = db;
+    this.name = name;
+    this.state = { where: {}, orderBy: [], skip: 0, limit: undefined, field: undefined, ...state };
+  }
+
+  _with(changes) {
+    return new Query(this.db, this.name, { ...this.state, ...changes });
+  }
+
+  where(condition) {
+    return this._with({ where: condition });
+  }
+
+  orderBy(field, direction = 'asc') {
+    return this._with({ orderBy: [...this.state.orderBy, [field, direction]] });
+  }
+
+  skip(n) {
+    return this._with({ skip: n });
+  }
+
+  limit(n) {
+    return this._with({ limit: n });
+  }
+
+  field(projection) {
+    return this._with({ field: projection });
+  }
+
+  get() {
+    const { where, orderBy, skip, limit, field } = this.state;
+    return this.db._call({ action: 'get', collection: this.name, where: encodeWhere(where), orderBy, skip, limit, field });
+  }
+
+  count() {
+    return this.db._call({ action: 'count', collection: this.name, where: encodeWhere(this.state.where) });
+  }
+
+  update({ data }) {
+    return this.db._call({ action: 'update', collection: this.name, where: encodeWhere(this.state.where), data: encode(data) });
+  }
+
+  remove() {
+    return this.db._call({ action: 'remove', collection: this.name, where: encodeWhere(this.state.where) });
+  }
+}
+
+class CollectionReference extends Query {
+  add({ data }) {
+    return this.db._call({ action: 'add', collection: this.name, data: encode(data) });
+  }
+
+  doc(docId) {
+    const call = (action, extra = {}) => this.db._call({ action, collection: this.name, docId, ...extra });
+    return {
+      get: () => call('doc.get'),
+      set: ({ data }) => call('doc.set', { data: encode(data) }),
+      update: ({ data }) => call('doc.update', { data: encode(data) }),
+      remove: () => call('doc.remove')
+    };
+  }
+}
+
+class Database {
+  constructor({ url = DEFAULT_URL, source } = {}) {
+    this.url = url.replace(/\/+$/, '') + '/database';
+    this.source = source;
+    this.command = command;
+  }
+
+  collection(name) {
+    return new CollectionReference(this, name);
+  }
+
+  createCollection(name) {
+    return this._call({ action: 'createCollection', collection: name });
+  }
+
+  serverDate() {
+    return new ServerDate();
+  }
+
+  RegExp(options) {
+    return new RegExpValue(options);
+  }
+
+  async _call(request) {
+    const response = await fetch(this.url, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ ...request, source: this.source })
+    });
+    const body = await response.json();
+    if (!response.ok) {
+      const error = new Error(body.errMsg || `HTTP ${response.status}`);
+      error.errCode = body.errCode;
+      throw error;
+    }
+    return { ...body, errMsg: 'collection.' + request.action + ':ok' };
+  }
+}
+
+function database(options) {
+  return new Database(options);
+}
+
+module.exports = { database, command, Database };
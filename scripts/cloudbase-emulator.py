@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+CloudBase 数据库本地模拟服务
+用 cloudbase_emulator.py（SQLite + JSON 文本 + 按 generate-index-config.py 自动建立的表达式索引）
+在本地提供云函数使用的数据库接口子集，无需网络，可在 CI 中运行；配合 cloudbase-emulator-client.js 使用:
+    const db = require('./scripts/cloudbase-emulator-client').database({ url: 'http://127.0.0.1:8787' })
+
+HTTP 接口（POST /database，JSON 请求体）:
+    {"action": "get", "collection": "meals", "where": {...}, "orderBy": [["mealDate", "desc"]], "skip": 0, "limit": 20}
+    action: get / count / add / update / remove / doc.get / doc.set / doc.update / doc.remove / createCollection
+    返回与 SDK 一致的结构: {"data": [...]} / {"total": n} / {"_id": ...} / {"stats": {"updated": n}}，
+    出错时返回 {"errCode": ..., "errMsg": ...}
+GET /stats 返回按查询形态汇总的耗时，GET /health 用于启动探测
+
+每次操作都会记录耗时、返回行数和 SQLite 查询计划；--log 写出的 JSONL 与查询形态日志格式兼容，
+可直接交给 index-advisor.py 分析本地真实请求的索引命中情况
+
+用法:
+    python scripts/cloudbase-emulator.py --db /tmp/cloudbase.sqlite --import meals=export/meals.jsonl
+    python scripts/cloudbase-emulator.py --port 8787 --log /tmp/queries.jsonl --slow-ms 20
+    python scripts/index-advisor.py /tmp/queries.jsonl
+"""
+
+import argparse
+import json
+import os
+import signal
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from cloudbase_emulator import MAX_LIMIT, Emulator, EmulatorError
+from json_stream import iter_records
+
+DEFAULT_PORT = 8787
+
+
+def dispatch(emulator, request):
+    """执行一个请求，返回 SDK 风格的结果"""
+    action = request.get('action')
+    collection = request.get('collection')
+    source = request.get('source')
+    where = request.get('where') or {}
+    doc_id = request.get('docId')
+    if action in ('doc.get', 'doc.set', 'doc.update', 'doc.remove') and doc_id is None:
+        raise EmulatorError('INVALID_PARAM', f"{action} 缺少 docId")
+
+    if action == 'get':
+        return {'data': emulator.get(collection, where, request.get('orderBy'), request.get('skip') or 0,
+                                     request.get('limit'), request.get('field'), source)}
+    if action == 'count':
+        return {'total': emulator.count(collection, where, source)}
+    if action == 'add':
+        ids = emulator.add(collection, request.get('data'), source)
+        return {'ids': ids} if isinstance(ids, list) else {'_id': ids, 'id': ids}
+    if action == 'update':
+        return {'stats': {'updated': emulator.update(collection, where, request.get('data'), source)}}
+    if action == 'remove':
+        return {'stats': {'removed': emulator.remove(collection, where, source)}}
+    if action == 'doc.get':
+        return {'data': emulator.get_doc(collection, doc_id, source)}
+    if action == 'doc.set':
+        updated, upserted = emulator.set_doc(collection, doc_id, request.get('data'), source)
+        return {'_id': doc_id, 'stats': {'updated': updated}, 'upsertedId': upserted}
+    if action == 'doc.update':
+        return {'stats': {'updated': emulator.update(collection, {'_id': doc_id}, request.get('data'), source)}}
+    if action == 'doc.remove':
+        return {'stats': {'removed': emulator.remove(collection, {'_id': doc_id}, source)}}
+    if action == 'createCollection':
+        emulator.ensure_collection(collection)
+        return {'ok': True}
+    raise EmulatorError('INVALID_PARAM', f"不支持的操作: {action}")
+
+
+def make_handler(emulator):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status, body):
+            payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            if self.path == '/health':
+                self._send(200, {'ok': True, 'collections': sorted(emulator.collections)})
+            elif self.path == '/stats':
+                self._send(200, {'data': emulator.stats()})
+            else:
+                self._send(404, {'errCode': 'NOT_FOUND', 'errMsg': self.path})
+
+        def do_POST(self):
+            if self.path != '/database':
+                self._send(404, {'errCode': 'NOT_FOUND', 'errMsg': self.path})
+                return
+            try:
+                length = int(self.headers.get('Content-Length') or 0)
+                request = json.loads(self.rfile.read(length) or b'{}')
+                self._send(200, dispatch(emulator, request))
+            except EmulatorError as e:
+                self._send(e.status, {'errCode': e.code, 'errMsg': e.message})
+            except json.JSONDecodeError as e:
+                self._send(400, {'errCode': 'INVALID_PARAM', 'errMsg': f"请求体不是合法 JSON: {e}"})
+            except Exception as e:
+                self._send(500, {'errCode': 'SYS_ERR', 'errMsg': str(e)})
+
+        def log_message(self, format, *args):
+            # 请求日志由模拟器的计时记录代替
+            pass
+
+    return Handler
+
+
+def make_logger(path, slow_ms):
+    """每条计时记录追加写入 JSONL；超过 slow_ms 的操作同时打印出来"""
+    out = open(path, 'a', encoding='utf-8') if path else None
+    lock = threading.Lock()
+
+    def log(record):
+        if out:
+            with lock:
+                out.write(json.dumps(record, ensure_ascii=False) + '\n')
+                out.flush()
+        if slow_ms is not None and record['ms'] >= slow_ms:
+            print(f"🐢 {record['ms']:.1f}ms {record['action']} {record['collection']} "
+                  f"{json.dumps(record.get('filter'), ensure_ascii=False)} → {record['rows']} 行  {record.get('plan', '')}")
+
+    return log, out
+
+
+def print_summary(emulator, limit):
+    summary = emulator.stats()
+    if not summary:
+        print('📊 没有执行过查询')
+        return
+    total = sum(item['count'] for item in summary)
+    print(f"\n📊 共 {total} 次操作，{len(summary)} 种查询形态（按总耗时排序，前 {limit} 个）:")
+    for item in summary[:limit]:
+        flag = ' ⚠️ 全表扫描' if item['fullScan'] else ''
+        sort = f" sort={','.join(item['sort'])}" if item['sort'] else ''
+        print(f"  {item['collection']}.{item['action']} {json.dumps(item['filter'], ensure_ascii=False)}{sort}: "
+              f"{item['count']} 次，总 {item['totalMs']:.1f}ms，p50 {item['p50Ms']:.2f}ms，p95 {item['p95Ms']:.2f}ms{flag}")
+        if item['plan']:
+            print(f"      {item['plan']}")
+
+
+def _raise_interrupt(signum, frame):
+    raise KeyboardInterrupt()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='基于 SQLite 的 CloudBase 数据库本地模拟服务')
+    parser.add_argument('--db', default=':memory:', help='SQLite 数据库文件（默认内存库，退出即丢弃）')
+    parser.add_argument('--host', default='127.0.0.1', help='监听地址')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='监听端口')
+    parser.add_argument('--import', dest='imports', action='append', default=[], metavar='COLLECTION=PATH',
+                        help='启动前导入集合（JSON 数组或 JSONL），可重复指定')
+    parser.add_argument('--no-indexes', action='store_true', help='不按 generate-index-config.py 建立表达式索引（对比索引效果）')
+    parser.add_argument('--log', help='计时记录输出（JSONL，追加写入，可交给 index-advisor.py）')
+    parser.add_argument('--slow-ms', type=float, help='打印耗时超过该值的操作')
+    parser.add_argument('--limit', type=int, default=20, help='退出时显示耗时最多的前 N 种查询形态')
+    args = parser.parse_args()
+
+    log, log_file = make_logger(args.log, args.slow_ms)
+    emulator = Emulator(args.db, create_indexes=not args.no_indexes, logger=log)
+
+    for item in args.imports:
+        collection, sep, path = item.partition('=')
+        if not sep or not os.path.exists(path):
+            print(f"❌ 导入参数应为 集合名=文件路径，且文件必须存在: {item}")
+            sys.exit(1)
+        try:
+            count = emulator.import_records(collection, iter_records(path))
+        except EmulatorError as e:
+            print(f"❌ 导入 {collection} 失败: {e.message}")
+            sys.exit(1)
+        print(f"📁 {collection}: 导入 {count} 条（{path}）")
+
+    for spec, usable in emulator.skipped_indexes:
+        fields = ', '.join(sorted(spec.multikey_fields))
+        if usable and not spec.unique:
+            print(f"⚠️  {spec.collection}.{spec.name}: 数组字段 {fields} 不能建表达式索引，只索引前 {usable} 个字段")
+        else:
+            print(f"⚠️  {spec.collection}.{spec.name}: 数组字段 {fields} 不能建表达式索引，已跳过")
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(emulator))
+    print(f"✅ CloudBase 模拟服务已启动: http://{args.host}:{server.server_address[1]}/database"
+          f"（单次最多返回 {MAX_LIMIT} 条{'，未建索引' if args.no_indexes else ''}）")
+    # CI 中用 SIGTERM 结束服务时同样输出汇总
+    signal.signal(signal.SIGTERM, _raise_interrupt)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print_summary(emulator, args.limit)
+        if log_file:
+            log_file.close()
+            print(f"📁 计时记录: {args.log}")
+        emulator.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,729 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+CloudBase 数据库本地模拟模块（SQLite）
+每个集合一张表 (_id TEXT PRIMARY KEY, doc TEXT)，文档以 JSON 文本存储；
+按 generate-index-config.py 中的索引元组自动建立 json_extract(doc, '$.字段') 表达式索引，
+把云函数使用的查询子集（where / orderBy / skip / limit / count / add / update / remove / doc().get/set
+以及 command 操作符）翻译成 SQL 执行，并记录每次操作的耗时、返回行数和 SQLite 查询计划。
+
+线上协议（JSON）中的取值约定：
+    {"$date": "2024-01-01T00:00:00.000Z"} / {"$date": 毫秒数}   → 存为 ISO 字符串（与字符串日期可以互相比较）
+    {"$serverDate": {}}                                        → 服务器当前时间
+    {"$regex": "...", "$options": "i"}                          → db.RegExp
+"""
+
+import datetime
+import json
+import re
+import sqlite3
+import threading
+import time
+import uuid
+
+from index_catalog import indexes_by_collection, load_indexes
+
+DEFAULT_LIMIT = 100       # 与云开发一致：不传 limit 时最多返回 100 条
+MAX_LIMIT = 1000          # 服务端单次最多返回 1000 条
+ID_FIELD = '_id'
+
+# 元数据表：记录各集合中出现过数组值的字段路径（查询时对这些路径按元素匹配）
+META_ARRAY_PATHS = '_emulator_array_paths'
+
+_COLLECTION_NAME = re.compile(r'^[A-Za-z0-9_\-]+$')
+_FIELD_PART = re.compile(r'^[^.\'"\[\]\s]+$')
+_RANGE_SQL = {'$gt': '>', '$gte': '>=', '$lt': '<', '$lte': '<='}
+_UPDATE_OPS = ('$set', '$remove', '$inc', '$mul', '$push', '$pull', '$pullAll', '$addToSet',
+               '$pop', '$shift', '$unshift', '$min', '$max')
+
+
+class EmulatorError(Exception):
+    """模拟器错误，errCode 与云开发 SDK 返回的错误码风格一致"""
+
+    def __init__(self, code, message, status=400):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+        self.status = status
+
+
+def format_time(moment):
+    return moment.strftime('%Y-%m-%dT%H:%M:%S.') + f"{moment.microsecond // 1000:03d}Z"
+
+
+def now_iso():
+    return format_time(datetime.datetime.now(datetime.timezone.utc))
+
+
+def decode_value(value):
+    """把线上协议中的 $date / $serverDate 转为存储值，其余原样（递归处理对象和数组）"""
+    if isinstance(value, dict):
+        if len(value) == 1 and '$date' in value:
+            raw = value['$date']
+            if isinstance(raw, (int, float)):
+                return format_time(datetime.datetime.fromtimestamp(raw / 1000, datetime.timezone.utc))
+            return raw
+        if len(value) == 1 and '$serverDate' in value:
+            return now_iso()
+        return {key: decode_value(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [decode_value(item) for item in value]
+    return value
+
+
+def check_collection(name):
+    if not isinstance(name, str) or not _COLLECTION_NAME.match(name):
+        raise EmulatorError('INVALID_PARAM', f"集合名不合法: {name!r}")
+    return name
+
+
+def check_field(path):
+    if not isinstance(path, str) or not all(_FIELD_PART.match(part) for part in path.split('.')):
+        raise EmulatorError('INVALID_PARAM', f"字段名不合法: {path!r}")
+    return path
+
+
+def quote_ident(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def field_expr(path, source='doc'):
+    """字段的 SQL 表达式；路径以字面量写入（表达式索引只有在表达式完全一致时才会被使用）"""
+    if path == ID_FIELD:
+        return ID_FIELD
+    return f"json_extract({source}, '$.{check_field(path)}')"
+
+
+def type_expr(path, source='doc'):
+    if path == ID_FIELD:
+        return "'text'"
+    return f"json_type({source}, '$.{check_field(path)}')"
+
+
+def array_paths_of(value, prefix=''):
+    """文档中取值为数组的字段路径（只沿对象向下，不进入数组内部）"""
+    paths = set()
+    if isinstance(value, dict):
+        for key, item in value.items():
+            path = f"{prefix}.{key}" if prefix else key
+            if isinstance(item, list):
+                paths.add(path)
+            elif isinstance(item, dict):
+                paths |= array_paths_of(item, path)
+    return paths
+
+
+def flatten_query(query, prefix=''):
+    """
+    把 where 条件展开为 [(字段路径, 条件)]；嵌套的普通对象按点路径展开（与云开发一致），
+    含 $ 操作符的对象视为该字段的条件
+    """
+    items = []
+    for key, value in query.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict) and value and not any(k.startswith('$') for k in value):
+            items.extend(flatten_query(value, path))
+        else:
+            items.append((path, value))
+    return items
+
+
+def _scalar_predicate(op, value, expr, typ):
+    """
+    单个取值上的条件（不处理数组展开），返回 (SQL, 参数)；写成 json_extract(...) = ? 的形式以便使用表达式索引，
+    字段缺失时结果为 NULL，取反（$ne / $nin）时由调用方用 IFNULL 处理
+    """
+    if op == '$eq':
+        if value is None:
+            return f"({typ} IS NULL OR {typ} = 'null')", []
+        if isinstance(value, bool):
+            return f"{typ} = '{'true' if value else 'false'}'", []
+        if isinstance(value, (int, float)):
+            return f"({expr} = ? AND {typ} IN ('integer', 'real'))", [value]
+        if isinstance(value, str):
+            return f"({expr} = ? AND {typ} = 'text')", [value]
+        return f"({expr} = json(?) AND {typ} IN ('object', 'array'))", \
+            [json.dumps(value, ensure_ascii=False, separators=(',', ':'))]
+    if op in _RANGE_SQL:
+        if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+            raise EmulatorError('INVALID_PARAM', f"{op} 只支持数字、字符串和日期")
+        types = "'text'" if isinstance(value, str) else "'integer', 'real'"
+        return f"({expr} {_RANGE_SQL[op]} ? AND {typ} IN ({types}))", [value]
+    if op == '$in':
+        if not isinstance(value, list):
+            raise EmulatorError('INVALID_PARAM', '$in 的参数必须是数组')
+        if not value:
+            return '0', []
+        # 全是字符串或全是数字时写成 IN (...)，可以利用索引
+        if all(isinstance(v, str) for v in value) or \
+                all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in value):
+            types = "'text'" if isinstance(value[0], str) else "'integer', 'real'"
+            marks = ', '.join('?' * len(value))
+            return f"({expr} IN ({marks}) AND {typ} IN ({types}))", list(value)
+        parts, params = [], []
+        for item in value:
+            sql, item_params = _scalar_predicate('$eq', item, expr, typ)
+            parts.append(sql)
+            params.extend(item_params)
+        return '(' + ' OR '.join(parts) + ')', params
+    if op == '$regex':
+        pattern, options = value
+        return f"({typ} = 'text' AND regexp(?, {expr}))", [('(?i)' if 'i' in options else '') + pattern]
+    raise EmulatorError('INVALID_PARAM', f"不支持的查询操作符: {op}")
+
+
+def compile_condition(path, condition, array_paths):
+    """单个字段的条件 → (SQL, 参数)；condition 可以是普通值、操作符对象或字段级 $and / $or"""
+    if isinstance(condition, dict) and any(key.startswith('$') for key in condition):
+        if '$regex' in condition:
+            return _predicate(path, '$regex', (condition['$regex'], condition.get('$options', '')), array_paths)
+        parts, params = [], []
+        for op, value in condition.items():
+            if op in ('$and', '$or'):
+                if not isinstance(value, list) or not value:
+                    raise EmulatorError('INVALID_PARAM', f"{op} 的参数必须是非空数组")
+                subs = [compile_condition(path, item, array_paths) for item in value]
+                joiner = ' AND ' if op == '$and' else ' OR '
+                sql = '(' + joiner.join(sub for sub, _ in subs) + ')'
+                sub_params = [p for _, sub_params in subs for p in sub_params]
+            elif op in ('$ne', '$neq'):
+                sql, sub_params = _predicate(path, '$eq', value, array_paths)
+                sql = f"NOT IFNULL({sql}, 0)"
+            elif op == '$nin':
+                sql, sub_params = _predicate(path, '$in', value, array_paths)
+                sql = f"NOT IFNULL({sql}, 0)"
+            elif op == '$exists':
+                sql, sub_params = f"({type_expr(path)} IS {'NOT ' if value else ''}NULL)", []
+            elif op == '$size':
+                sql, sub_params = f"({type_expr(path)} = 'array' AND json_array_length(doc, '$.{check_field(path)}') = ?)", [value]
+            else:
+                sql, sub_params = _predicate(path, op, value, array_paths)
+            parts.append(sql)
+            params.extend(sub_params)
+        return ('(' + ' AND '.join(parts) + ')' if len(parts) > 1 else parts[0]), params
+    return _predicate(path, '$eq', condition, array_paths)
+
+
+def _predicate(path, op, value, array_paths):
+    """
+    字段上的正向条件；字段路径经过数组字段时，除了直接比较，还按数组元素匹配
+    （与云开发 / MongoDB 一致：tags: 'a' 匹配 tags 数组中含 'a' 的文档）
+    """
+    sql, params = _scalar_predicate(op, value, field_expr(path), type_expr(path))
+    if path == ID_FIELD:
+        return sql, params
+    parts = path.split('.')
+    for i in range(len(parts), 0, -1):
+        prefix = '.'.join(parts[:i])
+        if prefix not in array_paths:
+            continue
+        rest = '.'.join(parts[i:])
+        if rest:
+            element_sql, element_params = _scalar_predicate(
+                op, value, f"json_extract(je.value, '$.{rest}')", f"json_type(je.value, '$.{rest}')")
+        else:
+            element_sql, element_params = _scalar_predicate(op, value, 'je.value', 'je.type')
+        sql = f"({sql} OR EXISTS (SELECT 1 FROM json_each(doc, '$.{prefix}') AS je WHERE {element_sql}))"
+        params = params + element_params
+        break
+    return sql, params
+
+
+def compile_where(query, array_paths=frozenset()):
+    """
+    where 条件 → (SQL, 参数, 查询形态)；查询形态为 {字段: 'eq' | 'in' | 'range' | 'ne' | ...}，
+    与 index_catalog.parse_query_shape 的 filter 对象格式一致
+    """
+    shape = {}
+    sql, params = _compile_query(query or {}, array_paths, shape)
+    return sql, params, shape
+
+
+def _compile_query(query, array_paths, shape):
+    if not isinstance(query, dict):
+        raise EmulatorError('INVALID_PARAM', 'where 条件必须是对象')
+    parts, params = [], []
+    for key, value in query.items():
+        if key in ('$and', '$or'):
+            if not isinstance(value, list) or not value:
+                raise EmulatorError('INVALID_PARAM', f"{key} 的参数必须是非空数组")
+            subs = [_compile_query(item, array_paths, shape) for item in value]
+            joiner = ' AND ' if key == '$and' else ' OR '
+            parts.append('(' + joiner.join(sub for sub, _ in subs) + ')')
+            params.extend(p for _, sub_params in subs for p in sub_params)
+            continue
+        if key.startswith('$'):
+            raise EmulatorError('INVALID_PARAM', f"不支持的查询操作符: {key}")
+        for path, condition in flatten_query({key: value}):
+            check_field(path)
+            shape.setdefault(path, _shape_of(condition))
+            sql, condition_params = compile_condition(path, condition, array_paths)
+            parts.append(sql)
+            params.extend(condition_params)
+    return (' AND '.join(parts) if parts else '1'), params
+
+
+def _shape_of(condition):
+    """字段条件在查询形态中的类别：eq / in / range，其余操作符记为操作符名（如 neq、regex、exists）"""
+    if not isinstance(condition, dict) or not any(key.startswith('$') for key in condition):
+        return 'eq'
+    kinds = []
+    for op, value in condition.items():
+        if op in ('$and', '$or'):
+            kinds.extend(_shape_of(item) for item in value)
+        elif op in _RANGE_SQL:
+            kinds.append('range')
+        elif op != '$options':
+            kinds.append(op[1:])
+    if '$or' in condition and set(kinds) <= {'eq', 'in'}:
+        return 'in'
+    if 'range' in kinds:
+        return 'range'
+    return kinds[0] if len(set(kinds)) == 1 else '+'.join(sorted(set(kinds)))
+
+
+def compile_order(order_by):
+    """[[字段, 'asc' | 'desc'], ...] → (ORDER BY 子句, [(字段, 方向)])"""
+    terms, sort = [], []
+    for item in order_by or []:
+        if isinstance(item, dict):
+            field, direction = item.get('field'), item.get('direction', 'asc')
+        else:
+            field, direction = item
+        direction = str(direction).lower()
+        if direction not in ('asc', 'desc'):
+            raise EmulatorError('INVALID_PARAM', f"排序方向只能是 asc / desc: {direction}")
+        terms.append(f"{field_expr(field)} {direction.upper()}")
+        sort.append((field, -1 if direction == 'desc' else 1))
+    return (' ORDER BY ' + ', '.join(terms) if terms else ''), sort
+
+
+def _get_parent(doc, path, create):
+    parts = path.split('.')
+    node = doc
+    for part in parts[:-1]:
+        child = node.get(part) if isinstance(node, dict) else None
+        if not isinstance(child, dict):
+            if not create:
+                return None, parts[-1]
+            child = {}
+            node[part] = child
+        node = child
+    return node, parts[-1]
+
+
+def _values_equal(left, right):
+    return type(left) is type(right) and left == right or \
+        (isinstance(left, (int, float)) and isinstance(right, (int, float))
+         and not isinstance(left, bool) and not isinstance(right, bool) and left == right)
+
+
+def flatten_update(data, prefix=''):
+    """update 的 data 按点路径展开：普通对象逐字段更新（与云开发一致），_.set() 才整体替换"""
+    items = []
+    for key, value in data.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict) and value and not any(k.startswith('$') for k in value):
+            items.extend(flatten_update(value, path))
+        else:
+            items.append((path, value))
+    return items
+
+
+def apply_update(doc, data):
+    """在文档上执行更新（原地修改），data 为字段 → 值或更新操作符"""
+    for path, value in flatten_update(data):
+        if path == ID_FIELD:
+            raise EmulatorError('INVALID_PARAM', '不能更新 _id')
+        check_field(path)
+        if isinstance(value, dict) and len(value) == 1 and next(iter(value)) in _UPDATE_OPS:
+            op, arg = next(iter(value.items()))
+        else:
+            op, arg = '$set', value
+        if op == '$remove':
+            parent, key = _get_parent(doc, path, False)
+            if isinstance(parent, dict):
+                parent.pop(key, None)
+            continue
+        parent, key = _get_parent(doc, path, True)
+        current = parent.get(key)
+        if op == '$set':
+            parent[key] = arg
+        elif op in ('$inc', '$mul'):
+            if current is not None and (isinstance(current, bool) or not isinstance(current, (int, float))):
+                raise EmulatorError('INVALID_PARAM', f"{op} 只能作用于数字字段: {path}")
+            parent[key] = (current or 0) + arg if op == '$inc' else (current or 0) * arg
+        elif op in ('$min', '$max'):
+            if current is None or (arg < current if op == '$min' else arg > current):
+                parent[key] = arg
+        else:
+            if current is None:
+                current = parent[key] = []
+            if not isinstance(current, list):
+                raise EmulatorError('INVALID_PARAM', f"{op} 只能作用于数组字段: {path}")
+            if op in ('$push', '$unshift'):
+                items = arg.get('each', []) if isinstance(arg, dict) else (arg if isinstance(arg, list) else [arg])
+                if op == '$push':
+                    position = arg.get('position', len(current)) if isinstance(arg, dict) else len(current)
+                    current[position:position] = items
+                else:
+                    current[0:0] = items
+            elif op == '$addToSet':
+                items = arg.get('each', []) if isinstance(arg, dict) else [arg]
+                for item in items:
+                    if not any(_values_equal(item, existing) for existing in current):
+                        current.append(item)
+            elif op == '$pop':
+                if current:
+                    current.pop(-1 if arg != -1 else 0)
+            elif op == '$shift':
+                if current:
+                    current.pop(0)
+            elif op in ('$pull', '$pullAll'):
+                targets = arg if op == '$pullAll' else [arg]
+                parent[key] = [item for item in current if not any(_values_equal(item, t) for t in targets)]
+    return doc
+
+
+class Emulator:
+    """
+    用法:
+        emulator = Emulator('local.sqlite')
+        emulator.add('meals', {'userId': 'u1', 'mealDate': '2024-01-01'})
+        emulator.get('meals', {'userId': 'u1'}, order_by=[['mealDate', 'desc']], limit=20)
+        emulator.stats()
+    同一个连接由一把锁保护，可在多线程的 HTTP 服务中共用
+    """
+
+    def __init__(self, path=':memory:', create_indexes=True, logger=None):
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.create_function('regexp', 2, _regexp, deterministic=True)
+        if path != ':memory:':
+            self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute(f"CREATE TABLE IF NOT EXISTS {META_ARRAY_PATHS} "
+                          f"(collection TEXT, path TEXT, PRIMARY KEY (collection, path))")
+        self.lock = threading.RLock()
+        self.create_indexes = create_indexes
+        self.index_specs = indexes_by_collection(load_indexes()) if create_indexes else {}
+        self.logger = logger
+        self.collections = {row[0] for row in self.conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' AND name != ?",
+            (META_ARRAY_PATHS,))}
+        self.array_paths = {}
+        for collection, path in self.conn.execute(f"SELECT collection, path FROM {META_ARRAY_PATHS}"):
+            self.array_paths.setdefault(collection, set()).add(path)
+        self.skipped_indexes = []
+        self._plans = {}
+        self.records = []
+
+    # ---------- 集合与索引 ----------
+
+    def ensure_collection(self, name):
+        check_collection(name)
+        if name in self.collections:
+            return
+        with self.lock:
+            table = quote_ident(name)
+            self.conn.execute(f"CREATE TABLE IF NOT EXISTS {table} ({ID_FIELD} TEXT PRIMARY KEY, doc TEXT NOT NULL)")
+            for spec in self.index_specs.get(name, []):
+                self._create_index(spec)
+            self.collections.add(name)
+
+    def _create_index(self, spec):
+        """把 IndexSpec 建为表达式索引；数组字段不能用表达式索引，只索引它前面的字段"""
+        columns = []
+        for field, direction in spec.keys:
+            if field in spec.multikey_fields:
+                break
+            columns.append(f"{field_expr(field)} {'DESC' if direction == -1 else 'ASC'}")
+        if len(columns) < len(spec.keys):
+            self.skipped_indexes.append((spec, len(columns)))
+            if not columns or spec.unique:
+                return
+        unique = 'UNIQUE ' if spec.unique else ''
+        name = quote_ident(f"{spec.collection}__{spec.name}")
+        self.conn.execute(f"CREATE {unique}INDEX IF NOT EXISTS {name} ON {quote_ident(spec.collection)} "
+                          f"({', '.join(columns)})")
+
+    def indexes(self, collection):
+        self.ensure_collection(collection)
+        with self.lock:
+            return [{'name': name, 'sql': sql} for name, sql in self.conn.execute(
+                "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+                (collection,))]
+
+    def _remember_arrays(self, collection, docs):
+        known = self.array_paths.setdefault(collection, set())
+        new = set()
+        for doc in docs:
+            new |= array_paths_of(doc) - known
+        if new:
+            self.conn.executemany(f"INSERT OR IGNORE INTO {META_ARRAY_PATHS} VALUES (?, ?)",
+                                  [(collection, path) for path in sorted(new)])
+            known |= new
+
+    # ---------- 计时与查询计划 ----------
+
+    def _explain(self, sql, params):
+        """SQLite 查询计划（按 SQL 文本缓存），如 'SEARCH meals USING INDEX meals__idx_user_date (...)'"""
+        plan = self._plans.get(sql)
+        if plan is None:
+            rows = self.conn.execute('EXPLAIN QUERY PLAN ' + sql, params).fetchall()
+            plan = self._plans[sql] = '; '.join(row[-1] for row in rows)
+        return plan
+
+    def _record(self, action, collection, started, rows, shape=None, sort=(), limit=None, skip=None, plan=None,
+                source=None):
+        record = {
+            'ts': now_iso(),
+            'action': action,
+            'collection': collection,
+            'filter': shape or {},
+            'sort': [('-' if direction == -1 else '') + field for field, direction in sort],
+            'ms': round((time.perf_counter() - started) * 1000, 3),
+            'rows': rows,
+        }
+        if limit is not None:
+            record['limit'] = limit
+        if skip:
+            record['skip'] = skip
+        if plan:
+            record['plan'] = plan
+        if source:
+            record['source'] = source
+        self.records.append(record)
+        if self.logger:
+            self.logger(record)
+        return record
+
+    # ---------- 读 ----------
+
+    def _select(self, collection, where, order_by=None, skip=0, limit=None, columns=f"{ID_FIELD}, doc"):
+        self.ensure_collection(collection)
+        sql_where, params, shape = compile_where(decode_value(where), self.array_paths.get(collection, ()))
+        order_sql, sort = compile_order(order_by)
+        sql = f"SELECT {columns} FROM {quote_ident(collection)} WHERE {sql_where}{order_sql}"
+        if limit is not None:
+            sql += ' LIMIT ? OFFSET ?'
+            params = params + [limit, skip or 0]
+        elif skip:
+            sql += ' LIMIT -1 OFFSET ?'
+            params = params + [skip]
+        return sql, params, shape, sort
+
+    def get(self, collection, where=None, order_by=None, skip=0, limit=None, field=None, source=None):
+        limit = DEFAULT_LIMIT if limit is None else limit
+        if not 0 < limit <= MAX_LIMIT:
+            raise EmulatorError('INVALID_PARAM', f"limit 必须在 1 ~ {MAX_LIMIT} 之间")
+        with self.lock:
+            started = time.perf_counter()
+            sql, params, shape, sort = self._select(collection, where, order_by, skip, limit)
+            docs = [_load(_id, doc, field) for _id, doc in self.conn.execute(sql, params)]
+            self._record('get', collection, started, len(docs), shape, sort, limit, skip,
+                         self._explain(sql, params), source)
+        return docs
+
+    def count(self, collection, where=None, source=None):
+        with self.lock:
+            started = time.perf_counter()
+            sql, params, shape, _ = self._select(collection, where, columns='COUNT(*)')
+            total = self.conn.execute(sql, params).fetchone()[0]
+            self._record('count', collection, started, total, shape, plan=self._explain(sql, params), source=source)
+        return total
+
+    def get_doc(self, collection, doc_id, source=None):
+        return self.get(collection, {ID_FIELD: doc_id}, limit=1, source=source)
+
+    # ---------- 写 ----------
+
+    def add(self, collection, data, source=None):
+        """新增一个或多个文档，返回 _id（列表输入时返回 _id 列表）"""
+        docs = data if isinstance(data, list) else [data]
+        rows = []
+        for doc in docs:
+            if not isinstance(doc, dict):
+                raise EmulatorError('INVALID_PARAM', 'add 的 data 必须是对象或对象数组')
+            doc = decode_value(doc)
+            doc_id = str(doc.pop(ID_FIELD, None) or uuid.uuid4().hex)
+            rows.append((doc_id, doc))
+        self.ensure_collection(collection)
+        with self.lock:
+            started = time.perf_counter()
+            try:
+                self.conn.execute('BEGIN')
+                self.conn.executemany(f"INSERT INTO {quote_ident(collection)} VALUES (?, ?)",
+                                      [(doc_id, _dump(doc)) for doc_id, doc in rows])
+                self._remember_arrays(collection, [doc for _, doc in rows])
+                self.conn.execute('COMMIT')
+            except sqlite3.IntegrityError as e:
+                self.conn.execute('ROLLBACK')
+                raise EmulatorError('DATABASE_DUPLICATE_WRITE', f"违反唯一约束: {e}", 409)
+            except Exception:
+                self.conn.execute('ROLLBACK')
+                raise
+            self._record('add', collection, started, len(rows), source=source)
+        ids = [doc_id for doc_id, _ in rows]
+        return ids if isinstance(data, list) else ids[0]
+
+    def update(self, collection, where, data, source=None):
+        """按条件更新（不受 limit 限制），返回更新的文档数"""
+        if not isinstance(data, dict) or not data:
+            raise EmulatorError('INVALID_PARAM', 'update 的 data 必须是非空对象')
+        data = decode_value(data)
+        with self.lock:
+            started = time.perf_counter()
+            sql, params, shape, _ = self._select(collection, where)
+            try:
+                self.conn.execute('BEGIN')
+                changed = []
+                for doc_id, raw in self.conn.execute(sql, params).fetchall():
+                    doc = json.loads(raw)
+                    apply_update(doc, data)
+                    changed.append((_dump(doc), doc_id, doc))
+                self.conn.executemany(f"UPDATE {quote_ident(collection)} SET doc = ? WHERE {ID_FIELD} = ?",
+                                      [(raw, doc_id) for raw, doc_id, _ in changed])
+                self._remember_arrays(collection, [doc for _, _, doc in changed])
+                self.conn.execute('COMMIT')
+            except sqlite3.IntegrityError as e:
+                self.conn.execute('ROLLBACK')
+                raise EmulatorError('DATABASE_DUPLICATE_WRITE', f"违反唯一约束: {e}", 409)
+            except Exception:
+                self.conn.execute('ROLLBACK')
+                raise
+            self._record('update', collection, started, len(changed), shape, plan=self._explain(sql, params),
+                         source=source)
+        return len(changed)
+
+    def set_doc(self, collection, doc_id, data, source=None):
+        """doc(id).set()：整体替换文档，不存在时新建；返回 (更新数, 新建的 _id)"""
+        if not isinstance(data, dict):
+            raise EmulatorError('INVALID_PARAM', 'set 的 data 必须是对象')
+        doc = decode_value(data)
+        doc.pop(ID_FIELD, None)
+        self.ensure_collection(collection)
+        with self.lock:
+            started = time.perf_counter()
+            table = quote_ident(collection)
+            try:
+                self.conn.execute('BEGIN')
+                exists = self.conn.execute(f"SELECT 1 FROM {table} WHERE {ID_FIELD} = ?", (doc_id,)).fetchone()
+                self.conn.execute(f"INSERT OR REPLACE INTO {table} VALUES (?, ?)", (doc_id, _dump(doc)))
+                self._remember_arrays(collection, [doc])
+                self.conn.execute('COMMIT')
+            except sqlite3.IntegrityError as e:
+                self.conn.execute('ROLLBACK')
+                raise EmulatorError('DATABASE_DUPLICATE_WRITE', f"违反唯一约束: {e}", 409)
+            except Exception:
+                self.conn.execute('ROLLBACK')
+                raise
+            self._record('set', collection, started, 1, {ID_FIELD: 'eq'}, source=source)
+        return (1, None) if exists else (0, doc_id)
+
+    def remove(self, collection, where, source=None):
+        """按条件删除，返回删除的文档数"""
+        with self.lock:
+            started = time.perf_counter()
+            self.ensure_collection(collection)
+            sql_where, params, shape = compile_where(decode_value(where), self.array_paths.get(collection, ()))
+            sql = f"DELETE FROM {quote_ident(collection)} WHERE {sql_where}"
+            removed = self.conn.execute(sql, params).rowcount
+            self._record('remove', collection, started, removed, shape, plan=self._explain(sql, params),
+                         source=source)
+        return removed
+
+    def import_records(self, collection, records, batch=5000):
+        """批量导入（跳过计时记录），文档缺少 _id 时自动生成；返回导入条数"""
+        self.ensure_collection(collection)
+        total = 0
+        with self.lock:
+            self.conn.execute('BEGIN')
+            try:
+                rows, docs = [], []
+                for record in records:
+                    doc = decode_value(record)
+                    doc_id = str(doc.pop(ID_FIELD, None) or uuid.uuid4().hex)
+                    rows.append((doc_id, _dump(doc)))
+                    docs.append(doc)
+                    if len(rows) >= batch:
+                        self._import_batch(collection, rows, docs)
+                        total += len(rows)
+                        rows, docs = [], []
+                if rows:
+                    self._import_batch(collection, rows, docs)
+                    total += len(rows)
+                self.conn.execute('COMMIT')
+            except Exception:
+                self.conn.execute('ROLLBACK')
+                raise
+            self.conn.execute('ANALYZE')
+            self._plans.clear()
+        return total
+
+    def _import_batch(self, collection, rows, docs):
+        self.conn.executemany(f"INSERT OR REPLACE INTO {quote_ident(collection)} VALUES (?, ?)", rows)
+        self._remember_arrays(collection, docs)
+
+    # ---------- 统计 ----------
+
+    def stats(self, records=None):
+        """
+        按 (集合, 操作, 查询形态) 汇总耗时：次数、总耗时、p50 / p95 / 最大值、平均返回行数、查询计划，
+        按总耗时降序
+        """
+        groups = {}
+        for record in self.records if records is None else records:
+            key = (record['collection'], record['action'],
+                   json.dumps(record.get('filter') or {}, sort_keys=True, ensure_ascii=False),
+                   '|'.join(record.get('sort') or []))
+            groups.setdefault(key, []).append(record)
+        summary = []
+        for (collection, action, shape, sort), items in groups.items():
+            times = sorted(item['ms'] for item in items)
+            summary.append({
+                'collection': collection,
+                'action': action,
+                'filter': json.loads(shape),
+                'sort': sort.split('|') if sort else [],
+                'count': len(items),
+                'totalMs': round(sum(times), 3),
+                'p50Ms': times[len(times) // 2],
+                'p95Ms': times[min(len(times) - 1, int(len(times) * 0.95))],
+                'maxMs': times[-1],
+                'avgRows': round(sum(item['rows'] for item in items) / len(items), 1),
+                'plan': items[-1].get('plan', ''),
+                'fullScan': is_full_scan(items[-1].get('plan', '')),
+            })
+        summary.sort(key=lambda item: -item['totalMs'])
+        return summary
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+def is_full_scan(plan):
+    """查询计划中是否有不走索引的全表扫描（json_each 虚表的扫描不算）"""
+    return any(step.startswith('SCAN ') and 'INDEX' not in step and 'VIRTUAL TABLE' not in step
+               for step in plan.split('; '))
+
+
+def _regexp(pattern, value):
+    if value is None:
+        return 0
+    return 1 if re.search(pattern, str(value)) else 0
+
+
+def _dump(doc):
+    return json.dumps(doc, ensure_ascii=False, separators=(',', ':'))
+
+
+def _load(doc_id, raw, field=None):
+    doc = json.loads(raw)
+    if field:
+        # field({a: true}) 只返回指定字段，field({a: false}) 排除指定字段；_id 总是返回
+        if any(field.values()):
+            doc = {key: doc[key] for key, keep in field.items() if keep and key in doc}
+        else:
+            doc = {key: value for key, value in doc.items() if key not in field}
+    return {ID_FIELD: doc_id, **doc}
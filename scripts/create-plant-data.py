@@ -2,11 +2,19 @@
 # -*- coding: utf-8 -*-
 """
 生成60种植物模板数据
+
+用法:
+    python scripts/create-plant-data.py
+    python scripts/create-plant-data.py --compact   # 以紧凑格式写出（无缩进，体积更小）
 """
 
-import json
+import argparse
 import os
 
+from json_stream import PRETTY_INDENT, atomic_write_json, dump_array
+from plant_index import GROWTH_TABLE_FILE, UNLOCK_INDEX_FILE, build_growth_tables, build_unlock_index
+from schema_validator import validate_or_exit
+
 # 定义60种植物数据
 plants = []
 
@@ -717,10 +725,28 @@ print(f"  - 白银级: {len(silver_shrubs) + len(silver_greens)}")
 print(f"  - 黄金级: {len(gold_trees) + len(gold_flowers)}")
 print(f"  - 钻石级: {len(diamond_rare) + len(diamond_concept)}")
 
-# 保存JSON文件
+# 写文件前校验，有错误时中止
+validate_or_exit('plants', plants)
+
+parser = argparse.ArgumentParser(description='生成植物模板数据、解锁索引和生长阶段前缀和表')
+parser.add_argument('--compact', action='store_true', help='以无空白的紧凑格式写出（默认缩进 2 格）')
+args = parser.parse_args()
+indent = None if args.compact else PRETTY_INDENT
+
+# 保存JSON文件（逐个写出植物，写完后原子替换）
 output_file = os.path.join(os.path.dirname(__file__), '../cloudfunctions/plant-templates/plant-data.json')
-with open(output_file, 'w', encoding='utf-8') as f:
-    json.dump(plants, f, ensure_ascii=False, indent=2)
+dump_array(output_file, plants, indent)
 
 print(f"\n✅ 植物数据文件已生成: {output_file}")
 
+# 保存解锁索引（按等级分组、按积分阈值排序，供“能解锁哪些植物”查询二分查找）
+unlock_index = build_unlock_index(plants)
+atomic_write_json(UNLOCK_INDEX_FILE, unlock_index, indent)
+
+print(f"✅ 植物解锁索引已生成: {UNLOCK_INDEX_FILE}（前置植物链 {len(unlock_index['prerequisites'])} 条）")
+
+# 保存生长阶段前缀和表（累计天数 / 累计减碳量，供按天数和减碳量二分出当前阶段）
+growth_tables = build_growth_tables(plants)
+atomic_write_json(GROWTH_TABLE_FILE, growth_tables, indent)
+
+print(f"✅ 生长阶段前缀和表已生成: {GROWTH_TABLE_FILE}")
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+每日统计（daily_stats）聚合模块
+daily_stats 在 order-sync 等云函数中随请求增量更新，时间长了会和 meals 对不上。这里从 meals 的 JSONL 流
+按 (userId, 日期) 聚合出 totalMeals / totalCarbonReduction / mealTypes.*，供两种用法：
+    增量：按输入文件的字节偏移断点续读，把新增餐食聚合成 inc 增量批次（内存中的分组数有上限，超过即输出）
+    重建：把日期范围内的全部餐食重新聚合成 set 绝对值批次，修复已漂移的统计
+
+解析走快速路径：不做完整的 json.loads，只在每行字节串中查找需要的 4 个顶层字段（userId 中有转义、
+日期为 {"$date": ...}、餐厅订单同步的餐食只有 date 字段等情况回退到 json.loads）。
+日期按 --tz-offset 小时换算为本地日期（云函数中 setHours(0, 0, 0, 0) 的结果），默认东八区
+"""
+
+import datetime
+import json
+import os
+import zlib
+
+MEAL_TYPES = ['breakfast', 'lunch', 'dinner', 'snack']
+DEFAULT_TZ_OFFSET = 8
+DEFAULT_MAX_GROUPS = 500000     # 增量模式内存中最多保留的 (userId, 日期) 分组数
+DEFAULT_BUCKETS = 64            # 重建模式按 userId 哈希分桶的桶数
+
+# 分组累加值的下标：餐食数、减排量，之后依次为各餐次的餐食数（mealType 为 restaurant 等其他值时只计入餐食数）
+COUNT, REDUCTION = 0, 1
+WIDTH = 2 + len(MEAL_TYPES)
+_MEAL_TYPE_SLOT = {name.encode(): 2 + i for i, name in enumerate(MEAL_TYPES)}
+
+_USER_KEY = b'"userId":"'
+_TYPE_KEY = b'"mealType":"'
+_DATE_KEY = b'"mealDate":"'
+_REDUCTION_KEY = b'"carbonReduction":'
+
+
+class LocalDate:
+    """
+    UTC 时间戳 → 本地日期（b'YYYY-MM-DD'）；按 'YYYY-MM-DDTHH' 前缀缓存，同一小时的餐食只换算一次
+    """
+
+    def __init__(self, tz_offset=DEFAULT_TZ_OFFSET):
+        self.offset = datetime.timedelta(hours=tz_offset)
+        self.tz = datetime.timezone(self.offset)
+        self.cache = {}
+        self.midnights = {}
+
+    def __call__(self, stamp):
+        """stamp 为 bytes 或 str；无法解析时返回 None"""
+        if isinstance(stamp, str):
+            stamp = stamp.encode()
+        if len(stamp) >= 13 and stamp[-1:] == b'Z' and stamp[10:11] == b'T':
+            day = self.cache.get(stamp[:13])
+            if day is None:
+                day = self._convert(stamp[:13] + b':00:00+00:00')
+                self.cache[stamp[:13]] = day
+            return day
+        if len(stamp) == 10:
+            # 只有日期时视为本地日期
+            return stamp
+        return self._convert(stamp)
+
+    def _convert(self, stamp):
+        try:
+            moment = datetime.datetime.fromisoformat(stamp.decode().replace('Z', '+00:00'))
+        except ValueError:
+            return None
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=datetime.timezone.utc)
+        return moment.astimezone(self.tz).strftime('%Y-%m-%d').encode()
+
+    def midnight(self, day):
+        """本地日期 → 当天 0 点的 UTC ISO 时间（与云函数写入的 date 一致）"""
+        stamp = self.midnights.get(day)
+        if stamp is None:
+            moment = datetime.datetime.strptime(day, '%Y-%m-%d') - self.offset
+            stamp = self.midnights[day] = moment.strftime('%Y-%m-%dT%H:%M:%S.000Z')
+        return stamp
+
+
+def meal_fields(line, local_date):
+    """
+    一行 meals JSONL → (userId, 本地日期, mealType, carbonReduction)，前三项为 bytes；不是有效餐食时返回 None。
+    快速路径假设这几个键名只出现在顶层（meals 中的 ingredients / restaurant / comparedToMeat 都不含这些键）
+    """
+    i = line.find(_USER_KEY) + 10
+    j = line.find(b'"', i)
+    k = line.find(_DATE_KEY) + 12
+    if i >= 10 and k >= 12:
+        user = line[i:j]
+        end = line.find(b'"', k)
+        # 以 Z 结尾的 UTC 时间直接查小时缓存，省掉一次方法调用
+        day = local_date.cache.get(line[k:k + 13]) if line[end - 1] == 90 else None
+        if day is None:
+            day = local_date(line[k:end])
+        i = line.find(_TYPE_KEY) + 12
+        meal_type = line[i:line.find(b'"', i)] if i >= 12 else None
+        i = line.find(_REDUCTION_KEY) + 18
+        try:
+            # 数字之后是逗号；是最后一个字段时没有逗号，[i:-1] 正好去掉结尾的 }
+            reduction = float(line[i:line.find(b',', i)]) if i >= 18 else 0.0
+        except ValueError:
+            day = None
+        if day is not None and b'\\' not in user:
+            return user, day, meal_type, reduction
+    return _slow_fields(line, local_date)
+
+
+def _slow_fields(line, local_date):
+    try:
+        meal = json.loads(line)
+    except ValueError:
+        return None
+    if not isinstance(meal, dict) or not meal.get('userId'):
+        return None
+    # restaurant-order-sync 写入的餐食用 date 字段
+    stamp = meal.get('mealDate') or meal.get('date') or meal.get('createdAt')
+    if isinstance(stamp, dict):
+        stamp = stamp.get('$date')
+    if isinstance(stamp, (int, float)):
+        stamp = datetime.datetime.fromtimestamp(stamp / 1000, datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+    day = local_date(stamp) if isinstance(stamp, str) else None
+    if day is None:
+        return None
+    meal_type = meal.get('mealType')
+    return (str(meal['userId']).encode(), day, meal_type.encode() if isinstance(meal_type, str) else None,
+            float(meal.get('carbonReduction') or 0))
+
+
+class Aggregator:
+    """
+    按 (userId, 日期) 累加；date_from / date_to（b'YYYY-MM-DD'，含两端）限定日期范围。
+    用法:
+        aggregator = Aggregator(LocalDate(8))
+        aggregator.add_lines(lines)
+        for (user, day), values in aggregator.drain(): ...
+    """
+
+    def __init__(self, local_date, date_from=None, date_to=None):
+        self.local_date = local_date
+        self.date_from = date_from
+        self.date_to = date_to
+        self.groups = {}
+        self.meals = 0
+        self.skipped = 0
+
+    def add_lines(self, lines):
+        groups = self.groups
+        local_date = self.local_date
+        date_from, date_to = self.date_from, self.date_to
+        slots = _MEAL_TYPE_SLOT
+        for line in lines:
+            fields = meal_fields(line, local_date)
+            if fields is None:
+                if line.strip():
+                    self.skipped += 1
+                continue
+            user, day, meal_type, reduction = fields
+            if (date_from is not None and day < date_from) or (date_to is not None and day > date_to):
+                continue
+            values = groups.get((user, day))
+            if values is None:
+                values = groups[(user, day)] = [0] * WIDTH
+            values[COUNT] += 1
+            values[REDUCTION] += reduction
+            slot = slots.get(meal_type)
+            if slot is not None:
+                values[slot] += 1
+            self.meals += 1
+
+    def merge(self, key, values):
+        current = self.groups.get(key)
+        if current is None:
+            self.groups[key] = list(values)
+        else:
+            for i, value in enumerate(values):
+                current[i] += value
+
+    def drain(self):
+        """按 (userId, 日期) 排序取出全部分组并清空"""
+        groups, self.groups = self.groups, {}
+        return sorted(groups.items())
+
+
+# upsert 行中 totalMeals 之后的部分：减排量与各餐次的餐食数
+_LINE_TAIL = ',"totalCarbonReduction":%a' + ''.join(f',"mealTypes.{name}":%d' for name in MEAL_TYPES) + '}}\n'
+_LINE_TAIL = _LINE_TAIL.encode()
+
+
+def update_lines(groups, op, local_date, date_strings=False):
+    """
+    [((userId, 日期), 累加值)] → upsert 行（bytes，含换行），交给 atomic_write_lines(..., encoded=True) 写出：
+        {"userId": ..., "date": {"$date": ...}, "op": "inc" | "set", "data": {"totalMeals": n, "totalCarbonReduction": x, "mealTypes.lunch": n, ...}}
+    data 只含由 meals 得到的字段（mealTypes 用点路径），不会覆盖 shopping / restaurant 等其他来源的统计。
+    直接拼接字节而不是构造 dict 再 json.dumps；userId 和日期部分按值缓存，结果与紧凑格式的 json.dumps 逐字节相同
+    """
+    users, days = {}, {}
+    for (user, day), values in groups:
+        head = users.get(user)
+        if head is None:
+            head = users[user] = b'{"userId":' + json.dumps(user.decode(), ensure_ascii=False).encode()
+        middle = days.get(day)
+        if middle is None:
+            date = f'"{day.decode()}"' if date_strings else f'{{"$date":"{local_date.midnight(day.decode())}"}}'
+            middle = days[day] = f',"date":{date},"op":"{op}","data":{{"totalMeals":'.encode()
+        yield head + middle + b'%d' % values[COUNT] + _LINE_TAIL % (round(values[REDUCTION], 4), *values[2:])
+
+
+def bucket_of(user, buckets):
+    return zlib.crc32(user) % buckets
+
+
+def complete_size(path):
+    """文件中最后一个换行符之后的偏移：正在追加写入的文件只处理到最后一个完整行"""
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        position = size
+        while position > 0:
+            step = min(1 << 16, position)
+            f.seek(position - step)
+            cut = f.read(step).rfind(b'\n')
+            if cut >= 0:
+                return position - step + cut + 1
+            position -= step
+    return 0
+
+
+def line_ranges(path, parts, start=0, end=None):
+    """把 [start, end) 切成 parts 段，段边界对齐到换行符之后；返回 [(起, 止)]"""
+    end = complete_size(path) if end is None else end
+    bounds = [start]
+    with open(path, 'rb') as f:
+        for n in range(1, parts):
+            f.seek(max(start + (end - start) * n // parts, bounds[-1]))
+            f.readline()
+            bounds.append(min(max(f.tell(), bounds[-1]), end))
+    bounds.append(end)
+    return [(lo, hi) for lo, hi in zip(bounds, bounds[1:]) if hi > lo]
+
+
+def iter_line_blocks(path, start, end, block_size=1 << 22):
+    """
+    读取 [start, end) 中的完整行，按块返回 (行列表, 块结束处的偏移)；end 必须是行尾（complete_size / line_ranges）
+    """
+    with open(path, 'rb') as f:
+        f.seek(start)
+        position = start
+        pending = b''
+        while position < end:
+            chunk = f.read(min(block_size, end - position))
+            if not chunk:
+                break
+            position += len(chunk)
+            data = pending + chunk
+            cut = len(data) if position >= end else data.rfind(b'\n') + 1
+            pending = data[cut:]
+            if cut:
+                yield data[:cut].splitlines(), position - len(pending)
+
+
+def head_crc(path, size=4096):
+    """文件开头的校验值：检查点中记录，用于发现输入文件被替换或轮转"""
+    with open(path, 'rb') as f:
+        return zlib.crc32(f.read(size))
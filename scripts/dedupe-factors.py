@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+碳因子跨文件去重脚本
+用 factor_dedup.py 把 cloudfunctions/database 下的多个因子文件按名称 / 别名合并（并查集），
+每组重复因子按 来源 / 年份 / 文件 优先级保留一条，写出合并后的因子表 merged-factors.json，
+并输出冲突报告：同一因子在不同来源间数值差异过大、同一别名指向多个不同因子
+
+用法:
+    python scripts/dedupe-factors.py
+    python scripts/dedupe-factors.py --source-order IPCC,CPCD,学术研究 --precedence year,source --report dedup-report.json
+    python scripts/dedupe-factors.py --files a.json b.json --output /tmp/merged.json --tolerance 0.5
+    python scripts/dedupe-factors.py --synthetic 200000           # 合成 20 万条因子测耗时，不写默认输出
+"""
+
+import argparse
+import random
+import time
+
+from factor_dedup import (DEFAULT_PRECEDENCE, DEFAULT_SOURCE_ORDER, DEFAULT_VALUE_TOLERANCE, FACTOR_FILES,
+                          MERGED_FACTORS_FILE, FactorDeduplicator)
+from json_stream import atomic_write_json, dump_array
+from schema_validator import validate_or_exit
+
+
+def synthesize_factors(count, seed=42):
+    """
+    生成 count 条因子（模拟导入国家数据库）：约每 3 条为同一因子在不同来源的记录，
+    名称带来源标注、别名部分重叠，另有少量宽泛别名被多个因子共用
+    """
+    rng = random.Random(seed)
+    sources = ['CPCD', 'IPCC', '学术研究', '估算值']
+    out = []
+    base = 0
+    while len(out) < count:
+        name = f"因子{base:07d}"
+        synonyms = [f"synonym_{base}_{n}" for n in range(3)]
+        value = round(rng.uniform(0.1, 30), 2)
+        for copy in range(rng.randint(1, 5)):
+            source = sources[copy % len(sources)]
+            out.append({
+                'name': f"{name}（{source}）" if copy else name,
+                'alias': rng.sample(synonyms, 2) + [name] + ([f"类别{base % 1000}"] if rng.random() < 0.1 else []),
+                'category': 'ingredient',
+                'factorValue': round(value * rng.uniform(0.9, 1.1), 2),
+                'unit': 'kgCO2e/kg',
+                'region': 'CN',
+                'source': source,
+                'year': rng.choice([2020, 2022, 2024]),
+                'status': 'active',
+            })
+        base += 1
+    return out[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='合并多个碳因子文件中的重复因子，输出合并后的因子表和冲突报告')
+    parser.add_argument('--files', nargs='+', help='因子文件，按文件优先级排列（默认 cloudfunctions/database 下的 5 个因子文件）')
+    parser.add_argument('--output', help=f"合并后的因子表（默认 {MERGED_FACTORS_FILE}）")
+    parser.add_argument('--report', help='把完整冲突报告写入 JSON 文件')
+    parser.add_argument('--source-order', default=','.join(DEFAULT_SOURCE_ORDER), help='来源优先级，逗号分隔，靠前的优先')
+    parser.add_argument('--precedence', default=','.join(DEFAULT_PRECEDENCE),
+                        help='选择保留记录时依次比较的字段，逗号分隔（source / year / file）')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_VALUE_TOLERANCE,
+                        help='同一因子的 最大值/最小值-1 超过该比例时报告数值冲突')
+    parser.add_argument('--ignore-key', action='append', default=[], help='不参与合并的宽泛名称或别名，可重复指定')
+    parser.add_argument('--synthetic', type=int, default=0, help='改用 N 条合成因子（测试规模，不写默认输出）')
+    parser.add_argument('--limit', type=int, default=10, help='每类冲突最多显示的条数')
+    parser.add_argument('--dry-run', action='store_true', help='只输出统计和冲突，不写合并后的因子表')
+    args = parser.parse_args()
+
+    options = {
+        'source_order': [s.strip() for s in args.source_order.split(',') if s.strip()],
+        'precedence': [s.strip() for s in args.precedence.split(',') if s.strip()],
+        'value_tolerance': args.tolerance,
+        'ignore_keys': args.ignore_key,
+    }
+    start = time.perf_counter()
+    if args.synthetic:
+        dedup = FactorDeduplicator([(0, record) for record in synthesize_factors(args.synthetic)], **options)
+    else:
+        dedup = FactorDeduplicator.from_files(args.files or FACTOR_FILES, **options)
+    load_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    merged, report = dedup.merge()
+    merge_time = time.perf_counter() - start
+
+    print(f"✅ 读取 {report['input']} 条因子（{load_time:.2f}s），合并耗时 {merge_time:.2f}s")
+    print(f"📊 合并后 {report['output']} 条，去除重复 {report['merged']} 条，跳过非 active 或无因子值 {report['skipped']} 条")
+    print(f"📊 数值冲突 {len(report['valueConflicts'])} 组，别名歧义 {len(report['nameConflicts'])} 个")
+
+    if report['valueConflicts']:
+        print(f"\n⚠️  同一因子的数值差异超过 {args.tolerance:.0%}:")
+        top = sorted(report['valueConflicts'], key=lambda c: -c['spread'])[:args.limit]
+        for conflict in top:
+            values = ', '.join(f"{m['source']} {m['factorValue']}" for m in conflict['members'])
+            chosen = conflict['chosen']
+            print(f"  - {conflict['name']}: 相差 {conflict['spread']:.0%}（{values}），保留 {chosen['source']} {chosen['factorValue']}")
+    if report['nameConflicts']:
+        print('\n⚠️  同一别名指向多个因子（未合并）:')
+        for conflict in report['nameConflicts'][:args.limit]:
+            print(f"  - {conflict['key']}: {' / '.join(conflict['factors'])}")
+
+    if args.report:
+        atomic_write_json(args.report, report)
+        print(f"\n📁 冲突报告已保存至: {args.report}")
+
+    output = args.output or (None if args.synthetic else MERGED_FACTORS_FILE)
+    if output and not args.dry_run:
+        # 写文件前校验，有错误时中止
+        validate_or_exit('factors', merged)
+        dump_array(output, merged)
+        print(f"📁 合并后的因子表已保存至: {output}")
+
+
+if __name__ == '__main__':
+    main()
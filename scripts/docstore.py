@@ -0,0 +1,665 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地内存文档库
+按 generate-index-config.py 中的索引元组建立有序索引（支持复合键、混合方向、点路径和数组字段），
+用简单的查询规划器执行 find / sort / limit，并输出 MongoDB explain 风格的执行计划，
+用于在本地评估索引的实际价值
+"""
+
+import bisect
+import itertools
+import time
+
+# 类型排序（参照 MongoDB 的 BSON 比较顺序）
+_TYPE_RANK = {
+    type(None): 0,
+    int: 1,
+    float: 1,
+    str: 2,
+    dict: 3,
+    list: 4,
+    bool: 5,
+}
+
+CHUNK_SIZE = 512   # 索引叶子块的最大条目数的一半
+
+
+class _Max:
+    """比任何键都大的哨兵"""
+
+    def __lt__(self, other):
+        return False
+
+    def __gt__(self, other):
+        return True
+
+    def __eq__(self, other):
+        return isinstance(other, _Max)
+
+    def __hash__(self):
+        return 1
+
+
+class _Min:
+    """比任何键都小的哨兵"""
+
+    def __lt__(self, other):
+        return True
+
+    def __gt__(self, other):
+        return False
+
+    def __eq__(self, other):
+        return isinstance(other, _Min)
+
+    def __hash__(self):
+        return 0
+
+
+MAX_KEY = _Max()
+MIN_KEY = _Min()
+
+
+class Desc:
+    """降序字段的键包装，比较结果取反"""
+
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        if isinstance(other, Desc):
+            return other.value < self.value
+        return NotImplemented
+
+    def __gt__(self, other):
+        if isinstance(other, Desc):
+            return self.value < other.value
+        return NotImplemented
+
+    def __eq__(self, other):
+        return isinstance(other, Desc) and self.value == other.value
+
+    def __hash__(self):
+        return hash(self.value)
+
+    def __repr__(self):
+        return f"Desc({self.value!r})"
+
+
+def encode_value(value):
+    """把字段值编码为可跨类型比较的元组"""
+    rank = _TYPE_RANK.get(type(value), 6)
+    if rank == 3:
+        return (rank, tuple(sorted((k, encode_value(v)) for k, v in value.items())))
+    if rank == 4:
+        return (rank, tuple(encode_value(v) for v in value))
+    if rank == 6:
+        return (rank, str(value))
+    return (rank, value)
+
+
+def encode_component(value, direction):
+    encoded = encode_value(value)
+    return Desc(encoded) if direction < 0 else encoded
+
+
+def get_values(doc, path):
+    """
+    按点路径取值，路径中遇到数组时展开每个元素
+    返回所有候选值列表；字段缺失时返回 [None]
+    """
+    current = [doc]
+    for part in path.split('.'):
+        next_values = []
+        for value in current:
+            if isinstance(value, dict):
+                if part in value:
+                    next_values.append(value[part])
+            elif isinstance(value, list):
+                for item in value:
+                    if isinstance(item, dict) and part in item:
+                        next_values.append(item[part])
+        current = next_values
+        if not current:
+            return [None]
+    return current
+
+
+def index_values(doc, path):
+    """索引用取值：数组字段展开为多个条目（多键索引）"""
+    values = []
+    for value in get_values(doc, path):
+        if isinstance(value, list):
+            values.extend(value if value else [None])
+        else:
+            values.append(value)
+    return values
+
+
+def sort_value(doc, path):
+    """排序用取值：数组取最小元素，缺失视为 null"""
+    values = index_values(doc, path)
+    return min(values, key=encode_value)
+
+
+class SortedKeyList:
+    """
+    有序键集合：分块有序数组组成的两层 B+ 树结构
+    _maxes 相当于内部节点，_lists 为叶子块，插入和删除为 O(log n + 块大小)
+    """
+
+    def __init__(self, keys=None):
+        self._lists = []
+        self._maxes = []
+        self._len = 0
+        if keys:
+            self.bulk_load(keys)
+
+    def __len__(self):
+        return self._len
+
+    def bulk_load(self, keys):
+        keys = sorted(keys)
+        self._lists = [keys[i:i + CHUNK_SIZE] for i in range(0, len(keys), CHUNK_SIZE)]
+        self._maxes = [chunk[-1] for chunk in self._lists]
+        self._len = len(keys)
+
+    def add(self, key):
+        if not self._maxes:
+            self._lists.append([key])
+            self._maxes.append(key)
+        else:
+            pos = bisect.bisect_left(self._maxes, key)
+            if pos == len(self._maxes):
+                pos -= 1
+                self._lists[pos].append(key)
+                self._maxes[pos] = key
+            else:
+                bisect.insort(self._lists[pos], key)
+            self._split(pos)
+        self._len += 1
+
+    def _split(self, pos):
+        chunk = self._lists[pos]
+        if len(chunk) > CHUNK_SIZE * 2:
+            half = chunk[CHUNK_SIZE:]
+            del chunk[CHUNK_SIZE:]
+            self._maxes[pos] = chunk[-1]
+            self._lists.insert(pos + 1, half)
+            self._maxes.insert(pos + 1, half[-1])
+
+    def remove(self, key):
+        pos = bisect.bisect_left(self._maxes, key)
+        if pos == len(self._maxes):
+            raise KeyError(key)
+        chunk = self._lists[pos]
+        idx = bisect.bisect_left(chunk, key)
+        if idx == len(chunk) or chunk[idx] != key:
+            raise KeyError(key)
+        del chunk[idx]
+        self._len -= 1
+        if chunk:
+            self._maxes[pos] = chunk[-1]
+        else:
+            del self._lists[pos]
+            del self._maxes[pos]
+
+    def _locate(self, key, right=False):
+        """返回键在 (块号, 块内位置) 坐标下的插入点"""
+        find = bisect.bisect_right if right else bisect.bisect_left
+        pos = find(self._maxes, key)
+        if pos == len(self._maxes):
+            return pos, 0
+        return pos, find(self._lists[pos], key)
+
+    def count_range(self, lo, hi):
+        """统计 [lo, hi] 内的键数量，只遍历块长度"""
+        start_chunk, start_idx = self._locate(lo)
+        end_chunk, end_idx = self._locate(hi, right=True)
+        if (start_chunk, start_idx) >= (end_chunk, end_idx):
+            return 0
+        if start_chunk == end_chunk:
+            return end_idx - start_idx
+        total = len(self._lists[start_chunk]) - start_idx
+        for chunk in self._lists[start_chunk + 1:end_chunk]:
+            total += len(chunk)
+        return total + end_idx
+
+    def irange(self, lo, hi, reverse=False):
+        """按顺序遍历 [lo, hi] 内的键"""
+        start_chunk, start_idx = self._locate(lo)
+        end_chunk, end_idx = self._locate(hi, right=True)
+        if (start_chunk, start_idx) >= (end_chunk, end_idx):
+            return
+        if not reverse:
+            for c in range(start_chunk, min(end_chunk + 1, len(self._lists))):
+                chunk = self._lists[c]
+                begin = start_idx if c == start_chunk else 0
+                end = end_idx if c == end_chunk else len(chunk)
+                for i in range(begin, end):
+                    yield chunk[i]
+        else:
+            for c in range(min(end_chunk, len(self._lists) - 1), start_chunk - 1, -1):
+                chunk = self._lists[c]
+                begin = start_idx if c == start_chunk else 0
+                end = end_idx if c == end_chunk else len(chunk)
+                for i in range(end - 1, begin - 1, -1):
+                    yield chunk[i]
+
+
+class OrderedIndex:
+    """单个索引：键为 (各字段编码值..., _id)"""
+
+    def __init__(self, name, keys, unique=False, multikey_fields=()):
+        self.name = name
+        self.keys = tuple(keys)
+        self.unique = unique
+        self.multikey_fields = frozenset(multikey_fields)
+        self.hidden = False
+        self.entries = SortedKeyList()
+
+    @classmethod
+    def from_spec(cls, spec):
+        return cls(spec.name, spec.keys, spec.unique, spec.multikey_fields)
+
+    @property
+    def key_pattern(self):
+        return {field: direction for field, direction in self.keys}
+
+    def doc_keys(self, doc):
+        components = [
+            [encode_component(value, direction) for value in index_values(doc, field)]
+            for field, direction in self.keys
+        ]
+        doc_id = encode_value(doc['_id'])
+        return {tuple(combo) + (doc_id,) for combo in itertools.product(*components)}
+
+    def check_unique(self, doc, keys):
+        if not self.unique:
+            return
+        for key in keys:
+            prefix = key[:-1]
+            for existing in self.entries.irange(prefix, prefix + (MAX_KEY,)):
+                if existing[-1] != key[-1]:
+                    raise DuplicateKeyError(f"索引 {self.name} 唯一约束冲突: {prefix}")
+
+    def insert(self, doc):
+        keys = self.doc_keys(doc)
+        self.check_unique(doc, keys)
+        for key in keys:
+            self.entries.add(key)
+
+    def remove(self, doc):
+        for key in self.doc_keys(doc):
+            self.entries.remove(key)
+
+    def bulk_build(self, docs):
+        keys = []
+        for doc in docs:
+            keys.extend(self.doc_keys(doc))
+        self.entries.bulk_load(keys)
+
+
+class DuplicateKeyError(Exception):
+    pass
+
+
+# ---------------- 查询条件 ----------------
+
+_RANGE_OPS = ('$gt', '$gte', '$lt', '$lte')
+
+
+def _compare(op, left, right):
+    a, b = encode_value(left), encode_value(right)
+    if a[0] != b[0]:
+        return False
+    if op == '$gt':
+        return a > b
+    if op == '$gte':
+        return a >= b
+    if op == '$lt':
+        return a < b
+    return a <= b
+
+
+def _match_condition(values, condition):
+    if isinstance(condition, dict) and condition and all(k.startswith('$') for k in condition):
+        for op, operand in condition.items():
+            if op == '$eq':
+                if not any(v == operand for v in values):
+                    return False
+            elif op == '$ne':
+                if any(v == operand for v in values):
+                    return False
+            elif op == '$in':
+                if not any(v in operand for v in values):
+                    return False
+            elif op == '$nin':
+                if any(v in operand for v in values):
+                    return False
+            elif op in _RANGE_OPS:
+                if not any(_compare(op, v, operand) for v in values):
+                    return False
+            elif op == '$exists':
+                if bool(operand) == (values == [None]):
+                    return False
+            else:
+                raise ValueError(f"不支持的查询操作符: {op}")
+        return True
+    return any(v == condition for v in values)
+
+
+def matches(doc, query):
+    """判断文档是否满足查询条件"""
+    for field, condition in query.items():
+        values = index_values(doc, field) + [v for v in get_values(doc, field) if isinstance(v, list)]
+        if not _match_condition(values, condition):
+            return False
+    return True
+
+
+def _field_bounds(condition):
+    """
+    把单个字段的条件转换为编码值区间列表 [(lo, hi)]，
+    返回 (区间列表, 是否为单点等值)；无法用于索引时返回 (None, False)
+    """
+    if isinstance(condition, dict) and condition and all(k.startswith('$') for k in condition):
+        if '$eq' in condition:
+            point = encode_value(condition['$eq'])
+            return [(point, point)], True
+        if '$in' in condition:
+            points = sorted({encode_value(v) for v in condition['$in']})
+            return [(p, p) for p in points], len(points) == 1
+        lo, hi = None, None
+        for op, operand in condition.items():
+            if op in ('$gt', '$gte'):
+                lo = encode_value(operand)
+            elif op in ('$lt', '$lte'):
+                hi = encode_value(operand)
+        if lo is None and hi is None:
+            return None, False
+        rank = (lo or hi)[0]
+        # 类型括号：范围只覆盖同类型的值，边界外的键由 FETCH 阶段再次过滤
+        return [(lo or (rank, MIN_KEY), hi or (rank, MAX_KEY))], False
+    point = encode_value(condition)
+    return [(point, point)], True
+
+
+def _format_interval(lo, hi, direction):
+    def show(value):
+        if value is MIN_KEY or (isinstance(value, tuple) and value[1] is MIN_KEY):
+            return 'MinKey'
+        if value is MAX_KEY or (isinstance(value, tuple) and value[1] is MAX_KEY):
+            return 'MaxKey'
+        return repr(value[1])
+    if direction < 0:
+        lo, hi = hi, lo
+    return f"[{show(lo)}, {show(hi)}]"
+
+
+class Plan:
+    """候选执行计划"""
+
+    def __init__(self, index, intervals, bounds, eq_prefix, sort_covered, reverse, estimated_keys):
+        self.index = index
+        self.intervals = intervals
+        self.bounds = bounds
+        self.eq_prefix = eq_prefix
+        self.sort_covered = sort_covered
+        self.reverse = reverse
+        self.estimated_keys = estimated_keys
+
+    def score(self, limit):
+        # 排序由索引提供且有 limit 时提前停止，代价按 limit 封顶
+        keys = self.estimated_keys
+        if self.sort_covered and limit:
+            keys = min(keys, limit * 4)
+        sort_penalty = 0 if self.sort_covered else keys * 0.1
+        return keys + sort_penalty
+
+    def describe(self):
+        return {
+            'stage': 'IXSCAN',
+            'indexName': self.index.name,
+            'keyPattern': self.index.key_pattern,
+            'isMultiKey': bool(self.index.multikey_fields),
+            'isUnique': self.index.unique,
+            'direction': 'backward' if self.reverse else 'forward',
+            'indexBounds': self.bounds,
+        }
+
+
+class Collection:
+    """单个集合：文档存储 + 有序索引 + 查询规划器"""
+
+    def __init__(self, name):
+        self.name = name
+        self.docs = {}
+        self.indexes = {}
+        self._next_id = itertools.count(1)
+        self.create_index('_id_', [('_id', 1)], unique=True)
+
+    def create_index(self, name, keys, unique=False, multikey_fields=()):
+        index = OrderedIndex(name, keys, unique, multikey_fields)
+        index.bulk_build(self.docs.values())
+        if unique:
+            # 校验已有数据的唯一性
+            seen = set()
+            for key in index.entries.irange(MIN_KEY, MAX_KEY):
+                if key[:-1] in seen:
+                    raise DuplicateKeyError(f"索引 {name} 唯一约束冲突: {key[:-1]}")
+                seen.add(key[:-1])
+        self.indexes[name] = index
+        return index
+
+    def create_index_from_spec(self, spec):
+        return self.create_index(spec.name, spec.keys, spec.unique, spec.multikey_fields)
+
+    def drop_index(self, name):
+        del self.indexes[name]
+
+    def hide_index(self, name, hidden=True):
+        """隐藏索引：继续维护但不参与查询规划（对应 MongoDB hidden index）"""
+        self.indexes[name].hidden = hidden
+
+    def insert_one(self, doc):
+        doc = dict(doc)
+        doc.setdefault('_id', f"{self.name}_{next(self._next_id)}")
+        if doc['_id'] in self.docs:
+            raise DuplicateKeyError(f"_id 重复: {doc['_id']}")
+        for index in self.indexes.values():
+            index.check_unique(doc, index.doc_keys(doc))
+        for index in self.indexes.values():
+            index.insert(doc)
+        self.docs[doc['_id']] = doc
+        return doc['_id']
+
+    def insert_many(self, docs, build_indexes=True):
+        """批量写入；build_indexes=True 时写完后整体重建索引，比逐条插入快得多"""
+        ids = []
+        if not build_indexes:
+            return [self.insert_one(doc) for doc in docs]
+        for doc in docs:
+            doc = dict(doc)
+            doc.setdefault('_id', f"{self.name}_{next(self._next_id)}")
+            self.docs[doc['_id']] = doc
+            ids.append(doc['_id'])
+        for name, index in list(self.indexes.items()):
+            rebuilt = self.create_index(name, index.keys, index.unique, index.multikey_fields)
+            rebuilt.hidden = index.hidden
+        return ids
+
+    def delete_one(self, doc_id):
+        doc = self.docs.pop(doc_id)
+        for index in self.indexes.values():
+            index.remove(doc)
+
+    def count(self):
+        return len(self.docs)
+
+    # ---------- 查询规划 ----------
+
+    def _plan_for(self, index, query, sort):
+        intervals = [()]
+        bounds = {}
+        eq_prefix = 0
+        prefix_open = True
+        for field, direction in index.keys:
+            condition = query.get(field) if prefix_open else None
+            field_intervals, is_point = _field_bounds(condition) if condition is not None else (None, False)
+            if field_intervals is None or field in index.multikey_fields and not is_point:
+                bounds[field] = ['[MinKey, MaxKey]']
+                prefix_open = False
+                continue
+            bounds[field] = [_format_interval(lo, hi, direction) for lo, hi in field_intervals]
+            expanded = []
+            for prefix in intervals:
+                for lo, hi in field_intervals:
+                    if direction < 0:
+                        lo, hi = Desc(hi), Desc(lo)
+                    expanded.append((prefix + ((lo, hi),)))
+            intervals = expanded
+            if is_point:
+                eq_prefix += 1
+            else:
+                prefix_open = False
+
+        # 排序覆盖检查：等值前缀之后的字段需与排序字段顺序一致，方向整体一致或整体相反
+        sort_covered, reverse = False, False
+        if sort:
+            remaining = [(f, d) for f, d in sort if f not in query or not _field_bounds(query[f])[1]]
+            segment = index.keys[eq_prefix:eq_prefix + len(remaining)]
+            if len(intervals) > 1 and remaining:
+                segment = ()
+            if not remaining:
+                sort_covered = True
+            elif len(segment) == len(remaining) and all(a[0] == b[0] for a, b in zip(segment, remaining)) \
+                    and not any(f in index.multikey_fields for f, _ in segment):
+                if all(a[1] == b[1] for a, b in zip(segment, remaining)):
+                    sort_covered = True
+                elif all(a[1] == -b[1] for a, b in zip(segment, remaining)):
+                    sort_covered, reverse = True, True
+
+        if not intervals[0] and not sort_covered:
+            return None
+
+        ranges = [self._interval_keys(interval) for interval in intervals]
+        estimated = sum(index.entries.count_range(lo, hi) for lo, hi in ranges)
+        return Plan(index, ranges, bounds, eq_prefix, sort_covered, reverse, estimated)
+
+    @staticmethod
+    def _interval_keys(interval):
+        lo = tuple(item[0] for item in interval)
+        hi = tuple(item[1] for item in interval)
+        return lo + (MIN_KEY,), hi + (MAX_KEY,)
+
+    def plan(self, query, sort=(), limit=None):
+        """返回 (最优计划或 None, 全部候选计划)"""
+        candidates = []
+        for index in self.indexes.values():
+            if index.hidden:
+                continue
+            plan = self._plan_for(index, query, sort)
+            if plan is not None:
+                candidates.append(plan)
+        candidates.sort(key=lambda p: (p.score(limit), -p.eq_prefix, p.index.name))
+        return (candidates[0] if candidates else None), candidates
+
+    # ---------- 执行 ----------
+
+    def _execute(self, query, sort, limit, skip):
+        sort = tuple(sort or ())
+        best, candidates = self.plan(query, sort, limit)
+        stats = {'keysExamined': 0, 'docsExamined': 0}
+        needed = (limit + skip) if limit else None
+        results = []
+
+        if best is None:
+            source = self.docs.values()
+        else:
+            source = self._index_scan(best, stats)
+
+        blocking_sort = bool(sort) and (best is None or not best.sort_covered)
+        for doc in source:
+            stats['docsExamined'] += 1
+            if matches(doc, query):
+                results.append(doc)
+                if needed and not blocking_sort and len(results) >= needed:
+                    break
+
+        if blocking_sort:
+            def sort_key(doc):
+                return tuple(encode_component(sort_value(doc, f), d) for f, d in sort)
+            results.sort(key=sort_key)
+
+        results = results[skip:]
+        if limit:
+            results = results[:limit]
+        return results, best, candidates, stats, blocking_sort
+
+    def _index_scan(self, plan, stats):
+        seen = set()
+        intervals = list(reversed(plan.intervals)) if plan.reverse else plan.intervals
+        for lo, hi in intervals:
+            for key in plan.index.entries.irange(lo, hi, reverse=plan.reverse):
+                stats['keysExamined'] += 1
+                doc_id = key[-1][1]
+                if doc_id in seen:
+                    continue
+                seen.add(doc_id)
+                yield self.docs[doc_id]
+
+    def find(self, query=None, sort=(), limit=None, skip=0):
+        return self._execute(query or {}, sort, limit, skip)[0]
+
+    def explain(self, query=None, sort=(), limit=None, skip=0):
+        """执行查询并返回 MongoDB explain('executionStats') 风格的结果"""
+        query = query or {}
+        started = time.perf_counter()
+        results, best, candidates, stats, blocking_sort = self._execute(query, sort, limit, skip)
+        elapsed = (time.perf_counter() - started) * 1000
+
+        stage = {'stage': 'COLLSCAN', 'filter': query, 'direction': 'forward'} if best is None \
+            else {'stage': 'FETCH', 'filter': query, 'inputStage': best.describe()}
+        if blocking_sort:
+            stage = {'stage': 'SORT', 'sortPattern': {f: d for f, d in sort}, 'inputStage': stage}
+        if skip:
+            stage = {'stage': 'SKIP', 'skipAmount': skip, 'inputStage': stage}
+        if limit:
+            stage = {'stage': 'LIMIT', 'limitAmount': limit, 'inputStage': stage}
+
+        return {
+            'queryPlanner': {
+                'namespace': self.name,
+                'parsedQuery': query,
+                'winningPlan': stage,
+                'rejectedPlans': [
+                    {'stage': 'FETCH', 'inputStage': plan.describe()} for plan in candidates[1:]
+                ],
+            },
+            'executionStats': {
+                'nReturned': len(results),
+                'executionTimeMillis': round(elapsed, 3),
+                'totalKeysExamined': stats['keysExamined'],
+                'totalDocsExamined': stats['docsExamined'],
+            },
+        }
+
+
+class DocumentStore:
+    """多集合文档库，可直接从索引目录建立全部声明的索引"""
+
+    def __init__(self):
+        self.collections = {}
+
+    def collection(self, name):
+        if name not in self.collections:
+            self.collections[name] = Collection(name)
+        return self.collections[name]
+
+    def apply_index_specs(self, specs):
+        for spec in specs:
+            self.collection(spec.collection).create_index_from_spec(spec)
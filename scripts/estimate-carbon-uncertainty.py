@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+碳足迹不确定区间估算脚本
+用 carbon_uncertainty.py 对全部食谱（或菜单项）做蒙特卡洛抽样，按因子的 uncertainty 给出
+每道菜碳足迹的均值与 5% / 95% 分位数，供认证材料引用区间而不是单一数值
+
+用法:
+    python scripts/estimate-carbon-uncertainty.py
+    python scripts/estimate-carbon-uncertainty.py --samples 20000 --json intervals.json
+    python scripts/estimate-carbon-uncertainty.py --menu-items menu-items.jsonl --json menu-intervals.json
+    python scripts/estimate-carbon-uncertainty.py --scale 2000 --samples 10000 --memory-mb 256   # 10 万条以上测吞吐与内存
+"""
+
+import argparse
+import resource
+import sys
+import time
+
+import numpy as np
+
+from carbon_uncertainty import (DEFAULT_MEMORY_MB, DEFAULT_SAMPLES, DEFAULT_UNCERTAINTY, menu_item_as_recipe,
+                                recipe_intervals)
+from factor_resolver import DEFAULT_MIN_CONFIDENCE, NameResolver
+from json_stream import ArrayWriter, iter_records
+from recipe_carbon import FACTORS_FILE, INGREDIENTS_FILE, RECIPES_FILE, FactorTable
+from unit_normalizer import UnitNormalizer
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1 << 20) if sys.platform == 'darwin' else peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description='蒙特卡洛估算食谱 / 菜单项碳足迹的不确定区间')
+    parser.add_argument('--recipes', default=RECIPES_FILE, help='食谱数据文件')
+    parser.add_argument('--menu-items', help='改为计算菜单项（JSON 数组或 JSONL，食材格式 ingredientName / quantity / unit）')
+    parser.add_argument('--factors', default=FACTORS_FILE, help='因子库文件')
+    parser.add_argument('--ingredients', default=INGREDIENTS_FILE, help='食材库文件（补充因子库中没有的食材）')
+    parser.add_argument('--samples', type=int, default=DEFAULT_SAMPLES, help='抽样次数')
+    parser.add_argument('--seed', type=int, default=1, help='随机种子')
+    parser.add_argument('--memory-mb', type=float, default=DEFAULT_MEMORY_MB, help='分块计算的内存上限（MB）')
+    parser.add_argument('--default-uncertainty', type=float, default=DEFAULT_UNCERTAINTY,
+                        help='缺少 uncertainty 的因子按该不确定度（%%）抽样')
+    parser.add_argument('--scale', type=int, default=1, help='把数据复制 N 倍（测吞吐与内存）')
+    parser.add_argument('--limit', type=int, default=10, help='显示相对区间最宽的前 N 项')
+    parser.add_argument('--json', dest='json_output', help='把每项的区间写入 JSON 文件')
+    args = parser.parse_args()
+
+    if args.menu_items:
+        items = list(iter_records(args.menu_items))
+        recipes = [menu_item_as_recipe(item) for item in items]
+        ids = [item.get('menuItemId') or item.get('_id') or item.get('name') for item in items]
+        cooking_factors = {}
+    else:
+        recipes = list(iter_records(args.recipes))
+        ids = [recipe.get('recipeId') for recipe in recipes]
+        cooking_factors = None
+    names = [recipe.get('name') for recipe in (items if args.menu_items else recipes)]
+    if args.scale > 1:
+        recipes, ids, names = recipes * args.scale, ids * args.scale, names * args.scale
+
+    table = FactorTable.from_files(args.factors, args.ingredients)
+    resolver = NameResolver.from_table(table, min_confidence=DEFAULT_MIN_CONFIDENCE)
+    normalizer = UnitNormalizer.from_files(args.ingredients, args.factors, resolver=resolver)
+
+    start = time.perf_counter()
+    stats, matrix = recipe_intervals(recipes, table, cooking_factors, resolver.lookup, normalizer,
+                                     default_uncertainty=args.default_uncertainty, samples=args.samples,
+                                     seed=args.seed, memory_mb=args.memory_mb)
+    elapsed = time.perf_counter() - start
+
+    count = len(recipes)
+    print(f"✅ {count} 项 × {args.samples} 次抽样，耗时 {elapsed:.2f}s（{count / elapsed:,.0f} 项/秒），峰值内存 {peak_rss_mb():.0f} MB")
+    coverage = matrix.coverage()
+    print(f"📊 食材全部可计算的项: {int((coverage >= 1).sum())}/{count}")
+
+    point, p5, p95 = stats['point'], stats['p5'], stats['p95']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        width = np.where(point > 0, (p95 - p5) / point, np.nan)
+    if np.any(~np.isnan(width)):
+        print(f"📊 90% 区间相对宽度: 中位数 {np.nanmedian(width):.1%}，最大 {np.nanmax(width):.1%}")
+    unique = len(recipes) // args.scale
+    order = [i for i in np.argsort(-np.nan_to_num(width[:unique], nan=-1)) if not np.isnan(width[i])][:args.limit]
+    if order:
+        print(f"\n区间最宽的 {len(order)} 项（kgCO2e）:")
+        for i in order:
+            print(f"  - {names[i]}: {point[i]:.3f}（均值 {stats['mean'][i]:.3f}，90% 区间 {p5[i]:.3f} ~ {p95[i]:.3f}）")
+
+    if args.json_output:
+        with ArrayWriter(args.json_output) as writer:
+            for i in range(count):
+                writer.write({
+                    'id': ids[i],
+                    'name': names[i],
+                    'point': round(float(point[i]), 4),
+                    'mean': round(float(stats['mean'][i]), 4),
+                    'std': round(float(stats['std'][i]), 4),
+                    'p5': round(float(p5[i]), 4),
+                    'p95': round(float(p95[i]), 4),
+                    'coverage': round(float(coverage[i]), 4),
+                })
+        print(f"\n📁 区间结果已保存至: {args.json_output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+索引存储与内存占用估算
+根据样本文档（JSONL）或集合统计信息中的字段大小，计算 indexes 列表中每个索引的键大小；
+数组字段（标注为“数组”或样本中实际为数组）按每个文档的元素个数放大索引条目数。
+按 1x / 10x / 100x 数据量预测索引的内存与磁盘占用，并与套餐内存对比
+
+用法:
+    python scripts/estimate-index-footprint.py --stats scripts/collection-stats.sample.json
+    python scripts/estimate-index-footprint.py --samples meals=/tmp/synthetic/meals.jsonl --plan-ram-gb 8
+"""
+
+import argparse
+import itertools
+import json
+import sys
+
+from docstore import index_values
+from index_catalog import (
+    INDEX_ENTRY_OVERHEAD, format_bytes, format_keys, indexes_by_collection, load_collection_stats, load_indexes
+)
+
+PAGE_FILL_FACTOR = 0.7     # B 树页平均填充率
+DISK_COMPRESSION = 0.5     # 磁盘上前缀压缩 + 块压缩后的比例
+DEFAULT_SCALES = (1, 10, 100)
+
+
+def value_bytes(value):
+    """按 BSON 编码近似计算单个键值的字节数"""
+    if value is None:
+        return 1
+    if isinstance(value, bool):
+        return 2
+    if isinstance(value, int):
+        return 5 if -2 ** 31 <= value < 2 ** 31 else 9
+    if isinstance(value, float):
+        return 9
+    if isinstance(value, str):
+        return len(value.encode('utf-8')) + 6
+    if isinstance(value, dict):
+        return 5 + sum(len(k) + 2 + value_bytes(v) for k, v in value.items())
+    if isinstance(value, list):
+        return 5 + sum(value_bytes(v) + 3 for v in value)
+    return len(str(value)) + 6
+
+
+class SampleProfile:
+    """从样本文档中统计每个索引的平均条目数与平均键大小"""
+
+    def __init__(self):
+        self.documents = {}
+        self.entries = {}
+        self.key_bytes = {}
+
+    def observe(self, collection, specs, doc):
+        self.documents[collection] = self.documents.get(collection, 0) + 1
+        for spec in specs:
+            per_field = [index_values(doc, field) for field, _ in spec.keys]
+            entries = 1
+            for values in per_field:
+                entries *= len(values)
+            key = (collection, spec.name)
+            self.entries[key] = self.entries.get(key, 0) + entries
+            total = 0
+            for combo in itertools.product(*per_field):
+                total += sum(value_bytes(v) for v in combo)
+            self.key_bytes[key] = self.key_bytes.get(key, 0) + total
+
+    def has(self, spec):
+        return (spec.collection, spec.name) in self.entries
+
+    def entries_per_document(self, spec):
+        return self.entries[(spec.collection, spec.name)] / max(self.documents[spec.collection], 1)
+
+    def entry_bytes(self, spec):
+        key = (spec.collection, spec.name)
+        return self.key_bytes[key] / max(self.entries[key], 1) + INDEX_ENTRY_OVERHEAD
+
+
+def load_samples(profile, grouped, sample_args, sample_size):
+    for item in sample_args:
+        collection, path = item.split('=', 1)
+        specs = grouped.get(collection)
+        if not specs:
+            print(f"⚠️  索引目录中没有集合 {collection}，忽略样本 {path}")
+            continue
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in itertools.islice(f, sample_size):
+                line = line.strip()
+                if line:
+                    profile.observe(collection, specs, json.loads(line))
+
+
+def estimate(specs, stats, profile, scales):
+    rows = []
+    for spec in specs:
+        if profile.has(spec):
+            fanout = profile.entries_per_document(spec)
+            entry = profile.entry_bytes(spec)
+            source = 'sample'
+        else:
+            fanout = stats.entries_per_document(spec)
+            entry = stats.entry_bytes(spec)
+            source = 'stats'
+        documents = stats.documents(spec.collection)
+        base = documents * fanout * entry / PAGE_FILL_FACTOR
+        rows.append({
+            'collection': spec.collection,
+            'index': spec.name,
+            'keys': format_keys(spec.keys),
+            'multikey': bool(spec.multikey_fields) or fanout > 1.0001,
+            'source': source,
+            'documents': documents,
+            'entriesPerDocument': round(fanout, 3),
+            'entryBytes': round(entry, 1),
+            # 内存按未压缩的 B 树页计算，磁盘按压缩后计算
+            'memoryBytes': {f"{scale}x": int(base * scale) for scale in scales},
+            'diskBytes': {f"{scale}x": int(base * DISK_COMPRESSION * scale) for scale in scales},
+        })
+    return rows
+
+
+def summarize(rows, scales):
+    collections = {}
+    for row in rows:
+        summary = collections.setdefault(row['collection'], {
+            'collection': row['collection'], 'indexes': 0,
+            'memoryBytes': {f"{s}x": 0 for s in scales}, 'diskBytes': {f"{s}x": 0 for s in scales},
+        })
+        summary['indexes'] += 1
+        for label in summary['memoryBytes']:
+            summary['memoryBytes'][label] += row['memoryBytes'][label]
+            summary['diskBytes'][label] += row['diskBytes'][label]
+    totals = {
+        'memoryBytes': {f"{s}x": sum(r['memoryBytes'][f"{s}x"] for r in rows) for s in scales},
+        'diskBytes': {f"{s}x": sum(r['diskBytes'][f"{s}x"] for r in rows) for s in scales},
+    }
+    return sorted(collections.values(), key=lambda c: -c['memoryBytes'][f"{scales[0]}x"]), totals
+
+
+def print_report(rows, collections, totals, scales, plan_ram_bytes, top):
+    labels = [f"{s}x" for s in scales]
+    print("💾 索引占用估算（内存 / 磁盘）")
+    header = ''.join(f"{label:>22}" for label in labels)
+    print(f"  {'集合':<32}{header}")
+    for summary in collections[:top]:
+        cells = ''.join(
+            f"{format_bytes(summary['memoryBytes'][l]) + ' / ' + format_bytes(summary['diskBytes'][l]):>22}" for l in labels
+        )
+        print(f"  {summary['collection']:<32}{cells}")
+    cells = ''.join(f"{format_bytes(totals['memoryBytes'][l]) + ' / ' + format_bytes(totals['diskBytes'][l]):>22}" for l in labels)
+    print(f"  {'合计':<32}{cells}")
+
+    multikey = [r for r in rows if r['multikey']]
+    if multikey:
+        print("\n📚 多键（数组）索引:")
+        for r in sorted(multikey, key=lambda r: -r['memoryBytes'][labels[0]]):
+            print(f"  - {r['collection']}.{r['index']}  每文档 {r['entriesPerDocument']} 个条目，"
+                  f"条目 {r['entryBytes']}B，{labels[0]} 内存 {format_bytes(r['memoryBytes'][labels[0]])}")
+
+    print("\n🔝 占用最大的索引:")
+    for r in sorted(rows, key=lambda r: -r['memoryBytes'][labels[0]])[:top]:
+        print(f"  - {r['collection']}.{r['index']} ({r['keys']})  {format_bytes(r['memoryBytes'][labels[0]])}"
+              f"  [{r['source']}]")
+
+    if plan_ram_bytes:
+        print(f"\n🧮 套餐内存 {format_bytes(plan_ram_bytes)}:")
+        for label in labels:
+            used = totals['memoryBytes'][label]
+            flag = '✅' if used <= plan_ram_bytes else '❌ 索引无法全部常驻内存'
+            print(f"  - {label}: 索引 {format_bytes(used)}，占 {100.0 * used / plan_ram_bytes:.0f}%  {flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='估算声明索引的内存与磁盘占用')
+    parser.add_argument('--stats', help='集合统计信息配置（JSON，含文档数与字段大小）')
+    parser.add_argument('--samples', action='append', default=[], metavar='COLLECTION=PATH',
+                        help='样本文档 JSONL，可重复指定')
+    parser.add_argument('--sample-size', type=int, default=10000, help='每个样本文件最多读取的文档数')
+    parser.add_argument('--scales', default=','.join(str(s) for s in DEFAULT_SCALES), help='数据量倍数，逗号分隔')
+    parser.add_argument('--plan-ram-gb', type=float, help='数据库套餐内存（GB），用于判断索引能否常驻内存')
+    parser.add_argument('--collection', help='只估算指定集合')
+    parser.add_argument('--top', type=int, default=15, help='列表显示条数')
+    parser.add_argument('--json', dest='json_output', help='把完整报告写入 JSON 文件')
+    args = parser.parse_args()
+
+    try:
+        scales = tuple(int(s) for s in args.scales.split(','))
+    except ValueError:
+        print(f"❌ 无效的倍数: {args.scales}")
+        sys.exit(1)
+
+    specs = load_indexes(args.collection)
+    stats = load_collection_stats(args.stats)
+    profile = SampleProfile()
+    load_samples(profile, indexes_by_collection(specs), args.samples, args.sample_size)
+
+    rows = estimate(specs, stats, profile, scales)
+    collections, totals = summarize(rows, scales)
+    plan_ram_bytes = int(args.plan_ram_gb * 1024 ** 3) if args.plan_ram_gb else None
+    print_report(rows, collections, totals, scales, plan_ram_bytes, args.top)
+
+    if args.json_output:
+        with open(args.json_output, 'w', encoding='utf-8') as f:
+            json.dump({'indexes': rows, 'collections': collections, 'totals': totals}, f, ensure_ascii=False, indent=2)
+        print(f"\n📁 报告已保存至: {args.json_output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -3,11 +3,23 @@
 """
 食谱数据扩展脚本
 从18道扩展到50道（新增32道）
+按 recipeId 合并进 recipe-data.json，重复执行不会产生重复食谱
+
+用法:
+    python scripts/expand-recipes.py
+    python scripts/expand-recipes.py --output /tmp/recipe-data.json --stream
+    python scripts/expand-recipes.py --output /tmp/recipe-data.json.gz --compact   # 紧凑格式 / gzip 压缩
 """
 
-import json
+import argparse
 import os
 
+from json_stream import PRETTY_INDENT, iter_array
+from schema_validator import validate_or_exit
+from seed_merge import merge_file
+
+RECIPE_DATA_FILE = os.path.join(os.path.dirname(__file__), '../cloudfunctions/recipe-data-import/recipe-data.json')
+
 # 新增的32道食谱数据
 new_recipes = [
     # 中式经典素食 +7道 (004-010)
@@ -1261,39 +1273,46 @@ new_recipes = [
 ]
 
 def main():
-    # 读取原始数据
-    current_file = os.path.join(os.path.dirname(__file__), '../cloudfunctions/recipe-data-import/recipe-data.json')
-    
-    with open(current_file, 'r', encoding='utf-8') as f:
-        original_recipes = json.load(f)
-    
-    print(f"原始食谱数量: {len(original_recipes)}")
+    parser = argparse.ArgumentParser(description='把新增食谱按 recipeId 合并进 recipe-data.json（可重复执行）')
+    parser.add_argument('--output', default=RECIPE_DATA_FILE, help='要合并的食谱数据文件')
+    parser.add_argument('--stream', action='store_true', default=None, help='强制使用流式合并（默认按文件大小自动选择）')
+    parser.add_argument('--compact', action='store_true', help='以无空白的紧凑格式写出（默认缩进 2 格）')
+    args = parser.parse_args()
+
     print(f"新增食谱数量: {len(new_recipes)}")
-    
-    # 合并数据
-    all_recipes = original_recipes + new_recipes
-    
-    print(f"合并后总数: {len(all_recipes)}")
-    
+
+    # 写文件前校验，有错误时中止
+    validate_or_exit('recipes', new_recipes)
+
+    # 按 recipeId 合并：新增追加、内容变化的替换、未变化的跳过
+    stats = merge_file(args.output, new_recipes, 'recipeId', stream=args.stream,
+                       indent=None if args.compact else PRETTY_INDENT)
+
+    print(f"\n合并结果{'（流式）' if stats.streamed else ''}:")
+    print(f"  新增: {stats.added}")
+    print(f"  更新: {stats.changed}")
+    print(f"  未变化: {stats.unchanged}")
+    if stats.duplicates_removed:
+        print(f"  清理重复: {stats.duplicates_removed}")
+    if stats.reformatted:
+        print(f"  已转换为{'紧凑' if args.compact else '缩进'}格式")
+    print(f"合并后总数: {stats.total}")
+
     # 统计各分类数量
     category_count = {}
-    for recipe in all_recipes:
+    for recipe in iter_array(args.output):
         cat = recipe['category']
         category_count[cat] = category_count.get(cat, 0) + 1
-    
+
     print("\n各分类数量:")
     for cat, count in sorted(category_count.items()):
         print(f"  {cat}: {count}道")
-    
-    # 写入新文件
-    output_file = os.path.join(os.path.dirname(__file__), '../cloudfunctions/recipe-data-import/recipe-data.json')
-    
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(all_recipes, f, ensure_ascii=False, indent=2)
-    
-    print(f"\n✅ 成功生成50道食谱数据文件!")
-    print(f"文件路径: {output_file}")
+
+    if stats.modified:
+        print("\n✅ 食谱数据文件已更新!")
+    else:
+        print("\n✅ 食谱数据已是最新，未改写文件")
+    print(f"文件路径: {args.output}")
 
 if __name__ == '__main__':
     main()
-
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+碳因子跨文件去重模块
+把多个因子文件的记录放在一起，名称和别名归一化后作为键分桶：同一地区、同一单位下共享键、且正式名称
+互为同义词的记录用并查集合并为一个簇（A 与 B、B 与 C 分别是同一因子时 A、B、C 为同一簇），
+每个簇按可配置的 来源 / 年份 / 文件 优先级选出一条代表记录，合并其余记录的名称和别名，
+输出一张合并后的因子表和冲突报告（簇内因子值差异过大、不同正式名称经别名串联到同一簇）。
+每个键只查一次字典、每条记录只做常数次合并，整体接近线性，可用于导入 10 万条以上的国家数据库
+"""
+
+import os
+import re
+from functools import lru_cache
+
+from factor_resolver import normalize_name
+from json_stream import iter_records
+
+ROOT_DIR = os.path.join(os.path.dirname(__file__), '..')
+FACTOR_DIR = os.path.join(ROOT_DIR, 'cloudfunctions/database')
+# 文件顺序即文件优先级
+FACTOR_FILES = [
+    os.path.join(FACTOR_DIR, name) for name in (
+        'all-reliable-factors.json',
+        'additional-reliable-factors.json',
+        'cpcd-factors.json',
+        'climate-restaurant-factors.json',
+        'comprehensive-factors-initial.json',
+    )
+]
+MERGED_FACTORS_FILE = os.path.join(FACTOR_DIR, 'merged-factors.json')
+
+# 来源优先级：国内实测数据库优先于国际默认值，估算值最后；不在列表中的来源排在列表之后
+DEFAULT_SOURCE_ORDER = ['CPCD', '国家数据库', 'CLCD', 'IPCC', 'Ecoinvent', '学术研究', '估算值', 'internal', '其他']
+# 代表记录的比较顺序：source（来源优先级）、year（新的优先）、file（文件顺序）
+DEFAULT_PRECEDENCE = ['source', 'year', 'file']
+# 簇内最大因子值 / 最小因子值 - 1 超过该比例时报告冲突
+DEFAULT_VALUE_TOLERANCE = 0.2
+
+# 名称末尾的来源标注，如 大米（CPCD）：作为键和合并后的名称时去掉
+_QUALIFIER = re.compile(r'\([^()]*\)$')
+
+
+@lru_cache(maxsize=1 << 18)
+def name_key(name):
+    """归一化名称（去掉末尾的括号标注），空名称返回空字符串"""
+    key = normalize_name(name)
+    stripped = _QUALIFIER.sub('', key)
+    return stripped or key
+
+
+def display_name(name):
+    """合并后的名称：去掉末尾的括号标注（全角或半角）"""
+    stripped = re.sub(r'\s*[(（][^()（）]*[)）]$', '', (name or '').strip())
+    return stripped or (name or '').strip()
+
+
+class UnionFind:
+    """并查集：按大小合并 + 路径减半，单次操作均摊接近常数"""
+
+    def __init__(self, count):
+        self.parent = list(range(count))
+        self.size = [1] * count
+
+    def find(self, x):
+        parent = self.parent
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def union(self, a, b):
+        a, b = self.find(a), self.find(b)
+        if a == b:
+            return a
+        if self.size[a] < self.size[b]:
+            a, b = b, a
+        self.parent[b] = a
+        self.size[a] += self.size[b]
+        return a
+
+    def groups(self):
+        """{根: [成员...]}，成员按编号升序"""
+        out = {}
+        for x in range(len(self.parent)):
+            out.setdefault(self.find(x), []).append(x)
+        return out
+
+
+def _block(record):
+    """只有地区和单位都相同的记录才可能是同一个因子"""
+    return record.get('region') or '', record.get('unit') or ''
+
+
+def record_keys(record, ignore_keys=()):
+    keys = {name_key(record.get('name'))}
+    keys.update(name_key(alias) for alias in record.get('alias') or [])
+    keys.discard('')
+    return keys - set(ignore_keys) if ignore_keys else keys
+
+
+class FactorDeduplicator:
+    """
+    用法:
+        dedup = FactorDeduplicator.from_files()
+        merged, report = dedup.merge()
+    records 为 [(文件序号, 记录)]；ignore_keys 为不参与串联的过于宽泛的名称 / 别名（归一化后）
+    """
+
+    def __init__(self, records, files=None, source_order=None, precedence=None,
+                 value_tolerance=DEFAULT_VALUE_TOLERANCE, ignore_keys=()):
+        self.files = files or []
+        self.records = [record for _, record in records]
+        self.file_idx = [file_idx for file_idx, _ in records]
+        self.source_rank = {source: rank for rank, source in enumerate(source_order or DEFAULT_SOURCE_ORDER)}
+        self.precedence = precedence or DEFAULT_PRECEDENCE
+        for field in self.precedence:
+            if field not in ('source', 'year', 'file'):
+                raise ValueError(f"未知的优先级字段: {field}（可选 source, year, file）")
+        self.value_tolerance = value_tolerance
+        self.ignore_keys = {normalize_name(key) for key in ignore_keys}
+
+    @classmethod
+    def from_files(cls, paths=None, **options):
+        paths = paths or [path for path in FACTOR_FILES if os.path.exists(path)]
+        records = [(file_idx, record) for file_idx, path in enumerate(paths) for record in iter_records(path)]
+        return cls(records, files=paths, **options)
+
+    def _rank(self, i):
+        record = self.records[i]
+        ranks = {
+            'source': self.source_rank.get(record.get('source'), len(self.source_rank)),
+            'year': -(record.get('year') or 0),
+            'file': self.file_idx[i],
+        }
+        return tuple(ranks[field] for field in self.precedence) + (i,)
+
+    def clusters(self):
+        """
+        返回 (簇列表, 歧义键, 跳过的记录序号)：簇为按优先级排好序的记录序号列表，代表记录在首位；
+        非 active 状态（缺省视为 active）或缺少因子值的记录不参与合并。
+        同一地区与单位下正式名称相同的记录总是合并；正式名称不同的两组记录只有在互为同义词时才合并：
+        A 组（以 A 为正式名称的全部记录）的名称或别名中有 B，且 B 组的名称或别名中有 A。
+        判断按名称分组而不是按已合并的簇进行，结果与记录顺序无关；
+        仅因共享某个宽泛别名（如 千张 与 腐竹 都写了别名 豆腐皮），或一方是另一方的上位类别
+        （如 坚果 的别名里有 杏仁）而相连的不合并，这些键记为歧义键 [(地区与单位, 键, [各簇的一条记录])]
+        """
+        uf = UnionFind(len(self.records))
+        # (地区, 单位, 正式名称) → 以该名称为正式名称的第一条记录 / 这些记录的全部键；
+        # 只按本记录的键查这两张表，宽泛别名被成千上万条记录共用也不会逐个比较
+        by_name, name_keys = {}, {}
+        record_key_sets = {}
+        skipped = []
+        for i, record in enumerate(self.records):
+            if record.get('status', 'active') != 'active' or record.get('factorValue') is None:
+                skipped.append(i)
+                continue
+            block = _block(record)
+            own_name = name_key(record.get('name'))
+            record_key_sets[i] = record_keys(record, self.ignore_keys)
+            own_keys = record_key_sets[i] | {own_name}
+            uf.union(by_name.setdefault((block, own_name), i), i)
+            name_keys.setdefault((block, own_name), set()).update(own_keys)
+            # 互为同义词的条件只会因为本记录新增的键而成立，所以只检查本记录的键
+            for key in sorted(own_keys - {own_name}):
+                owner = by_name.get((block, key))
+                if owner is not None and own_name in name_keys[(block, key)]:
+                    uf.union(owner, i)
+        skip = set(skipped)
+        groups = [members for root, members in uf.groups().items() if root not in skip]
+        clusters = [sorted(members, key=self._rank) for members in groups]
+        clusters.sort(key=lambda members: members[0])
+
+        # 合并后仍被多个簇持有的键：同一别名指向多个因子（仅共享宽泛别名、或上位类别与具体因子）
+        holders = {}
+        for i, own_keys in record_key_sets.items():
+            block = _block(self.records[i])
+            for key in own_keys:
+                holders.setdefault((block, key), {}).setdefault(uf.find(i), i)
+        conflicts = [(block, key, sorted(roots.values())) for (block, key), roots in holders.items() if len(roots) > 1]
+        return clusters, conflicts, skipped
+
+    def merged_record(self, members):
+        """代表记录的全部字段，名称去掉括号标注，别名为簇内其他名称和别名的并集（按归一化结果去重）"""
+        head = dict(self.records[members[0]])
+        head['name'] = display_name(head.get('name'))
+        seen = {name_key(head['name'])}
+        aliases = []
+        for i in members:
+            record = self.records[i]
+            for alias in [record.get('name')] + list(record.get('alias') or []):
+                alias = display_name(alias)
+                key = normalize_name(alias)
+                if key and key not in seen:
+                    seen.add(key)
+                    aliases.append(alias)
+        head['alias'] = aliases
+        return head
+
+    def _describe(self, i):
+        record = self.records[i]
+        return {
+            'file': os.path.basename(self.files[self.file_idx[i]]) if self.files else self.file_idx[i],
+            'name': record.get('name'),
+            'source': record.get('source'),
+            'year': record.get('year'),
+            'factorValue': record.get('factorValue'),
+        }
+
+    def merge(self):
+        """返回 (合并后的因子列表, 报告)"""
+        clusters, conflicts, skipped = self.clusters()
+        merged = []
+        report = {
+            'input': len(self.records),
+            'output': len(clusters),
+            'skipped': len(skipped),
+            'merged': 0,
+            'valueConflicts': [],
+            'nameConflicts': [],
+            'clusters': [],
+        }
+        for members in clusters:
+            record = self.merged_record(members)
+            merged.append(record)
+            if len(members) == 1:
+                continue
+            report['merged'] += len(members) - 1
+            values = [float(self.records[i]['factorValue']) for i in members]
+            entry = {
+                'name': record['name'],
+                'region': record.get('region'),
+                'unit': record.get('unit'),
+                'chosen': self._describe(members[0]),
+                'members': [self._describe(i) for i in members],
+            }
+            report['clusters'].append(entry)
+            low, high = min(values), max(values)
+            spread = (high / low - 1) if low > 0 else (0.0 if high == low else float('inf'))
+            if spread > self.value_tolerance:
+                report['valueConflicts'].append(dict(entry, spread=round(spread, 4)))
+        # 记录序号 → 所在簇的序号，用于报告歧义别名分别指向哪些合并后的因子
+        cluster_of = {i: n for n, members in enumerate(clusters) for i in members}
+        for (region, unit), key, owners in conflicts:
+            report['nameConflicts'].append({
+                'key': key,
+                'region': region,
+                'unit': unit,
+                'factors': [merged[cluster_of[i]]['name'] for i in owners],
+                'members': [self._describe(i) for i in owners],
+            })
+        return merged, report
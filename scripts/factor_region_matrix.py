@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+因子 × 地区矩阵模块
+restaurant-menu-carbon 的 matchEnergyFactor / matchMaterialFactor / matchTransportFactor 每次先查精确地区、
+查不到再查 national_average，一次匹配要发多次数据库查询。这里在构建阶段把回退提前算好：
+行为因子（类别 + 名称 + 单位），列为地区，每格为回退后的因子值，并记录命中层级（exact_region / national_fallback）
+和胜出的来源；名称、别名（能源还有 subCategory）到行号的索引一并写出，查询任一因子任一地区只需一次数组下标。
+地区列表与旧地区代码映射读取 database/migrate-factor-regions.js，区域电网因子读取 carbon-baseline-init/index.js。
+重新构建时按行比较内容哈希，只重算因子记录有变化的行
+"""
+
+import base64
+import json
+import os
+import re
+
+import numpy as np
+
+from factor_dedup import MERGED_FACTORS_FILE, name_key
+from factor_resolver import normalize_name
+from json_stream import atomic_write_json, iter_records
+from seed_merge import content_hash
+
+ROOT_DIR = os.path.join(os.path.dirname(__file__), '..')
+REGION_MIGRATION_JS = os.path.join(ROOT_DIR, 'cloudfunctions/database/migrate-factor-regions.js')
+BASELINE_INIT_JS = os.path.join(ROOT_DIR, 'cloudfunctions/carbon-baseline-init/index.js')
+REGION_MATRIX_FILE = os.path.join(ROOT_DIR, 'cloudfunctions/restaurant-menu-carbon/factor-region-matrix.json')
+
+NATIONAL_AVERAGE = 'national_average'
+# 与 matchXxxFactor 返回的 matchLevel 一致；missing 表示该地区和全国平均都没有因子
+LEVELS = ['missing', 'exact_region', 'national_fallback']
+MISSING, EXACT_REGION, NATIONAL_FALLBACK = range(len(LEVELS))
+GRID_FACTOR_SOURCE = '区域电网因子'
+
+
+def _js_object(source, name):
+    """读取 JS 中 const NAME = { 'key': 'value' / 数字, ... } 形式的对象字面量"""
+    block = re.search(r'\b' + re.escape(name) + r'\s*=\s*\{(.*?)\}', source, re.S)
+    if block is None:
+        return {}
+    body = re.sub(r'//[^\n]*', '', block.group(1))
+    pairs = re.findall(r"'?([\w-]+)'?\s*:\s*(?:'([^']*)'|([\d.]+))", body)
+    return {key: text if text else float(number) for key, text, number in pairs}
+
+
+def load_region_config(migration_path=REGION_MIGRATION_JS, baseline_path=BASELINE_INIT_JS):
+    """
+    返回 (地区列表, 旧地区代码映射, 区域电网因子)
+    地区为 REVERSE_MAPPING 与 regionFactors 中出现的新格式地区代码，national_average 在首位
+    """
+    mapping, regions = {}, [NATIONAL_AVERAGE]
+    if os.path.exists(migration_path):
+        with open(migration_path, 'r', encoding='utf-8') as f:
+            source = f.read()
+        mapping = _js_object(source, 'REGION_MAPPING')
+        regions += list(_js_object(source, 'REVERSE_MAPPING'))
+    grid = {}
+    if os.path.exists(baseline_path):
+        with open(baseline_path, 'r', encoding='utf-8') as f:
+            grid = _js_object(f.read(), 'regionFactors')
+        regions += list(grid)
+    return list(dict.fromkeys(regions)), mapping, grid
+
+
+def grid_factor_records(grid, year=None):
+    """区域电网因子转为 电力 因子记录（每个地区一条）"""
+    return [{
+        'name': '电力',
+        'category': 'energy',
+        'subCategory': 'electricity',
+        'factorValue': value,
+        'unit': 'kgCO2e/kWh',
+        'region': region,
+        'source': GRID_FACTOR_SOURCE,
+        'year': year,
+        'status': 'active',
+    } for region, value in grid.items()]
+
+
+def _row_key(record):
+    return record.get('category') or '', name_key(record.get('name')), record.get('unit') or ''
+
+
+def encode_array(array, dtype):
+    """数组 → 指定字节序类型的 base64 文本（按行优先排列）"""
+    return base64.b64encode(np.ascontiguousarray(array, dtype=dtype).tobytes()).decode('ascii')
+
+
+def decode_array(text, dtype, native, shape):
+    """encode_array() 的逆操作"""
+    return np.frombuffer(base64.b64decode(text), dtype=dtype).astype(native).reshape(shape)
+
+
+def _renumber_sources(winners, sources):
+    """
+    来源表只保留 winners 引用到的来源，按行优先首次出现的顺序编号（与全量构建时登记的顺序相同）：
+    增量构建复用旧行时登记了旧矩阵的全部来源，不再被引用的来源在这里去掉，增量与全量构建的结果逐字节相同
+    """
+    flat = winners.ravel()
+    used, first = np.unique(flat[flat >= 0], return_index=True)
+    order = used[np.argsort(first)]
+    code = np.full(len(sources) + 1, -1, dtype=np.int32)
+    code[order] = np.arange(len(order), dtype=np.int32)
+    return code[winners], [sources[old] for old in order]
+
+
+class RegionFactorMatrix:
+    """
+    用法:
+        matrix = RegionFactorMatrix.build(records, regions)
+        matrix.lookup('电力', 'east_china')      # {'factorValue', 'matchLevel', 'source', 'year', 'region', ...}
+        matrix.save(path); RegionFactorMatrix.load(path)
+    values / levels / winners 为 (行数, 地区数) 的数组；winners 为 sources 表中的下标（-1 表示没有因子）
+    """
+
+    def __init__(self, regions, rows, values, levels, winners, sources):
+        self.regions = list(regions)
+        self.region_idx = {region: col for col, region in enumerate(self.regions)}
+        self.rows = rows
+        self.values = values
+        self.levels = levels
+        self.winners = winners
+        self.sources = sources
+        self.index = self._build_index(rows)
+
+    @staticmethod
+    def _build_index(rows):
+        """{类别: {归一化名称: 行号}}；名称优先于别名，能源因子的 subCategory 也可作为名称（对应 matchEnergyFactor）"""
+        index = {}
+        for row, info in enumerate(rows):
+            index.setdefault(info['category'], {}).setdefault(name_key(info['name']), row)
+        for row, info in enumerate(rows):
+            names = index[info['category']]
+            for alias in info.get('alias') or []:
+                names.setdefault(normalize_name(alias), row)
+            if info['category'] == 'energy' and info.get('subCategory'):
+                names.setdefault(normalize_name(info['subCategory']), row)
+        return index
+
+    @classmethod
+    def build(cls, records, regions, region_mapping=None, previous=None):
+        """
+        records 为因子记录（同一因子在不同地区各一条）；region_mapping 把旧地区代码映射为新格式。
+        previous 为上一次构建的矩阵：地区列表相同且行内容哈希相同的行直接复用，只重算有变化的行。
+        返回 (矩阵, {'rows', 'reused', 'rebuilt'})
+        """
+        region_mapping = region_mapping or {}
+        regions = list(regions)
+        if NATIONAL_AVERAGE not in regions:
+            regions.insert(0, NATIONAL_AVERAGE)
+        col_of = {region: col for col, region in enumerate(regions)}
+
+        groups = {}
+        for record in records:
+            if record.get('status', 'active') != 'active' or record.get('factorValue') is None:
+                continue
+            groups.setdefault(_row_key(record), []).append(record)
+        keys = sorted(groups)
+
+        reusable = previous is not None and previous.regions == regions
+        old_rows = {(info['category'], name_key(info['name']), info['unit']): row
+                    for row, info in enumerate(previous.rows)} if reusable else {}
+
+        values = np.full((len(keys), len(regions)), np.nan, dtype=np.float64)
+        levels = np.zeros((len(keys), len(regions)), dtype=np.uint8)
+        winners = np.full((len(keys), len(regions)), -1, dtype=np.int32)
+        sources, source_idx = [], {}
+
+        def source_code(source):
+            code = source_idx.get(source)
+            if code is None:
+                code = source_idx[source] = len(sources)
+                sources.append(list(source))
+            return code
+
+        rows = []
+        reused = 0
+        remap = None
+        for row, key in enumerate(keys):
+            members = groups[key]
+            digest = content_hash(sorted(members, key=content_hash))
+            by_region = {}
+            for record in members:
+                region = region_mapping.get(record.get('region'), record.get('region')) or NATIONAL_AVERAGE
+                # 同一地区有多条时保留先出现的（输入为去重后的因子表时，先出现的即优先级高的）
+                by_region.setdefault(region, record)
+            head = by_region.get(NATIONAL_AVERAGE) or members[0]
+            rows.append({
+                'category': key[0],
+                'name': head.get('name'),
+                'unit': key[2],
+                'subCategory': head.get('subCategory'),
+                'alias': sorted({alias for record in members for alias in record.get('alias') or []}),
+                'hash': digest,
+            })
+
+            old = old_rows.get(key)
+            if old is not None and previous.rows[old]['hash'] == digest:
+                values[row] = previous.values[old]
+                levels[row] = previous.levels[old]
+                if remap is None:
+                    # 旧矩阵的来源下标 → 新来源表下标（末尾的 -1 对应没有因子的格）
+                    remap = np.array([source_code(tuple(s)) for s in previous.sources] + [-1], dtype=np.int32)
+                winners[row] = remap[previous.winners[old]]
+                reused += 1
+                continue
+
+            national = by_region.get(NATIONAL_AVERAGE)
+            for region, col in col_of.items():
+                record, level = by_region.get(region), EXACT_REGION
+                if record is None and national is not None:
+                    record, level = national, NATIONAL_FALLBACK
+                if record is None:
+                    continue
+                values[row, col] = float(record['factorValue'])
+                levels[row, col] = level
+                matched_region = region if level == EXACT_REGION else NATIONAL_AVERAGE
+                winners[row, col] = source_code((record.get('source'), record.get('year'), matched_region))
+
+        winners, sources = _renumber_sources(winners, sources)
+        matrix = cls(regions, rows, values, levels, winners, sources)
+        return matrix, {'rows': len(rows), 'reused': reused, 'rebuilt': len(rows) - reused}
+
+    def row_of(self, name, category=None):
+        key = normalize_name(name)
+        categories = [category] if category else list(self.index)
+        for cat in categories:
+            row = self.index.get(cat, {}).get(key)
+            if row is None:
+                row = self.index.get(cat, {}).get(name_key(name))
+            if row is not None:
+                return row
+        return None
+
+    def lookup(self, name, region=NATIONAL_AVERAGE, category=None):
+        """回退已解析的因子；不在地区列表中的地区按全国平均（命中层级为 national_fallback），找不到因子返回 None"""
+        row = self.row_of(name, category)
+        if row is None:
+            return None
+        return self.lookup_row(row, region)
+
+    def lookup_row(self, row, region=NATIONAL_AVERAGE):
+        """按行号查询（同名因子有多个单位时由调用方选行）"""
+        region = region or NATIONAL_AVERAGE
+        col = self.region_idx.get(region)
+        if col is None:
+            col = self.region_idx[NATIONAL_AVERAGE]
+        level = int(self.levels[row, col])
+        if level == MISSING:
+            return None
+        if level == EXACT_REGION and self.regions[col] != region:
+            level = NATIONAL_FALLBACK
+        source, year, matched_region = self.sources[self.winners[row, col]]
+        info = self.rows[row]
+        return {
+            'name': info['name'],
+            'category': info['category'],
+            'unit': info['unit'],
+            'factorValue': float(self.values[row, col]),
+            'matchLevel': LEVELS[level],
+            'region': matched_region,
+            'source': source,
+            'year': year,
+        }
+
+    def to_dict(self):
+        """values 为 float64、levels 为 uint8、winners 为 int32 的小端字节（base64），按行优先排列"""
+        return {
+            'version': 1,
+            'regions': self.regions,
+            'levels': LEVELS,
+            'rows': self.rows,
+            'sources': self.sources,
+            'index': self.index,
+            'shape': list(self.values.shape),
+            'valueData': encode_array(self.values, '<f8'),
+            'levelData': encode_array(self.levels, 'u1'),
+            'winnerData': encode_array(self.winners, '<i4'),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        if data.get('levels') != LEVELS:
+            raise ValueError('矩阵文件的命中层级定义与当前版本不一致，请重新生成')
+        shape = tuple(data['shape'])
+        values = decode_array(data['valueData'], '<f8', np.float64, shape)
+        levels = decode_array(data['levelData'], 'u1', np.uint8, shape)
+        winners = decode_array(data['winnerData'], '<i4', np.int32, shape)
+        return cls(data['regions'], data['rows'], values, levels, winners, data['sources'])
+
+    def save(self, path=REGION_MATRIX_FILE):
+        atomic_write_json(path, self.to_dict(), indent=None)
+
+    @classmethod
+    def load(cls, path=REGION_MATRIX_FILE):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+
+def load_factor_records(paths=None):
+    paths = paths or [MERGED_FACTORS_FILE]
+    return [record for path in paths for record in iter_records(path)]
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+食材名称 → 碳因子 解析模块
+离线版的 restaurant-menu-carbon/index.js matchFactor()：把因子库的全部名称和别名编译成一个
+Aho-Corasick 多模式自动机，一次扫描即可找出自由文本名称中包含的所有因子名称，按以下顺序匹配:
+    exact            与因子名称完全相同（忽略大小写、全角半角）
+    alias            与某个别名完全相同（含 GENERIC_ALIASES 中的通用名称，如 植物油 → 大豆油）
+    contains         输入以因子名称 / 别名结尾（如 嫩豆腐 → 豆腐），取最长的一个
+    contains_inner   因子名称 / 别名出现在输入中间（如 香菇片 → 香菇）
+    contained        输入是因子名称 / 别名的结尾部分（如 腐皮 → 豆腐皮，至少两个字），取最短的一个
+    contained_inner  输入是因子名称 / 别名的开头或中间部分
+    fuzzy            字符二元组 Dice 相似度最高的名称 / 别名
+每种匹配都给出 0~1 的置信度，低于 min_confidence 的视为未匹配；结果按名称缓存（LRU）。
+中文名词的中心词在末尾，不在末尾的部分匹配多半只是修饰语（白葡萄酒 ≠ 葡萄，橄榄 ≠ 橄榄油），
+这两种级别另有更高的最低置信度（LEVEL_MIN_CONFIDENCE）。单个字的输入（肉、油、豆、菜）是很多名称的一部分，
+不做 contained / contained_inner 匹配，常用的单字名称（蒜、米）在 GENERIC_ALIASES 中显式列出
+"""
+
+import math
+import unicodedata
+from functools import lru_cache
+
+UNRESOLVED = -1
+
+DEFAULT_CACHE_SIZE = 1 << 18
+DEFAULT_MIN_CONFIDENCE = 0.5
+
+# 各匹配级别的置信度上限
+LEVEL_WEIGHTS = {
+    'exact': 1.0,
+    'alias': 0.95,
+    'contains': 0.9,
+    'contains_inner': 0.75,
+    'contained': 0.8,
+    'contained_inner': 0.8,
+    'fuzzy': 0.7,
+}
+
+# 部分匹配级别的最低置信度（与 min_confidence 取较大者）
+LEVEL_MIN_CONFIDENCE = {
+    'contains_inner': 0.6,
+    'contained_inner': 0.7,
+}
+
+# 因子库中没有的通用名称 → 代表性因子名称（因子库中存在该名称时按别名注册）
+GENERIC_ALIASES = {
+    '植物油': '大豆油',
+    '食用油': '大豆油',
+    '色拉油': '大豆油',
+    '调和油': '大豆油',
+    '意面': '意大利面',
+    '蒜': '大蒜',
+    '米': '大米',
+}
+
+
+def normalize_name(name):
+    """统一全角半角、大小写并去掉空白"""
+    return ''.join(unicodedata.normalize('NFKC', name or '').lower().split())
+
+
+def _bigrams(text):
+    padded = '^' + text + '$'
+    return {padded[i:i + 2] for i in range(len(padded) - 1)}
+
+
+class _Automaton:
+    """Aho-Corasick 自动机：goto 为每个节点的转移字典，out 为在该节点结束的模式编号（已沿失败链合并）"""
+
+    def __init__(self, patterns):
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [[]]
+        for pid, pattern in enumerate(patterns):
+            node = 0
+            for char in pattern:
+                nxt = self.goto[node].get(char)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[node][char] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append([])
+                node = nxt
+            self.out[node].append(pid)
+
+        # 按层构建失败链
+        queue = list(self.goto[0].values())
+        head = 0
+        while head < len(queue):
+            node = queue[head]
+            head += 1
+            for char, nxt in self.goto[node].items():
+                queue.append(nxt)
+                state = self.fail[node]
+                while state and char not in self.goto[state]:
+                    state = self.fail[state]
+                target = self.goto[state].get(char, 0)
+                self.fail[nxt] = target if target != nxt else 0
+                if self.out[self.fail[nxt]]:
+                    self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def search(self, text):
+        """产出 (结束位置, 模式编号)"""
+        goto, fail, out = self.goto, self.fail, self.out
+        node = 0
+        for pos, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for pid in out[node]:
+                yield pos + 1, pid
+
+
+class NameResolver:
+    """
+    entries: [(因子列号, 名称, [别名...])]；同一个模式对应多个因子时，名称优先于别名，先出现的优先
+    用法:
+        resolver = NameResolver.from_table(FactorTable.from_files())
+        resolver.resolve('嫩豆腐')   # {'column': ..., 'matched': '豆腐', 'level': 'contains', 'confidence': ...}
+        resolver.lookup('嫩豆腐')    # 因子列号，未匹配为 -1（可直接作为 RecipeMatrix 的 resolver）
+    """
+
+    def __init__(self, entries, min_confidence=DEFAULT_MIN_CONFIDENCE, cache_size=DEFAULT_CACHE_SIZE):
+        self.min_confidence = min_confidence
+        self.names = {}
+        self.patterns, self.columns, self.is_name = [], [], []
+        pattern_ids = {}
+
+        def register(text, column, is_name):
+            key = normalize_name(text)
+            if key and key not in pattern_ids:
+                pattern_ids[key] = len(self.patterns)
+                self.patterns.append(key)
+                self.columns.append(column)
+                self.is_name.append(is_name)
+
+        for column, name, _ in entries:
+            self.names.setdefault(column, name)
+            register(name, column, True)
+        for column, _, aliases in entries:
+            for alias in aliases or []:
+                register(alias, column, False)
+        columns_by_name = {}
+        for column, name, _ in entries:
+            columns_by_name.setdefault(normalize_name(name), column)
+        for alias, target in GENERIC_ALIASES.items():
+            column = columns_by_name.get(normalize_name(target))
+            if column is not None:
+                register(alias, column, False)
+
+        self._exact = pattern_ids
+        self._automaton = _Automaton(self.patterns)
+
+        # 模式的结尾部分 / 其他子串（至少两个字）→ 包含它的最短模式，用于 contained / contained_inner 匹配；
+        # 等长时名称优先、再按模式文本排序，结果与因子的登记顺序无关
+        self._suffixes, self._substrings = {}, {}
+        for pid, pattern in enumerate(self.patterns):
+            key = (len(pattern), not self.is_name[pid], pattern)
+            for start in range(len(pattern)):
+                for end in range(start + 2, len(pattern) + 1):
+                    table = self._suffixes if end == len(pattern) else self._substrings
+                    sub = pattern[start:end]
+                    best = table.get(sub)
+                    if best is None or (len(self.patterns[best]), not self.is_name[best], self.patterns[best]) > key:
+                        table[sub] = pid
+
+        # 二元组倒排表，用于 fuzzy 匹配的候选筛选
+        self._bigram_sets = [_bigrams(p) for p in self.patterns]
+        self._bigram_index = {}
+        for pid, grams in enumerate(self._bigram_sets):
+            for gram in grams:
+                self._bigram_index.setdefault(gram, []).append(pid)
+
+        self.resolve = lru_cache(maxsize=cache_size)(self._resolve)
+
+    @classmethod
+    def from_table(cls, table, **kwargs):
+        """由 recipe_carbon.FactorTable 构建，列号与 FactorTable.values 对应"""
+        entries = [(col, name, table.aliases[col]) for col, name in enumerate(table.names)]
+        return cls(entries, **kwargs)
+
+    @classmethod
+    def from_factors(cls, factors, **kwargs):
+        """由因子记录列表构建，列号为记录在列表中的序号"""
+        entries = [(i, f.get('name', ''), f.get('alias') or []) for i, f in enumerate(factors)]
+        return cls(entries, **kwargs)
+
+    def _result(self, pid, level, confidence):
+        if confidence < max(self.min_confidence, LEVEL_MIN_CONFIDENCE.get(level, 0.0)):
+            return None
+        column = self.columns[pid]
+        return {
+            'column': column,
+            'name': self.names[column],
+            'matched': self.patterns[pid],
+            'level': level,
+            'confidence': round(confidence, 4),
+        }
+
+    def _resolve(self, name):
+        """返回匹配结果字典，未匹配返回 None（结果会被缓存共享，调用方不要修改）"""
+        text = normalize_name(name)
+        if not text:
+            return None
+
+        pid = self._exact.get(text)
+        if pid is not None:
+            return self._result(pid, 'exact' if self.is_name[pid] else 'alias',
+                                LEVEL_WEIGHTS['exact' if self.is_name[pid] else 'alias'])
+
+        best = self._best_contained_pattern(text)
+        if best is not None:
+            pid, suffix = best
+            level = 'contains' if suffix else 'contains_inner'
+            match = self._result(pid, level,
+                                 LEVEL_WEIGHTS[level] * math.sqrt(len(self.patterns[pid]) / len(text)))
+            if match is not None:
+                return match
+
+        for level, table in (('contained', self._suffixes), ('contained_inner', self._substrings)):
+            pid = table.get(text)
+            if pid is not None:
+                match = self._result(pid, level,
+                                     LEVEL_WEIGHTS[level] * math.sqrt(len(text) / len(self.patterns[pid])))
+                if match is not None:
+                    return match
+
+        pid, score = self._best_fuzzy(text)
+        if pid is not None:
+            return self._result(pid, 'fuzzy', LEVEL_WEIGHTS['fuzzy'] * score)
+        return None
+
+    def _best_contained_pattern(self, text):
+        """输入中出现的最长模式；等长时位于词尾的优先（中文名词的中心词通常在末尾），再按名称优先"""
+        best, best_key = None, None
+        for end, pid in self._automaton.search(text):
+            suffix = end == len(text)
+            key = (len(self.patterns[pid]), suffix, self.is_name[pid])
+            if best_key is None or key > best_key:
+                best, best_key = (pid, suffix), key
+        return best
+
+    def _best_fuzzy(self, text):
+        grams = _bigrams(text)
+        overlap = {}
+        for gram in grams:
+            for pid in self._bigram_index.get(gram, ()):
+                overlap[pid] = overlap.get(pid, 0) + 1
+        best, best_score = None, 0.0
+        for pid, shared in overlap.items():
+            score = 2.0 * shared / (len(grams) + len(self._bigram_sets[pid]))
+            if score > best_score:
+                best, best_score = pid, score
+        return best, best_score
+
+    def lookup(self, name):
+        match = self.resolve(name)
+        return match['column'] if match else UNRESOLVED
+
+    def resolve_many(self, names):
+        """批量解析（重复名称命中缓存）"""
+        resolve = self.resolve
+        return [resolve(name) for name in names]
+
+    def cache_info(self):
+        return self.resolve.cache_info()
@@ -393,19 +393,22 @@ indexes.extend([
     ('tenant_applications', 'organizationName_index', 'organizationName', '1', '否', '中', '组织名称索引', '按组织名称搜索'),
 ])
 
-# 写入CSV文件
-output_file = 'Docs/索引配置表.csv'
-with open(output_file, 'w', encoding='utf-8-sig', newline='') as f:
-    writer = csv.writer(f)
-    writer.writerow(['集合名称', '索引名称', '索引字段', '字段排序', '唯一索引', '优先级', '说明', '用途'])
-    
-    for idx in indexes:
-        writer.writerow(idx)
-
-print(f"✅ 索引配置表生成完成！")
-print(f"📊 统计信息：")
-print(f"   - 总索引数: {len(indexes)}")
-print(f"   - 集合数: {len(set(idx[0] for idx in indexes))}")
-print(f"   - 唯一索引数: {sum(1 for idx in indexes if idx[4] == '是')}")
-print(f"\n📁 文件已保存至: {output_file}")
+def main():
+    # 写入CSV文件
+    output_file = 'Docs/索引配置表.csv'
+    with open(output_file, 'w', encoding='utf-8-sig', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['集合名称', '索引名称', '索引字段', '字段排序', '唯一索引', '优先级', '说明', '用途'])
+        
+        for idx in indexes:
+            writer.writerow(idx)
+    
+    print(f"✅ 索引配置表生成完成！")
+    print(f"📊 统计信息：")
+    print(f"   - 总索引数: {len(indexes)}")
+    print(f"   - 集合数: {len(set(idx[0] for idx in indexes))}")
+    print(f"   - 唯一索引数: {sum(1 for idx in indexes if idx[4] == '是')}")
+    print(f"\n📁 文件已保存至: {output_file}")
 
+if __name__ == '__main__':
+    main()
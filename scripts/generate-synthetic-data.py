@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+压测数据生成脚本
+按索引目录中的集合流式生成 JSONL 数据，支持固定种子复现、热点租户/重度用户的偏斜分布，
+并按分片在进程池中并行生成
+
+用法:
+    python scripts/generate-synthetic-data.py --count 1000000 --out /tmp/synthetic
+    python scripts/generate-synthetic-data.py meals=5000000 daily_stats=2000000 --workers 8 --seed 7
+    python scripts/generate-synthetic-data.py --all --count 10000
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from synthetic_data import DEFAULT_DAYS, DEFAULT_SKEW, catalogue_collections, generate_documents
+
+HOT_COLLECTIONS = [
+    'users', 'meals', 'daily_stats', 'restaurant_orders', 'carbon_transactions',
+    'user_messages', 'audit_logs', 'behavior_records', 'restaurants', 'restaurant_menu_items',
+]
+DEFAULT_SHARD_SIZE = 100000
+
+
+def write_shard(task):
+    """进程池任务：生成一个分片并写入分片文件，返回写入条数"""
+    collection, start, stop, path, seed, shard_size, options = task
+    written = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        for doc in generate_documents(collection, start, stop, seed, shard_size, **options):
+            f.write(json.dumps(doc, ensure_ascii=False, separators=(',', ':')))
+            f.write('\n')
+            written += 1
+    return written
+
+
+def plan_tasks(collection, count, out_dir, seed, shard_size, options):
+    tasks = []
+    for shard, start in enumerate(range(0, count, shard_size)):
+        stop = min(start + shard_size, count)
+        path = os.path.join(out_dir, f"{collection}.part-{shard:05d}.jsonl")
+        tasks.append((collection, start, stop, path, seed, shard_size, options))
+    return tasks
+
+
+def merge_parts(tasks, output_file):
+    """按分片顺序拼接分片文件，流式复制"""
+    with open(output_file, 'wb') as out:
+        for task in tasks:
+            with open(task[3], 'rb') as part:
+                shutil.copyfileobj(part, out, 1024 * 1024)
+            os.remove(task[3])
+
+
+def parse_targets(args):
+    targets = {}
+    for item in args.targets:
+        if '=' in item:
+            name, count = item.split('=', 1)
+            targets[name] = int(count)
+        else:
+            targets[item] = args.count
+    if args.all:
+        for name in catalogue_collections():
+            targets.setdefault(name, args.count)
+    if not targets:
+        targets = {name: args.count for name in HOT_COLLECTIONS}
+    return targets
+
+
+def main():
+    parser = argparse.ArgumentParser(description='流式生成压测数据（JSONL）')
+    parser.add_argument('targets', nargs='*', help='集合名或 集合名=条数')
+    parser.add_argument('--all', action='store_true', help='生成索引目录中的全部集合')
+    parser.add_argument('--count', type=int, default=100000, help='未指定条数时每个集合的条数')
+    parser.add_argument('--out', default='synthetic-data', help='输出目录')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='进程数')
+    parser.add_argument('--shard-size', type=int, default=DEFAULT_SHARD_SIZE, help='每个分片的条数')
+    parser.add_argument('--users', type=int, help='用户总数')
+    parser.add_argument('--tenants', type=int, help='租户总数')
+    parser.add_argument('--restaurants', type=int, help='餐厅总数')
+    parser.add_argument('--days', type=int, default=DEFAULT_DAYS, help='数据覆盖的天数')
+    parser.add_argument('--skew', type=float, default=DEFAULT_SKEW, help='Zipf 偏斜指数')
+    args = parser.parse_args()
+
+    targets = parse_targets(args)
+    population = {k: getattr(args, k) for k in ('users', 'tenants', 'restaurants') if getattr(args, k)}
+    options = {'population': population, 'days': args.days, 'skew': args.skew}
+    os.makedirs(args.out, exist_ok=True)
+
+    print(f"🌱 生成 {len(targets)} 个集合，种子 {args.seed}，{args.workers} 个进程")
+    total_started = time.perf_counter()
+    total_rows = 0
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        for collection, count in targets.items():
+            started = time.perf_counter()
+            tasks = plan_tasks(collection, count, args.out, args.seed, args.shard_size, options)
+            try:
+                written = sum(pool.map(write_shard, tasks))
+            except ValueError as e:
+                print(f"❌ {collection}: {e}")
+                sys.exit(1)
+            output_file = os.path.join(args.out, f"{collection}.jsonl")
+            merge_parts(tasks, output_file)
+            elapsed = time.perf_counter() - started
+            total_rows += written
+            print(f"  ✓ {collection}: {written} 条，{elapsed:.1f}s（{written / max(elapsed, 1e-9):,.0f} 条/秒）→ {output_file}")
+
+    elapsed = time.perf_counter() - total_started
+    print(f"\n✅ 共生成 {total_rows} 条数据，耗时 {elapsed:.1f}s（{total_rows / max(elapsed, 1e-9):,.0f} 条/秒）")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+索引顾问
+读取查询形态日志（JSONL），为每个查询形态匹配 generate-index-config.py 中声明的最优索引，
+报告全表扫描的查询、从未被选中的索引，以及每个查询的估算代价
+
+用法:
+    python scripts/index-advisor.py scripts/query-shapes.sample.jsonl
+    python scripts/index-advisor.py queries.jsonl --stats scripts/collection-stats.sample.json --json advisor-report.json
+
+集合文档数（documents）与字段基数（cardinality）取自集合统计信息配置
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+from collections import namedtuple
+
+from index_catalog import (
+    PRIORITY_RANK, format_keys, indexes_by_collection, load_collection_stats, load_indexes, load_query_shapes
+)
+
+# 代价模型参数（单位：相对工作量）
+RANGE_SELECTIVITY = 0.3             # 范围条件的默认选择率
+KEY_COST = 0.2                      # 扫描一个索引键
+DOC_COST = 1.0                      # 读取一个文档
+SORT_COST = 0.05                    # 内存排序中每次比较
+
+# 单个索引对某个查询形态的匹配结果
+IndexMatch = namedtuple('IndexMatch', [
+    'index', 'equality_prefix', 'range_field', 'sort_covered', 'keys_examined', 'docs_examined', 'in_memory_sort', 'cost'
+])
+
+
+class CostModel:
+    """基于集合规模和字段基数的简单代价模型"""
+
+    def __init__(self, stats):
+        self.stats = stats
+        self.range_selectivity = stats.config.get('rangeSelectivity', RANGE_SELECTIVITY)
+
+    def count(self, collection):
+        return self.stats.documents(collection)
+
+    def selectivity(self, collection, field):
+        return 1.0 / max(self.stats.cardinality(collection, field), 1)
+
+    def matched(self, shape):
+        """满足全部过滤条件的估算文档数"""
+        selectivity = 1.0
+        for field in shape.equality:
+            selectivity *= self.selectivity(shape.collection, field)
+        selectivity *= self.range_selectivity ** len(shape.range)
+        return self.count(shape.collection) * selectivity
+
+    def sort_cost(self, rows):
+        return SORT_COST * rows * math.log2(max(rows, 2))
+
+
+def _sort_covered_at(keys, start, sort):
+    """判断 keys[start:] 是否按顺序覆盖排序字段（整体同向或整体反向均可）"""
+    if not sort:
+        return True
+    segment = keys[start:start + len(sort)]
+    if len(segment) < len(sort):
+        return False
+    if any(key[0] != item[0] for key, item in zip(segment, sort)):
+        return False
+    same = all(key[1] == item[1] for key, item in zip(segment, sort))
+    reverse = all(key[1] == -item[1] for key, item in zip(segment, sort))
+    return same or reverse
+
+
+def match_index(shape, spec, model):
+    """计算索引对查询形态的可用程度与代价；索引完全不可用时返回 None"""
+    keys = spec.keys
+    equality = set(shape.equality)
+
+    prefix = 0
+    while prefix < len(keys) and keys[prefix][0] in equality:
+        prefix += 1
+
+    # 等值字段已经固定取值，不影响排序
+    sort = tuple(item for item in shape.sort if item[0] not in equality)
+    # 数组字段的多键索引不能提供排序
+    sort_keys = keys[prefix:prefix + len(sort)]
+    sort_covered = bool(shape.sort) and _sort_covered_at(keys, prefix, sort) \
+        and not any(field in spec.multikey_fields for field, _ in sort_keys)
+
+    range_field = None
+    if prefix < len(keys) and keys[prefix][0] in shape.range and (not sort or sort[0][0] == keys[prefix][0]):
+        range_field = keys[prefix][0]
+
+    if prefix == 0 and range_field is None and not (sort_covered and sort):
+        return None
+
+    total = model.count(shape.collection)
+    selectivity = 1.0
+    for field, _ in keys[:prefix]:
+        selectivity *= model.selectivity(shape.collection, field)
+    if range_field:
+        selectivity *= model.range_selectivity
+    scanned = total * selectivity
+    matched = model.matched(shape)
+
+    # 唯一索引的全部字段都是等值条件时最多命中一条
+    if spec.unique and prefix == len(keys):
+        scanned = min(scanned, 1)
+
+    # 不需要内存排序且有 limit 时，找到 limit 条匹配文档即可停止
+    in_memory_sort = bool(shape.sort) and not sort_covered
+    if not in_memory_sort and shape.limit and matched > 0:
+        scanned = min(scanned, shape.limit * scanned / matched)
+
+    keys_examined = scanned
+    docs_examined = scanned
+    cost = keys_examined * KEY_COST + docs_examined * DOC_COST
+    if in_memory_sort:
+        cost += model.sort_cost(min(matched, scanned))
+
+    return IndexMatch(spec, prefix, range_field, sort_covered, keys_examined, docs_examined, in_memory_sort, cost)
+
+
+def collection_scan_cost(shape, model):
+    total = model.count(shape.collection)
+    matched = model.matched(shape)
+    docs = total
+    if not shape.sort and shape.limit and matched > 0:
+        docs = min(total, shape.limit * total / matched)
+    cost = docs * DOC_COST
+    if shape.sort:
+        cost += model.sort_cost(matched)
+    return docs, cost
+
+
+def choose_index(shape, specs, model):
+    """返回 (最优匹配或 None, 全部可用匹配)"""
+    candidates = [m for m in (match_index(shape, spec, model) for spec in specs) if m is not None]
+    if not candidates:
+        return None, []
+    candidates.sort(key=lambda m: (
+        m.cost,
+        -m.equality_prefix,
+        not m.sort_covered,
+        not m.index.unique,
+        len(m.index.keys),
+        PRIORITY_RANK.get(m.index.priority, len(PRIORITY_RANK)),
+    ))
+    return candidates[0], candidates
+
+
+def describe_shape(shape):
+    parts = []
+    if shape.equality:
+        parts.append('eq(' + ','.join(shape.equality) + ')')
+    if shape.range:
+        parts.append('range(' + ','.join(shape.range) + ')')
+    if shape.sort:
+        parts.append('sort(' + ','.join(f"{field}:{direction}" for field, direction in shape.sort) + ')')
+    if shape.limit:
+        parts.append(f"limit({shape.limit})")
+    return ' '.join(parts) or 'all'
+
+
+def advise(shapes, specs, model):
+    grouped = indexes_by_collection(specs)
+    results = []
+    chosen = set()
+
+    for shape in shapes:
+        best, candidates = choose_index(shape, grouped.get(shape.collection, []), model)
+        scan_docs, scan_cost = collection_scan_cost(shape, model)
+        notes = []
+        if best is None:
+            notes.append('无可用索引，全表扫描')
+        else:
+            chosen.add((shape.collection, best.index.name))
+            if best.in_memory_sort:
+                notes.append('排序无法使用索引，需内存排序')
+            residual = [f for f in shape.equality if f not in {k[0] for k in best.index.keys[:best.equality_prefix]}]
+            if residual:
+                notes.append('以下等值字段未走索引: ' + ','.join(residual))
+            if best.cost >= scan_cost:
+                notes.append('索引代价不低于全表扫描')
+
+        cost = best.cost if best else scan_cost
+        results.append({
+            'collection': shape.collection,
+            'shape': describe_shape(shape),
+            'label': shape.label,
+            'weight': shape.weight,
+            'plan': 'IXSCAN' if best else 'COLLSCAN',
+            'index': best.index.name if best else None,
+            'indexKeys': format_keys(best.index.keys) if best else None,
+            'keysExamined': round(best.keys_examined, 1) if best else 0,
+            'docsExamined': round(best.docs_examined if best else scan_docs, 1),
+            'inMemorySort': best.in_memory_sort if best else bool(shape.sort),
+            'estimatedCost': round(cost, 1),
+            'collectionScanCost': round(scan_cost, 1),
+            'weightedCost': round(cost * shape.weight, 1),
+            'candidates': [m.index.name for m in candidates],
+            'notes': notes,
+        })
+
+    queried = {shape.collection for shape in shapes}
+    unused = [
+        {'collection': spec.collection, 'index': spec.name, 'keys': format_keys(spec.keys),
+         'unique': spec.unique, 'priority': spec.priority}
+        for spec in specs
+        if spec.collection in queried and (spec.collection, spec.name) not in chosen
+    ]
+    unqueried = sorted({spec.collection for spec in specs} - queried)
+
+    return {
+        'summary': {
+            'shapes': len(shapes),
+            'collectionScans': sum(1 for r in results if r['plan'] == 'COLLSCAN'),
+            'inMemorySorts': sum(1 for r in results if r['plan'] == 'IXSCAN' and r['inMemorySort']),
+            'unusedIndexes': len(unused),
+            'totalWeightedCost': round(sum(r['weightedCost'] for r in results), 1),
+        },
+        'queries': results,
+        'collectionScans': [r for r in results if r['plan'] == 'COLLSCAN'],
+        'unusedIndexes': unused,
+        'collectionsWithoutQueries': unqueried,
+    }
+
+
+def print_report(report):
+    summary = report['summary']
+    print("📊 索引顾问报告")
+    print(f"   - 查询形态数: {summary['shapes']}")
+    print(f"   - 全表扫描: {summary['collectionScans']}")
+    print(f"   - 内存排序: {summary['inMemorySorts']}")
+    print(f"   - 未被选中的索引: {summary['unusedIndexes']}")
+    print(f"   - 加权总代价: {summary['totalWeightedCost']}")
+
+    print("\n🔍 查询计划（按加权代价降序）:")
+    for r in sorted(report['queries'], key=lambda r: -r['weightedCost']):
+        target = r['index'] or '—'
+        label = f" [{r['label']}]" if r['label'] else ''
+        print(f"  {r['plan']:<8} {r['collection']}.{target}  {r['shape']}{label}")
+        print(f"           代价 {r['estimatedCost']} (全表扫描 {r['collectionScanCost']}) × {r['weight']} 次")
+        for note in r['notes']:
+            print(f"           ⚠️  {note}")
+
+    if report['collectionScans']:
+        print("\n❌ 全表扫描的查询:")
+        for r in report['collectionScans']:
+            print(f"  - {r['collection']}: {r['shape']}  代价 {r['estimatedCost']}")
+
+    if report['unusedIndexes']:
+        print("\n💤 从未被选中的索引（仅统计日志中出现过的集合）:")
+        for u in report['unusedIndexes']:
+            flag = '（唯一约束，保留）' if u['unique'] else ''
+            print(f"  - {u['collection']}.{u['index']}  {u['keys']}{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='根据查询形态日志评估声明的索引')
+    parser.add_argument('queries', help='查询形态 JSONL 文件')
+    parser.add_argument('--stats', help='集合统计信息配置（JSON，含文档数与字段基数）')
+    parser.add_argument('--collection', help='只分析指定集合')
+    parser.add_argument('--json', dest='json_output', help='把完整报告写入 JSON 文件')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.queries):
+        print(f"❌ 查询形态文件不存在: {args.queries}")
+        sys.exit(1)
+
+    shapes = load_query_shapes(args.queries)
+    specs = load_indexes(args.collection)
+    if args.collection:
+        shapes = [shape for shape in shapes if shape.collection == args.collection]
+
+    report = advise(shapes, specs, CostModel(load_collection_stats(args.stats)))
+    print_report(report)
+
+    if args.json_output:
+        with open(args.json_output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n📁 报告已保存至: {args.json_output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+冗余索引分析
+找出 generate-index-config.py 中每个集合的重复索引、前缀覆盖索引和方向等价索引，
+并根据各集合的写入速率估算冗余索引带来的额外写入代价与存储占用
+
+用法:
+    python scripts/index-redundancy-report.py
+    python scripts/index-redundancy-report.py --stats scripts/collection-stats.sample.json --json redundancy.json
+
+各集合的写入速率（insertsPerSecond）、文档数与字段大小取自集合统计信息配置
+"""
+
+import argparse
+import json
+
+from index_catalog import (
+    PRIORITY_RANK, format_bytes, format_keys, indexes_by_collection, load_collection_stats, load_indexes
+)
+
+# 冗余类型
+DUPLICATE = 'duplicate'                    # 字段与方向完全相同
+DIRECTION_EQUIVALENT = 'direction-equivalent'  # 字段相同，方向整体镜像或仅末位字段方向不同
+PREFIX_COVERED = 'prefix-covered'          # 是另一个索引的前缀
+
+KIND_LABELS = {
+    DUPLICATE: '重复索引',
+    DIRECTION_EQUIVALENT: '方向等价',
+    PREFIX_COVERED: '前缀覆盖',
+}
+
+
+def _directions_match(a, b):
+    """两组方向完全一致或整体镜像"""
+    same = all(x == y for x, y in zip(a, b))
+    mirrored = all(x == -y for x, y in zip(a, b))
+    return same or mirrored
+
+
+def classify_pair(a, b):
+    """
+    判断索引 a 相对于索引 b 是否冗余，返回 (冗余类型, 说明) 或 None
+    只在 a 能被 b 完全替代时返回结果
+    """
+    fields_a = [field for field, _ in a.keys]
+    fields_b = [field for field, _ in b.keys]
+    dirs_a = [direction for _, direction in a.keys]
+    dirs_b = [direction for _, direction in b.keys]
+
+    if fields_a == fields_b:
+        if dirs_a == dirs_b:
+            return DUPLICATE, '字段和方向完全相同'
+        if _directions_match(dirs_a, dirs_b):
+            return DIRECTION_EQUIVALENT, '方向整体镜像，可反向扫描'
+        if dirs_a[:-1] == dirs_b[:-1]:
+            return DIRECTION_EQUIVALENT, '仅末位字段方向不同，前导字段等值查询时等价'
+        return None
+
+    if len(fields_a) < len(fields_b) and fields_b[:len(fields_a)] == fields_a:
+        if _directions_match(dirs_a, dirs_b[:len(dirs_a)]) or len(fields_a) == 1:
+            return PREFIX_COVERED, f"是 {b.name} 的前缀"
+    return None
+
+
+def _keeper_rank(spec, order):
+    # 保留优先级：唯一索引 > 优先级高 > 字段多 > 声明靠前
+    return (not spec.unique, PRIORITY_RANK.get(spec.priority, len(PRIORITY_RANK)), -len(spec.keys), order[spec.name])
+
+
+def find_redundant(specs):
+    """返回单个集合内的冗余发现列表"""
+    order = {spec.name: i for i, spec in enumerate(specs)}
+    findings = []
+    seen = set()
+
+    for a in specs:
+        best = None
+        for b in specs:
+            if a is b:
+                continue
+            result = classify_pair(a, b)
+            if result is None:
+                continue
+            kind, reason = result
+            # 字段相同的成对索引只报告排名靠后的一个
+            if kind != PREFIX_COVERED and _keeper_rank(a, order) < _keeper_rank(b, order):
+                continue
+            candidate = (kind, reason, b)
+            if best is None or _keeper_rank(b, order) < _keeper_rank(best[2], order):
+                best = candidate
+        if best is None or a.name in seen:
+            continue
+        kind, reason, keeper = best
+        seen.add(a.name)
+        findings.append({
+            'kind': kind,
+            'index': a,
+            'coveredBy': keeper,
+            'reason': reason,
+            # 唯一索引承担约束职责，即使被覆盖也不能直接删除
+            'droppable': not a.unique,
+        })
+    return findings
+
+
+def analyze(specs, stats):
+    report = []
+    for collection, collection_specs in indexes_by_collection(specs).items():
+        findings = find_redundant(collection_specs)
+        if not findings:
+            continue
+
+        # 每次插入写一次文档 + 每个索引各一次（含默认 _id 索引）
+        writes_per_insert = 2 + sum(stats.entries_per_document(spec) for spec in collection_specs)
+        rate = stats.inserts_per_second(collection)
+        for finding in findings:
+            spec = finding['index']
+            extra_writes = rate * stats.entries_per_document(spec)
+            report.append({
+                'collection': collection,
+                'index': spec.name,
+                'keys': format_keys(spec.keys),
+                'kind': finding['kind'],
+                'coveredBy': finding['coveredBy'].name,
+                'coveredByKeys': format_keys(finding['coveredBy'].keys),
+                'reason': finding['reason'],
+                'droppable': finding['droppable'],
+                'insertsPerSecond': rate,
+                'extraIndexWritesPerSecond': round(extra_writes, 2),
+                'writeAmplificationPercent': round(100.0 * stats.entries_per_document(spec) / writes_per_insert, 1),
+                'storageBytes': int(stats.index_bytes(spec)),
+            })
+
+    # 写入压力最大的放在前面
+    report.sort(key=lambda r: (-r['extraIndexWritesPerSecond'], -r['storageBytes'], r['collection'], r['index']))
+    return report
+
+
+def print_report(report):
+    droppable = [r for r in report if r['droppable']]
+    print("📊 冗余索引分析")
+    print(f"   - 冗余索引: {len(report)}")
+    print(f"   - 可删除: {len(droppable)}")
+    print(f"   - 可节省索引写入: {sum(r['extraIndexWritesPerSecond'] for r in droppable):.2f} 次/秒")
+    print(f"   - 可节省索引存储: {format_bytes(sum(r['storageBytes'] for r in droppable))}")
+
+    for kind in (DUPLICATE, DIRECTION_EQUIVALENT, PREFIX_COVERED):
+        rows = [r for r in report if r['kind'] == kind]
+        if not rows:
+            continue
+        print(f"\n🔁 {KIND_LABELS[kind]}（{len(rows)}）:")
+        for r in rows:
+            action = '建议删除' if r['droppable'] else '唯一约束，保留'
+            print(f"  - {r['collection']}.{r['index']} ({r['keys']}) → {r['coveredBy']} ({r['coveredByKeys']})")
+            print(f"      {r['reason']}；{action}；额外写入 {r['extraIndexWritesPerSecond']} 次/秒，"
+                  f"写放大 {r['writeAmplificationPercent']}%，存储 {format_bytes(r['storageBytes'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='检测重复、前缀覆盖和方向等价的索引')
+    # --rates 为旧参数名：原写入速率配置（defaults / fieldBytes / collections）是集合统计信息配置的子集，可直接使用
+    parser.add_argument('--stats', '--rates', dest='stats', help='集合统计信息配置（JSON，含写入速率与文档数）')
+    parser.add_argument('--collection', help='只分析指定集合')
+    parser.add_argument('--json', dest='json_output', help='把完整报告写入 JSON 文件')
+    args = parser.parse_args()
+
+    report = analyze(load_indexes(args.collection), load_collection_stats(args.stats))
+    print_report(report)
+
+    if args.json_output:
+        with open(args.json_output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n📁 报告已保存至: {args.json_output}")
+
+
+if __name__ == '__main__':
+    main()
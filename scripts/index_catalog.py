@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+索引目录加载模块
+从 generate-index-config.py 读取 indexes 列表，解析为结构化的索引定义，
+供索引顾问、冗余分析等脚本共用
+"""
+
+import importlib.util
+import json
+import os
+from collections import namedtuple
+
+INDEX_CONFIG_SCRIPT = os.path.join(os.path.dirname(__file__), 'generate-index-config.py')
+
+# 优先级排序（数值越小越优先）
+PRIORITY_RANK = {'最高': 0, '高': 1, '中': 2}
+
+# 集合统计信息的默认值（未在配置中给出时使用）
+DEFAULT_DOCUMENTS = 100000
+DEFAULT_DOCUMENT_BYTES = 1024
+DEFAULT_INSERTS_PER_SECOND = 1
+DEFAULT_CARDINALITY = 100
+DEFAULT_FIELD_BYTES = 24
+INDEX_ENTRY_OVERHEAD = 16   # 每个索引条目的记录指针与页内开销（字节）
+ARRAY_FANOUT = 4            # 数组字段每个文档平均产生的索引条目数
+
+# 解析后的索引定义
+# keys: [(字段, 方向)]，方向为 1 / -1；数组字段方向记为 1，并在 multikey_fields 中标注
+IndexSpec = namedtuple('IndexSpec', [
+    'collection', 'name', 'keys', 'unique', 'priority', 'description', 'usage', 'multikey_fields'
+])
+
+# 查询形态
+# equality: 等值过滤字段；range: 范围过滤字段；sort: [(字段, 方向)]；weight: 该形态出现次数
+QueryShape = namedtuple('QueryShape', ['collection', 'equality', 'range', 'sort', 'limit', 'weight', 'label'])
+
+# 计时记录中不带查询条件的写入操作
+WRITE_ACTIONS = ('add', 'set')
+
+_raw_indexes = None
+
+
+def load_raw_indexes():
+    """加载 generate-index-config.py 中的原始索引元组（不会写出CSV）"""
+    global _raw_indexes
+    if _raw_indexes is None:
+        spec = importlib.util.spec_from_file_location('generate_index_config', INDEX_CONFIG_SCRIPT)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _raw_indexes = list(module.indexes)
+    return _raw_indexes
+
+
+def parse_index(row):
+    """把一行 (集合名, 索引名, 字段列表, 排序列表, 是否唯一, 优先级, 说明, 用途) 解析为 IndexSpec"""
+    collection, name, fields, orders, unique, priority, description, usage = row
+    parts = fields.split('|')
+    multikey_fields = set()
+
+    if not orders:
+        # 字段与方向写在一起的旧格式，例如 'level|-1|points|-1'
+        keys = [(parts[i], int(parts[i + 1])) for i in range(0, len(parts), 2)]
+    else:
+        directions = orders.split('|')
+        if len(directions) != len(parts):
+            raise ValueError(f"索引 {collection}.{name} 的字段与排序数量不一致: {fields} / {orders}")
+        keys = []
+        for field, direction in zip(parts, directions):
+            if direction == '数组':
+                multikey_fields.add(field)
+                keys.append((field, 1))
+            else:
+                keys.append((field, int(direction)))
+
+    return IndexSpec(
+        collection=collection,
+        name=name,
+        keys=tuple(keys),
+        unique=(unique == '是'),
+        priority=priority,
+        description=description,
+        usage=usage,
+        multikey_fields=frozenset(multikey_fields),
+    )
+
+
+def load_indexes(collection=None):
+    """返回全部 IndexSpec，可按集合过滤"""
+    specs = [parse_index(row) for row in load_raw_indexes()]
+    if collection is not None:
+        specs = [spec for spec in specs if spec.collection == collection]
+    return specs
+
+
+def indexes_by_collection(specs=None):
+    """按集合分组，保持声明顺序"""
+    grouped = {}
+    for spec in specs if specs is not None else load_indexes():
+        grouped.setdefault(spec.collection, []).append(spec)
+    return grouped
+
+
+def format_keys(keys):
+    """把索引键格式化为 'userId:1|mealDate:-1'"""
+    return '|'.join(f"{field}:{direction}" for field, direction in keys)
+
+
+def parse_sort(value):
+    """解析排序定义，支持 'createdAt' / '-createdAt' / ['createdAt', -1] / {'field': ..., 'direction': ...}"""
+    sort = []
+    for item in value or []:
+        if isinstance(item, str):
+            if item.startswith('-'):
+                sort.append((item[1:], -1))
+            else:
+                sort.append((item.lstrip('+'), 1))
+        elif isinstance(item, dict):
+            direction = item.get('direction', 1)
+            if direction in ('desc', 'DESC'):
+                direction = -1
+            elif direction in ('asc', 'ASC'):
+                direction = 1
+            sort.append((item['field'], int(direction)))
+        else:
+            field, direction = item
+            if direction in ('desc', 'DESC'):
+                direction = -1
+            elif direction in ('asc', 'ASC'):
+                direction = 1
+            sort.append((field, int(direction)))
+    return tuple(sort)
+
+
+def parse_query_shape(record):
+    """
+    解析一条查询形态记录，格式示例：
+    {"collection": "meals", "filter": ["userId"], "range": ["mealDate"],
+     "sort": ["-mealDate"], "limit": 20, "count": 1500}
+    filter 也可以写成对象：{"userId": "eq", "mealDate": "range"}
+    """
+    filters = record.get('filter') or []
+    equality = []
+    ranges = list(record.get('range') or [])
+    if isinstance(filters, dict):
+        for field, op in filters.items():
+            if op in ('eq', 'in', '=', None):
+                equality.append(field)
+            else:
+                ranges.append(field)
+    else:
+        equality.extend(filters)
+
+    return QueryShape(
+        collection=record['collection'],
+        equality=tuple(equality),
+        range=tuple(field for field in ranges if field not in equality),
+        sort=parse_sort(record.get('sort')),
+        limit=record.get('limit'),
+        weight=record.get('count', 1),
+        label=record.get('label') or record.get('source') or '',
+    )
+
+
+def load_query_shapes(path):
+    """
+    读取 JSONL 格式的查询形态日志，空行和 # 开头的行会被忽略；
+    cloudbase-emulator.py 的计时记录中没有查询条件的写入操作（add / set）也会被跳过
+    """
+    shapes = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            try:
+                record = json.loads(line)
+                if record.get('action') in WRITE_ACTIONS:
+                    continue
+                shapes.append(parse_query_shape(record))
+            except (ValueError, KeyError) as e:
+                raise ValueError(f"{path}:{line_no} 查询形态解析失败: {e}")
+    return shapes
+
+
+def load_json_config(path):
+    """读取可选的 JSON 配置文件，未提供时返回空字典"""
+    if not path:
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+class CollectionStats:
+    """
+    集合统计信息（文档数、平均文档大小、写入速率、字段基数与字段大小），
+    各索引分析脚本共用同一份配置，格式见 collection-stats.sample.json
+    """
+
+    def __init__(self, config=None):
+        config = config or {}
+        self.defaults = dict(config.get('defaults', {}))
+        # 兼容 index-advisor.py 原来的统计格式：defaultCount / defaultCardinality 与集合下的 count
+        for old, new in (('defaultCount', 'documents'), ('defaultCardinality', 'cardinality')):
+            if old in config:
+                self.defaults.setdefault(new, config[old])
+        field_bytes = dict(config.get('fieldBytes', {}))
+        self.default_field_bytes = field_bytes.pop('default', DEFAULT_FIELD_BYTES)
+        self.field_sizes = field_bytes
+        self.array_fanout = config.get('arrayFanout', ARRAY_FANOUT)
+        self.collections = config.get('collections', {})
+        self.config = config
+
+    def _get(self, collection, key, default):
+        return self.collections.get(collection, {}).get(key, self.defaults.get(key, default))
+
+    def documents(self, collection):
+        count = self.collections.get(collection, {}).get('count')
+        return count if count is not None else self._get(collection, 'documents', DEFAULT_DOCUMENTS)
+
+    def avg_document_bytes(self, collection):
+        return self._get(collection, 'avgDocumentBytes', DEFAULT_DOCUMENT_BYTES)
+
+    def inserts_per_second(self, collection):
+        return self._get(collection, 'insertsPerSecond', DEFAULT_INSERTS_PER_SECOND)
+
+    def cardinality(self, collection, field):
+        cardinality = self.collections.get(collection, {}).get('cardinality', {})
+        return cardinality.get(field, self.defaults.get('cardinality', DEFAULT_CARDINALITY))
+
+    def field_bytes(self, field):
+        return self.field_sizes.get(field, self.default_field_bytes)
+
+    def entries_per_document(self, spec):
+        return self.array_fanout if spec.multikey_fields else 1
+
+    def entry_bytes(self, spec):
+        return sum(self.field_bytes(field) for field, _ in spec.keys) + INDEX_ENTRY_OVERHEAD
+
+    def index_entries(self, spec):
+        return self.documents(spec.collection) * self.entries_per_document(spec)
+
+    def index_bytes(self, spec):
+        return self.index_entries(spec) * self.entry_bytes(spec)
+
+
+def load_collection_stats(path):
+    return CollectionStats(load_json_config(path))
+
+
+def format_bytes(size):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024:
+            return f"{size:.1f}{unit}"
+        size /= 1024
+    return f"{size:.1f}TB"
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+JSON 数组流式读写模块
+种子数据文件的顶层都是数组：iter_array() 逐个解析数组元素，不把整个文件读入内存；
+ArrayWriter 逐个写出元素，先写临时文件，完成后原子替换目标文件，中途出错不会留下半个文件。
+两种输出格式: indent=2（美化，与 json.dump(..., ensure_ascii=False, indent=2) 逐字节一致）
+和 indent=None（紧凑，无空白）；路径以 .gz 结尾时自动按 gzip 读写。
+读写过程中内存只保存一个读缓冲区和当前元素，与文件大小无关
+"""
+
+import gzip
+import io
+import json
+import os
+import tempfile
+
+CHUNK_SIZE = 1 << 16
+PRETTY_INDENT = 2
+COMPACT_SEPARATORS = (',', ':')
+_WHITESPACE = ' \t\n\r'
+_NUMBER_CHARS = '.eE+-0123456789'
+
+
+def _make_temp(path):
+    """在目标文件同目录创建临时文件，权限沿用原文件（新文件按 umask 默认权限）"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix='.' + os.path.basename(path) + '.', suffix='.tmp', dir=directory)
+    if os.path.exists(path):
+        mode = os.stat(path).st_mode & 0o777
+    else:
+        umask = os.umask(0)
+        os.umask(umask)
+        mode = 0o666 & ~umask
+    os.chmod(tmp_path, mode)
+    return fd, tmp_path
+
+
+def _is_gzip(path):
+    return str(path).endswith('.gz')
+
+
+def open_text(path):
+    """以文本方式打开（.gz 自动解压）"""
+    if _is_gzip(path):
+        return gzip.open(path, 'rt', encoding='utf-8')
+    return open(path, 'r', encoding='utf-8')
+
+
+def _open_temp_writer(path):
+    """返回 (文本写入对象, 底层二进制文件, 临时文件路径)；.gz 目标写 gzip 压缩流"""
+    fd, tmp_path = _make_temp(path)
+    raw = os.fdopen(fd, 'wb')
+    stream = gzip.GzipFile(fileobj=raw, mode='wb', mtime=0) if _is_gzip(path) else raw
+    return io.TextIOWrapper(stream, encoding='utf-8', newline='\n'), raw, tmp_path
+
+
+def _finish(text, raw):
+    """写完后刷到磁盘并关闭；gzip 流先关闭以写出文件尾（不会关闭底层文件）"""
+    text.flush()
+    if text.buffer is not raw:
+        text.buffer.close()
+    raw.flush()
+    os.fsync(raw.fileno())
+    raw.close()
+
+
+def _abort(text, raw):
+    if not text.closed:
+        text.close()
+    if not raw.closed:
+        raw.close()
+
+
+def encode(item, indent=PRETTY_INDENT):
+    if indent:
+        return json.dumps(item, ensure_ascii=False, indent=indent)
+    return json.dumps(item, ensure_ascii=False, separators=COMPACT_SEPARATORS)
+
+
+def detect_indent(path):
+    """
+    根据文件开头判断格式：'[\\n  {' 这样的返回缩进空格数，紧凑格式返回 None；
+    用于判断原始文本能否直接写回另一种格式的文件
+    """
+    with open_text(path) as f:
+        head = f.read(256)
+    stripped = head.lstrip(_WHITESPACE)
+    if not stripped.startswith('['):
+        return None
+    body = stripped[1:]
+    if not body.startswith('\n'):
+        return None
+    line = body[1:]
+    return (len(line) - len(line.lstrip(' '))) or None
+
+
+def iter_array(path, chunk_size=CHUNK_SIZE, with_text=False):
+    """
+    逐个产出顶层 JSON 数组中的元素
+    with_text=True 时产出 (元素, 元素在文件中的原始文本)，便于原样写回未修改的元素
+    """
+    decoder = json.JSONDecoder()
+    with open_text(path) as f:
+        buf, pos, eof = '', 0, False
+
+        def fill():
+            nonlocal buf, pos, eof
+            chunk = f.read(chunk_size)
+            if not chunk:
+                eof = True
+            buf = buf[pos:] + chunk
+            pos = 0
+
+        def skip_whitespace():
+            nonlocal pos
+            while True:
+                while pos < len(buf) and buf[pos] in _WHITESPACE:
+                    pos += 1
+                if pos < len(buf) or eof:
+                    return
+                fill()
+
+        skip_whitespace()
+        if pos >= len(buf) or buf[pos] != '[':
+            raise ValueError(f"{path} 的顶层不是 JSON 数组")
+        pos += 1
+        skip_whitespace()
+        if pos < len(buf) and buf[pos] == ']':
+            return
+
+        count = 0
+        while True:
+            skip_whitespace()
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                fill()
+                continue
+            # 元素恰好停在缓冲区末尾时，或数字后面紧跟数字的组成字符（23.5 被截成 23. 时解析出 23），补读后重新解析
+            if not eof and (end >= len(buf) or (isinstance(item, (int, float)) and not isinstance(item, bool)
+                                                and buf[end] in _NUMBER_CHARS)):
+                fill()
+                continue
+            text = buf[pos:end] if with_text else None
+            pos = end
+            count += 1
+            yield (item, text) if with_text else item
+            skip_whitespace()
+            if pos >= len(buf):
+                raise ValueError(f"{path} 的 JSON 数组没有结束")
+            if buf[pos] == ']':
+                return
+            if buf[pos] != ',':
+                raise ValueError(f"{path} 的 JSON 数组格式错误: 第 {count} 个元素后应为 ',' 或 ']'")
+            pos += 1
+
+
+def iter_records(path, chunk_size=CHUNK_SIZE):
+    """逐条产出记录：顶层 JSON 数组按元素读取，否则按 JSONL（每行一个对象）读取"""
+    with open_text(path) as f:
+        head = f.read(64).lstrip(_WHITESPACE)
+    if head.startswith('['):
+        yield from iter_array(path, chunk_size)
+        return
+    with open_text(path) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+class ArrayWriter:
+    """
+    逐个写出 JSON 数组元素；indent=2 时与 json.dump(..., ensure_ascii=False, indent=2) 完全一致，
+    indent=None 时为无空白的紧凑格式
+    用法:
+        with ArrayWriter(path) as writer:
+            for item in items:
+                writer.write(item)
+    """
+
+    def __init__(self, path, indent=PRETTY_INDENT):
+        self.path = path
+        self.indent = indent
+        self.count = 0
+        self._file = None
+        self._raw = None
+        self._tmp_path = None
+        self._discarded = False
+
+    def __enter__(self):
+        self._file, self._raw, self._tmp_path = _open_temp_writer(self.path)
+        self._file.write('[')
+        return self
+
+    def write(self, item):
+        text = encode(item, self.indent)
+        if self.indent:
+            text = text.replace('\n', '\n' + ' ' * self.indent)
+        self.write_raw(text)
+
+    def write_raw(self, text):
+        """
+        写入已经编码好的元素文本，例如 iter_array(with_text=True) 从同格式文件读到的原始文本
+        （美化格式下为数组内的原样文本：首行不缩进，后续行已带数组层的缩进）
+        """
+        if self.indent:
+            self._file.write((',\n' if self.count else '\n') + ' ' * self.indent + text)
+        else:
+            self._file.write((',' if self.count else '') + text)
+        self.count += 1
+
+    def write_all(self, items):
+        for item in items:
+            self.write(item)
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._discarded:
+            return False
+        try:
+            if exc_type is None:
+                self._file.write('\n]' if self.count and self.indent else ']')
+                _finish(self._file, self._raw)
+                os.replace(self._tmp_path, self.path)
+        finally:
+            _abort(self._file, self._raw)
+            if os.path.exists(self._tmp_path):
+                os.remove(self._tmp_path)
+        return False
+
+    def discard(self):
+        """放弃本次写出（不替换目标文件）"""
+        self._discarded = True
+        _abort(self._file, self._raw)
+        os.remove(self._tmp_path)
+
+
+def dump_array(path, items, indent=PRETTY_INDENT):
+    """把可迭代对象逐个写成 JSON 数组文件（原子替换），返回写出的元素数"""
+    with ArrayWriter(path, indent=indent) as writer:
+        writer.write_all(items)
+    return writer.count
+
+
+def atomic_write_json(path, data, indent=PRETTY_INDENT):
+    """整体写出 JSON（非数组的小文件，如索引）：先写同目录临时文件再原子替换"""
+    text, raw, tmp_path = _open_temp_writer(path)
+    try:
+        if indent:
+            json.dump(data, text, ensure_ascii=False, indent=indent)
+        else:
+            json.dump(data, text, ensure_ascii=False, separators=COMPACT_SEPARATORS)
+        _finish(text, raw)
+        os.replace(tmp_path, path)
+    finally:
+        _abort(text, raw)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def atomic_write_lines(path, items, encoded=False):
+    """
+    把可迭代对象写成 JSONL（每行一个紧凑 JSON，原子替换），返回写出的行数；
+    encoded 为 True 时 items 为已编码好的 bytes 行（含结尾换行），原样写出
+    """
+    text, raw, tmp_path = _open_temp_writer(path)
+    count = 0
+    try:
+        if encoded:
+            out = text.buffer
+            for line in items:
+                out.write(line)
+                count += 1
+        else:
+            for item in items:
+                text.write(encode(item, None) + '\n')
+                count += 1
+        _finish(text, raw)
+        os.replace(tmp_path, path)
+    finally:
+        _abort(text, raw)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return count
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+肉类 → 素食替代 减排矩阵模块
+meat-data.json 中每种肉类产品给出了 veganAlternatives（只有名称）。这里把全部替代品名称解析到植物性食材
+（因子库中植物类因子优先，其次食材库），预先算出 肉类产品 × 替代品 的稠密矩阵：
+    carbonSaved     每替换 1kg 减少的碳排放（kgCO2e/kg）= 肉类 carbonFootprint - 替代品因子
+    proteinDelta    每 100g 蛋白质差值（g）= 替代品 - 肉类
+    calorieDelta    每 100g 热量差值（kcal）= 替代品 - 肉类
+listed 标记该替代品是否列在该产品的 veganAlternatives 中，每个产品的最佳替换按 listed 的替代品排序后写出，
+按 comparisonGroup 汇总的排序也一并写出，"牛肉换成什么" 这类查询只需读一次数组。
+解析只在植物性条目中进行，素牛肉 / 素三文鱼 这类仿肉不会匹配到肉类因子，统一按 MOCK_MEAT_BASE 计算；
+按 MOCK_MEAT_BASE 估算的替换（estimated）在排序中排在其他替换之后，避免几十个仿肉以同一个减排量混在真实解析的替代品中
+"""
+
+import json
+import os
+
+import numpy as np
+
+from factor_dedup import MERGED_FACTORS_FILE
+from factor_region_matrix import decode_array, encode_array
+from factor_resolver import DEFAULT_MIN_CONFIDENCE, NameResolver, normalize_name
+from json_stream import atomic_write_json, iter_records
+from recipe_carbon import INGREDIENTS_FILE
+
+ROOT_DIR = os.path.join(os.path.dirname(__file__), '..')
+MEAT_DATA_FILE = os.path.join(ROOT_DIR, 'cloudfunctions/meat-data-import/meat-data.json')
+SWAP_MATRIX_FILE = os.path.join(ROOT_DIR, 'cloudfunctions/meat-data-import/meat-swap-matrix.json')
+
+# 参与解析的因子 subCategory 与食材库 category（不含肉类、水产、乳制品、蛋类）
+PLANT_SUBCATEGORIES = {'vegetable', 'fruit', 'nuts', 'beans', 'bean', 'bean_product', 'grain', 'mushroom', 'oil'}
+PLANT_INGREDIENT_CATEGORIES = {'beans', 'vegetables', 'fruits', 'grains', 'nuts', 'oils', 'sweeteners'}
+
+# 仿肉（素X / 植物X）统一按豆制品 素鸡 计算；泛称按下表换成基础食材（按前缀匹配，如 豆制品 → 豆腐）。
+# 库中没有对应因子的原料（如 魔芋）不换成外形相近的食材，保持未解析
+MOCK_MEAT_PREFIXES = ('植物', '素')
+MOCK_MEAT_BASE = '素鸡'
+ALTERNATIVE_BASES = {
+    '豆制品': '豆腐',
+    '大豆蛋白': '黄豆',
+    '面筋': '小麦',
+}
+# 按 MOCK_MEAT_BASE 估算的解析级别
+ESTIMATED_LEVELS = {'mock_meat'}
+# 含动物成分、不能作为素食替代的名称（血豆腐为猪血 / 鸭血制品）：不进入矩阵，作为数据错误报告
+NON_VEGAN_ALTERNATIVES = {'血豆腐'}
+# 换成基础食材后的置信度系数
+BASE_CONFIDENCE = 0.6
+
+DEFAULT_TOP = 5
+
+
+class PlantCatalog:
+    """
+    植物性食材目录：因子库中植物类因子优先（与 FactorTable 一致），因子库中没有的再用食材库补充；
+    营养数据来自食材库，因子按名称或别名对应到食材库中的条目
+    用法:
+        catalog = PlantCatalog.from_files()
+        catalog.resolve('素牛肉')   # {'name': '素鸡', 'level': 'mock_meat', 'carbonFootprint': ..., 'protein': ...}
+    """
+
+    def __init__(self, entries, nutrition, min_confidence=DEFAULT_MIN_CONFIDENCE):
+        # entries: [(名称, 因子值, 来源, [别名...])]；nutrition: {食材名: nutrition}
+        self.entries = entries
+        self.nutrition = nutrition
+        self.resolver = NameResolver([(col, name, aliases) for col, (name, _, _, aliases) in enumerate(entries)],
+                                     min_confidence=min_confidence)
+
+    @classmethod
+    def from_files(cls, factors_path=MERGED_FACTORS_FILE, ingredients_path=INGREDIENTS_FILE, **kwargs):
+        entries, seen = [], set()
+        if factors_path and os.path.exists(factors_path):
+            for factor in iter_records(factors_path):
+                if (factor.get('status', 'active') != 'active' or factor.get('unit') != 'kgCO2e/kg'
+                        or factor.get('subCategory') not in PLANT_SUBCATEGORIES):
+                    continue
+                entries.append((factor['name'], float(factor['factorValue']), 'factor', factor.get('alias') or []))
+                seen.add(factor['name'])
+                seen.update(factor.get('alias') or [])
+        nutrition = {}
+        if ingredients_path and os.path.exists(ingredients_path):
+            for item in iter_records(ingredients_path):
+                if item.get('category') not in PLANT_INGREDIENT_CATEGORIES:
+                    continue
+                nutrition.setdefault(item['name'], item.get('nutrition') or {})
+                if item['name'] not in seen and item.get('carbonFootprint') is not None:
+                    entries.append((item['name'], float(item['carbonFootprint']), 'ingredient', []))
+                    seen.add(item['name'])
+        return cls(entries, nutrition, **kwargs)
+
+    def _nutrition_of(self, column):
+        name, _, _, aliases = self.entries[column]
+        for candidate in [name] + list(aliases):
+            if candidate in self.nutrition:
+                return self.nutrition[candidate]
+        return {}
+
+    def _match(self, name):
+        """(匹配结果, 级别, 置信度系数)：精确匹配 → 基础食材表 → 仿肉 → 模糊匹配"""
+        match = self.resolver.resolve(name)
+        if match is not None and match['level'] in ('exact', 'alias'):
+            return match, match['level'], 1.0
+        text = normalize_name(name)
+        for key, base in ALTERNATIVE_BASES.items():
+            if text.startswith(key):
+                return self.resolver.resolve(base), 'base', BASE_CONFIDENCE
+        if text.startswith(MOCK_MEAT_PREFIXES):
+            return self.resolver.resolve(MOCK_MEAT_BASE), 'mock_meat', BASE_CONFIDENCE
+        return match, match['level'] if match else None, 1.0
+
+    def resolve(self, name):
+        """返回替代品的解析结果；未匹配时 resolvedName 为 None，各数值为 nan"""
+        match, level, scale = self._match(name)
+        if match is None:
+            return {'name': name, 'resolvedName': None, 'source': None, 'level': None, 'confidence': 0.0,
+                    'carbonFootprint': np.nan, 'protein': np.nan, 'calories': np.nan}
+        _, value, source, _ = self.entries[match['column']]
+        nutrition = self._nutrition_of(match['column'])
+        return {
+            'name': name,
+            'resolvedName': match['name'],
+            'source': source,
+            'level': level,
+            'confidence': round(match['confidence'] * scale, 4),
+            'carbonFootprint': value,
+            'protein': float(nutrition.get('protein', np.nan)),
+            'calories': float(nutrition.get('calories', np.nan)),
+        }
+
+
+def _number(value, digits):
+    return None if value is None or np.isnan(value) else round(float(value), digits)
+
+
+class SwapMatrix:
+    """
+    用法:
+        matrix = SwapMatrix.build(meats, PlantCatalog.from_files())
+        matrix.best_swaps('牛肉（牛腩）')      # 按减排量排序的替代品
+        matrix.group_swaps('beef')
+        matrix.save(path); SwapMatrix.load(path)
+    carbon_saved / protein_delta / calorie_delta 为 (产品数, 替代品数) 的 float32 数组，listed 为同形状的 bool 数组
+    """
+
+    def __init__(self, products, alternatives, carbon_saved, protein_delta, calorie_delta, listed):
+        self.products = products
+        self.alternatives = alternatives
+        self.carbon_saved = carbon_saved
+        self.protein_delta = protein_delta
+        self.calorie_delta = calorie_delta
+        self.listed = listed
+        self.product_idx = {}
+        for row, product in enumerate(products):
+            for key in (product['name'], product.get('nameEn')):
+                if key:
+                    self.product_idx.setdefault(normalize_name(key), row)
+        self.alternative_idx = {normalize_name(alt['name']): col for col, alt in enumerate(alternatives)}
+        self.groups = {}
+        for row, product in enumerate(products):
+            self.groups.setdefault(product.get('comparisonGroup') or product.get('subcategory'), []).append(row)
+        self.rankings = self._rank()
+
+    @classmethod
+    def build(cls, meats, catalog):
+        """meats 为 meat-data.json 的记录（只取 active），catalog 为 PlantCatalog；NON_VEGAN_ALTERNATIVES 中的名称跳过"""
+        meats = [meat for meat in meats if meat.get('status', 'active') == 'active']
+        names = list(dict.fromkeys(name for meat in meats for name in vegan_alternatives(meat)))
+        alternatives = [catalog.resolve(name) for name in names]
+        col_of = {name: col for col, name in enumerate(names)}
+
+        products, listed = [], np.zeros((len(meats), len(names)), dtype=bool)
+        for row, meat in enumerate(meats):
+            nutrition = meat.get('nutrition') or {}
+            products.append({
+                'name': meat['name'],
+                'nameEn': meat.get('nameEn'),
+                'comparisonGroup': meat.get('comparisonGroup') or meat.get('subcategory'),
+                'carbonFootprint': float(meat['carbonFootprint']),
+                'protein': float(nutrition.get('protein', np.nan)),
+                'calories': float(nutrition.get('calories', np.nan)),
+            })
+            listed[row, [col_of[name] for name in vegan_alternatives(meat)]] = True
+
+        def column(items, key):
+            return np.array([item[key] for item in items], dtype=np.float64)
+
+        # 产品列向量与替代品行向量广播为稠密矩阵
+        carbon_saved = column(products, 'carbonFootprint')[:, None] - column(alternatives, 'carbonFootprint')[None, :]
+        protein_delta = column(alternatives, 'protein')[None, :] - column(products, 'protein')[:, None]
+        calorie_delta = column(alternatives, 'calories')[None, :] - column(products, 'calories')[:, None]
+        return cls(products, alternatives, carbon_saved.astype(np.float32), protein_delta.astype(np.float32),
+                   calorie_delta.astype(np.float32), listed)
+
+    def _estimated(self):
+        return np.array([alt.get('level') in ESTIMATED_LEVELS for alt in self.alternatives], dtype=bool)
+
+    def _rank(self):
+        """
+        每个产品 listed 替代品的列号：先排解析到具体食材的替代品，再排按 MOCK_MEAT_BASE 估算的仿肉，
+        各自按减排量降序、蛋白质差值降序排列（无法解析的替代品不参与排序）
+        """
+        saved = np.where(self.listed & ~np.isnan(self.carbon_saved), self.carbon_saved, -np.inf)
+        protein = np.nan_to_num(self.protein_delta, nan=-np.inf)
+        estimated = self._estimated()
+        rankings = []
+        for row in range(len(self.products)):
+            order = np.lexsort((-protein[row], -saved[row], estimated))
+            rankings.append([int(col) for col in order if np.isfinite(saved[row, col])])
+        return rankings
+
+    def _swap(self, row, col):
+        alt = self.alternatives[col]
+        saved = float(self.carbon_saved[row, col])
+        footprint = self.products[row]['carbonFootprint']
+        return {
+            'alternative': alt['name'],
+            'resolvedName': alt['resolvedName'],
+            'estimated': alt.get('level') in ESTIMATED_LEVELS,
+            'carbonSaved': _number(saved, 4),
+            'carbonSavedRatio': _number(saved / footprint if footprint else np.nan, 4),
+            'proteinDelta': _number(self.protein_delta[row, col], 2),
+            'calorieDelta': _number(self.calorie_delta[row, col], 1),
+        }
+
+    def row_of(self, product):
+        return self.product_idx.get(normalize_name(product))
+
+    def best_swaps(self, product, limit=None):
+        """产品名称（中文或英文）的最佳替换列表，找不到产品返回 None"""
+        row = self.row_of(product)
+        if row is None:
+            return None
+        return [self._swap(row, col) for col in self.rankings[row][:limit]]
+
+    def group_swaps(self, group, limit=None):
+        """comparisonGroup 内所有产品列出的替代品，按组内平均减排量排序（估算的仿肉排在后面）"""
+        rows = self.groups.get(group)
+        if not rows:
+            return None
+        listed = self.listed[rows].any(axis=0) & ~np.isnan(self.carbon_saved[rows[0]])
+        saved = self.carbon_saved[rows].mean(axis=0, dtype=np.float64)
+        estimated = self._estimated()
+        cols = [int(col) for col in np.lexsort((-saved, estimated)) if listed[col]][:limit]
+        return [{
+            'alternative': self.alternatives[col]['name'],
+            'resolvedName': self.alternatives[col]['resolvedName'],
+            'estimated': bool(estimated[col]),
+            'carbonSaved': _number(saved[col], 4),
+            'products': int(self.listed[rows, col].sum()),
+        } for col in cols]
+
+    def lookup(self, product, alternative):
+        """任一产品 × 替代品（不要求 listed），找不到返回 None"""
+        row, col = self.row_of(product), self.alternative_idx.get(normalize_name(alternative))
+        if row is None or col is None:
+            return None
+        swap = self._swap(row, col)
+        swap['listed'] = bool(self.listed[row, col])
+        return swap
+
+    def unresolved(self):
+        return [alt['name'] for alt in self.alternatives if alt['resolvedName'] is None]
+
+    def to_dict(self, top=DEFAULT_TOP):
+        """矩阵为 float32 / uint8 的小端字节（base64），按行优先排列；bestSwaps 为展开后的前 top 个替换，可直接返回"""
+        def plain(item):
+            return {key: _number(value, 4) if isinstance(value, float) else value for key, value in item.items()}
+
+        return {
+            'version': 1,
+            'units': {'carbon': 'kgCO2e/kg', 'protein': 'g/100g', 'calories': 'kcal/100g'},
+            'products': [plain(product) for product in self.products],
+            'alternatives': [plain(alt) for alt in self.alternatives],
+            'index': {'products': self.product_idx, 'alternatives': self.alternative_idx},
+            'rankings': self.rankings,
+            'bestSwaps': [[self._swap(row, col) for col in ranking[:top]] for row, ranking in enumerate(self.rankings)],
+            'groups': {group: {'products': rows, 'bestSwaps': self.group_swaps(group, top)}
+                       for group, rows in self.groups.items()},
+            'shape': list(self.carbon_saved.shape),
+            'carbonSavedData': encode_array(self.carbon_saved, '<f4'),
+            'proteinDeltaData': encode_array(self.protein_delta, '<f4'),
+            'calorieDeltaData': encode_array(self.calorie_delta, '<f4'),
+            'listedData': encode_array(self.listed, 'u1'),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        shape = tuple(data['shape'])
+
+        def restore(items, keys):
+            return [{**item, **{key: np.nan if item.get(key) is None else item[key] for key in keys}} for item in items]
+
+        products = restore(data['products'], ('carbonFootprint', 'protein', 'calories'))
+        alternatives = restore(data['alternatives'], ('carbonFootprint', 'protein', 'calories'))
+        return cls(products, alternatives,
+                   decode_array(data['carbonSavedData'], '<f4', np.float32, shape),
+                   decode_array(data['proteinDeltaData'], '<f4', np.float32, shape),
+                   decode_array(data['calorieDeltaData'], '<f4', np.float32, shape),
+                   decode_array(data['listedData'], 'u1', bool, shape))
+
+    def save(self, path=SWAP_MATRIX_FILE, top=DEFAULT_TOP):
+        atomic_write_json(path, self.to_dict(top), indent=None)
+
+    @classmethod
+    def load(cls, path=SWAP_MATRIX_FILE):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+
+def vegan_alternatives(meat):
+    return [name for name in meat.get('veganAlternatives') or [] if name not in NON_VEGAN_ALTERNATIVES]
+
+
+def non_vegan_alternatives(meats):
+    """veganAlternatives 中不是素食的条目：[(产品名称, 替代品名称)]"""
+    return [(meat['name'], name) for meat in meats if meat.get('status', 'active') == 'active'
+            for name in meat.get('veganAlternatives') or [] if name in NON_VEGAN_ALTERNATIVES]
+
+
+def load_meats(path=MEAT_DATA_FILE):
+    return list(iter_records(path))
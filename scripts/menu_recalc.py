@@ -0,0 +1,647 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+菜单项碳足迹重算模块
+离线版的 restaurant-menu-carbon/index.js recalculateMenuItems()：按同样的规则把一个 restaurant_menu_items 文档
+转成计算请求（缺少食材时从关联菜谱取），再按 calculationLevel 走 L1（基准值估算）/ L2（标准配方 + 标准能耗模型）/
+L3（实测能耗 + 溯源因子）计算，最后与基准值置信区间比较，得到与云函数写回内容相同的 updateData。
+因子不再逐条查询数据库，而是查 build-factor-region-matrix.py 生成的 因子 × 地区 矩阵（地区回退已预先算好），
+基准值查 carbon_baselines 的导出记录（没有导出时与云函数一样使用系统默认值）。
+命中层级按云函数的 matchFactor / matchMaterialFactor / matchTransportFactor / matchEnergyFactor 近似：
+名称命中时为 exact_region / national_fallback，别名或包含匹配为 alias_fuzzy_match，品类兜底为 category_fallback
+"""
+
+from functools import lru_cache
+
+from factor_dedup import name_key
+from factor_region_matrix import NATIONAL_AVERAGE, REGION_MATRIX_FILE, RegionFactorMatrix
+from factor_resolver import normalize_name
+
+VALID_MEAL_TYPES = ['meat_simple', 'meat_full']
+VALID_ENERGY_TYPES = ['electric', 'gas', 'mixed']
+DEFAULT_CALCULATION_LEVEL = 'L2'
+
+# 以下常量与 restaurant-menu-carbon/index.js 保持一致
+DEFAULT_BASELINES = {'meat_simple': 5.0, 'meat_full': 7.5}
+DEFAULT_WASTE_RATES = {
+    'vegetables': 0.20, 'vegetable': 0.20, 'leafy': 0.20,
+    'meat': 0.05,
+    'seafood': 0.15,
+    'grains': 0.0, 'grain': 0.0, 'nuts': 0.0, 'spices': 0.0,
+    'others': 0.10, 'other': 0.10,
+}
+DEFAULT_WASTE_RATE = 0.10
+STANDARD_TIME_MODEL = {'raw': 0, 'steamed': 15, 'boiled': 20, 'stir_fried': 5, 'fried': 8, 'baked': 45}
+STANDARD_POWER_MODEL = {'raw': 0, 'steamed': 2.0, 'boiled': 1.5, 'stir_fried': 3.0, 'fried': 5.0, 'baked': 4.0}
+DEFAULT_ELECTRIC_FACTOR = 0.5703
+DEFAULT_GAS_FACTOR = 2.16
+# 食材 category → 因子库 subCategory（类别兜底用）
+CATEGORY_MAP = {
+    'vegetables': 'vegetable', 'vegetable': 'vegetable',
+    'beans': 'bean_product', 'bean_product': 'bean_product',
+    'grains': 'grain', 'grain': 'grain',
+    'fruits': 'fruit', 'fruit': 'fruit',
+    'nuts': 'nut', 'nut': 'nut',
+    'mushrooms': 'mushroom', 'mushroom': 'mushroom',
+    'seafood': 'seafood', 'dairy': 'dairy',
+    'spices': 'spice', 'spice': 'spice',
+    'others': 'other', 'other': 'other',
+    'meat': 'meat',
+}
+# L1 按行业经验比例分解：食材 70%，能耗 20%，包装 5%，运输 5%
+L1_SHARES = {'ingredients': 0.7, 'energy': 0.2, 'packaging': 0.05, 'transport': 0.05}
+HIGH_CARBON_WARNING = '碳足迹高于基准值置信上限，建议优化菜谱配方或烹饪方式'
+NEGATIVE_REDUCTION_WARNING = '碳减排值为负，建议优化菜谱配方或烹饪方式'
+
+
+class RecalculationError(Exception):
+    """单个菜单项无法计算（对应云函数返回 code != 0）"""
+
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+def default_waste_rate(category):
+    return DEFAULT_WASTE_RATES.get(category) or DEFAULT_WASTE_RATE
+
+
+def weight_in_kg(quantity, unit):
+    """g / ml 除以 1000，kg / l 原值，未知单位按 g 处理"""
+    unit = (unit or 'g').lower()
+    if unit in ('kg', '千克', 'l', '升'):
+        return quantity
+    return quantity / 1000
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float('nan')
+
+
+class FactorMatcher:
+    """
+    用 RegionFactorMatrix 回答云函数中各 matchXxxFactor 的查询，结果为 {'factorValue', 'matchLevel', 'source', ...}
+    用法:
+        matcher = FactorMatcher(RegionFactorMatrix.load())
+        matcher.match_factor('嫩豆腐', 'beans', 'east_china')
+    同一查询的结果按 (名称, 类别, 地区) 缓存
+    """
+
+    def __init__(self, matrix):
+        self.matrix = matrix
+        # 别名包含匹配的候选：[(行号, 类别, [小写别名...])]
+        self._aliases = [(row, info['category'], [alias.lower() for alias in info.get('alias') or []])
+                         for row, info in enumerate(matrix.rows)]
+        self._by_subcategory = {}
+        self._energy_rows = {}
+        for row, info in enumerate(matrix.rows):
+            if info['category'] == 'ingredient' and info.get('subCategory'):
+                self._by_subcategory.setdefault(info['subCategory'], row)
+            if info['category'] == 'energy':
+                self._energy_rows.setdefault((info['name'], info['unit']), row)
+        self.match_factor = lru_cache(maxsize=1 << 16)(self._match_factor)
+        self.match_material = lru_cache(maxsize=1 << 12)(self._match_material)
+        self.match_transport = lru_cache(maxsize=1 << 12)(self._match_transport)
+        self.match_energy = lru_cache(maxsize=64)(self._match_energy)
+
+    @classmethod
+    def from_file(cls, path=REGION_MATRIX_FILE):
+        return cls(RegionFactorMatrix.load(path))
+
+    def _named(self, name, categories, region, alias_level):
+        """名称或别名完全相同；名称命中沿用矩阵的 exact_region / national_fallback，别名命中为 alias_level"""
+        for category in categories:
+            row = self.matrix.row_of(name, category)
+            if row is None:
+                continue
+            match = self.matrix.lookup_row(row, region)
+            if match is None:
+                continue
+            if name_key(self.matrix.rows[row]['name']) != name_key(name):
+                match['matchLevel'] = alias_level
+            return match
+        return None
+
+    def _contains(self, name, categories, region, level):
+        """别名包含输入或输入包含别名（与云函数的内存过滤相同，按矩阵行序取第一个）"""
+        text = (name or '').lower()
+        for row, category, aliases in self._aliases:
+            if category in categories and any(alias in text or text in alias for alias in aliases):
+                match = self.matrix.lookup_row(row, region)
+                if match is not None:
+                    match['matchLevel'] = level
+                    return match
+        return None
+
+    def _match_factor(self, name, category, region):
+        """matchFactor：名称（精确地区 → 全国平均）→ 别名 → 别名包含 → 品类兜底"""
+        if not normalize_name(name):
+            return None
+        match = self._named(name, ('ingredient', 'material', 'energy'), region, 'alias_fuzzy_match')
+        if match is None:
+            categories = ('ingredient',) if category else ('ingredient', 'material', 'energy', 'transport')
+            match = self._contains(name, categories, region, 'alias_fuzzy_match')
+        if match is None and category:
+            row = self._by_subcategory.get(CATEGORY_MAP.get(category, category))
+            match = self.matrix.lookup_row(row, region) if row is not None else None
+            if match is not None:
+                match['matchLevel'] = 'category_fallback'
+        return match
+
+    def _match_material(self, name, region):
+        """matchMaterialFactor：名称 → 别名（alias_match）→ 包含（fuzzy_match）"""
+        match = self._named(name, ('material',), region, 'alias_match')
+        return match or self._contains(name, ('material',), region, 'fuzzy_match')
+
+    def _match_transport(self, mode, region):
+        return self._named(mode, ('transport',), region, 'alias_match')
+
+    def _match_energy(self, energy_type, region):
+        """matchEnergyFactor：gas → 天然气（m³），其余 → 电力（kWh）"""
+        key = ('天然气', 'kgCO2e/m³') if energy_type == 'gas' else ('电力', 'kgCO2e/kWh')
+        row = self._energy_rows.get(key)
+        if row is None:
+            return self._named(key[0], ('energy',), region, 'name_match')
+        return self.matrix.lookup_row(row, region)
+
+
+class BaselineTable:
+    """
+    carbon_baselines 导出记录按 (mealType, region, energyType) 建索引，同一组合保留 version 最大的 active 记录；
+    query() 对应 carbon-baseline-query 的单条查询（找不到时回退全国平均）
+    """
+
+    def __init__(self, records=()):
+        self.index = {}
+        for record in records:
+            category = record.get('category') or {}
+            if record.get('status', 'active') != 'active':
+                continue
+            key = (category.get('mealType'), category.get('region'), category.get('energyType'))
+            current = self.index.get(key)
+            if current is None or str(record.get('version') or '') > str(current.get('version') or ''):
+                self.index[key] = record
+
+    def query(self, meal_type, region, energy_type):
+        return (self.index.get((meal_type, region, energy_type))
+                or self.index.get((meal_type, NATIONAL_AVERAGE, energy_type)))
+
+
+def baseline_interval(baseline_doc):
+    """(基准值, 置信下限, 置信上限, 不确定度)：优先 confidenceInterval，其次 uncertainty，都没有时按 10%"""
+    footprint = baseline_doc.get('carbonFootprint') or {}
+    value = footprint.get('value') or 0
+    interval = footprint.get('confidenceInterval')
+    if interval:
+        return value, interval.get('lower') or 0, interval.get('upper') or 0, None
+    uncertainty = footprint.get('uncertainty')
+    if uncertainty is None:
+        uncertainty = value * 0.1
+    return value, max(0, value - uncertainty), value + uncertainty, uncertainty
+
+
+def _default_interval(value):
+    uncertainty = value * 0.1
+    return value, max(0, value - uncertainty), value + uncertainty, uncertainty
+
+
+class MenuRecalculator:
+    """
+    用法:
+        recalc = MenuRecalculator(matcher, baselines, recipes=recipes, restaurants=restaurants, calculated_at=now)
+        update = recalc.recalculate(menu_item)    # {'_id', 'restaurantId', 'unset', 'data'}，失败抛出 RecalculationError
+    recipes 为 {菜谱 _id 或 recipeId: 菜谱文档}，versions 为 {菜单项 ID: 最新的 recipe_versions 文档}，
+    restaurants 为 {餐厅 _id: 餐厅文档}（None 表示不校验餐厅是否存在）
+    """
+
+    def __init__(self, matcher, baselines=None, recipes=None, versions=None, restaurants=None, calculated_at=None):
+        self.matcher = matcher
+        self.baselines = baselines or BaselineTable()
+        self.recipes = recipes or {}
+        self.versions = versions or {}
+        self.restaurants = restaurants
+        self.calculated_at = calculated_at
+
+    # ---------------- 请求构建（recalculateMenuItems） ----------------
+
+    @staticmethod
+    def _recipe_ingredients(recipe):
+        """菜谱的 ingredients（字符串或对象）转为菜单项格式，缺少用量时按 100g"""
+        lines = []
+        for index, ing in enumerate((recipe or {}).get('ingredients') or []):
+            if isinstance(ing, dict):
+                main = ing['isMainIngredient'] if ing.get('isMainIngredient') is not None else index == 0
+                lines.append({
+                    'ingredientName': ing.get('name') or ing.get('ingredientName') or ing.get('ingredient') or str(ing),
+                    'quantity': ing.get('quantity') or ing.get('amount') or 100,
+                    'unit': ing.get('unit') or 'g',
+                    'isMainIngredient': main,
+                })
+            else:
+                lines.append({'ingredientName': str(ing), 'quantity': 100, 'unit': 'g', 'isMainIngredient': index == 0})
+        return lines
+
+    def region_of(self, menu_item):
+        region = menu_item.get('restaurantRegion')
+        if not region and self.restaurants is not None:
+            region = (self.restaurants.get(menu_item.get('restaurantId')) or {}).get('region')
+        return region
+
+    def request_for(self, menu_item):
+        """与 recalculateMenuItems 传给 calculateMenuItemCarbon 的参数相同"""
+        ingredients = menu_item.get('ingredients') or []
+        # 菜单项没有食材时先取该菜单项最新的配方版本，再取关联菜谱（云函数只查关联菜谱）
+        version = self.versions.get(menu_item.get('menuItemId') or menu_item.get('_id'))
+        if not ingredients and version:
+            ingredients = self._recipe_ingredients(version)
+        if not ingredients and menu_item.get('baseRecipeId'):
+            ingredients = self._recipe_ingredients(self.recipes.get(menu_item['baseRecipeId']))
+        return {
+            'restaurantId': menu_item.get('restaurantId'),
+            'mealType': menu_item.get('mealType') or 'meat_simple',
+            'energyType': menu_item.get('energyType') or 'electric',
+            'calculationLevel': menu_item.get('calculationLevel') or DEFAULT_CALCULATION_LEVEL,
+            'region': self.region_of(menu_item) or NATIONAL_AVERAGE,
+            'ingredients': ingredients,
+            'cookingMethod': menu_item.get('cookingMethod') or None,
+            'cookingTime': menu_item.get('cookingTime') or None,
+            'packaging': menu_item.get('packaging') or None,
+        }
+
+    # ---------------- 各分项 ----------------
+
+    def _ingredient_lines(self, data, region, detailed):
+        """CF_ingredients = Σ(M_i × EF_i × (1 + W_i))；detailed 为 L2 的明细格式（含未匹配项和计算公式）"""
+        total, info = 0.0, []
+        for ingredient in data.get('ingredients') or []:
+            if not isinstance(ingredient, dict):
+                continue
+            name = ingredient.get('ingredientName') or ingredient.get('name')
+            quantity = ingredient.get('quantity')
+            category = ingredient.get('category') or None
+            waste_rate = ingredient.get('wasteRate') or default_waste_rate(category)
+            # 只有 ingredientId 的食材需要查 ingredients 集合，离线导出中没有，与查不到时一样跳过
+            if not name or quantity is None:
+                continue
+            amount = _number(quantity)
+            if not amount > 0:
+                continue
+            unit = ingredient.get('unit') or 'g'
+            weight = weight_in_kg(amount, unit)
+            factor = self.matcher.match_factor(name, category, region)
+            if factor is not None:
+                carbon = factor['factorValue'] * weight * (1 + waste_rate)
+                total += carbon
+                entry = {
+                    'ingredientName': name,
+                    'ingredientCategory': category,
+                    'quantity': amount,
+                    'unit': unit,
+                    'weightInKg': weight,
+                    'wasteRate': waste_rate,
+                    'matchedFactor': {
+                        'factorId': None,
+                        'factorValue': factor['factorValue'],
+                        'unit': factor.get('unit') or 'kg CO₂e/kg',
+                        'matchLevel': factor.get('matchLevel') or 'unknown',
+                        'source': factor.get('source'),
+                        'year': factor.get('year'),
+                        'region': factor.get('region'),
+                    },
+                }
+                if detailed:
+                    entry['carbonFootprint'] = carbon
+                    entry['calculation'] = {
+                        'formula': 'CF = EF × M × (1 + W)',
+                        'values': {'EF': factor['factorValue'], 'M': weight, 'W': waste_rate, 'result': carbon},
+                    }
+                else:
+                    entry['traceability'] = ingredient.get('traceability')
+                    entry['carbonFootprint'] = carbon
+                info.append(entry)
+            elif detailed:
+                info.append({
+                    'ingredientName': name,
+                    'ingredientCategory': category,
+                    'quantity': amount,
+                    'unit': unit,
+                    'weightInKg': weight,
+                    'wasteRate': waste_rate,
+                    'matchedFactor': None,
+                    'carbonFootprint': 0,
+                    'warning': '因子匹配失败，未计算碳足迹',
+                })
+        return total, info
+
+    def _standard_energy(self, cooking_method, cooking_time, energy_type, region):
+        """calculateEnergyByStandardModel：按烹饪方式的标准工时和功率估算"""
+        minutes = cooking_time or STANDARD_TIME_MODEL.get(cooking_method) or 10
+        power = STANDARD_POWER_MODEL.get(cooking_method) or 2.0
+        factor = self.matcher.match_energy(energy_type or 'electric', region)
+        if factor is not None and factor['factorValue']:
+            value = factor['factorValue']
+        else:
+            value = DEFAULT_GAS_FACTOR if energy_type == 'gas' else DEFAULT_ELECTRIC_FACTOR
+        if energy_type == 'gas':
+            # 天然气：功率对应流量按 power/10 (m³/h) 简化估算
+            return power / 10 * (minutes / 60) * value
+        return power * (minutes / 60) * value
+
+    def _packaging(self, data, region):
+        total = 0.0
+        packaging = data.get('packaging')
+        if not packaging:
+            return total
+        for item in packaging if isinstance(packaging, list) else [packaging]:
+            name = item.get('type') or item.get('name') or item.get('material')
+            weight = item.get('weight') or 0
+            if not name or weight <= 0:
+                continue
+            factor = self.matcher.match_material(name, region)
+            if factor is not None and factor['factorValue']:
+                total += factor['factorValue'] * weight
+        return total
+
+    def _transport(self, data, region, traceable):
+        transport = data.get('transport') or {}
+        if not (transport.get('distance') and transport.get('mode')):
+            return 0.0
+        if traceable and transport.get('traceabilityFactor'):
+            value = transport['traceabilityFactor']
+        else:
+            factor = self.matcher.match_transport(transport['mode'], region)
+            value = factor['factorValue'] if factor is not None else None
+        if not value:
+            return 0.0
+        return transport['distance'] * value * (transport.get('weight') or 1)
+
+    # ---------------- 各计算级别 ----------------
+
+    def _baseline(self, data, region):
+        return self.baselines.query(data.get('mealType') or 'meat_simple', region or NATIONAL_AVERAGE,
+                                    data.get('energyType') or 'electric')
+
+    def calculate_l1(self, data, region):
+        """calculateCarbonFootprintL1：基准值即估算值，按行业经验比例分解"""
+        # carbon-baseline-query 自身已回退到全国平均，云函数再以 national_average 重查的结果与此相同
+        doc = self._baseline(data, region)
+        if doc is not None:
+            value, lower, upper, uncertainty = baseline_interval(doc)
+            source = (doc.get('source') or {}).get('organization')
+        else:
+            value, lower, upper, uncertainty = _default_interval(DEFAULT_BASELINES.get(data.get('mealType'), 5.0))
+            source = '系统默认值（L1估算）'
+        baseline_info = {
+            'baselineId': doc.get('baselineId') if doc else None,
+            'version': doc.get('version') if doc else None,
+            'source': source,
+            'queryDate': self.calculated_at,
+            'confidenceInterval': {'lower': lower, 'upper': upper, 'uncertainty': uncertainty},
+        }
+        breakdown = {key: value * share for key, share in L1_SHARES.items()}
+        return {
+            'value': value,
+            'ingredients': breakdown['ingredients'],
+            'cookingEnergy': breakdown['energy'],
+            'packaging': breakdown['packaging'],
+            'transport': breakdown['transport'],
+            'breakdown': breakdown,
+            'factorMatchInfo': [{'note': 'L1估算级：直接使用基准值作为估算', 'baselineInfo': baseline_info}],
+            'baselineInfo': baseline_info,
+            'calculationLevel': 'L1',
+            'isEstimated': True,
+        }
+
+    def calculate_l2(self, data, region):
+        """calculateCarbonFootprint：标准配方 + 标准能耗模型（有功率和时长时按实际功率）"""
+        ingredients, info = self._ingredient_lines(data, region, detailed=True)
+        energy = 0.0
+        if data.get('cookingMethod') and (data.get('cookingTime') or data.get('energyType')):
+            factor = None
+            if data.get('power') and data.get('cookingTime'):
+                factor = self.matcher.match_energy(data.get('energyType') or 'electric', region)
+            if factor is not None and factor['factorValue']:
+                energy = data['power'] * (data['cookingTime'] / 60) * factor['factorValue']
+            else:
+                energy = self._standard_energy(data['cookingMethod'], data.get('cookingTime'),
+                                               data.get('energyType'), region)
+        packaging = self._packaging(data, region)
+        transport = self._transport(data, region, traceable=False)
+        total = ingredients + energy + packaging + transport
+        return {
+            'value': total,
+            'ingredients': ingredients,
+            'cookingEnergy': energy,
+            'packaging': packaging,
+            'transport': transport,
+            'breakdown': {'ingredients': ingredients, 'energy': energy, 'packaging': packaging, 'transport': transport},
+            'factorMatchInfo': info,
+            'calculationDetails': {
+                'ingredients': [{
+                    'ingredientName': line['ingredientName'],
+                    'category': line['ingredientCategory'],
+                    'quantity': line['quantity'],
+                    'unit': line['unit'],
+                    'weightInKg': line['weightInKg'],
+                    'wasteRate': line['wasteRate'],
+                    'factor': {
+                        'value': line['matchedFactor']['factorValue'],
+                        'unit': line['matchedFactor']['unit'],
+                        'matchLevel': line['matchedFactor']['matchLevel'],
+                        'source': line['matchedFactor']['source'],
+                    } if line['matchedFactor'] else None,
+                    'carbonFootprint': line['carbonFootprint'],
+                    'calculation': line.get('calculation'),
+                    'warning': line.get('warning'),
+                } for line in info],
+                'energy': {'method': data.get('cookingMethod'), 'time': data.get('cookingTime'),
+                           'energyType': data.get('energyType'), 'carbonFootprint': energy},
+                'packaging': {'carbonFootprint': packaging},
+                'transport': {'carbonFootprint': transport},
+                'total': total,
+            },
+        }
+
+    def calculate_l3(self, data, region):
+        """calculateCarbonFootprintL3：有电表读数时按实测能耗，运输优先使用溯源因子"""
+        measured = 0.0
+        reading = data.get('meterReading') or {}
+        if reading.get('energyConsumption'):
+            factor = self.matcher.match_energy(data.get('energyType') or 'electric', region)
+            if factor is not None and factor['factorValue']:
+                measured = reading['energyConsumption'] * factor['factorValue']
+        ingredients, info = self._ingredient_lines(data, region, detailed=False)
+        energy = measured
+        if measured == 0 and data.get('cookingMethod') and (data.get('cookingTime') or data.get('energyType')):
+            energy = self._standard_energy(data['cookingMethod'], data.get('cookingTime'), data.get('energyType'), region)
+        packaging = self._packaging(data, region)
+        transport = self._transport(data, region, traceable=True)
+        total = ingredients + energy + packaging + transport
+        return {
+            'value': total,
+            'ingredients': ingredients,
+            'cookingEnergy': energy,
+            'packaging': packaging,
+            'transport': transport,
+            'breakdown': {'ingredients': ingredients, 'energy': energy, 'packaging': packaging, 'transport': transport},
+            'factorMatchInfo': info,
+            'calculationLevel': 'L3',
+            'hasMeterReading': measured > 0,
+            'isAuditable': True,
+        }
+
+    def calculate(self, data):
+        """calculateMenuItemCarbon 的 data 部分；参数无效时抛出 RecalculationError"""
+        if not data.get('restaurantId') or not data.get('mealType') or not data.get('energyType'):
+            raise RecalculationError(400, '缺少必填字段：restaurantId、mealType、energyType 为必填')
+        if data['mealType'] not in VALID_MEAL_TYPES:
+            raise RecalculationError(400, f"无效的 mealType: {data['mealType']}，有效值：{', '.join(VALID_MEAL_TYPES)}")
+        if data['energyType'] not in VALID_ENERGY_TYPES:
+            raise RecalculationError(400, f"无效的 energyType: {data['energyType']}，有效值：{', '.join(VALID_ENERGY_TYPES)}")
+        restaurant = None
+        if self.restaurants is not None:
+            restaurant = self.restaurants.get(data['restaurantId'])
+            if restaurant is None:
+                raise RecalculationError(404, '餐厅不存在')
+        region = data.get('region') or (restaurant or {}).get('region')
+        if not region:
+            raise RecalculationError(400, '餐厅未定义地区，请先设置餐厅地区或菜单项的适用区域')
+
+        level = data.get('calculationLevel') or DEFAULT_CALCULATION_LEVEL
+        if level == 'L1':
+            return self._l1_result(self.calculate_l1(data, region))
+        carbon = self.calculate_l3(data, region) if level == 'L3' else self.calculate_l2(data, region)
+        carbon['calculationLevel'] = level
+
+        doc = self._baseline(data, region)
+        if doc is not None:
+            baseline, lower, upper, uncertainty = baseline_interval(doc)
+            source = (doc.get('source') or {}).get('organization')
+        else:
+            baseline, lower, upper, uncertainty = _default_interval(DEFAULT_BASELINES.get(data['mealType'], 5.0))
+            source = '系统默认值'
+        reduction = baseline - carbon['value']
+
+        # 显著减排（< 置信下限）/ 行业达标 / 高碳排放（> 置信上限）
+        carbon_level, needs_optimization, warning = 'medium', False, None
+        if lower > 0 and upper > 0:
+            if carbon['value'] < lower:
+                carbon_level = 'low'
+            elif carbon['value'] > upper:
+                carbon_level, needs_optimization, warning = 'high', True, HIGH_CARBON_WARNING
+        else:
+            needs_optimization = reduction < 0
+            if needs_optimization:
+                carbon_level, warning = 'high', NEGATIVE_REDUCTION_WARNING
+            elif reduction > baseline * 0.2:
+                carbon_level = 'low'
+
+        breakdown = carbon['breakdown']
+        return {
+            'carbonFootprint': {
+                'value': carbon['value'],
+                'baseline': baseline,
+                'reduction': reduction,
+                'baselineConfidenceInterval': {'lower': lower, 'upper': upper, 'uncertainty': uncertainty},
+                'breakdown': {
+                    'ingredients': carbon['ingredients'] or breakdown['ingredients'] or 0,
+                    'energy': carbon['cookingEnergy'] or breakdown['energy'] or 0,
+                    'packaging': carbon['packaging'] or breakdown['packaging'] or 0,
+                    'transport': carbon['transport'] or breakdown['transport'] or 0,
+                },
+            },
+            'baselineInfo': {
+                'baselineId': doc.get('baselineId') if doc else None,
+                'version': doc.get('version') if doc else None,
+                'source': source,
+                'queryDate': self.calculated_at,
+            },
+            'factorMatchInfo': carbon['factorMatchInfo'],
+            'calculationDetails': carbon.get('calculationDetails'),
+            'optimizationFlag': {'needsOptimization': needs_optimization, 'warningMessage': warning},
+            'carbonLevel': carbon_level,
+            'calculationLevel': level,
+            'calculatedAt': self.calculated_at,
+        }
+
+    def _l1_result(self, carbon):
+        baseline = carbon['value']
+        info = carbon['baselineInfo']
+        interval = info.get('confidenceInterval')
+        lower = interval.get('lower') or baseline if interval else baseline
+        upper = interval.get('upper') or baseline if interval else baseline
+        carbon_level = 'medium'
+        if interval:
+            if carbon['value'] < lower:
+                carbon_level = 'low'
+            elif carbon['value'] > upper:
+                carbon_level = 'high'
+        return {
+            'carbonFootprint': {
+                'value': carbon['value'],
+                'baseline': baseline,
+                'reduction': 0,
+                'baselineConfidenceInterval': {'lower': lower, 'upper': upper},
+                'breakdown': carbon['breakdown'],
+            },
+            'baselineInfo': info,
+            'factorMatchInfo': carbon['factorMatchInfo'],
+            'optimizationFlag': {
+                'needsOptimization': carbon_level == 'high',
+                'warningMessage': HIGH_CARBON_WARNING if carbon_level == 'high' else None,
+            },
+            'carbonLevel': carbon_level,
+            'calculationLevel': 'L1',
+            'isEstimated': True,
+            'calculatedAt': self.calculated_at,
+        }
+
+    def recalculate(self, menu_item):
+        """
+        返回写回 restaurant_menu_items 的更新：data 为 updateData，unset 为需要先删除的旧格式字段
+        （baselineInfo 为 null、carbonFootprint 为数字时，云函数先 _.remove() 再更新）
+        """
+        request = self.request_for(menu_item)
+        result = self.calculate(request)
+        update = {
+            'carbonFootprint': result['carbonFootprint'],
+            'baselineInfo': result['baselineInfo'],
+            'factorMatchInfo': result.get('factorMatchInfo') or [],
+            'calculationDetails': result.get('calculationDetails'),
+            # 保持菜单项原有的计算级别，不使用计算结果中的值
+            'calculationLevel': menu_item.get('calculationLevel') or DEFAULT_CALCULATION_LEVEL,
+            'optimizationFlag': result['optimizationFlag'],
+            'calculatedAt': result['calculatedAt'],
+            'restaurantRegion': menu_item.get('restaurantRegion') or request['region'],
+        }
+        unset = []
+        if 'baselineInfo' in menu_item and menu_item['baselineInfo'] is None:
+            unset.append('baselineInfo')
+        if isinstance(menu_item.get('carbonFootprint'), (int, float)) and not isinstance(menu_item.get('carbonFootprint'), bool):
+            unset.append('carbonFootprint')
+        return {'_id': menu_item.get('_id'), 'restaurantId': menu_item.get('restaurantId'), 'unset': unset, 'data': update}
+
+
+def _latest(index, key, record):
+    current = index.get(key)
+    if current is None or _number(record.get('version') or 0) >= _number(current.get('version') or 0):
+        index[key] = record
+
+
+def index_recipes(records):
+    """
+    菜谱与菜谱版本导出 → (菜谱, 配方版本)：菜谱按 _id 和 recipeId 索引；带 menuItemId 的为 recipe_versions 文档，
+    按 menuItemId 索引；同一键有多个版本时保留 version 最大的
+    """
+    recipes, versions = {}, {}
+    for record in records:
+        if record.get('menuItemId'):
+            _latest(versions, record['menuItemId'], record)
+            continue
+        for key in {record.get('_id'), record.get('recipeId')} - {None}:
+            _latest(recipes, key, record)
+    return recipes, versions
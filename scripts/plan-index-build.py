@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+索引创建计划生成脚本
+根据各集合的文档数与平均文档大小，估算每个索引的创建耗时和临时内存，
+按“唯一索引 → 最高优先级 → 高 → 中”的顺序在并发预算内分批，输出 JSON 创建计划；
+同时用完整的索引目录重新生成 cloudfunctions/database/indexes-config.json
+
+用法:
+    python scripts/plan-index-build.py --stats scripts/collection-stats.sample.json
+    python scripts/plan-index-build.py --stats stats.json --concurrency 3 --memory-mb 2048 --output build-plan.json
+"""
+
+import argparse
+import json
+import math
+import os
+
+from index_catalog import (
+    PRIORITY_RANK, format_bytes, format_keys, indexes_by_collection, load_collection_stats, load_indexes
+)
+
+INDEXES_CONFIG_FILE = os.path.join(os.path.dirname(__file__), '../cloudfunctions/database/indexes-config.json')
+
+# 创建耗时模型参数
+SCAN_MB_PER_SECOND = 100            # 全表扫描吞吐
+SORT_COMPARISONS_PER_SECOND = 2e7   # 外部排序比较速度
+WRITE_MB_PER_SECOND = 50            # 索引写入吞吐
+SPILL_MB_PER_SECOND = 80            # 超出排序内存后落盘归并的读写吞吐
+SORT_MEMORY_MB = 200                # 单个索引创建可用的排序内存（MongoDB 默认 200MB）
+FIXED_OVERHEAD_SECONDS = 2          # 每个索引的固定开销（元数据、锁、校验）
+UNIQUE_CHECK_FACTOR = 1.1           # 唯一索引需要额外的重复键校验
+
+MB = 1024 * 1024
+
+
+def estimate_build(spec, stats, sort_memory_mb=SORT_MEMORY_MB):
+    """估算单个索引的创建耗时（秒）与临时内存（字节）"""
+    documents = stats.documents(spec.collection)
+    entries = stats.index_entries(spec)
+    key_bytes = entries * stats.entry_bytes(spec)
+
+    scan = documents * stats.avg_document_bytes(spec.collection) / MB / SCAN_MB_PER_SECOND
+    sort = entries * math.log2(max(entries, 2)) / SORT_COMPARISONS_PER_SECOND
+    if spec.unique:
+        sort *= UNIQUE_CHECK_FACTOR
+    write = key_bytes / MB / WRITE_MB_PER_SECOND
+
+    limit = sort_memory_mb * MB
+    spills = key_bytes > limit
+    # 超出排序内存时需要把有序段写盘再归并读回
+    spill = 2 * key_bytes / MB / SPILL_MB_PER_SECOND if spills else 0
+
+    return {
+        'collection': spec.collection,
+        'name': spec.name,
+        'keys': format_keys(spec.keys),
+        'unique': spec.unique,
+        'priority': spec.priority,
+        'documents': documents,
+        'indexEntries': entries,
+        'indexBytes': int(key_bytes),
+        'estimatedSeconds': round(FIXED_OVERHEAD_SECONDS + scan + sort + write + spill, 1),
+        'tempMemoryBytes': int(min(key_bytes, limit)),
+        'spillsToDisk': spills,
+    }
+
+
+def build_order_key(item):
+    # 唯一索引优先（先建约束，避免迁移期间写入重复数据），再按优先级，同级内耗时短的先建
+    return (not item['unique'], PRIORITY_RANK.get(item['priority'], len(PRIORITY_RANK)), item['estimatedSeconds'])
+
+
+def plan_batches(items, concurrency, memory_budget):
+    """
+    按顺序贪心装批：每批最多 concurrency 个索引、临时内存之和不超过预算，
+    且同一集合同一时间只建一个索引（避免对同一大集合并发全表扫描）
+    """
+    pending = sorted(items, key=build_order_key)
+    batches = []
+    while pending:
+        batch, used_memory, collections = [], 0, set()
+        remaining = []
+        for item in pending:
+            fits = len(batch) < concurrency \
+                and item['collection'] not in collections \
+                and (not batch or used_memory + item['tempMemoryBytes'] <= memory_budget)
+            if fits:
+                batch.append(item)
+                used_memory += item['tempMemoryBytes']
+                collections.add(item['collection'])
+            else:
+                remaining.append(item)
+        batches.append({
+            'batch': len(batches) + 1,
+            'estimatedSeconds': max(item['estimatedSeconds'] for item in batch),
+            'peakMemoryBytes': used_memory,
+            'indexes': batch,
+        })
+        pending = remaining
+    return batches
+
+
+def _config_entry(spec, existing):
+    entry = {
+        'name': spec.name,
+        'keys': [{'field': field, 'direction': direction} for field, direction in spec.keys],
+    }
+    if spec.unique:
+        entry['unique'] = True
+    if spec.multikey_fields:
+        entry['multikey'] = True
+    entry['priority'] = spec.priority
+    # 手工写的说明优先，目录中的用途只用于新条目
+    entry['description'] = (existing or {}).get('description') or spec.usage
+    # 保留手工维护的附加属性（sparse、performanceTarget 等）
+    for key, value in (existing or {}).items():
+        if key not in entry and key not in ('keys', 'unique'):
+            entry[key] = value
+    return entry
+
+
+def regenerate_indexes_config(path, specs, batches):
+    """用完整索引目录重建 indexes-config.json，目录中没有的手工条目（TTL、全文索引、区域配置等）原样保留"""
+    existing = {}
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            existing = json.load(f).get('collections', {})
+
+    collections = {}
+    for collection, collection_specs in indexes_by_collection(specs).items():
+        old_entries = {entry['name']: entry for entry in existing.get(collection, {}).get('indexes', [])}
+        entries = [_config_entry(spec, old_entries.get(spec.name)) for spec in collection_specs]
+        declared = {spec.name for spec in collection_specs}
+        entries.extend(entry for name, entry in old_entries.items() if name not in declared)
+        collections[collection] = {'collectionName': collection, 'indexes': entries}
+
+    for collection, data in existing.items():
+        if collection not in collections:
+            collections[collection] = data
+
+    total_mandatory, total_optional = 0, 0
+    for data in collections.values():
+        data['totalIndexes'] = len(data['indexes'])
+        # 保持 collectionName / totalIndexes / indexes 的字段顺序
+        data['indexes'] = data.pop('indexes')
+        total_optional += sum(1 for entry in data['indexes'] if entry.get('optional'))
+        total_mandatory += sum(1 for entry in data['indexes'] if not entry.get('optional'))
+
+    minutes = math.ceil(sum(batch['estimatedSeconds'] for batch in batches) / 60)
+    config = {
+        'description': '数据库索引配置文件 - 用于在控制台手动创建索引时参考（由 scripts/plan-index-build.py 生成）',
+        'totalIndexes': total_mandatory,
+        'collections': collections,
+        'summary': {
+            'totalMandatory': total_mandatory,
+            'totalOptional': total_optional,
+            'totalUnique': sum(1 for spec in specs if spec.unique),
+            'buildBatches': len(batches),
+            'estimatedTime': f"约{minutes}分钟（按集合统计估算的索引创建耗时，不含控制台操作时间）",
+        },
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(config, f, ensure_ascii=False, indent=2)
+        f.write('\n')
+    return config
+
+
+def main():
+    parser = argparse.ArgumentParser(description='生成按优先级分批的索引创建计划')
+    parser.add_argument('--stats', help='集合统计信息配置（JSON，含文档数与平均文档大小）')
+    parser.add_argument('--concurrency', type=int, default=2, help='同一批内最多并发创建的索引数')
+    parser.add_argument('--memory-mb', type=int, default=1024, help='同一批内临时内存预算（MB）')
+    parser.add_argument('--sort-memory-mb', type=int, default=SORT_MEMORY_MB, help='单个索引创建的排序内存上限（MB）')
+    parser.add_argument('--output', default='index-build-plan.json', help='创建计划输出文件')
+    parser.add_argument('--config', default=INDEXES_CONFIG_FILE, help='要重新生成的 indexes-config.json 路径')
+    parser.add_argument('--no-config', action='store_true', help='只输出创建计划，不重新生成 indexes-config.json')
+    args = parser.parse_args()
+
+    stats = load_collection_stats(args.stats)
+    specs = load_indexes()
+    items = [estimate_build(spec, stats, args.sort_memory_mb) for spec in specs]
+    batches = plan_batches(items, args.concurrency, args.memory_mb * MB)
+    total_seconds = sum(batch['estimatedSeconds'] for batch in batches)
+
+    plan = {
+        'budget': {
+            'concurrency': args.concurrency,
+            'memoryBytes': args.memory_mb * MB,
+            'sortMemoryBytes': args.sort_memory_mb * MB,
+        },
+        'totalIndexes': len(items),
+        'totalBatches': len(batches),
+        'totalEstimatedSeconds': round(total_seconds, 1),
+        'batches': batches,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(plan, f, ensure_ascii=False, indent=2)
+
+    print("🗂️  索引创建计划")
+    print(f"   - 索引数: {len(items)}（唯一索引 {sum(1 for i in items if i['unique'])}）")
+    print(f"   - 批次数: {len(batches)}（并发 {args.concurrency}，内存预算 {args.memory_mb}MB）")
+    print(f"   - 预计总耗时: {total_seconds / 60:.1f} 分钟")
+    print(f"   - 需落盘排序的索引: {sum(1 for i in items if i['spillsToDisk'])}")
+    print("\n⏱️  耗时最长的批次:")
+    for batch in sorted(batches, key=lambda b: -b['estimatedSeconds'])[:5]:
+        names = ', '.join(f"{i['collection']}.{i['name']}" for i in batch['indexes'])
+        print(f"  #{batch['batch']:<4} {batch['estimatedSeconds']:>8.1f}s  {format_bytes(batch['peakMemoryBytes']):>9}  {names}")
+    print(f"\n📁 创建计划已保存至: {args.output}")
+
+    if not args.no_config:
+        config = regenerate_indexes_config(args.config, specs, batches)
+        print(f"📁 索引配置已更新: {args.config}（必建 {config['summary']['totalMandatory']}，"
+              f"可选 {config['summary']['totalOptional']}）")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+植物解锁索引模块
+把植物模板的 unlockRequirements 预先整理为按等级分组、按积分阈值排序的紧凑索引，
+查询“某个用户（等级、积分、减碳量）能解锁哪些植物、下一个能解锁哪株”时只需二分查找，
+不必每次扫描全部模板；前置植物（prerequisitePlants）按拓扑顺序逐个判断，支持多级链条。
+同时为每株植物的 growthStages 生成累计天数 / 累计减碳量表，按已生长天数和累计减碳量二分出当前阶段与进度，
+批量接口一次处理 NumPy 数组形式的大量用户花园
+"""
+
+import bisect
+import json
+import os
+
+UNLOCK_INDEX_FILE = os.path.join(os.path.dirname(__file__), '../cloudfunctions/plant-templates/plant-unlock-index.json')
+GROWTH_TABLE_FILE = os.path.join(os.path.dirname(__file__), '../cloudfunctions/plant-templates/plant-growth-tables.json')
+
+# 用户等级从低到高，高等级可以解锁所有低等级的植物
+LEVEL_ORDER = ['bronze', 'silver', 'gold', 'diamond']
+LEVEL_RANK = {level: i for i, level in enumerate(LEVEL_ORDER)}
+
+
+def _requirements(plant):
+    req = plant.get('unlockRequirements') or {}
+    level = req.get('userLevel', LEVEL_ORDER[0])
+    if level not in LEVEL_RANK:
+        raise ValueError(f"植物 {plant['plantId']} 的解锁等级未知: {level}")
+    return level, req.get('totalPoints') or 0, req.get('totalCarbon') or 0, list(req.get('prerequisitePlants') or [])
+
+
+def _topological_order(requires):
+    """按依赖关系排序（前置植物在前），出现未知植物或循环依赖时报错"""
+    order, state = [], {}
+
+    def visit(plant_id, path):
+        if state.get(plant_id) == 'done':
+            return
+        if state.get(plant_id) == 'visiting':
+            raise ValueError(f"前置植物存在循环依赖: {' → '.join(path + [plant_id])}")
+        state[plant_id] = 'visiting'
+        for dep in requires.get(plant_id, ()):
+            visit(dep, path + [plant_id])
+        state[plant_id] = 'done'
+        if plant_id in requires:
+            order.append(plant_id)
+
+    for plant_id in requires:
+        visit(plant_id, [])
+    return order
+
+
+def build_unlock_index(plants):
+    """
+    生成可直接写成 JSON 的解锁索引：
+    levels.<等级>: plantIds / points / carbon 按 (积分, 减碳量) 升序排列，
+                   prefixMaxCarbon[i] 为前 i+1 株植物的最大减碳要求，用于判断整段前缀是否都满足减碳条件
+    prerequisites: 按拓扑顺序排列的 [plantId, [前置 plantId...]]
+    """
+    plants = [p for p in plants if p.get('status', 'active') == 'active']
+    by_name = {p['name']: p['plantId'] for p in plants}
+    plant_ids = {p['plantId'] for p in plants}
+
+    grouped = {level: [] for level in LEVEL_ORDER}
+    requires = {}
+    for plant in plants:
+        level, points, carbon, prerequisites = _requirements(plant)
+        grouped[level].append((points, carbon, plant['plantId']))
+        if prerequisites:
+            deps = []
+            for ref in prerequisites:
+                # 前置植物在模板里按名称填写，也兼容直接写 plantId
+                dep = by_name.get(ref, ref if ref in plant_ids else None)
+                if dep is None:
+                    raise ValueError(f"植物 {plant['plantId']} 的前置植物不存在: {ref}")
+                deps.append(dep)
+            requires[plant['plantId']] = deps
+
+    levels = {}
+    for level, items in grouped.items():
+        items.sort()
+        prefix_max, running = [], 0
+        for _, carbon, _ in items:
+            running = max(running, carbon)
+            prefix_max.append(running)
+        levels[level] = {
+            'plantIds': [plant_id for _, _, plant_id in items],
+            'points': [points for points, _, _ in items],
+            'carbon': [carbon for _, carbon, _ in items],
+            'prefixMaxCarbon': prefix_max,
+        }
+
+    return {
+        'levelOrder': LEVEL_ORDER,
+        'totalPlants': len(plants),
+        'levels': levels,
+        'prerequisites': [[plant_id, requires[plant_id]] for plant_id in _topological_order(requires)],
+        'names': {p['plantId']: p['name'] for p in plants},
+    }
+
+
+class UnlockIndex:
+    """加载后的解锁索引，query() 的阈值定位为 O(log n)"""
+
+    def __init__(self, data):
+        self.data = data
+        self.levels = data['levels']
+        self.level_order = data.get('levelOrder', LEVEL_ORDER)
+        self.prerequisites = [(plant_id, tuple(deps)) for plant_id, deps in data.get('prerequisites', [])]
+        self.gated = {plant_id for plant_id, _ in self.prerequisites}
+        self.names = data.get('names', {})
+        self.ids_by_name = {name: plant_id for plant_id, name in self.names.items()}
+
+    @classmethod
+    def from_plants(cls, plants):
+        return cls(build_unlock_index(plants))
+
+    @classmethod
+    def from_json(cls, path=UNLOCK_INDEX_FILE):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def _levels_for(self, level):
+        if level not in LEVEL_RANK:
+            raise ValueError(f"未知的用户等级: {level}")
+        return self.level_order[:self.level_order.index(level) + 1]
+
+    def unlock_positions(self, level, points):
+        """各可用等级中积分已满足的植物数量（排序数组上的二分位置）"""
+        return {name: bisect.bisect_right(self.levels[name]['points'], points) for name in self._levels_for(level)}
+
+    def _threshold_unlocked(self, level, points, carbon):
+        """返回满足等级、积分、减碳条件的植物，以及积分已满足但减碳不足的植物"""
+        unlocked, carbon_short = [], []
+        for name in self._levels_for(level):
+            entry = self.levels[name]
+            end = bisect.bisect_right(entry['points'], points)
+            if not end:
+                continue
+            if entry['prefixMaxCarbon'][end - 1] <= carbon:
+                # 常见情况：积分与减碳要求同步增长，整段前缀都已解锁
+                unlocked.extend(entry['plantIds'][:end])
+            else:
+                for i in range(end):
+                    if entry['carbon'][i] <= carbon:
+                        unlocked.append(entry['plantIds'][i])
+                    else:
+                        carbon_short.append((entry['carbon'][i] - carbon, name, i))
+        return unlocked, carbon_short
+
+    def _resolve_owned(self, owned):
+        return {self.ids_by_name.get(item, item) for item in owned}
+
+    def _apply_prerequisites(self, unlocked, owned):
+        """
+        按拓扑顺序处理有前置植物的模板：
+        提供 owned（用户花园中已有的植物 plantId 或名称）时要求前置植物已种下，
+        否则要求前置植物本身已解锁（链条逐级传递）
+        """
+        if not self.gated:
+            return unlocked, {}
+        available = set(unlocked)
+        satisfied = self._resolve_owned(owned) if owned is not None else available
+        blocked = {}
+        for plant_id, deps in self.prerequisites:
+            if plant_id not in available:
+                continue
+            missing = [dep for dep in deps if dep not in satisfied]
+            if missing:
+                available.discard(plant_id)
+                blocked[plant_id] = missing
+        if not blocked:
+            return unlocked, blocked
+        return [plant_id for plant_id in unlocked if plant_id not in blocked], blocked
+
+    def _next_unlockable(self, level, points, carbon, carbon_short):
+        """下一株可解锁的植物：当前可用等级中积分差距最小者，积分已够的按减碳差距最小"""
+        best = None
+        if carbon_short:
+            _, name, i = min(carbon_short)
+            best = (0, self.levels[name]['carbon'][i] - carbon, name, i)
+        for name in self._levels_for(level):
+            entry = self.levels[name]
+            i = bisect.bisect_right(entry['points'], points)
+            if i < len(entry['points']):
+                candidate = (entry['points'][i] - points, max(entry['carbon'][i] - carbon, 0), name, i)
+                if best is None or candidate[:2] < best[:2]:
+                    best = candidate
+        if best is None:
+            return None
+        points_needed, carbon_needed, name, i = best
+        plant_id = self.levels[name]['plantIds'][i]
+        return {
+            'plantId': plant_id,
+            'name': self.names.get(plant_id, plant_id),
+            'userLevel': name,
+            'pointsNeeded': points_needed,
+            'carbonNeeded': carbon_needed,
+        }
+
+    def query(self, level, points, carbon, owned=None):
+        """
+        返回 {'unlocked': [plantId...], 'blocked': {plantId: [缺少的前置 plantId]}, 'next': {...} 或 None}
+        level 为用户等级，高等级包含低等级的全部植物
+        """
+        unlocked, carbon_short = self._threshold_unlocked(level, points, carbon)
+        unlocked, blocked = self._apply_prerequisites(unlocked, owned)
+        return {
+            'unlocked': unlocked,
+            'blocked': blocked,
+            'next': self._next_unlockable(level, points, carbon, carbon_short),
+        }
+
+    def is_unlocked(self, plant_id, level, points, carbon, owned=None):
+        return plant_id in set(self.query(level, points, carbon, owned)['unlocked'])
+
+
+def scan_unlocked(plants, level, points, carbon, owned=None):
+    """
+    逐个检查全部模板的参考实现，按与 PlantUnlockIndex 相同的规则判断，用于校验索引结果和基准对比：
+    userLevel 等级、totalPoints 积分、totalCarbon 减碳量三项阈值，前置植物按名称或 plantId 与 owned 比较
+    （owned 为 None 时与本次可解锁的植物比较）。
+    这不是云函数的逐行移植：getUnlockedPlants 只比较积分和减碳量；checkUnlockStatus 另外检查前置植物，
+    用花园中植物的 type 与 prerequisitePlants 比较，两者都不检查等级
+    """
+    by_name = {p['name']: p['plantId'] for p in plants}
+    rank = LEVEL_RANK[level]
+    passed = []
+    for plant in plants:
+        if plant.get('status', 'active') != 'active':
+            continue
+        plant_level, need_points, need_carbon, _ = _requirements(plant)
+        if LEVEL_RANK[plant_level] <= rank and points >= need_points and carbon >= need_carbon:
+            passed.append(plant)
+
+    available = {p['plantId'] for p in passed}
+    if owned is not None:
+        satisfied = {by_name.get(item, item) for item in owned}
+    else:
+        satisfied = available
+    # 前置链条可能跨越多层，反复剔除直到稳定
+    changed = True
+    while changed:
+        changed = False
+        for plant in passed:
+            if plant['plantId'] not in available:
+                continue
+            deps = [by_name.get(ref, ref) for ref in _requirements(plant)[3]]
+            if any(dep not in satisfied for dep in deps):
+                available.discard(plant['plantId'])
+                changed = True
+    return [p['plantId'] for p in passed if p['plantId'] in available]
+
+
+def build_growth_tables(plants):
+    """
+    生成每株植物的生长阶段前缀和表：
+    cumulativeDays[i] / cumulativeCarbon[i] 为完成第 i+1 个阶段所需的累计天数 / 累计减碳量，
+    两项都达到才算完成该阶段
+    """
+    tables = {}
+    for plant in plants:
+        stages = plant.get('growthStages') or []
+        days, carbon = [], []
+        total_days, total_carbon = 0, 0
+        for stage in stages:
+            total_days += stage.get('duration') or 0
+            total_carbon += stage.get('requiredCarbon') or 0
+            days.append(total_days)
+            carbon.append(total_carbon)
+        tables[plant['plantId']] = {
+            'stages': [stage.get('stage', i + 1) for i, stage in enumerate(stages)],
+            'cumulativeDays': days,
+            'cumulativeCarbon': carbon,
+        }
+    return tables
+
+
+class GrowthResolver:
+    """
+    根据 (plantId, 已生长天数, 累计减碳量) 计算当前生长阶段与进度
+    单个查询用 bisect，批量查询把所有植物的前缀和按 植物序号 × 跨度 + 数值 拼成一个有序数组，
+    一次 numpy.searchsorted 完成全部二分
+    """
+
+    def __init__(self, tables):
+        self.tables = tables
+        self.plant_ids = list(tables)
+        self.codes = {plant_id: i for i, plant_id in enumerate(self.plant_ids)}
+        self._arrays = None
+
+    @classmethod
+    def from_plants(cls, plants):
+        return cls(build_growth_tables(plants))
+
+    @classmethod
+    def from_json(cls, path=GROWTH_TABLE_FILE):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def resolve(self, plant_id, elapsed_days, carbon_accrued):
+        """
+        返回 {'stage': 当前阶段编号, 'stageIndex': 从 0 开始的阶段序号, 'stageProgress': 本阶段进度 0~1,
+              'percent': 整体进度 0~100, 'mature': 是否已完成全部阶段}
+        """
+        table = self.tables[plant_id]
+        days, carbon = table['cumulativeDays'], table['cumulativeCarbon']
+        count = len(days)
+        if not count:
+            return {'stage': None, 'stageIndex': 0, 'stageProgress': 1.0, 'percent': 100.0, 'mature': True}
+        completed = min(bisect.bisect_right(days, elapsed_days), bisect.bisect_right(carbon, carbon_accrued))
+        if completed >= count:
+            return {'stage': table['stages'][-1], 'stageIndex': count - 1, 'stageProgress': 1.0,
+                    'percent': 100.0, 'mature': True}
+
+        start_days = days[completed - 1] if completed else 0
+        start_carbon = carbon[completed - 1] if completed else 0
+        progress = min(
+            _fraction(elapsed_days - start_days, days[completed] - start_days),
+            _fraction(carbon_accrued - start_carbon, carbon[completed] - start_carbon),
+        )
+        return {
+            'stage': table['stages'][completed],
+            'stageIndex': completed,
+            'stageProgress': progress,
+            'percent': 100.0 * (completed + progress) / count,
+            'mature': False,
+        }
+
+    def encode(self, plant_ids):
+        """把 plantId 列表转换为批量接口使用的整数编码数组"""
+        import numpy as np
+        return np.fromiter((self.codes[plant_id] for plant_id in plant_ids), dtype=np.int32, count=len(plant_ids))
+
+    def _batch_arrays(self):
+        if self._arrays is None:
+            import numpy as np
+            counts = np.array([len(self.tables[p]['cumulativeDays']) for p in self.plant_ids], dtype=np.int64)
+            offsets = np.concatenate(([0], np.cumsum(counts)))
+            # 每株植物的数值落在 [植物序号 × 跨度, (植物序号 + 1) × 跨度) 内，拼接后整体有序
+            day_span = 1.0 + max([t['cumulativeDays'][-1] for t in self.tables.values() if t['cumulativeDays']] or [0])
+            carbon_span = 1.0 + max([t['cumulativeCarbon'][-1] for t in self.tables.values() if t['cumulativeCarbon']] or [0])
+            rows = np.repeat(np.arange(len(self.plant_ids)), counts)
+            flat_days = np.concatenate([self.tables[p]['cumulativeDays'] for p in self.plant_ids] + [[]]).astype(np.float64)
+            flat_carbon = np.concatenate([self.tables[p]['cumulativeCarbon'] for p in self.plant_ids] + [[]]).astype(np.float64)
+            # 阶段起点表：每株植物 [0, c1, ..., cn]，用 offsets + 植物序号 + 已完成阶段数 定位
+            start_offsets = offsets[:-1] + np.arange(len(self.plant_ids))
+            starts_days = np.insert(flat_days, offsets[:-1], 0.0)
+            starts_carbon = np.insert(flat_carbon, offsets[:-1], 0.0)
+            self._arrays = {
+                'counts': counts, 'offsets': offsets, 'startOffsets': start_offsets,
+                'daySpan': day_span, 'carbonSpan': carbon_span,
+                'dayKeys': rows * day_span + flat_days, 'carbonKeys': rows * carbon_span + flat_carbon,
+                'startsDays': starts_days, 'startsCarbon': starts_carbon,
+            }
+        return self._arrays
+
+    def resolve_batch(self, plant_codes, elapsed_days, carbon_accrued):
+        """
+        批量计算，参数均为等长的 NumPy 数组（plant_codes 来自 encode()），
+        返回 (阶段序号 stageIndex, 本阶段进度 stageProgress, 整体进度 percent) 三个数组
+        """
+        import numpy as np
+        a = self._batch_arrays()
+        codes = np.asarray(plant_codes, dtype=np.int64)
+        days = np.clip(np.asarray(elapsed_days, dtype=np.float64), 0, a['daySpan'] - 1)
+        carbon = np.clip(np.asarray(carbon_accrued, dtype=np.float64), 0, a['carbonSpan'] - 1)
+
+        base = a['offsets'][codes]
+        done_days = np.searchsorted(a['dayKeys'], codes * a['daySpan'] + days, side='right') - base
+        done_carbon = np.searchsorted(a['carbonKeys'], codes * a['carbonSpan'] + carbon, side='right') - base
+        counts = a['counts'][codes]
+        completed = np.minimum(done_days, done_carbon)
+        mature = completed >= counts
+        current = np.minimum(completed, np.maximum(counts - 1, 0))
+
+        start = a['startOffsets'][codes] + current
+        end = np.minimum(start + 1, len(a['startsDays']) - 1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            day_length = a['startsDays'][end] - a['startsDays'][start]
+            carbon_length = a['startsCarbon'][end] - a['startsCarbon'][start]
+            day_fraction = np.where(day_length > 0, (days - a['startsDays'][start]) / day_length, 1.0)
+            carbon_fraction = np.where(carbon_length > 0, (carbon - a['startsCarbon'][start]) / carbon_length, 1.0)
+        progress = np.clip(np.minimum(day_fraction, carbon_fraction), 0.0, 1.0)
+        progress[mature] = 1.0
+        percent = np.where(counts > 0, 100.0 * (current + progress) / np.maximum(counts, 1), 100.0)
+        percent[mature] = 100.0
+        return current, progress, percent
+
+
+def _fraction(value, length):
+    if length <= 0:
+        return 1.0
+    return min(max(value / length, 0.0), 1.0)
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+菜单项碳足迹批量重算脚本
+因子更新后需要重算所有租户的 restaurant_menu_items，云函数 recalculateMenuItems 逐条计算且受超时限制。
+本脚本读取菜单项（以及菜谱 / 配方版本、餐厅、基准值）的 JSONL 导出，按 restaurantId 哈希分片，
+在进程池中用 menu_recalc.py（与云函数相同的 L1 / L2 / L3 规则）重算，每个分片写出一个 JSONL 更新批次:
+    {"_id": ..., "restaurantId": ..., "unset": [需先删除的旧格式字段], "data": updateData}
+
+断点续算：每算完一个餐厅，在分片的检查点日志中追加一行（餐厅 ID、更新文件的字节偏移、耗时、失败项），
+重新运行同样的命令时跳过已完成的餐厅，并把更新文件截断到最后一个完整餐厅处。
+输出目录结构:
+    <out>/manifest.json                分片参数、输入文件指纹、本次重算的 calculatedAt
+    <out>/shards/items-NNNNN.jsonl     按餐厅分片后的菜单项
+    <out>/updates/updates-NNNNN.jsonl  更新批次
+    <out>/checkpoints/shard-NNNNN.jsonl
+
+用法:
+    python scripts/recalculate-menu-items.py --menu-items export/restaurant_menu_items.jsonl --out /tmp/recalc
+    python scripts/recalculate-menu-items.py --menu-items items.jsonl --recipes recipes.jsonl recipe_versions.jsonl \\
+        --restaurants restaurants.jsonl --baselines carbon_baselines.jsonl --workers 8 --out /tmp/recalc
+    python scripts/recalculate-menu-items.py --menu-items items.jsonl --out /tmp/recalc --fresh   # 丢弃检查点重算
+"""
+
+import argparse
+import datetime
+import json
+import os
+import shutil
+import sys
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from factor_region_matrix import REGION_MATRIX_FILE
+from json_stream import atomic_write_json, iter_records
+from menu_recalc import BaselineTable, FactorMatcher, MenuRecalculator, RecalculationError, index_recipes
+
+DEFAULT_SHARDS = 64
+MANIFEST_VERSION = 1
+
+# 进程内的重算器，由 init_worker 在每个进程中构建一次
+_recalculator = None
+
+
+def shard_of(restaurant_id, shards):
+    return zlib.crc32(str(restaurant_id).encode('utf-8')) % shards
+
+
+def shard_paths(out_dir, shard):
+    return (os.path.join(out_dir, 'shards', f"items-{shard:05d}.jsonl"),
+            os.path.join(out_dir, 'updates', f"updates-{shard:05d}.jsonl"),
+            os.path.join(out_dir, 'checkpoints', f"shard-{shard:05d}.jsonl"))
+
+
+def fingerprint(paths):
+    return [{'path': os.path.abspath(path), 'size': os.path.getsize(path), 'mtime': int(os.path.getmtime(path))}
+            for path in paths if path]
+
+
+def partition(menu_items_path, out_dir, shards):
+    """按 restaurantId 把菜单项流式写入 shards 个分片文件，返回菜单项条数"""
+    os.makedirs(os.path.join(out_dir, 'shards'), exist_ok=True)
+    files = [open(shard_paths(out_dir, shard)[0], 'w', encoding='utf-8') for shard in range(shards)]
+    count = 0
+    try:
+        for item in iter_records(menu_items_path):
+            out = files[shard_of(item.get('restaurantId'), shards)]
+            out.write(json.dumps(item, ensure_ascii=False, separators=(',', ':')))
+            out.write('\n')
+            count += 1
+    finally:
+        for f in files:
+            f.close()
+    return count
+
+
+def prepare(args):
+    """分片已存在且输入未变时直接复用（断点续算），否则重新分片；返回 manifest"""
+    manifest_path = os.path.join(args.out, 'manifest.json')
+    inputs = fingerprint([args.menu_items] + (args.recipes or []) + [args.restaurants, args.baselines, args.matrix])
+    if not args.fresh and os.path.exists(manifest_path):
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('version') == MANIFEST_VERSION and manifest.get('inputs') == inputs:
+            return manifest
+        print('⚠️  输入文件或分片参数已变化，丢弃旧的分片和检查点，重新开始')
+
+    for name in ('shards', 'updates', 'checkpoints', 'manifest.json'):
+        path = os.path.join(args.out, name)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        elif os.path.exists(path):
+            os.remove(path)
+    started = time.perf_counter()
+    count = partition(args.menu_items, args.out, args.shards)
+    print(f"📁 {count} 个菜单项已按餐厅分为 {args.shards} 片（{time.perf_counter() - started:.1f}s）")
+    manifest = {
+        'version': MANIFEST_VERSION,
+        'inputs': inputs,
+        'shards': args.shards,
+        'items': count,
+        # 同一次重算（含中断后续算）的所有更新使用同一个 calculatedAt
+        'calculatedAt': datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.000Z'),
+    }
+    atomic_write_json(manifest_path, manifest)
+    return manifest
+
+
+def read_checkpoint(path):
+    """
+    ([记录], 完整行的字节数)；只保留以换行结尾、能解析的行，写到一半被中断的最后一行不计入字节数，
+    续算前按该字节数截断检查点文件
+    """
+    entries, size = [], 0
+    if os.path.exists(path):
+        with open(path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    break
+                size += len(line)
+    return entries, size
+
+
+def init_worker(args, calculated_at):
+    global _recalculator
+    recipes, versions = index_recipes(record for path in args.recipes or [] for record in iter_records(path))
+    restaurants = None
+    if args.restaurants:
+        # 只保留计算用到的地区，餐厅很多时也不占多少内存
+        restaurants = {doc.get('_id') or doc.get('restaurantId'): {'region': doc.get('region')}
+                       for doc in iter_records(args.restaurants)}
+    baselines = BaselineTable(iter_records(args.baselines) if args.baselines else ())
+    _recalculator = MenuRecalculator(FactorMatcher.from_file(args.matrix), baselines, recipes=recipes,
+                                     versions=versions, restaurants=restaurants, calculated_at=calculated_at)
+
+
+def process_shard(task):
+    """进程池任务：重算一个分片中尚未完成的餐厅，返回 (分片号, 本次重算的菜单项数, 本次失败数)"""
+    out_dir, shard = task
+    items_path, updates_path, checkpoint_path = shard_paths(out_dir, shard)
+    entries, checkpoint_size = read_checkpoint(checkpoint_path)
+    done = {entry['restaurantId'] for entry in entries}
+    offset = entries[-1]['offset'] if entries else 0
+
+    restaurants = {}
+    with open(items_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            item = json.loads(line)
+            if item.get('restaurantId') not in done:
+                restaurants.setdefault(item.get('restaurantId'), []).append(item)
+    if not restaurants:
+        return shard, 0, 0
+
+    os.makedirs(os.path.dirname(updates_path), exist_ok=True)
+    os.makedirs(os.path.dirname(checkpoint_path), exist_ok=True)
+    processed = failed_total = 0
+    with open(updates_path, 'ab') as updates, open(checkpoint_path, 'a', encoding='utf-8') as checkpoint:
+        # 上次中断时写了一半的餐厅不计入检查点，截掉；检查点写了一半的最后一行同样截掉，否则新记录会接在它后面
+        updates.truncate(offset)
+        updates.seek(offset)
+        checkpoint.truncate(checkpoint_size)
+        checkpoint.seek(checkpoint_size)
+        for restaurant_id, items in restaurants.items():
+            started = time.perf_counter()
+            failed = []
+            for item in items:
+                try:
+                    update = _recalculator.recalculate(item)
+                except RecalculationError as e:
+                    failed.append({'_id': item.get('_id'), 'code': e.code, 'message': e.message})
+                    continue
+                except Exception as e:
+                    failed.append({'_id': item.get('_id'), 'code': 500, 'message': str(e)})
+                    continue
+                updates.write(json.dumps(update, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+                updates.write(b'\n')
+            updates.flush()
+            checkpoint.write(json.dumps({
+                'restaurantId': restaurant_id,
+                'offset': updates.tell(),
+                'items': len(items),
+                'failed': failed,
+                'seconds': round(time.perf_counter() - started, 6),
+            }, ensure_ascii=False) + '\n')
+            checkpoint.flush()
+            processed += len(items)
+            failed_total += len(failed)
+    return shard, processed, failed_total
+
+
+def main():
+    parser = argparse.ArgumentParser(description='按餐厅分片、多进程批量重算菜单项碳足迹，支持断点续算')
+    parser.add_argument('--menu-items', required=True, help='restaurant_menu_items 导出（JSON 数组或 JSONL）')
+    parser.add_argument('--recipes', nargs='+', help='recipes / recipe_versions 导出（菜单项没有食材时使用）')
+    parser.add_argument('--restaurants', help='restaurants 导出（菜单项没有 restaurantRegion 时取餐厅地区，并校验餐厅存在）')
+    parser.add_argument('--baselines', help='carbon_baselines 导出（不提供时使用系统默认基准值）')
+    parser.add_argument('--matrix', default=REGION_MATRIX_FILE, help='build-factor-region-matrix.py 生成的因子矩阵')
+    parser.add_argument('--out', required=True, help='输出目录（分片、更新批次、检查点）')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='进程数')
+    parser.add_argument('--shards', type=int, default=DEFAULT_SHARDS, help='分片数（只在首次运行或 --fresh 时生效）')
+    parser.add_argument('--fresh', action='store_true', help='丢弃已有的分片和检查点，从头重算')
+    parser.add_argument('--limit', type=int, default=10, help='显示最慢的前 N 个餐厅')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.matrix):
+        print(f"❌ 因子矩阵不存在: {args.matrix}，请先运行 build-factor-region-matrix.py")
+        sys.exit(1)
+    manifest = prepare(args)
+    shards = manifest['shards']
+
+    print(f"🔄 重算 {manifest['items']} 个菜单项，{shards} 个分片，{args.workers} 个进程")
+    started = time.perf_counter()
+    processed = failed = 0
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker,
+                             initargs=(args, manifest['calculatedAt'])) as pool:
+        futures = [pool.submit(process_shard, (args.out, shard)) for shard in range(shards)]
+        for n, future in enumerate(as_completed(futures), 1):
+            _, count, errors = future.result()
+            processed += count
+            failed += errors
+            if n % max(1, shards // 10) == 0 or n == shards:
+                elapsed = time.perf_counter() - started
+                print(f"  ✓ {n}/{shards} 片，本次已算 {processed} 项（{processed / max(elapsed, 1e-9):,.0f} 项/秒）")
+    elapsed = time.perf_counter() - started
+
+    entries = [entry for shard in range(shards) for entry in read_checkpoint(shard_paths(args.out, shard)[2])[0]]
+    total_items = sum(entry['items'] for entry in entries)
+    total_failed = sum(len(entry['failed']) for entry in entries)
+    print(f"\n✅ 本次重算 {processed} 项（失败 {failed}），耗时 {elapsed:.2f}s（{processed / max(elapsed, 1e-9):,.0f} 项/秒）")
+    print(f"📊 累计完成 {len(entries)} 个餐厅、{total_items}/{manifest['items']} 项，写出更新 {total_items - total_failed} 条")
+
+    if total_failed:
+        reasons = {}
+        for entry in entries:
+            for failure in entry['failed']:
+                reasons[failure['message']] = reasons.get(failure['message'], 0) + 1
+        print('\n⚠️  失败原因:')
+        for message, count in sorted(reasons.items(), key=lambda x: -x[1])[:args.limit]:
+            print(f"  - {message}: {count} 项")
+
+    slowest = sorted(entries, key=lambda entry: -entry['seconds'])[:args.limit]
+    if slowest:
+        print(f"\n最慢的 {len(slowest)} 个餐厅:")
+        for entry in slowest:
+            per_item = entry['seconds'] / max(entry['items'], 1) * 1000
+            print(f"  - {entry['restaurantId']}: {entry['items']} 项，{entry['seconds']:.3f}s（{per_item:.2f} ms/项）")
+    print(f"\n📁 更新批次: {os.path.join(args.out, 'updates')}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+食谱碳足迹批量重算脚本
+用 recipe_carbon.py 一次性重算全部食谱的碳足迹（食谱 × 因子稀疏矩阵乘以因子值向量，再乘烹饪方式系数），
+与食谱中手工填写的 carbonComparison.veganCarbon 对比，列出偏差超过阈值的食谱，
+以及无法匹配因子的食材、无法换算为重量的用量（单位换算见 unit_normalizer.py）和不在系数表中的烹饪方式；
+食材名称默认经 factor_resolver.py 做别名 / 包含 / 模糊匹配，--exact 时只按名称和别名精确匹配
+
+用法:
+    python scripts/recalculate-recipe-carbon.py
+    python scripts/recalculate-recipe-carbon.py --tolerance 0.3 --min-coverage 0.8 --json drift.json
+    python scripts/recalculate-recipe-carbon.py --scale 2000        # 把食谱复制到 10 万条以上测吞吐
+    python scripts/recalculate-recipe-carbon.py --recipes /tmp/recipes.json --update
+"""
+
+import argparse
+import json
+import sys
+import time
+
+from factor_resolver import DEFAULT_MIN_CONFIDENCE, NameResolver
+from json_stream import atomic_write_json
+from recipe_carbon import FACTORS_FILE, INGREDIENTS_FILE, RECIPES_FILE, FactorTable, find_drift, recalculate
+from schema_validator import validate_or_exit
+from unit_normalizer import UnitNormalizer
+
+
+def main():
+    parser = argparse.ArgumentParser(description='批量重算食谱碳足迹并检查手工填写值的偏差')
+    parser.add_argument('--recipes', default=RECIPES_FILE, help='食谱数据文件')
+    parser.add_argument('--factors', default=FACTORS_FILE, help='碳因子数据文件')
+    parser.add_argument('--ingredients', default=INGREDIENTS_FILE, help='食材数据文件（因子库缺失时补充）')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='允许的相对偏差')
+    parser.add_argument('--min-coverage', type=float, default=1.0,
+                        help='只比较食材行可计算占比不低于该值的食谱')
+    parser.add_argument('--match-confidence', type=float, default=DEFAULT_MIN_CONFIDENCE,
+                        help='食材名称匹配因子的最低置信度（见 factor_resolver.py）')
+    parser.add_argument('--exact', action='store_true', help='只按因子名称和别名精确匹配食材')
+    parser.add_argument('--scale', type=int, default=1, help='把食谱重复 N 遍后计算，用于测试吞吐')
+    parser.add_argument('--limit', type=int, default=20, help='最多显示的偏差食谱数')
+    parser.add_argument('--update', action='store_true',
+                        help='把计算值写回 veganCarbon 并重算 savingsPercent（只更新覆盖率达到 --min-coverage 的食谱）')
+    parser.add_argument('--json', dest='json_output', help='把偏差报告写入 JSON 文件')
+    args = parser.parse_args()
+
+    with open(args.recipes, 'r', encoding='utf-8') as f:
+        recipes = json.load(f)
+    if args.update and args.scale != 1:
+        print("❌ --update 不能与 --scale 同时使用")
+        sys.exit(1)
+    batch = recipes * args.scale
+
+    table = FactorTable.from_files(args.factors, args.ingredients)
+    name_resolver = None if args.exact else NameResolver.from_table(table, min_confidence=args.match_confidence)
+    normalizer = UnitNormalizer.from_files(args.ingredients, args.factors, resolver=name_resolver)
+    start = time.perf_counter()
+    result = recalculate(batch, table, resolver=name_resolver and name_resolver.lookup, normalizer=normalizer)
+    elapsed = time.perf_counter() - start
+    matrix = result['matrix']
+
+    print(f"📊 因子 {len(table.names)} 个，食谱 {len(batch)} 道，食材行 {len(matrix.rows)} 条")
+    print(f"✅ 重算耗时 {elapsed * 1000:.1f} ms（{len(batch) / max(elapsed, 1e-9):,.0f} 道/秒）")
+
+    # 偏差只针对原始食谱报告，--scale 复制出来的部分结果相同
+    result = {key: value[:len(recipes)] if key in ('carbon', 'coverage', 'stored') else value
+              for key, value in result.items()}
+    drifted, incomparable, relative = find_drift(result, args.tolerance, args.min_coverage)
+    covered = result['coverage'] >= args.min_coverage
+    print(f"📊 食材全部可计算的食谱 {int((result['coverage'] >= 1.0).sum())}/{len(recipes)}，"
+          f"覆盖率不足无法比较 {len(incomparable)} 道")
+
+    if len(drifted):
+        print(f"\n⚠️ 记录值与计算值偏差超过 {args.tolerance:.0%} 的食谱 {len(drifted)} 道:")
+        for i in drifted[:args.limit]:
+            recipe = recipes[i]
+            print(f"  - {recipe.get('recipeId')} {recipe.get('name')}: "
+                  f"记录 {result['stored'][i]:.3f}，计算 {result['carbon'][i]:.3f} kgCO2e（偏差 {relative[i]:.0%}）")
+    else:
+        print(f"\n✅ 没有偏差超过 {args.tolerance:.0%} 的食谱")
+
+    unresolved = matrix.unresolved_names()
+    if unresolved:
+        print(f"\n⚠️ 无法匹配因子的食材 {len(unresolved)} 种: "
+              + '、'.join(f"{name}({count})" for name, count in unresolved[:args.limit]))
+    units = matrix.unconvertible_units()
+    if units:
+        print(f"⚠️ 无法换算为重量的食材用量 {len(units)} 种: "
+              + '、'.join(f"{name}/{unit}({count})" for name, unit, count in units[:args.limit]))
+    if result['unknownMethods']:
+        print(f"⚠️ 不在 cookingFactors 中的烹饪方式（按默认系数计算）: {'、'.join(result['unknownMethods'])}")
+
+    if args.json_output:
+        report = {
+            'recipes': len(recipes),
+            'elapsedMs': round(elapsed * 1000, 3),
+            'tolerance': args.tolerance,
+            'minCoverage': args.min_coverage,
+            'drifted': [{
+                'recipeId': recipes[i].get('recipeId'),
+                'stored': float(result['stored'][i]),
+                'computed': round(float(result['carbon'][i]), 4),
+                'relative': round(float(relative[i]), 4),
+            } for i in drifted],
+            'unresolvedNames': dict(unresolved),
+            'unconvertibleUnits': [{'name': name, 'unit': unit, 'lines': count} for name, unit, count in units],
+            'unknownMethods': result['unknownMethods'],
+        }
+        with open(args.json_output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"📁 报告已保存至: {args.json_output}")
+
+    if args.update:
+        updated, no_comparison, over_meat = 0, [], []
+        for i in range(len(recipes)):
+            if not covered[i]:
+                continue
+            comparison = recipes[i].get('carbonComparison')
+            if not isinstance(comparison, dict):
+                # 没有对比数据的食谱缺少 meatCarbon，不凭空补出半个 carbonComparison
+                no_comparison.append(recipes[i].get('recipeId'))
+                continue
+            value = round(float(result['carbon'][i]), 2)
+            if comparison.get('veganCarbon') == value:
+                continue
+            meat = comparison.get('meatCarbon')
+            if isinstance(meat, (int, float)) and meat > 0:
+                if value > meat:
+                    over_meat.append(recipes[i].get('recipeId'))
+                    continue
+                comparison['savingsPercent'] = round((meat - value) / meat * 100, 1)
+            comparison['veganCarbon'] = value
+            updated += 1
+        if no_comparison:
+            print(f"⚠️ 没有 carbonComparison 的食谱 {len(no_comparison)} 道，未更新: "
+                  + '、'.join(str(r) for r in no_comparison[:args.limit]))
+        if over_meat:
+            print(f"⚠️ 计算值超过 meatCarbon 的食谱 {len(over_meat)} 道，需先核对 meatCarbon，未更新: "
+                  + '、'.join(str(r) for r in over_meat[:args.limit]))
+        if updated:
+            validate_or_exit('recipes', recipes)
+            atomic_write_json(args.recipes, recipes)
+        print(f"✅ 已更新 {updated} 道食谱的 veganCarbon / savingsPercent: {args.recipes}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+食谱碳足迹批量计算模块
+把全部食谱的食材行一次性整理为 食谱 × 因子 的稀疏矩阵（行号、列号、重量 kg 三个数组），
+与因子值向量相乘后按食谱求和，再乘以烹饪方式系数，得到每道菜的碳足迹；
+烹饪方式系数直接读取 cloudfunctions/carbon/carbon-calculator.js 中的 cookingFactors，与云函数保持一致
+"""
+
+import json
+import os
+import re
+
+import numpy as np
+
+from unit_normalizer import UnitNormalizer
+
+ROOT_DIR = os.path.join(os.path.dirname(__file__), '..')
+FACTORS_FILE = os.path.join(ROOT_DIR, 'cloudfunctions/database/all-reliable-factors.json')
+INGREDIENTS_FILE = os.path.join(ROOT_DIR, 'cloudfunctions/data-import/ingredients-data.json')
+RECIPES_FILE = os.path.join(ROOT_DIR, 'cloudfunctions/recipe-data-import/recipe-data.json')
+CARBON_CALCULATOR_JS = os.path.join(ROOT_DIR, 'cloudfunctions/carbon/carbon-calculator.js')
+
+# 与 CarbonCalculator.getCookingFactor() 一致：未知烹饪方式按炒菜系数计算
+DEFAULT_COOKING_FACTOR = 1.15
+
+UNRESOLVED = -1
+
+
+def load_cooking_factors(path=CARBON_CALCULATOR_JS):
+    """从 carbon-calculator.js 的 this.cookingFactors = {...} 中读取烹饪方式系数"""
+    with open(path, 'r', encoding='utf-8') as f:
+        source = f.read()
+    block = re.search(r'this\.cookingFactors\s*=\s*\{(.*?)\};', source, re.S)
+    if block is None:
+        raise ValueError(f"{path} 中没有找到 cookingFactors 定义")
+    return {name: float(value) for name, value in re.findall(r"'([^']+)'\s*:\s*([\d.]+)", block.group(1))}
+
+
+class FactorTable:
+    """
+    碳因子表：优先使用因子库（名称与别名，单位 kgCO2e/kg），
+    因子库中没有的再用食材库的 carbonFootprint 补充；
+    uncertainties 为各因子的不确定度（%），未知为 nan
+    """
+
+    def __init__(self, entries, uncertainties=None):
+        # entries: [(名称, 因子值, 来源, [别名...])]
+        self.names = [name for name, _, _, _ in entries]
+        self.values = np.array([value for _, value, _, _ in entries], dtype=np.float64)
+        if uncertainties is None:
+            uncertainties = [np.nan] * len(entries)
+        self.uncertainties = np.array([np.nan if u is None else u for u in uncertainties], dtype=np.float64)
+        self.sources = [source for _, _, source, _ in entries]
+        self.aliases = [list(aliases) for _, _, _, aliases in entries]
+        self.index = {}
+        for col, name in enumerate(self.names):
+            self.index.setdefault(name, col)
+        # 别名的优先级低于名称，避免别名覆盖另一个因子的正式名称
+        for col, (_, _, _, aliases) in enumerate(entries):
+            for alias in aliases:
+                self.index.setdefault(alias, col)
+
+    @classmethod
+    def from_files(cls, factors_path=FACTORS_FILE, ingredients_path=INGREDIENTS_FILE):
+        entries, uncertainties, seen = [], [], set()
+        if factors_path and os.path.exists(factors_path):
+            with open(factors_path, 'r', encoding='utf-8') as f:
+                for factor in json.load(f):
+                    if factor.get('status', 'active') != 'active' or factor.get('unit') != 'kgCO2e/kg':
+                        continue
+                    entries.append((factor['name'], float(factor['factorValue']), 'factor', factor.get('alias') or []))
+                    uncertainties.append(factor.get('uncertainty'))
+                    seen.add(factor['name'])
+                    seen.update(factor.get('alias') or [])
+        if ingredients_path and os.path.exists(ingredients_path):
+            with open(ingredients_path, 'r', encoding='utf-8') as f:
+                for item in json.load(f):
+                    if item['name'] not in seen and item.get('carbonFootprint') is not None:
+                        entries.append((item['name'], float(item['carbonFootprint']), 'ingredient', []))
+                        uncertainties.append(None)
+                        seen.add(item['name'])
+        return cls(entries, uncertainties)
+
+    def lookup(self, name):
+        return self.index.get(name, UNRESOLVED)
+
+
+class RecipeMatrix:
+    """
+    食谱 × 因子稀疏矩阵（COO 形式）
+    rows / cols / kg 为每个食材行的食谱序号、因子列号（无法匹配为 -1）与重量（无法换算为 nan）
+    """
+
+    def __init__(self, recipes, table, resolver=None, normalizer=None):
+        resolver = resolver or table.lookup
+        self.normalizer = normalizer or UnitNormalizer.from_files()
+        self.count = len(recipes)
+
+        # 遍历时把名称和单位编码为整数：每个不同的名称 / 单位只查一次，再按编码展开到所有食材行
+        name_codes, unit_codes = {}, {}
+        rows, name_idx, unit_idx, amounts = [], [], [], []
+        for row, recipe in enumerate(recipes):
+            for line in recipe.get('ingredients') or []:
+                rows.append(row)
+                name_idx.append(name_codes.setdefault(line.get('name', ''), len(name_codes)))
+                unit_idx.append(unit_codes.setdefault(line.get('unit', ''), len(unit_codes)))
+                amounts.append(line.get('amount') or 0)
+        self.rows = np.array(rows, dtype=np.int64)
+        self.name_list = list(name_codes)
+        self.unit_list = list(unit_codes)
+        self.name_idx = np.array(name_idx, dtype=np.int64)
+        self.unit_idx = np.array(unit_idx, dtype=np.int64)
+
+        name_cols = np.array([resolver(name) for name in self.name_list], dtype=np.int64)
+        self.cols = name_cols[self.name_idx]
+        self.kg = self.normalizer.to_kg(amounts, self.name_idx, self.unit_idx, self.name_list, self.unit_list)
+
+    @property
+    def resolved(self):
+        return (self.cols != UNRESOLVED) & ~np.isnan(self.kg)
+
+    def multiply(self, values):
+        """稀疏矩阵 × 因子值向量，返回每道食谱的食材碳足迹之和（无法匹配或换算的行不计入）"""
+        ok = self.resolved
+        weights = self.kg[ok] * values[self.cols[ok]]
+        return np.bincount(self.rows[ok], weights=weights, minlength=self.count)
+
+    def coverage(self):
+        """每道食谱中既能匹配因子、又能换算重量的食材行占比"""
+        lines = np.bincount(self.rows, minlength=self.count)
+        resolved_lines = np.bincount(self.rows[self.resolved], minlength=self.count)
+        return np.where(lines > 0, resolved_lines / np.maximum(lines, 1), 1.0)
+
+    def _count_codes(self, codes, mask, labels):
+        counts = np.bincount(codes[mask], minlength=len(labels))
+        order = np.argsort(-counts, kind='stable')
+        return [(labels[i], int(counts[i])) for i in order if counts[i]]
+
+    def unresolved_names(self):
+        """无法匹配因子的食材名称及出现次数"""
+        return self._count_codes(self.name_idx, self.cols == UNRESOLVED, self.name_list)
+
+    def unconvertible_units(self):
+        """无法换算为重量的 (食材, 单位, 行数)"""
+        return self.normalizer.unconvertible(self.name_idx, self.unit_idx, self.name_list, self.unit_list)
+
+
+def cooking_multipliers(recipes, cooking_factors):
+    """每道食谱的烹饪方式系数，以及不在系数表中的烹饪方式"""
+    methods = [recipe.get('cookingMethod') for recipe in recipes]
+    unknown = sorted({m for m in methods if m not in cooking_factors})
+    values = np.array([cooking_factors.get(m, DEFAULT_COOKING_FACTOR) for m in methods], dtype=np.float64)
+    return values, unknown
+
+
+def recalculate(recipes, table=None, cooking_factors=None, resolver=None, normalizer=None):
+    """
+    批量计算全部食谱的碳足迹，返回字典：
+    carbon: 含烹饪系数的碳足迹（kgCO2e）；coverage: 可计算食材行占比；
+    stored: 食谱中记录的 carbonComparison.veganCarbon；matrix: RecipeMatrix；unknownMethods
+    """
+    table = table or FactorTable.from_files()
+    cooking_factors = cooking_factors if cooking_factors is not None else load_cooking_factors()
+    matrix = RecipeMatrix(recipes, table, resolver, normalizer)
+    multipliers, unknown = cooking_multipliers(recipes, cooking_factors)
+    stored = np.array([
+        (recipe.get('carbonComparison') or {}).get('veganCarbon', np.nan) for recipe in recipes
+    ], dtype=np.float64)
+    return {
+        'carbon': matrix.multiply(table.values) * multipliers,
+        'coverage': matrix.coverage(),
+        'stored': stored,
+        'matrix': matrix,
+        'unknownMethods': unknown,
+    }
+
+
+def find_drift(result, tolerance, min_coverage=1.0):
+    """
+    返回记录值与计算值相对偏差超过 tolerance 的食谱序号（只比较食材覆盖率达到 min_coverage 的食谱），
+    以及因覆盖率不足而无法判断的食谱序号
+    """
+    carbon, stored, coverage = result['carbon'], result['stored'], result['coverage']
+    comparable = (coverage >= min_coverage) & ~np.isnan(stored)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        relative = np.abs(stored - carbon) / np.where(carbon > 0, carbon, np.nan)
+    drifted = comparable & (np.nan_to_num(relative, nan=np.inf) > tolerance)
+    return np.flatnonzero(drifted), np.flatnonzero(~comparable), relative
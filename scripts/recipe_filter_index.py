@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+食谱筛选位图索引模块
+为食谱的每个筛选维度（标签、季节、菜系、分类、难度、食材、状态）的每个取值建一张压缩位图（roaring_bitmap.py），
+烹饪时长按区间分桶，每桶一张位图；筛选时同一维度内的多个取值取并集，不同维度之间取交集，
+分面计数为结果位图与各取值位图的交集计数，都只做位运算，不再逐条扫描食谱。
+索引序列化为 JSON，放在 recipe-data.json 同目录的 recipe-filter-index.json
+"""
+
+import json
+import os
+
+import numpy as np
+
+from factor_resolver import normalize_name
+from roaring_bitmap import RoaringBitmap
+
+RECIPES_FILE = os.path.join(os.path.dirname(__file__), '../cloudfunctions/recipe-data-import/recipe-data.json')
+FILTER_INDEX_FILE = os.path.join(os.path.dirname(__file__), '../cloudfunctions/recipe-data-import/recipe-filter-index.json')
+
+FACETS = ['tags', 'season', 'cuisine', 'category', 'difficulty', 'ingredient', 'status']
+SEASONS = ['spring', 'summer', 'autumn', 'winter']
+
+# 烹饪时长分桶的上界（分钟，左闭右开），最后一桶为 >= 最后一个上界
+TIME_EDGES = [10, 15, 20, 30, 45, 60, 90, 120]
+
+
+def facet_values(recipe):
+    """食谱在各维度上的取值；season 为逗号分隔字符串，'all' 展开为四季"""
+    seasons = set()
+    for season in (recipe.get('season') or '').split(','):
+        season = season.strip()
+        if season == 'all':
+            seasons.update(SEASONS)
+        elif season:
+            seasons.add(season)
+    return {
+        'tags': set(recipe.get('tags') or []),
+        'season': seasons,
+        'cuisine': {recipe['cuisine']} if recipe.get('cuisine') else set(),
+        'category': {recipe['category']} if recipe.get('category') else set(),
+        'difficulty': {recipe['difficulty']} if recipe.get('difficulty') else set(),
+        'ingredient': {normalize_name(line.get('name')) for line in recipe.get('ingredients') or [] if line.get('name')},
+        'status': {recipe.get('status', 'active')},
+    }
+
+
+def time_bucket(minutes):
+    return int(np.searchsorted(TIME_EDGES, minutes, side='right'))
+
+
+class RecipeFilterIndex:
+    """
+    用法:
+        index = RecipeFilterIndex.build(recipes)
+        hits = index.filter({'season': ['winter'], 'cuisine': ['sichuan', 'cantonese']}, cooking_time=(0, 30))
+        index.facet_counts(hits, ['tags', 'difficulty'])
+        index.ids_of(hits)
+    """
+
+    def __init__(self, ids, cooking_time, facets, time_buckets):
+        self.ids = ids
+        self.cooking_time = np.asarray(cooking_time, dtype=np.int32)
+        self.facets = facets
+        self.time_buckets = time_buckets
+        self.universe = RoaringBitmap.full(len(ids))
+
+    @classmethod
+    def build(cls, recipes):
+        postings = {facet: {} for facet in FACETS}
+        for row, recipe in enumerate(recipes):
+            for facet, values in facet_values(recipe).items():
+                for value in values:
+                    postings[facet].setdefault(value, []).append(row)
+        cooking_time = np.array([recipe.get('cookingTime') or 0 for recipe in recipes], dtype=np.int32)
+        buckets = np.searchsorted(TIME_EDGES, cooking_time, side='right')
+        facets = {
+            facet: {value: RoaringBitmap.from_ids(rows) for value, rows in sorted(values.items())}
+            for facet, values in postings.items()
+        }
+        time_buckets = [RoaringBitmap.from_ids(np.flatnonzero(buckets == b), presorted=True) for b in range(len(TIME_EDGES) + 1)]
+        return cls([recipe.get('recipeId') for recipe in recipes], cooking_time, facets, time_buckets)
+
+    def _facet_union(self, facet, values):
+        if facet not in self.facets:
+            raise ValueError(f"未知的筛选维度: {facet}")
+        bitmaps = self.facets[facet]
+        if facet == 'ingredient':
+            values = [normalize_name(v) for v in values]
+        result = RoaringBitmap()
+        for value in values:
+            if value in bitmaps:
+                result = result | bitmaps[value]
+        return result
+
+    def time_range(self, low=None, high=None):
+        """烹饪时长在 [low, high] 内的食谱：整桶直接取并集，首尾两个部分覆盖的桶再按实际时长过滤"""
+        low = 0 if low is None else low
+        high = np.iinfo(np.int32).max if high is None else high
+        first, last = time_bucket(low), time_bucket(high)
+        result = RoaringBitmap()
+        for b in range(first, last + 1):
+            bucket = self.time_buckets[b]
+            if first < b < last:
+                result = result | bucket
+                continue
+            rows = bucket.to_array()
+            minutes = self.cooking_time[rows]
+            result = result | RoaringBitmap.from_ids(rows[(minutes >= low) & (minutes <= high)], presorted=True)
+        return result
+
+    def filter(self, any_of=None, all_of=None, exclude=None, cooking_time=None):
+        """
+        any_of:  {维度: [取值...]}，同一维度内满足任一取值（析取），维度之间同时满足（合取）
+        all_of:  {维度: [取值...]}，需同时具备全部取值（如必须包含的全部食材）
+        exclude: {维度: [取值...]}，排除具备任一取值的食谱
+        cooking_time: (最短, 最长) 分钟，任一端可为 None
+        """
+        result = self.universe
+        for facet, values in (any_of or {}).items():
+            result = result & self._facet_union(facet, values)
+        for facet, values in (all_of or {}).items():
+            for value in values:
+                result = result & self._facet_union(facet, [value])
+        if cooking_time is not None:
+            result = result & self.time_range(*cooking_time)
+        for facet, values in (exclude or {}).items():
+            result = result - self._facet_union(facet, values)
+        return result
+
+    def facet_counts(self, result, facets=None):
+        """结果集中各维度各取值的食谱数（只返回非零项）"""
+        counts = {}
+        for facet in facets or FACETS:
+            counts[facet] = {}
+            for value, bitmap in self.facets[facet].items():
+                count = result.intersection_count(bitmap)
+                if count:
+                    counts[facet][value] = count
+        return counts
+
+    def ids_of(self, result, offset=0, limit=None):
+        rows = result.to_array()
+        rows = rows[offset:None if limit is None else offset + limit]
+        return [self.ids[row] for row in rows]
+
+    def to_dict(self):
+        return {
+            'version': 1,
+            'count': len(self.ids),
+            'ids': self.ids,
+            'cookingTime': self.cooking_time.tolist(),
+            'timeEdges': TIME_EDGES,
+            'timeBuckets': [bitmap.to_dict() for bitmap in self.time_buckets],
+            'facets': {
+                facet: {value: bitmap.to_dict() for value, bitmap in values.items()}
+                for facet, values in self.facets.items()
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        if data.get('timeEdges') != TIME_EDGES:
+            raise ValueError('索引文件的烹饪时长分桶与当前版本不一致，请重新生成')
+        facets = {
+            facet: {value: RoaringBitmap.from_dict(bitmap) for value, bitmap in values.items()}
+            for facet, values in data['facets'].items()
+        }
+        time_buckets = [RoaringBitmap.from_dict(bitmap) for bitmap in data['timeBuckets']]
+        return cls(data['ids'], data['cookingTime'], facets, time_buckets)
+
+    @classmethod
+    def load(cls, path=FILTER_INDEX_FILE):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+
+def scan_filter(recipes, any_of=None, all_of=None, exclude=None, cooking_time=None):
+    """逐条扫描的基准实现（与 RecipeFilterIndex.filter 语义相同），返回食谱序号列表"""
+    def normalized(conditions):
+        return [(facet, {normalize_name(v) if facet == 'ingredient' else v for v in values})
+                for facet, values in (conditions or {}).items()]
+
+    any_of, all_of, exclude = normalized(any_of), normalized(all_of), normalized(exclude)
+    low, high = cooking_time or (None, None)
+    rows = []
+    for row, recipe in enumerate(recipes):
+        minutes = recipe.get('cookingTime') or 0
+        if (low is not None and minutes < low) or (high is not None and minutes > high):
+            continue
+        values = facet_values(recipe)
+        if any(not values[facet] & wanted for facet, wanted in any_of):
+            continue
+        if any(not wanted <= values[facet] for facet, wanted in all_of):
+            continue
+        if any(values[facet] & unwanted for facet, unwanted in exclude):
+            continue
+        rows.append(row)
+    return rows
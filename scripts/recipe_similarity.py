@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+相似食谱索引模块
+每道食谱取 食材名称 + 标签 + 菜系 作为特征集合，计算 MinHash 签名（Jaccard 相似度的无偏估计），
+再把签名分成若干段（band）做局部敏感哈希：两道食谱只要有一段签名完全相同就成为候选，
+查询只比较候选而不是全部食谱，再按签名一致的比例排序取前 k 个。
+签名按块批量计算（NumPy），分段哈希表为排序后的键数组，查询时二分定位
+"""
+
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from factor_resolver import normalize_name
+
+NEIGHBOR_TABLE_FILE = os.path.join(os.path.dirname(__file__), '../cloudfunctions/recipe/recipe-neighbors.json')
+
+DEFAULT_NUM_PERM = 128
+# 64 段 × 每段 2 行：相似度阈值约 (1/64)^(1/2) ≈ 0.13，现有食谱与近邻的 Jaccard 相似度多在 0.15~0.4
+DEFAULT_BANDS = 64
+DEFAULT_MAX_DF = 0.5
+DEFAULT_MAX_CANDIDATES = 512
+# 每个桶最多取出的食谱数：桶很大说明桶内都是高度相似的食谱，取一部分即可
+DEFAULT_MAX_BUCKET = 64
+
+# 大于 2^32 的素数，哈希值与系数都小于 2^32，乘积不会溢出 uint64
+_PRIME = np.uint64(4294967311)
+_MASK32 = 0xFFFFFFFF
+# 批量计算签名时每块的特征数上限（块内中间数组为 num_perm × 特征数）
+_BLOCK_TOKENS = 1 << 18
+
+
+def recipe_tokens(recipe, canonical=None):
+    """
+    食谱的特征集合：i:食材、t:标签、c:菜系
+    canonical 可选，用于把食材名称归一（如 NameResolver 匹配到的因子名称），嫩豆腐 / 老豆腐 视为同一特征
+    """
+    tokens = set()
+    for line in recipe.get('ingredients') or []:
+        name = normalize_name(line.get('name') if isinstance(line, dict) else line)
+        if name:
+            tokens.add('i:' + (canonical(name) if canonical else name))
+    for tag in recipe.get('tags') or []:
+        tokens.add('t:' + normalize_name(tag))
+    if recipe.get('cuisine'):
+        tokens.add('c:' + normalize_name(recipe['cuisine']))
+    return tokens
+
+
+def stop_tokens(token_sets, max_df=DEFAULT_MAX_DF):
+    """出现在超过 max_df 比例食谱中的特征，对区分食谱没有帮助"""
+    if len(token_sets) < 2:
+        return set()
+    df = {}
+    for tokens in token_sets:
+        for token in tokens:
+            df[token] = df.get(token, 0) + 1
+    limit = max_df * len(token_sets)
+    return {token for token, count in df.items() if count > limit}
+
+
+def _token_hash(token):
+    return int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=4).digest(), 'little')
+
+
+class MinHasher:
+    """num_perm 个形如 (a·x + b) mod p 的哈希函数；同样的 seed 得到同样的签名"""
+
+    def __init__(self, num_perm=DEFAULT_NUM_PERM, seed=1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.a = rng.integers(1, _MASK32, size=num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, _MASK32, size=num_perm, dtype=np.uint64)
+        self._hashes = {}
+
+    def hash_tokens(self, tokens):
+        cache = self._hashes
+        out = []
+        for token in tokens:
+            value = cache.get(token)
+            if value is None:
+                value = cache[token] = _token_hash(token)
+            out.append(value)
+        return out
+
+    def signatures(self, token_sets):
+        """
+        批量计算签名，返回 (食谱数, num_perm) 的 uint32 数组；空集合的签名全为最大值
+        所有特征哈希拼成一个数组，按块做 (a·x + b) mod p，再用 minimum.reduceat 按食谱取最小值
+        """
+        count = len(token_sets)
+        sigs = np.full((count, self.num_perm), _MASK32, dtype=np.uint32)
+        start = 0
+        while start < count:
+            stop, tokens = start, 0
+            while stop < count and (tokens == 0 or tokens + len(token_sets[stop]) <= _BLOCK_TOKENS):
+                tokens += len(token_sets[stop])
+                stop += 1
+            sizes = np.array([len(token_sets[i]) for i in range(start, stop)], dtype=np.int64)
+            values = np.array([h for i in range(start, stop) for h in self.hash_tokens(token_sets[i])],
+                              dtype=np.uint64)
+            if len(values):
+                hashed = (self.a[:, None] * values[None, :] % _PRIME + self.b[:, None]) % _PRIME
+                hashed = (hashed & np.uint64(_MASK32)).astype(np.uint32)
+                nonempty = np.flatnonzero(sizes)
+                offsets = np.concatenate(([0], np.cumsum(sizes)[:-1]))[nonempty]
+                sigs[start + nonempty] = np.minimum.reduceat(hashed, offsets, axis=1).T
+            start = stop
+        return sigs
+
+
+def _band_keys(sigs, bands):
+    """每段签名折叠为一个 uint64 键（键中混入段号，不同段的键互不相同），返回 (食谱数, bands)"""
+    rows = sigs.shape[1] // bands
+    keys = np.tile(np.arange(bands, dtype=np.uint64), (sigs.shape[0], 1))
+    with np.errstate(over='ignore'):
+        for r in range(rows):
+            keys = keys * np.uint64(0x100000001B3) ^ sigs[:, r::rows].astype(np.uint64)
+    return keys
+
+
+class SimilarityIndex:
+    """
+    用法:
+        index = SimilarityIndex(recipes)
+        index.neighbors('chinese_vegan_001', k=5)          # [(recipeId, 相似度), ...]
+        index.query(['豆腐', '青椒', '酱油'], k=5)
+    相似度为签名一致比例，即 Jaccard 相似度的估计值。
+    超过 max_df 比例的食谱都有的特征（如所有食谱都带的“素食”标签）不参与计算；
+    每个桶最多取 max_bucket 道、候选超过 max_candidates 时只保留命中段数最多的部分再精排，
+    保证单次查询的开销有上限
+    """
+
+    def __init__(self, recipes, num_perm=DEFAULT_NUM_PERM, bands=DEFAULT_BANDS, seed=1, canonical=None,
+                 max_df=DEFAULT_MAX_DF, max_candidates=DEFAULT_MAX_CANDIDATES, max_bucket=DEFAULT_MAX_BUCKET):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) 必须能被 bands ({bands}) 整除")
+        self.ids = [recipe.get('recipeId') for recipe in recipes]
+        self.position = {recipe_id: i for i, recipe_id in enumerate(self.ids)}
+        self.bands = bands
+        self.canonical = canonical
+        self.max_candidates = max_candidates
+        self.max_bucket = max_bucket
+        self.hasher = MinHasher(num_perm, seed)
+
+        token_sets = [recipe_tokens(recipe, canonical) for recipe in recipes]
+        self.stop_tokens = stop_tokens(token_sets, max_df)
+        if self.stop_tokens:
+            token_sets = [tokens - self.stop_tokens for tokens in token_sets]
+        self.sigs = self.hasher.signatures(token_sets)
+        # 没有特征的食谱签名全为最大值，彼此的签名完全一致；不作为近邻返回，也没有近邻
+        self.empty = np.array([not tokens for tokens in token_sets], dtype=bool)
+
+        # 所有段的键放在一个排序数组里，查询时一次 searchsorted 定位全部段的桶
+        keys = _band_keys(self.sigs, bands).ravel()
+        order = np.argsort(keys, kind='stable')
+        self.keys = keys[order]
+        self.members = order // bands
+
+    def _candidates(self, sig):
+        """与 sig 至少有一段相同的食谱序号及命中段数"""
+        keys = _band_keys(sig[None, :], self.bands)[0]
+        lo = np.searchsorted(self.keys, keys, 'left')
+        hi = np.searchsorted(self.keys, keys, 'right')
+        hit = hi > lo
+        if not hit.any():
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        cap = self.max_bucket
+        found = np.concatenate([self.members[a:min(b, a + cap)] for a, b in zip(lo[hit], hi[hit])])
+        return np.unique(found, return_counts=True)
+
+    def _rank(self, sig, k, exclude=None):
+        candidates, hits = self._candidates(sig)
+        keep = ~self.empty[candidates]
+        if exclude is not None:
+            keep &= candidates != exclude
+        candidates, hits = candidates[keep], hits[keep]
+        if not len(candidates):
+            return []
+        if len(candidates) > self.max_candidates:
+            keep = np.argpartition(-hits, self.max_candidates)[:self.max_candidates]
+            candidates = candidates[keep]
+        scores = (self.sigs[candidates] == sig).mean(axis=1)
+        top = np.argsort(-scores, kind='stable')[:k]
+        return [(self.ids[candidates[i]], float(scores[i])) for i in top]
+
+    def neighbors(self, recipe_id, k=5):
+        row = self.position[recipe_id]
+        if self.empty[row]:
+            return []
+        return self._rank(self.sigs[row], k, exclude=row)
+
+    def query(self, ingredients, k=5, tags=None, cuisine=None):
+        """按任意食材列表（可附带标签和菜系）查询相似食谱"""
+        tokens = recipe_tokens({'ingredients': ingredients, 'tags': tags, 'cuisine': cuisine}, self.canonical)
+        tokens -= self.stop_tokens
+        if not tokens:
+            return []
+        return self._rank(self.hasher.signatures([tokens])[0], k)
+
+    def neighbor_table(self, k=5, min_similarity=0.0):
+        """
+        全部食谱的近邻表（紧凑格式，供 recipe 云函数随包发布）:
+        {'k', 'ids': [recipeId...], 'neighbors': [[近邻序号, 相似度×1000, ...], ...]}
+        """
+        neighbors = []
+        for row in range(len(self.ids)):
+            flat = []
+            if self.empty[row]:
+                neighbors.append(flat)
+                continue
+            for recipe_id, score in self._rank(self.sigs[row], k, exclude=row):
+                if score >= min_similarity:
+                    flat.extend([self.position[recipe_id], int(round(score * 1000))])
+            neighbors.append(flat)
+        return {'k': k, 'numPerm': self.hasher.num_perm, 'bands': self.bands, 'ids': self.ids, 'neighbors': neighbors}
+
+
+def jaccard(a, b):
+    union = len(a | b)
+    return len(a & b) / union if union else 0.0
+
+
+def exact_neighbors(token_sets, row, k=5):
+    """逐对计算 Jaccard 相似度的前 k 个（基准实现，用于核对 LSH 的召回率）"""
+    target = token_sets[row]
+    scores = [(jaccard(target, tokens), i) for i, tokens in enumerate(token_sets) if i != row and tokens]
+    scores.sort(key=lambda item: -item[0])
+    return scores[:k]
+
+
+def write_neighbor_table(table, path=NEIGHBOR_TABLE_FILE):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(table, f, ensure_ascii=False, separators=(',', ':'))
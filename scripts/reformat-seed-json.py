@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+种子数据格式转换脚本
+用 json_stream.py 逐个读取 JSON 数组（或 JSONL）中的元素并逐个写出，
+在缩进 / 紧凑 / gzip 压缩格式之间转换，内存占用与文件大小无关，可处理数 GB 的导出文件
+
+用法:
+    python scripts/reformat-seed-json.py recipe-data.json recipe-data.min.json --compact
+    python scripts/reformat-seed-json.py export.jsonl export.json.gz --compact
+    python scripts/reformat-seed-json.py recipe-data.json.gz recipe-data.json
+    python scripts/reformat-seed-json.py --synthetic 2000000 /tmp/big.json   # 生成大文件测试内存占用
+"""
+
+import argparse
+import os
+import resource
+import sys
+import time
+
+from json_stream import PRETTY_INDENT, dump_array, iter_records
+
+
+def peak_rss_mb():
+    """进程峰值常驻内存（MB）；Linux 下 ru_maxrss 单位为 KB，macOS 为字节"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1 << 20) if sys.platform == 'darwin' else peak / 1024
+
+
+def synthetic_records(count):
+    """生成 count 条与食谱结构相近的记录，用于测试大文件"""
+    for i in range(count):
+        yield {
+            'recipeId': f"synthetic_{i:08d}",
+            'name': f"合成食谱 {i}",
+            'category': ['hot_dish', 'cold_dish', 'soup', 'staple'][i % 4],
+            'ingredients': [{'name': name, 'amount': 50 + i % 200, 'unit': 'g'} for name in ('豆腐', '青椒', '香菇')],
+            'tags': ['素食', '家常'],
+            'cookingTime': 10 + i % 50,
+            'status': 'active',
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='流式转换 JSON 数组文件的格式（缩进 / 紧凑 / gzip）')
+    parser.add_argument('input', nargs='?', help='输入文件（JSON 数组或 JSONL，.gz 自动解压）')
+    parser.add_argument('output', help='输出文件（以 .gz 结尾时 gzip 压缩）')
+    parser.add_argument('--compact', action='store_true', help='以无空白的紧凑格式写出（默认缩进 2 格）')
+    parser.add_argument('--synthetic', type=int, default=0, help='不读输入文件，改为写出 N 条合成记录')
+    args = parser.parse_args()
+
+    if not args.synthetic and not args.input:
+        parser.error('需要输入文件，或使用 --synthetic N')
+    if args.input and os.path.abspath(args.input) == os.path.abspath(args.output):
+        parser.error('输入和输出不能是同一个文件')
+
+    records = synthetic_records(args.synthetic) if args.synthetic else iter_records(args.input)
+    start = time.perf_counter()
+    count = dump_array(args.output, records, None if args.compact else PRETTY_INDENT)
+    elapsed = time.perf_counter() - start
+
+    print(f"✅ 已写出 {count:,} 条记录（{'紧凑' if args.compact else '缩进'}格式），耗时 {elapsed:.2f}s")
+    if args.input:
+        print(f"📊 输入 {os.path.getsize(args.input) / (1 << 20):.1f} MB → 输出 {os.path.getsize(args.output) / (1 << 20):.1f} MB")
+    else:
+        print(f"📊 输出 {os.path.getsize(args.output) / (1 << 20):.1f} MB")
+    print(f"📊 峰值内存 {peak_rss_mb():.1f} MB")
+    print(f"📁 输出文件: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+食材名称批量映射脚本
+用 factor_resolver.py 把食谱 / 菜单 / 订单中的自由文本食材名称离线映射到碳因子，
+输出各匹配级别的数量、未匹配和低置信度的名称，可把完整映射表保存为 JSON 供导入前预处理
+
+输入文件格式按内容判断:
+    JSON 数组    食谱或菜单记录，读取每条记录 ingredients[].name
+    JSONL        每行一个对象，读取 name 字段（或 ingredients[].name）
+    其他文本     每行一个名称
+
+用法:
+    python scripts/resolve-ingredient-names.py
+    python scripts/resolve-ingredient-names.py --input order-lines.txt --json name-mapping.json
+    python scripts/resolve-ingredient-names.py --scale 10000 --min-confidence 0.6
+"""
+
+import argparse
+import json
+import time
+
+from factor_resolver import DEFAULT_MIN_CONFIDENCE, NameResolver
+from recipe_carbon import FACTORS_FILE, INGREDIENTS_FILE, RECIPES_FILE, FactorTable
+
+
+def _names_from_record(record):
+    if record.get('ingredients'):
+        return [line.get('name', '') for line in record['ingredients']]
+    return [record['name']] if 'name' in record else []
+
+
+def load_names(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    stripped = text.lstrip()
+    if stripped.startswith('['):
+        return [name for record in json.loads(text) for name in _names_from_record(record)]
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    if lines and lines[0].startswith('{'):
+        return [name for line in lines for name in _names_from_record(json.loads(line))]
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description='把食材名称离线映射到碳因子')
+    parser.add_argument('--input', default=RECIPES_FILE, help='名称来源文件（默认读取食谱数据）')
+    parser.add_argument('--factors', default=FACTORS_FILE, help='碳因子数据文件')
+    parser.add_argument('--ingredients', default=INGREDIENTS_FILE, help='食材数据文件（因子库缺失时补充）')
+    parser.add_argument('--min-confidence', type=float, default=DEFAULT_MIN_CONFIDENCE,
+                        help='低于该置信度视为未匹配')
+    parser.add_argument('--scale', type=int, default=1, help='把名称重复 N 遍后解析，用于测试吞吐')
+    parser.add_argument('--limit', type=int, default=20, help='最多显示的名称数')
+    parser.add_argument('--json', dest='json_output', help='把名称 → 因子映射表写入 JSON 文件')
+    args = parser.parse_args()
+
+    names = load_names(args.input)
+    table = FactorTable.from_files(args.factors, args.ingredients)
+    start = time.perf_counter()
+    resolver = NameResolver.from_table(table, min_confidence=args.min_confidence)
+    build_time = time.perf_counter() - start
+
+    batch = names * args.scale
+    start = time.perf_counter()
+    results = resolver.resolve_many(batch)
+    elapsed = time.perf_counter() - start
+
+    cache = resolver.cache_info()
+    print(f"📊 模式 {len(resolver.patterns)} 个（名称与别名），自动机构建 {build_time * 1000:.1f} ms")
+    print(f"✅ 解析 {len(batch)} 个名称（不同名称 {cache.currsize} 个）耗时 {elapsed * 1000:.1f} ms，"
+          f"{len(batch) / max(elapsed, 1e-9) * 60:,.0f} 个/分钟")
+
+    mapping = dict(zip(names, results[:len(names)]))
+    levels = {}
+    for match in mapping.values():
+        level = match['level'] if match else 'unresolved'
+        levels[level] = levels.get(level, 0) + 1
+    print("📊 不同名称按匹配级别: " + '，'.join(f"{level} {count}" for level, count in sorted(levels.items())))
+
+    guessed = sorted(((name, m) for name, m in mapping.items() if m and m['level'] not in ('exact', 'alias')),
+                     key=lambda item: item[1]['confidence'])
+    if guessed:
+        print(f"\n⚠️ 非精确匹配 {len(guessed)} 个（按置信度从低到高）:")
+        for name, match in guessed[:args.limit]:
+            print(f"  - {name} → {match['name']}（{match['level']}，{match['confidence']:.2f}）")
+    unresolved = [name for name, match in mapping.items() if match is None]
+    if unresolved:
+        print(f"\n⚠️ 未匹配 {len(unresolved)} 个: {'、'.join(unresolved[:args.limit])}")
+
+    if args.json_output:
+        with open(args.json_output, 'w', encoding='utf-8') as f:
+            json.dump(mapping, f, ensure_ascii=False, indent=2)
+        print(f"📁 映射表已保存至: {args.json_output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+压缩位图模块（Roaring 结构）
+按编号的高 16 位分块，每块一个容器：元素不超过 4096 个时为有序 uint16 数组，否则为 1024 个 uint64 组成的位图。
+稀疏集合省空间，稠密集合按字运算；交、并、差在容器之间逐块完成，计数用 popcount。
+序列化为 JSON 友好的字典：{'keys': [块号...], 'types': 'ab...', 'data': [base64...]}，
+数组容器为 uint16 小端字节，位图容器为 uint64 小端字节
+"""
+
+import base64
+
+import numpy as np
+
+ARRAY_LIMIT = 4096
+WORDS = 1024
+
+if hasattr(np, 'bitwise_count'):
+    def _popcount(words):
+        return int(np.bitwise_count(words).sum())
+else:
+    # NumPy 2.0 之前没有 bitwise_count：按字节查表计数
+    _BYTE_COUNTS = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+    def _popcount(words):
+        return int(_BYTE_COUNTS[words.view(np.uint8)].sum(dtype=np.int64))
+
+
+def _to_words(container):
+    if container.dtype == np.uint64:
+        return container
+    bits = np.zeros(WORDS * 64, dtype=bool)
+    bits[container] = True
+    return np.packbits(bits, bitorder='little').view(np.uint64)
+
+
+def _to_values(container):
+    if container.dtype == np.uint16:
+        return container
+    bits = np.unpackbits(container.view(np.uint8), bitorder='little')
+    return np.flatnonzero(bits).astype(np.uint16)
+
+
+def _contains(words, values):
+    v = values.astype(np.uint64)
+    return ((words[v >> np.uint64(6)] >> (v & np.uint64(63))) & np.uint64(1)).astype(bool)
+
+
+def _cardinality(container):
+    if container.dtype == np.uint16:
+        return len(container)
+    return _popcount(container)
+
+
+def _shrink(words):
+    """位图容器元素较少时转回数组容器，空容器返回 None"""
+    count = _popcount(words)
+    if count == 0:
+        return None
+    return _to_values(words) if count <= ARRAY_LIMIT else words
+
+
+def _and(a, b):
+    if a.dtype == np.uint16 and b.dtype == np.uint16:
+        out = np.intersect1d(a, b, assume_unique=True)
+        return out if len(out) else None
+    if a.dtype == np.uint16 or b.dtype == np.uint16:
+        values, words = (a, b) if a.dtype == np.uint16 else (b, a)
+        out = values[_contains(words, values)]
+        return out if len(out) else None
+    return _shrink(a & b)
+
+
+def _or(a, b):
+    if a.dtype == np.uint16 and b.dtype == np.uint16 and len(a) + len(b) <= ARRAY_LIMIT:
+        return np.union1d(a, b)
+    return _shrink(_to_words(a) | _to_words(b))
+
+
+def _andnot(a, b):
+    if a.dtype == np.uint16:
+        out = a[~_contains(_to_words(b), a)] if b.dtype == np.uint64 else np.setdiff1d(a, b, assume_unique=True)
+        return out if len(out) else None
+    return _shrink(a & ~_to_words(b))
+
+
+class RoaringBitmap:
+    """不可变的压缩位图；用法: RoaringBitmap.from_ids([...])，a & b，a | b，a - b，len(a)"""
+
+    __slots__ = ('keys', 'containers')
+
+    def __init__(self, keys=None, containers=None):
+        self.keys = keys or []
+        self.containers = containers or []
+
+    @classmethod
+    def from_ids(cls, ids, presorted=False):
+        """presorted=True 表示 ids 已经升序且无重复（如另一张位图的 to_array()），跳过排序去重"""
+        ids = np.asarray(ids, dtype=np.uint32)
+        if not presorted:
+            ids = np.unique(ids)
+        keys, containers = [], []
+        if len(ids):
+            high = ids >> 16
+            bounds = np.flatnonzero(np.diff(high)) + 1
+            for chunk in np.split(ids, bounds):
+                values = (chunk & 0xFFFF).astype(np.uint16)
+                keys.append(int(chunk[0] >> 16))
+                containers.append(values if len(values) <= ARRAY_LIMIT else _to_words(values))
+        return cls(keys, containers)
+
+    @classmethod
+    def full(cls, count):
+        return cls.from_ids(np.arange(count, dtype=np.uint32))
+
+    def _merge(self, other, op, keep_left, keep_right):
+        keys, containers = [], []
+        i = j = 0
+        while i < len(self.keys) or j < len(other.keys):
+            left = self.keys[i] if i < len(self.keys) else None
+            right = other.keys[j] if j < len(other.keys) else None
+            if right is None or (left is not None and left < right):
+                if keep_left:
+                    keys.append(left)
+                    containers.append(self.containers[i])
+                i += 1
+            elif left is None or right < left:
+                if keep_right:
+                    keys.append(right)
+                    containers.append(other.containers[j])
+                j += 1
+            else:
+                merged = op(self.containers[i], other.containers[j])
+                if merged is not None:
+                    keys.append(left)
+                    containers.append(merged)
+                i += 1
+                j += 1
+        return RoaringBitmap(keys, containers)
+
+    def __and__(self, other):
+        return self._merge(other, _and, False, False)
+
+    def __or__(self, other):
+        return self._merge(other, _or, True, True)
+
+    def __sub__(self, other):
+        return self._merge(other, _andnot, True, False)
+
+    def __len__(self):
+        return sum(_cardinality(c) for c in self.containers)
+
+    def __eq__(self, other):
+        return isinstance(other, RoaringBitmap) and np.array_equal(self.to_array(), other.to_array())
+
+    def intersection_count(self, other):
+        """|self ∩ other|，不构造结果位图"""
+        total = 0
+        positions = {key: n for n, key in enumerate(other.keys)}
+        for key, container in zip(self.keys, self.containers):
+            n = positions.get(key)
+            if n is None:
+                continue
+            mine, theirs = container, other.containers[n]
+            if mine.dtype == np.uint64 and theirs.dtype == np.uint64:
+                total += _popcount(mine & theirs)
+            else:
+                merged = _and(mine, theirs)
+                total += 0 if merged is None else len(merged)
+        return total
+
+    def to_array(self):
+        if not self.keys:
+            return np.zeros(0, dtype=np.uint32)
+        return np.concatenate([
+            (np.uint32(key) << np.uint32(16)) | _to_values(c).astype(np.uint32)
+            for key, c in zip(self.keys, self.containers)
+        ])
+
+    def to_dict(self):
+        return {
+            'keys': self.keys,
+            'types': ''.join('a' if c.dtype == np.uint16 else 'b' for c in self.containers),
+            'data': [base64.b64encode(c.astype(c.dtype.newbyteorder('<')).tobytes()).decode('ascii')
+                     for c in self.containers],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        containers = []
+        for kind, encoded in zip(data['types'], data['data']):
+            dtype = '<u2' if kind == 'a' else '<u8'
+            raw = np.frombuffer(base64.b64decode(encoded), dtype=dtype)
+            containers.append(raw.astype(np.uint16 if kind == 'a' else np.uint64))
+        return cls(list(data['keys']), containers)
+
+    def size_in_bytes(self):
+        return sum(c.nbytes for c in self.containers) + 2 * len(self.keys)
@@ -0,0 +1,466 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+种子数据校验模块
+为植物、食谱、食材、肉类、碳因子五类种子数据定义结构，
+每个结构只编译一次为嵌套的校验函数，逐条校验时不再解释结构定义；
+错误按类型与字段路径聚合，给出数量和示例位置。
+生成脚本在写文件前调用 validate_or_exit()，有错误时不写出文件
+"""
+
+import re
+import sys
+import time
+
+from plant_index import LEVEL_ORDER
+
+# 问题级别：error 阻止写出文件，warning 只报告
+ERROR = 'error'
+WARNING = 'warning'
+
+SAMPLE_PATHS = 5
+SEASONS = ['all', 'spring', 'summer', 'autumn', 'winter']
+STATUSES = ['active', 'inactive', 'archived']
+
+
+class ValidationReport:
+    """按 (级别, 问题类型, 归一化字段路径) 聚合的问题清单"""
+
+    def __init__(self, dataset):
+        self.dataset = dataset
+        self.records = 0
+        self.seconds = 0.0
+        self.groups = {}
+
+    def add(self, severity, kind, field, loc, message):
+        """field 为归一化字段路径（数组下标记为 []），loc 为具体位置（见 render_location）"""
+        key = (severity, kind, field)
+        group = self.groups.get(key)
+        if group is None:
+            group = self.groups[key] = {'count': 0, 'samples': [], 'message': message}
+        group['count'] += 1
+        if len(group['samples']) < SAMPLE_PATHS:
+            group['samples'].append(render_location(loc))
+
+    def count(self, severity):
+        return sum(g['count'] for (s, _, _), g in self.groups.items() if s == severity)
+
+    @property
+    def ok(self):
+        return self.count(ERROR) == 0
+
+    def to_dict(self):
+        return {
+            'dataset': self.dataset,
+            'records': self.records,
+            'errors': self.count(ERROR),
+            'warnings': self.count(WARNING),
+            'recordsPerSecond': round(self.records / self.seconds) if self.seconds else None,
+            'issues': [
+                {'severity': s, 'kind': kind, 'field': field, 'count': g['count'],
+                 'message': g['message'], 'samples': g['samples']}
+                for (s, kind, field), g in sorted(self.groups.items(), key=lambda item: (item[0][0], -item[1]['count']))
+            ],
+        }
+
+    def print_summary(self, limit=20):
+        icon = '✅' if self.ok else '❌'
+        rate = f"，{self.records / self.seconds:,.0f} 条/秒" if self.seconds else ''
+        print(f"{icon} {self.dataset}: {self.records} 条记录，错误 {self.count(ERROR)}，警告 {self.count(WARNING)}{rate}")
+        for issue in self.to_dict()['issues'][:limit]:
+            mark = '❌' if issue['severity'] == ERROR else '⚠️ '
+            print(f"   {mark} {issue['kind']:<12} {issue['field']:<36} ×{issue['count']:<5} {issue['message']}")
+            print(f"      例: {', '.join(issue['samples'])}")
+
+
+# ============ 结构定义 ============
+# 结构用字典描述：type 为 object / array / string / integer / number / boolean / csv，
+# object: properties（字段 → 结构）、required、recommended（缺失时只警告）
+# array: items、minItems；string: enum、pattern、minLength；number / integer: min、max；
+# csv: 逗号分隔的字符串，每项须在 enum 中
+
+STRING = {'type': 'string', 'minLength': 1}
+NON_NEGATIVE = {'type': 'number', 'min': 0}
+STRING_LIST = {'type': 'array', 'items': STRING}
+
+NUTRITION = {
+    'type': 'object',
+    'required': ['calories', 'protein', 'carbs', 'fat'],
+    'properties': {field: NON_NEGATIVE for field in ('calories', 'protein', 'carbs', 'fat')},
+}
+
+PLANT_SCHEMA = {
+    'type': 'object',
+    'required': ['plantId', 'name', 'nameEn', 'category', 'rarity', 'unlockRequirements', 'growthStages',
+                 'carbonAbsorption', 'pointsPerDay', 'status'],
+    'recommended': ['symbolism'],
+    'properties': {
+        'plantId': {'type': 'string', 'pattern': r'^[a-z]+_\d{3}$'},
+        'name': STRING,
+        'nameEn': STRING,
+        'category': STRING,
+        'rarity': {'type': 'string', 'enum': ['common', 'rare', 'epic', 'legendary']},
+        'unlockRequirements': {
+            'type': 'object',
+            'required': ['userLevel', 'totalPoints', 'totalCarbon'],
+            'properties': {
+                'userLevel': {'type': 'string', 'enum': LEVEL_ORDER},
+                'totalPoints': {'type': 'integer', 'min': 0},
+                'totalCarbon': NON_NEGATIVE,
+                'prerequisitePlants': STRING_LIST,
+            },
+        },
+        'growthStages': {
+            'type': 'array',
+            'minItems': 1,
+            'items': {
+                'type': 'object',
+                'required': ['stage', 'duration', 'requiredCarbon'],
+                'recommended': ['name', 'requiredWater'],
+                'properties': {
+                    'stage': {'type': 'integer', 'min': 1},
+                    'name': STRING,
+                    'duration': {'type': 'number', 'min': 1},
+                    'requiredWater': NON_NEGATIVE,
+                    'requiredCarbon': NON_NEGATIVE,
+                    'specialEffect': STRING,
+                    'milestone': STRING,
+                },
+            },
+        },
+        'symbolism': {'type': 'object', 'required': ['meaning', 'story'],
+                      'properties': {'meaning': STRING, 'story': STRING}},
+        'carbonAbsorption': NON_NEGATIVE,
+        'pointsPerDay': {'type': 'integer', 'min': 0},
+        'status': {'type': 'string', 'enum': STATUSES},
+    },
+}
+
+RECIPE_SCHEMA = {
+    'type': 'object',
+    'required': ['recipeId', 'name', 'category', 'ingredients', 'cookingMethod', 'carbonComparison', 'status'],
+    'recommended': ['nameEn', 'cuisine', 'difficulty', 'cookingTime', 'servings', 'cookingSteps', 'tags', 'season'],
+    'properties': {
+        'recipeId': {'type': 'string', 'pattern': r'^[a-z_]+_\d{3}$'},
+        'name': STRING,
+        'nameEn': STRING,
+        'category': STRING,
+        'cuisine': STRING,
+        'difficulty': {'type': 'string', 'enum': ['easy', 'medium', 'hard']},
+        'cookingTime': {'type': 'integer', 'min': 1},
+        'servings': {'type': 'integer', 'min': 1},
+        'ingredients': {
+            'type': 'array',
+            'minItems': 1,
+            'items': {
+                'type': 'object',
+                'required': ['name', 'amount', 'unit'],
+                'properties': {'name': STRING, 'amount': {'type': 'number', 'min': 0, 'exclusiveMin': True},
+                               'unit': STRING},
+            },
+        },
+        'cookingMethod': STRING,
+        'cookingSteps': {'type': 'array', 'minItems': 1, 'items': STRING},
+        'tags': STRING_LIST,
+        'carbonComparison': {
+            'type': 'object',
+            'required': ['meatCarbon', 'veganCarbon', 'savingsPercent'],
+            'recommended': ['meatVersion'],
+            'properties': {
+                'meatVersion': STRING,
+                'meatCarbon': NON_NEGATIVE,
+                'veganCarbon': NON_NEGATIVE,
+                'savingsPercent': {'type': 'number', 'min': 0, 'max': 100},
+            },
+        },
+        'season': {'type': 'csv', 'enum': SEASONS},
+        'nutritionHighlight': {'type': 'string'},
+        'tips': {'type': 'string'},
+        'status': {'type': 'string', 'enum': STATUSES},
+    },
+}
+
+INGREDIENT_SCHEMA = {
+    'type': 'object',
+    'required': ['name', 'category', 'carbonFootprint', 'status'],
+    'recommended': ['nameEn', 'nutrition'],
+    'properties': {
+        'name': STRING,
+        'nameEn': STRING,
+        'category': STRING,
+        'carbonFootprint': NON_NEGATIVE,
+        'nutrition': NUTRITION,
+        'platformMappings': {'type': 'object'},
+        'status': {'type': 'string', 'enum': STATUSES},
+    },
+}
+
+MEAT_SCHEMA = {
+    'type': 'object',
+    'required': ['name', 'category', 'subcategory', 'carbonFootprint', 'comparisonGroup', 'status'],
+    'recommended': ['nameEn', 'nutrition', 'sources', 'veganAlternatives'],
+    'properties': {
+        'name': STRING,
+        'nameEn': STRING,
+        'category': STRING,
+        'subcategory': STRING,
+        'carbonFootprint': NON_NEGATIVE,
+        'nutrition': NUTRITION,
+        'productionMethod': STRING,
+        'region': STRING,
+        'sources': STRING_LIST,
+        'comparisonGroup': STRING,
+        'veganAlternatives': STRING_LIST,
+        'status': {'type': 'string', 'enum': STATUSES},
+    },
+}
+
+FACTOR_SCHEMA = {
+    'type': 'object',
+    'required': ['name', 'category', 'factorValue', 'unit', 'region', 'source', 'status'],
+    'recommended': ['alias', 'subCategory', 'uncertainty', 'year'],
+    'properties': {
+        'name': STRING,
+        'alias': STRING_LIST,
+        'category': {'type': 'string', 'enum': ['ingredient', 'material', 'energy', 'transport', 'waste']},
+        'subCategory': STRING,
+        'factorValue': NON_NEGATIVE,
+        'unit': {'type': 'string', 'pattern': r'^kgCO2e/\S+$'},
+        'uncertainty': {'type': 'number', 'min': 0, 'max': 100},
+        'region': STRING,
+        'source': STRING,
+        'year': {'type': 'integer', 'min': 1990, 'max': 2100},
+        'version': STRING,
+        'boundary': STRING,
+        'status': {'type': 'string', 'enum': STATUSES},
+        'notes': {'type': 'string'},
+    },
+}
+
+
+# ============ 编译 ============
+# 运行时的位置用 (上级位置, 字段名或下标) 的嵌套元组表示，只在需要记录示例时才拼成字符串；
+# 分组用的归一化字段路径（数组下标记为 []）在编译时就已确定
+
+def render_location(loc):
+    parts = []
+    while loc is not None:
+        loc, key = loc
+        parts.append(f"[{key}]" if isinstance(key, int) else f".{key}")
+    return ''.join(reversed(parts))
+
+
+_TYPE_CHECKS = {
+    'string': lambda v: isinstance(v, str),
+    'integer': lambda v: isinstance(v, int) and not isinstance(v, bool),
+    'number': lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    'boolean': lambda v: isinstance(v, bool),
+    'object': lambda v: isinstance(v, dict),
+    'array': lambda v: isinstance(v, list),
+    'csv': lambda v: isinstance(v, str),
+}
+
+
+def compile_schema(schema, field='$'):
+    """把结构定义编译为 check(value, loc, report) 函数，只在加载时执行一次"""
+    kind = schema['type']
+    type_ok = _TYPE_CHECKS[kind]
+    inner = None
+
+    if kind == 'object':
+        properties = {name: compile_schema(sub, f"{field}.{name}") for name, sub in schema.get('properties', {}).items()}
+        required = tuple((name, f"{field}.{name}") for name in schema.get('required', ()))
+        recommended = tuple((name, f"{field}.{name}") for name in schema.get('recommended', ()))
+
+        def inner(value, loc, report):
+            for name, label in required:
+                if name not in value:
+                    report.add(ERROR, 'missing', label, (loc, name), '缺少必填字段')
+            for name, label in recommended:
+                if name not in value:
+                    report.add(WARNING, 'inconsistent', label, (loc, name), '部分记录缺少该字段')
+            for name, item in value.items():
+                check = properties.get(name)
+                if check is not None:
+                    check(item, (loc, name), report)
+
+    elif kind == 'array':
+        item_check = compile_schema(schema['items'], f"{field}[]") if 'items' in schema else None
+        min_items = schema.get('minItems', 0)
+
+        def inner(value, loc, report):
+            if len(value) < min_items:
+                report.add(ERROR, 'too-short', field, loc, f"至少需要 {min_items} 项")
+            if item_check is not None:
+                for i, item in enumerate(value):
+                    item_check(item, (loc, i), report)
+
+    elif kind == 'csv':
+        enum = frozenset(schema['enum'])
+        message = f"取值须为 {'/'.join(sorted(enum))} 的逗号组合"
+
+        def inner(value, loc, report):
+            if not enum.issuperset(item.strip() for item in value.split(',')):
+                report.add(ERROR, 'enum', field, loc, message)
+
+    elif kind == 'string':
+        enum = frozenset(schema['enum']) if 'enum' in schema else None
+        pattern = re.compile(schema['pattern']) if 'pattern' in schema else None
+        min_length = schema.get('minLength', 0)
+        if enum is not None or pattern is not None or min_length:
+            def inner(value, loc, report):
+                if len(value) < min_length:
+                    report.add(ERROR, 'empty', field, loc, '不能为空字符串')
+                elif enum is not None and value not in enum:
+                    report.add(ERROR, 'enum', field, loc, f"取值须为 {'/'.join(sorted(enum))}")
+                elif pattern is not None and not pattern.match(value):
+                    report.add(ERROR, 'pattern', field, loc, f"格式须匹配 {pattern.pattern}")
+
+    elif kind in ('integer', 'number'):
+        low, high = schema.get('min'), schema.get('max')
+        exclusive = schema.get('exclusiveMin', False)
+        if low is not None or high is not None:
+            def inner(value, loc, report):
+                if low is not None and (value <= low if exclusive else value < low):
+                    report.add(ERROR, 'range', field, loc, f"须{'大于' if exclusive else '不小于'} {low}")
+                elif high is not None and value > high:
+                    report.add(ERROR, 'range', field, loc, f"须不大于 {high}")
+
+    type_message = f"类型应为 {'string' if kind == 'csv' else kind}"
+
+    if inner is None:
+        def check(value, loc, report):
+            if not type_ok(value):
+                report.add(ERROR, 'type', field, loc, type_message)
+        return check
+
+    def check(value, loc, report):
+        if not type_ok(value):
+            report.add(ERROR, 'type', field, loc, type_message)
+            return
+        inner(value, loc, report)
+    return check
+
+
+# ============ 跨记录检查 ============
+# 不是对象的记录、类型不对的字段已由单条记录校验报告，这里直接跳过
+
+_SCALAR = (str, int, float)
+
+
+def _records(records):
+    return [(i, record) for i, record in enumerate(records) if isinstance(record, dict)]
+
+
+def _check_unique(records, field, report):
+    seen = {}
+    for i, record in _records(records):
+        value = record.get(field)
+        if not isinstance(value, _SCALAR):
+            continue
+        if value in seen:
+            report.add(ERROR, 'duplicate', f"[].{field}", ((None, i), field), f"与 [{seen[value]}] 重复")
+        else:
+            seen[value] = i
+
+
+def _check_plants(records, report):
+    _check_unique(records, 'plantId', report)
+    known = {record.get(key) for _, record in _records(records) for key in ('name', 'plantId')
+             if isinstance(record.get(key), _SCALAR)}
+    for i, record in _records(records):
+        stages = record.get('growthStages')
+        if isinstance(stages, list):
+            numbers = [stage.get('stage') for stage in stages if isinstance(stage, dict)]
+            if numbers != list(range(1, len(numbers) + 1)):
+                report.add(ERROR, 'sequence', '[].growthStages', ((None, i), 'growthStages'), '阶段编号须从 1 开始连续递增')
+        req = record.get('unlockRequirements')
+        refs = req.get('prerequisitePlants') if isinstance(req, dict) else None
+        if isinstance(refs, list):
+            for j, ref in enumerate(refs):
+                if isinstance(ref, _SCALAR) and ref not in known:
+                    report.add(ERROR, 'reference', '[].unlockRequirements.prerequisitePlants[]',
+                               ((((None, i), 'unlockRequirements'), 'prerequisitePlants'), j), '前置植物不存在')
+
+
+def _check_recipes(records, report):
+    _check_unique(records, 'recipeId', report)
+    for i, record in _records(records):
+        comparison = record.get('carbonComparison')
+        if not isinstance(comparison, dict):
+            continue
+        meat, vegan, percent = (comparison.get(k) for k in ('meatCarbon', 'veganCarbon', 'savingsPercent'))
+        if all(isinstance(v, (int, float)) for v in (meat, vegan, percent)) and meat > 0:
+            if abs((meat - vegan) / meat * 100 - percent) > 1:
+                report.add(WARNING, 'inconsistent', '[].carbonComparison.savingsPercent',
+                           (((None, i), 'carbonComparison'), 'savingsPercent'), '与 meatCarbon / veganCarbon 计算的节省比例不一致')
+
+
+def _check_factors(records, report):
+    owners = {}
+    records = [(i, record) for i, record in _records(records)
+               if isinstance(record.get('name'), _SCALAR) and isinstance(record.get('region'), (str, type(None)))]
+    for i, record in records:
+        key = (record.get('name'), record.get('region'))
+        if key in owners:
+            report.add(ERROR, 'duplicate', '[].name', ((None, i), 'name'), f"与 [{owners[key]}] 的名称和地区相同")
+        else:
+            owners[key] = i
+    # 别名与其他因子的名称或别名冲突时，按名称匹配会出现歧义
+    names = {}
+    for i, record in records:
+        aliases = record.get('alias')
+        for j, alias in enumerate(aliases if isinstance(aliases, list) else []):
+            if not isinstance(alias, _SCALAR):
+                continue
+            other = names.get((alias, record.get('region')))
+            if other is not None and other != i:
+                report.add(WARNING, 'ambiguous', '[].alias[]', (((None, i), 'alias'), j), f"别名与 [{other}] 冲突")
+            names.setdefault((alias, record.get('region')), i)
+        names.setdefault((record.get('name'), record.get('region')), i)
+
+
+DATASETS = {
+    'plants': (PLANT_SCHEMA, _check_plants),
+    'recipes': (RECIPE_SCHEMA, _check_recipes),
+    'ingredients': (INGREDIENT_SCHEMA, lambda records, report: _check_unique(records, 'name', report)),
+    'meat': (MEAT_SCHEMA, lambda records, report: _check_unique(records, 'name', report)),
+    'factors': (FACTOR_SCHEMA, _check_factors),
+}
+
+_compiled = {}
+
+
+def get_validator(dataset):
+    """返回编译好的单条记录校验函数（按数据集缓存）"""
+    if dataset not in _compiled:
+        if dataset not in DATASETS:
+            raise ValueError(f"未知的数据集: {dataset}（可选 {', '.join(DATASETS)}）")
+        _compiled[dataset] = compile_schema(DATASETS[dataset][0], '[]')
+    return _compiled[dataset]
+
+
+def validate(dataset, records):
+    """校验整个数据集，返回 ValidationReport"""
+    check = get_validator(dataset)
+    report = ValidationReport(dataset)
+    started = time.perf_counter()
+    if not isinstance(records, list):
+        report.add(ERROR, 'type', '$', None, '数据文件顶层应为数组')
+    else:
+        for i, record in enumerate(records):
+            check(record, (None, i), report)
+        DATASETS[dataset][1](records, report)
+        report.records = len(records)
+    report.seconds = time.perf_counter() - started
+    return report
+
+
+def validate_or_exit(dataset, records):
+    """生成脚本写文件前的校验阶段：打印汇总，有错误时退出且不写出文件"""
+    report = validate(dataset, records)
+    report.print_summary()
+    if not report.ok:
+        print(f"❌ {dataset} 数据校验未通过，已中止写入")
+        sys.exit(1)
+    return report
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+种子数据合并模块
+按主键（如 recipeId）把新增记录合并进已有的种子数据文件：
+主键不存在则追加，内容哈希不同则替换，相同则跳过；已有文件中的重复主键只保留第一条。
+没有任何变化时不改写文件，重复执行结果不变；有变化时先写临时文件再原子替换。
+已有记录中未被替换的按原始文本写回；文件较大时按块流式读取，内存只保存主键集合
+"""
+
+import hashlib
+import json
+import os
+
+from json_stream import CHUNK_SIZE, PRETTY_INDENT, ArrayWriter, atomic_write_json, detect_indent, iter_array
+
+# 超过该大小的文件默认走流式合并
+STREAM_THRESHOLD_BYTES = 256 * 1024 * 1024
+
+
+def content_hash(record):
+    """记录内容的哈希（字段顺序无关）"""
+    text = json.dumps(record, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+class MergeStats:
+    def __init__(self):
+        self.added = 0
+        self.changed = 0
+        self.unchanged = 0
+        self.duplicates_removed = 0
+        self.total = 0
+        self.streamed = False
+        self.reformatted = False
+
+    @property
+    def modified(self):
+        return bool(self.added or self.changed or self.duplicates_removed or self.reformatted)
+
+    def to_dict(self):
+        return {
+            'added': self.added,
+            'changed': self.changed,
+            'unchanged': self.unchanged,
+            'duplicatesRemoved': self.duplicates_removed,
+            'total': self.total,
+            'streamed': self.streamed,
+            'reformatted': self.reformatted,
+        }
+
+
+def _index_incoming(incoming, key):
+    """新记录按主键建索引，同一主键出现多次时以最后一条为准"""
+    index = {}
+    for record in incoming:
+        index[record[key]] = (record, content_hash(record))
+    return index
+
+
+def merge_records(existing, incoming, key):
+    """内存中合并，返回 (合并后的列表, MergeStats)，保持已有记录的顺序，新记录追加在末尾"""
+    stats = MergeStats()
+    pending = _index_incoming(incoming, key)
+    merged, seen = [], set()
+    for record in existing:
+        record_key = record.get(key)
+        if record_key in seen:
+            stats.duplicates_removed += 1
+            continue
+        seen.add(record_key)
+        update = pending.pop(record_key, None)
+        if update is None:
+            merged.append(record)
+        elif update[1] == content_hash(record):
+            stats.unchanged += 1
+            merged.append(record)
+        else:
+            stats.changed += 1
+            merged.append(update[0])
+    for record, _ in pending.values():
+        stats.added += 1
+        merged.append(record)
+    stats.total = len(merged)
+    return merged, stats
+
+
+def _merge_into(writer, records, incoming, key, reuse_text=True):
+    """
+    records 为 iter_array(with_text=True) 产出的 (记录, 原始文本)，
+    reuse_text=True 时未被替换的记录按原始文本写回，不重新编码（源文件与输出格式不同时需设为 False）
+    """
+    stats = MergeStats()
+    pending = _index_incoming(incoming, key)
+    seen = set()
+    for record, text in records:
+        record_key = record.get(key)
+        if record_key in seen:
+            stats.duplicates_removed += 1
+            continue
+        seen.add(record_key)
+        update = pending.pop(record_key, None)
+        if update is None or update[1] == content_hash(record):
+            if update is not None:
+                stats.unchanged += 1
+            if reuse_text:
+                writer.write_raw(text)
+            else:
+                writer.write(record)
+        else:
+            stats.changed += 1
+            writer.write(update[0])
+    for record, _ in pending.values():
+        stats.added += 1
+        writer.write(record)
+    stats.total = writer.count
+    return stats
+
+
+def merge_file(path, incoming, key, stream=None, indent=PRETTY_INDENT):
+    """
+    把 incoming 合并进 path 指向的 JSON 数组文件，返回 MergeStats
+    stream=None 时按文件大小自动选择：小文件一次读入内存，大文件按块流式读取，内存只保存主键集合；
+    indent 与文件现有格式不同（美化 / 紧凑）时整体按新格式重写
+    """
+    if not os.path.exists(path):
+        merged, stats = merge_records([], incoming, key)
+        atomic_write_json(path, merged, indent)
+        return stats
+
+    size = os.path.getsize(path)
+    if stream is None:
+        stream = size > STREAM_THRESHOLD_BYTES
+    chunk_size = CHUNK_SIZE if stream else max(size, 1)
+
+    reuse_text = detect_indent(path) == indent
+    with ArrayWriter(path, indent=indent) as writer:
+        stats = _merge_into(writer, iter_array(path, chunk_size, with_text=True), incoming, key, reuse_text)
+        stats.streamed = stream
+        stats.reformatted = not reuse_text
+        if not stats.modified:
+            # 没有任何变化时不改写文件
+            writer.discard()
+    return stats
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+花园经济模拟
+读取 plant-data.json，用 NumPy 向量化地推进大量模拟用户逐日记录饮食：
+每餐按减碳量获得积分（1kg = 10 积分，与 order-sync / restaurant-order-sync 一致），
+花园中正在种植的植物每天产出 pointsPerDay 积分与 carbonAbsorption 减碳量，
+植物按累计天数与累计减碳量推进生长阶段（GrowthResolver），成熟后改种已解锁植物中产出最高的一株；
+每天按等级、积分、减碳阈值（含前置植物链）判断解锁，统计各稀有度首次解锁所需天数的分布与模拟吞吐
+
+用法:
+    python scripts/simulate-garden-economy.py --users 1000000 --days 365
+    python scripts/simulate-garden-economy.py --users 200000 --days 180 --meals-per-day 1.5 --json economy.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from plant_index import LEVEL_ORDER, LEVEL_RANK, GrowthResolver, build_unlock_index
+
+PLANT_DATA_FILE = os.path.join(os.path.dirname(__file__), '../cloudfunctions/plant-templates/plant-data.json')
+
+RARITY_ORDER = ['common', 'rare', 'epic', 'legendary']
+POINTS_PER_KG = 10            # 1kg 减碳 = 10 积分
+PERCENTILES = (10, 25, 50, 75, 90, 99)
+NOT_UNLOCKED = -1
+
+
+class Catalogue:
+    """把植物目录整理成按植物序号对齐的数组，解锁阈值已沿前置植物链取最大值"""
+
+    def __init__(self, plants):
+        plants = [p for p in plants if p.get('status', 'active') == 'active']
+        self.plants = plants
+        self.plant_ids = [p['plantId'] for p in plants]
+        codes = {plant_id: i for i, plant_id in enumerate(self.plant_ids)}
+
+        req = [p.get('unlockRequirements') or {} for p in plants]
+        level = np.array([LEVEL_RANK[r.get('userLevel', LEVEL_ORDER[0])] for r in req], dtype=np.int8)
+        points = np.array([r.get('totalPoints') or 0 for r in req], dtype=np.float64)
+        carbon = np.array([r.get('totalCarbon') or 0 for r in req], dtype=np.float64)
+        # 前置植物必须先解锁，按拓扑顺序把前置阈值合并进来，链条多长都只需一遍
+        for plant_id, deps in build_unlock_index(plants)['prerequisites']:
+            i = codes[plant_id]
+            for dep in deps:
+                j = codes[dep]
+                level[i] = max(level[i], level[j])
+                points[i] = max(points[i], points[j])
+                carbon[i] = max(carbon[i], carbon[j])
+        self.level, self.points, self.carbon = level, points, carbon
+
+        self.points_per_day = np.array([p.get('pointsPerDay') or 0 for p in plants], dtype=np.float64)
+        self.carbon_per_day = np.array([p.get('carbonAbsorption') or 0 for p in plants], dtype=np.float64)
+        self.rarity = [p.get('rarity', RARITY_ORDER[0]) for p in plants]
+
+        # 阈值最低的植物作为每个用户的第一株
+        self.starter = int(np.lexsort((self.carbon, self.points, self.level))[0])
+        # 按产出从高到低排列，改种时取第一株已解锁的
+        self.by_yield = np.argsort(-self.points_per_day, kind='stable')
+        self.growth = GrowthResolver.from_plants(plants)
+        self.growth_codes = self.growth.encode(self.plant_ids)
+        self.tiers = {rarity: self._frontier(rarity) for rarity in RARITY_ORDER if rarity in self.rarity}
+
+    def _frontier(self, rarity):
+        """稀有度内不被其他植物支配的阈值组合（满足任一即解锁该稀有度）"""
+        members = [i for i, r in enumerate(self.rarity) if r == rarity]
+        frontier = []
+        for i in members:
+            dominated = any(
+                j != i and self.level[j] <= self.level[i] and self.points[j] <= self.points[i]
+                and self.carbon[j] <= self.carbon[i]
+                and (self.level[j], self.points[j], self.carbon[j]) != (self.level[i], self.points[i], self.carbon[i])
+                for j in members
+            )
+            if not dominated and (self.level[i], self.points[i], self.carbon[i]) not in \
+                    [(self.level[k], self.points[k], self.carbon[k]) for k in frontier]:
+                frontier.append(i)
+        return frontier
+
+    def best_unlocked(self, level, points, carbon):
+        """为每个用户返回已解锁植物中每日积分产出最高的一株"""
+        choice = np.full(len(level), self.starter, dtype=np.int64)
+        pending = np.ones(len(level), dtype=bool)
+        for plant in self.by_yield:
+            ok = pending & (level >= self.level[plant]) & (points >= self.points[plant]) & (carbon >= self.carbon[plant])
+            choice[ok] = plant
+            pending &= ~ok
+            if not pending.any():
+                break
+        return choice
+
+
+def level_thresholds(catalogue, override=None):
+    """用户等级对应的累计积分门槛，默认取每个等级中最低的植物积分要求"""
+    if override:
+        values = [float(v) for v in override.split(',')]
+        if len(values) != len(LEVEL_ORDER):
+            raise ValueError(f"等级门槛数量应为 {len(LEVEL_ORDER)}: {override}")
+        return np.array(values)
+    values = []
+    for rank in range(len(LEVEL_ORDER)):
+        mask = catalogue.level == rank
+        values.append(catalogue.points[mask].min() if mask.any() else (values[-1] if values else 0))
+    values[0] = 0
+    return np.maximum.accumulate(np.array(values, dtype=np.float64))
+
+
+def simulate_chunk(catalogue, thresholds, users, days, params, rng):
+    """模拟一批用户，返回 {稀有度: 首次解锁天数数组（未解锁为 -1）} 与最终状态"""
+    # 用户活跃度差异：每天是否记录饮食的概率服从 Beta 分布
+    activity = rng.beta(params['activity_a'], params['activity_b'], users)
+    points = np.zeros(users)
+    carbon = np.zeros(users)
+    level = np.zeros(users, dtype=np.int8)
+
+    plant = np.full(users, catalogue.starter, dtype=np.int64)
+    plant_days = np.zeros(users)
+    plant_carbon = np.zeros(users)
+    harvested = np.zeros(users, dtype=np.int32)
+
+    unlock_day = {rarity: np.full(users, NOT_UNLOCKED, dtype=np.int32) for rarity in catalogue.tiers}
+    meal_mu = np.log(params['meal_carbon']) - params['meal_sigma'] ** 2 / 2
+
+    for day in range(days):
+        active = rng.random(users) < activity
+        meals = rng.poisson(params['meals_per_day'], users) * active
+        # 同一天多餐的减碳量之和近似为 餐数 × 单餐对数正态样本
+        meal_carbon = meals * rng.lognormal(meal_mu, params['meal_sigma'], users)
+
+        points += np.floor(meal_carbon * POINTS_PER_KG) + catalogue.points_per_day[plant]
+        carbon += meal_carbon + catalogue.carbon_per_day[plant]
+        level = (np.searchsorted(thresholds, points, side='right') - 1).astype(np.int8)
+
+        plant_days += 1
+        plant_carbon += meal_carbon
+        _, _, percent = catalogue.growth.resolve_batch(catalogue.growth_codes[plant], plant_days, plant_carbon)
+        mature = percent >= 100.0
+        if mature.any():
+            harvested += mature
+            plant[mature] = catalogue.best_unlocked(level[mature], points[mature], carbon[mature])
+            plant_days[mature] = 0
+            plant_carbon[mature] = 0
+
+        for rarity, frontier in catalogue.tiers.items():
+            pending = unlock_day[rarity] == NOT_UNLOCKED
+            if not pending.any():
+                continue
+            idx = np.flatnonzero(pending)
+            ok = np.zeros(len(idx), dtype=bool)
+            for i in frontier:
+                ok |= (level[idx] >= catalogue.level[i]) & (points[idx] >= catalogue.points[i]) \
+                    & (carbon[idx] >= catalogue.carbon[i])
+            unlock_day[rarity][idx[ok]] = day + 1
+
+    return unlock_day, {'points': points, 'carbon': carbon, 'level': level, 'harvested': harvested}
+
+
+def summarize(unlock_days, final, users, days):
+    tiers = {}
+    for rarity, values in unlock_days.items():
+        reached = values[values != NOT_UNLOCKED]
+        tiers[rarity] = {
+            'unlockedUsers': int(len(reached)),
+            'unlockedPercent': round(100.0 * len(reached) / users, 2),
+            'daysPercentiles': {f"p{p}": float(np.percentile(reached, p)) for p in PERCENTILES} if len(reached) else {},
+            'meanDays': round(float(reached.mean()), 1) if len(reached) else None,
+        }
+    levels = np.bincount(final['level'].astype(np.int64), minlength=len(LEVEL_ORDER))
+    return {
+        'users': users,
+        'days': days,
+        'tiers': tiers,
+        'finalLevels': {LEVEL_ORDER[i]: round(100.0 * levels[i] / users, 2) for i in range(len(LEVEL_ORDER))},
+        'finalPoints': {f"p{p}": round(float(np.percentile(final['points'], p)), 1) for p in PERCENTILES},
+        'finalCarbon': {f"p{p}": round(float(np.percentile(final['carbon'], p)), 2) for p in PERCENTILES},
+        'meanHarvests': round(float(final['harvested'].mean()), 2),
+    }
+
+
+def print_report(report, thresholds, elapsed):
+    print("🌳 花园经济模拟")
+    print(f"   - 用户数: {report['users']:,}，模拟天数: {report['days']}")
+    print("   - 等级积分门槛: " + ', '.join(f"{l} {int(t)}" for l, t in zip(LEVEL_ORDER, thresholds)))
+    print("\n⏳ 各稀有度首次解锁天数:")
+    header = ''.join(f"{'p' + str(p):>8}" for p in PERCENTILES)
+    print(f"  {'稀有度':<12}{'已解锁':>9}{header}")
+    for rarity in RARITY_ORDER:
+        tier = report['tiers'].get(rarity)
+        if tier is None:
+            continue
+        cells = ''.join(f"{tier['daysPercentiles'].get('p' + str(p), float('nan')):>8.0f}" for p in PERCENTILES)
+        print(f"  {rarity:<12}{tier['unlockedPercent']:>8.1f}%{cells}")
+    print("\n🏅 期末等级分布: " + ', '.join(f"{l} {v}%" for l, v in report['finalLevels'].items()))
+    print(f"   期末积分中位数 {report['finalPoints']['p50']}，减碳中位数 {report['finalCarbon']['p50']}kg，"
+          f"平均收获 {report['meanHarvests']} 株")
+    user_days = report['users'] * report['days']
+    print(f"\n⚡ 吞吐: {user_days / elapsed:,.0f} 用户·天/秒（耗时 {elapsed:.1f}s）")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='向量化模拟花园经济，评估植物解锁阈值的平衡性')
+    parser.add_argument('--plants', default=PLANT_DATA_FILE, help='植物模板数据（plant-data.json）')
+    parser.add_argument('--users', type=int, default=1000000, help='模拟用户数')
+    parser.add_argument('--days', type=int, default=365, help='模拟天数')
+    parser.add_argument('--chunk', type=int, default=500000, help='每批模拟的用户数（控制内存）')
+    parser.add_argument('--meals-per-day', type=float, default=2.0, help='活跃日平均记录餐数（泊松分布）')
+    parser.add_argument('--meal-carbon', type=float, default=1.2, help='单餐平均减碳量（kg，对数正态分布）')
+    parser.add_argument('--meal-sigma', type=float, default=0.6, help='单餐减碳量对数标准差')
+    parser.add_argument('--activity', default='2,3', help='每日活跃概率的 Beta 分布参数 a,b')
+    parser.add_argument('--level-points', help='bronze,silver,gold,diamond 的累计积分门槛，默认取植物目录中的最低要求')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子')
+    parser.add_argument('--json', dest='json_output', help='把统计结果写入 JSON 文件')
+    args = parser.parse_args()
+
+    with open(args.plants, 'r', encoding='utf-8') as f:
+        catalogue = Catalogue(json.load(f))
+    try:
+        thresholds = level_thresholds(catalogue, args.level_points)
+        activity_a, activity_b = (float(v) for v in args.activity.split(','))
+    except ValueError as e:
+        print(f"❌ 参数错误: {e}")
+        sys.exit(1)
+
+    params = {
+        'meals_per_day': args.meals_per_day,
+        'meal_carbon': args.meal_carbon,
+        'meal_sigma': args.meal_sigma,
+        'activity_a': activity_a,
+        'activity_b': activity_b,
+    }
+
+    started = time.perf_counter()
+    unlock_parts = {}
+    final_parts = {}
+    for chunk, start in enumerate(range(0, args.users, args.chunk)):
+        users = min(args.chunk, args.users - start)
+        # 每批使用独立的随机流，相同种子与批大小下结果可复现
+        rng = np.random.default_rng([args.seed, chunk])
+        unlock_day, final = simulate_chunk(catalogue, thresholds, users, args.days, params, rng)
+        for rarity, values in unlock_day.items():
+            unlock_parts.setdefault(rarity, []).append(values)
+        for key, values in final.items():
+            final_parts.setdefault(key, []).append(values)
+    elapsed = time.perf_counter() - started
+
+    report = summarize(
+        {rarity: np.concatenate(parts) for rarity, parts in unlock_parts.items()},
+        {key: np.concatenate(parts) for key, parts in final_parts.items()},
+        args.users, args.days,
+    )
+    report['userDaysPerSecond'] = round(args.users * args.days / elapsed)
+    report['levelPoints'] = [float(t) for t in thresholds]
+    report['params'] = params
+    print_report(report, thresholds, elapsed)
+
+    if args.json_output:
+        with open(args.json_output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"📁 结果已保存至: {args.json_output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,459 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+合成数据生成模块
+按 generate-index-config.py 中登记的集合和字段生成压测数据，
+取值来自真实种子文件（食材、食谱、植物模板）。
+所有生成器都是逐条产出的 generator，内存占用与数据量无关；
+每个分片使用独立的确定性随机源，相同的种子和分片大小总能得到相同的数据
+"""
+
+import datetime
+import json
+import math
+import os
+import random
+
+from index_catalog import indexes_by_collection, load_indexes
+
+ROOT_DIR = os.path.join(os.path.dirname(__file__), '..')
+INGREDIENTS_FILE = os.path.join(ROOT_DIR, 'cloudfunctions/data-import/ingredients-data.json')
+RECIPES_FILE = os.path.join(ROOT_DIR, 'cloudfunctions/recipe-data-import/recipe-data.json')
+PLANTS_FILE = os.path.join(ROOT_DIR, 'cloudfunctions/plant-templates/plant-data.json')
+
+START_DATE = datetime.datetime(2025, 1, 1)
+
+# 默认规模参数
+DEFAULT_POPULATION = {
+    'users': 1000000,
+    'tenants': 200,
+    'restaurants': 5000,
+    'messages': 20000,
+}
+DEFAULT_DAYS = 365
+DEFAULT_SKEW = 1.1   # Zipf 指数，越大头部用户/租户越集中
+
+USER_LEVELS = ['bronze', 'silver', 'gold', 'diamond']
+MEAL_TYPES = ['breakfast', 'lunch', 'dinner', 'snack']
+MEAL_SOURCES = ['manual', 'shopping', 'restaurant', 'delivery']
+ORDER_STATUSES = ['pending', 'confirmed', 'completed', 'cancelled']
+MESSAGE_STATUSES = ['unread', 'read', 'archived']
+TRANSACTION_TYPES = ['earn', 'redeem', 'transfer', 'expire']
+AUDIT_ACTIONS = ['create', 'update', 'delete', 'login', 'export', 'approve']
+AUDIT_RESOURCES = ['restaurant', 'menu', 'order', 'recipe', 'factor', 'user', 'tenant']
+ADMIN_ROLES = ['platform_admin', 'system_admin', 'restaurant_admin', 'carbon_specialist', 'operator']
+BEHAVIOR_TYPES = ['meal_record', 'check_in', 'share', 'order', 'garden_water', 'recipe_view']
+CITIES = ['上海', '北京', '杭州', '深圳', '广州', '成都', '南京', '武汉', '西安', '苏州']
+CARBON_LABELS = ['ultra_low', 'low', 'medium', 'high']
+BASELINE_REGIONS = ['east_china', 'north_china', 'south_china', 'central_china', 'northwest', 'northeast']
+MENU_MEAL_TYPES = ['meat_simple', 'meat_full']
+ENERGY_TYPES = ['electric', 'gas', 'mixed']
+CALCULATION_LEVELS = ['L1', 'L2', 'L2', 'L2', 'L3']
+COOKING_METHODS = ['raw', 'steamed', 'boiled', 'stir_fried', 'fried', 'baked']
+
+
+def _load_json(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+class SeedPools:
+    """种子文件中的取值池，只在进程内加载一次"""
+
+    _instance = None
+
+    def __init__(self):
+        ingredients = _load_json(INGREDIENTS_FILE)
+        recipes = _load_json(RECIPES_FILE)
+        plants = _load_json(PLANTS_FILE)
+        self.ingredients = [
+            (item['name'], item.get('category', 'other'), float(item.get('carbonFootprint') or 0))
+            for item in ingredients
+        ]
+        self.recipes = [(item['recipeId'], item['name'], item.get('cuisine', '')) for item in recipes]
+        self.recipe_carbon = [
+            (item.get('carbonComparison') or {}).get('veganCarbon', 0.5) for item in recipes
+        ]
+        self.plants = [(item['plantId'], item.get('rarity', 'common')) for item in plants]
+        self.ingredient_categories = sorted({category for _, category, _ in self.ingredients})
+
+    @classmethod
+    def get(cls):
+        if cls._instance is None:
+            cls._instance = SeedPools()
+        return cls._instance
+
+
+def zipf_rank(rng, n, skew=DEFAULT_SKEW):
+    """
+    按幂律分布抽取 [0, n) 中的名次，0 号最热门
+    使用连续幂律分布的反函数，O(1) 时间、无需预计算权重表
+    """
+    if n <= 1:
+        return 0
+    u = rng.random()
+    if abs(skew - 1.0) < 1e-9:
+        x = math.exp(u * math.log(n + 1))
+    else:
+        a = 1.0 - skew
+        x = ((math.pow(n + 1, a) - 1.0) * u + 1.0) ** (1.0 / a)
+    return min(int(x) - 1, n - 1)
+
+
+def iso(moment):
+    return moment.strftime('%Y-%m-%dT%H:%M:%S.000Z')
+
+
+class Context:
+    """单个分片的生成上下文"""
+
+    def __init__(self, collection, shard, seed, population=None, days=DEFAULT_DAYS, skew=DEFAULT_SKEW):
+        self.collection = collection
+        self.rng = random.Random(f"{seed}:{collection}:{shard}")
+        self.population = dict(DEFAULT_POPULATION, **(population or {}))
+        self.days = days
+        self.skew = skew
+        self.pools = SeedPools.get()
+
+    def user_id(self):
+        return f"user_{zipf_rank(self.rng, self.population['users'], self.skew):08d}"
+
+    def tenant_id(self):
+        return f"tenant_{zipf_rank(self.rng, self.population['tenants'], self.skew):05d}"
+
+    def restaurant_id(self):
+        return f"rest_{zipf_rank(self.rng, self.population['restaurants'], self.skew):06d}"
+
+    def moment(self, day=None):
+        if day is None:
+            day = self.rng.randrange(self.days)
+        return START_DATE + datetime.timedelta(days=day, seconds=self.rng.randrange(86400))
+
+    def ingredient_lines(self, count):
+        lines = []
+        for name, category, factor in self.rng.sample(self.pools.ingredients, count):
+            amount = self.rng.choice((20, 50, 80, 100, 150, 200, 300))
+            lines.append({
+                'name': name,
+                'category': category,
+                'amount': amount,
+                'unit': 'g',
+                'carbonFootprint': round(factor * amount / 1000, 4),
+            })
+        return lines
+
+
+# ---------------- 各集合的专用生成器 ----------------
+
+def gen_users(ctx, i):
+    rng = ctx.rng
+    level_roll = rng.random()
+    level = USER_LEVELS[0 if level_roll < 0.6 else 1 if level_roll < 0.85 else 2 if level_roll < 0.97 else 3]
+    created = ctx.moment()
+    return {
+        '_id': f"user_{i:08d}",
+        'openId': f"oOPEN{i:010d}",
+        'nickName': f"用户{i}",
+        'level': level,
+        'points': int(rng.paretovariate(1.3) * 50),
+        'totalCarbonReduction': round(rng.paretovariate(1.5) * 2, 3),
+        'lastLoginAt': iso(created + datetime.timedelta(days=rng.randrange(60))),
+        'createdAt': iso(created),
+    }
+
+
+def gen_meals(ctx, i):
+    rng = ctx.rng
+    lines = ctx.ingredient_lines(rng.randint(2, 6))
+    total = round(sum(line['carbonFootprint'] for line in lines), 4)
+    moment = ctx.moment()
+    recipe_id, recipe_name, _ = rng.choice(ctx.pools.recipes)
+    source = rng.choice(MEAL_SOURCES)
+    meal = {
+        '_id': f"meal_{i:010d}",
+        'userId': ctx.user_id(),
+        'mealType': rng.choice(MEAL_TYPES),
+        'mealDate': iso(moment),
+        'recipeId': recipe_id,
+        'dishName': recipe_name,
+        'ingredients': lines,
+        'totalCarbonFootprint': total,
+        'carbonReduction': round(total * rng.uniform(1.5, 6.0), 4),
+        'source': source,
+        'sourceOrderId': f"SO{i:012d}",
+        'isPublic': rng.random() < 0.2,
+        'createdAt': iso(moment + datetime.timedelta(minutes=rng.randrange(120))),
+    }
+    if source == 'restaurant':
+        meal['restaurant'] = {'restaurantId': ctx.restaurant_id()}
+    return meal
+
+
+def gen_daily_stats(ctx, i):
+    # (userId, date) 唯一：按序号铺开，保证不重复
+    users = ctx.population['users']
+    rng = ctx.rng
+    day = (i // users) % ctx.days
+    meals = rng.randint(1, 4)
+    return {
+        '_id': f"ds_{i:010d}",
+        'userId': f"user_{i % users:08d}",
+        'date': (START_DATE + datetime.timedelta(days=day)).strftime('%Y-%m-%d'),
+        'totalMeals': meals,
+        'totalCarbonReduction': round(rng.paretovariate(2.0) * 0.8 * meals, 4),
+        'mealTypes': {t: (1 if j < meals else 0) for j, t in enumerate(MEAL_TYPES)},
+    }
+
+
+def gen_gardens(ctx, i):
+    rng = ctx.rng
+    plants = rng.sample(ctx.pools.plants, rng.randint(1, 5))
+    return {
+        '_id': f"garden_{i:08d}",
+        'userId': f"user_{i % ctx.population['users']:08d}",
+        'plants': [{'plantId': plant_id, 'rarity': rarity, 'stage': rng.randint(1, 4)} for plant_id, rarity in plants],
+        'totalCarbonAbsorbed': round(rng.paretovariate(1.5), 3),
+    }
+
+
+def gen_restaurant_orders(ctx, i):
+    rng = ctx.rng
+    moment = ctx.moment()
+    items = []
+    for _ in range(rng.randint(1, 5)):
+        idx = rng.randrange(len(ctx.pools.recipes))
+        recipe_id, name, _ = ctx.pools.recipes[idx]
+        items.append({'recipeId': recipe_id, 'name': name, 'quantity': rng.randint(1, 3),
+                      'carbonFootprint': ctx.pools.recipe_carbon[idx]})
+    carbon = round(sum(item['carbonFootprint'] * item['quantity'] for item in items), 4)
+    return {
+        '_id': f"ro_{i:010d}",
+        'orderId': f"ORD{i:012d}",
+        'tenantId': ctx.tenant_id(),
+        'restaurantId': ctx.restaurant_id(),
+        'userId': ctx.user_id(),
+        'status': rng.choices(ORDER_STATUSES, weights=(5, 10, 80, 5))[0],
+        'items': items,
+        'totalAmount': round(sum(rng.uniform(12, 68) * item['quantity'] for item in items), 2),
+        'carbonImpact': {'totalCarbon': carbon, 'carbonSavingsVsMeat': round(carbon * rng.uniform(2, 6), 4)},
+        'orderDate': iso(moment),
+        'createdAt': iso(moment),
+    }
+
+
+def gen_carbon_transactions(ctx, i):
+    rng = ctx.rng
+    kind = rng.choices(TRANSACTION_TYPES, weights=(70, 20, 5, 5))[0]
+    amount = round(rng.paretovariate(1.8) * 5, 2)
+    return {
+        '_id': f"ct_{i:010d}",
+        'transactionId': f"TX{i:012d}",
+        'tenantId': ctx.tenant_id(),
+        'userId': ctx.user_id(),
+        'transactionType': kind,
+        'amount': amount if kind == 'earn' else -amount,
+        'createdAt': iso(ctx.moment()),
+    }
+
+
+def gen_user_messages(ctx, i):
+    rng = ctx.rng
+    return {
+        '_id': f"um_{i:010d}",
+        'userId': ctx.user_id(),
+        # (messageId, userId) 唯一：每条关联使用独立的消息序号
+        'messageId': f"msg_{i:010d}",
+        'status': rng.choices(MESSAGE_STATUSES, weights=(35, 55, 10))[0],
+        'createdAt': iso(ctx.moment()),
+    }
+
+
+def gen_audit_logs(ctx, i):
+    rng = ctx.rng
+    moment = ctx.moment()
+    return {
+        '_id': f"al_{i:010d}",
+        'userId': f"admin_{zipf_rank(rng, 2000, ctx.skew):05d}",
+        'role': rng.choice(ADMIN_ROLES),
+        'tenantId': ctx.tenant_id(),
+        'action': rng.choice(AUDIT_ACTIONS),
+        'resource': rng.choice(AUDIT_RESOURCES),
+        'status': 'success' if rng.random() < 0.97 else 'failure',
+        'timestamp': iso(moment),
+        'createdAt': iso(moment),
+    }
+
+
+def gen_behavior_records(ctx, i):
+    rng = ctx.rng
+    return {
+        '_id': f"br_{i:010d}",
+        'userId': ctx.user_id(),
+        'tenantId': ctx.tenant_id(),
+        'behaviorType': rng.choice(BEHAVIOR_TYPES),
+        'points': rng.choice((1, 2, 5, 10)),
+        'timestamp': iso(ctx.moment()),
+    }
+
+
+def gen_restaurants(ctx, i):
+    rng = ctx.rng
+    certified = rng.random() < 0.3
+    return {
+        '_id': f"rest_{i:06d}",
+        'restaurantId': f"rest_{i:06d}",
+        'tenantId': f"tenant_{zipf_rank(rng, ctx.population['tenants'], ctx.skew):05d}",
+        'name': f"餐厅{i}",
+        'category': rng.choice(('vegan', 'vegetarian', 'flexitarian')),
+        'status': 'active' if rng.random() < 0.9 else 'inactive',
+        'location': {'city': rng.choice(CITIES)},
+        'climateCertification': {
+            'isCertified': certified,
+            'certificationLevel': rng.choice(('bronze', 'silver', 'gold', 'platinum')) if certified else None,
+        },
+        'certificationStatus': 'certified' if certified else rng.choice(('none', 'pending', 'reviewing')),
+        'ratings': {'overallRating': round(rng.uniform(3.0, 5.0), 1)},
+        'carbonImpact': {'totalCarbonReduction': round(rng.paretovariate(1.2) * 100, 2)},
+        'region': rng.choice(BASELINE_REGIONS),
+    }
+
+
+def gen_restaurant_menu_items(ctx, i):
+    rng = ctx.rng
+    idx = rng.randrange(len(ctx.pools.recipes))
+    recipe_id, name, _ = ctx.pools.recipes[idx]
+    restaurant = ctx.restaurant_id()
+    return {
+        '_id': f"mi_{i:010d}",
+        'menuItemId': f"mi_{i:010d}",
+        'restaurantId': restaurant,
+        'menuId': f"menu_{restaurant}",
+        'skuCode': f"SKU{i:010d}",
+        'name': name,
+        'recipeId': recipe_id,
+        'status': 'active' if rng.random() < 0.85 else 'inactive',
+        'carbonData': {
+            'carbonFootprint': ctx.pools.recipe_carbon[idx],
+            'carbonLabel': rng.choice(CARBON_LABELS),
+            'carbonScore': rng.randint(40, 100),
+        },
+        # 以下为 recalculateMenuItems 使用的计算配置；约 1/10 的菜单项没有食材，重算时从关联菜谱取
+        'mealType': rng.choice(MENU_MEAL_TYPES),
+        'energyType': rng.choice(ENERGY_TYPES),
+        'calculationLevel': rng.choice(CALCULATION_LEVELS),
+        'cookingMethod': rng.choice(COOKING_METHODS),
+        'baseRecipeId': recipe_id,
+        'ingredients': [] if rng.random() < 0.1 else [
+            {'ingredientName': line['name'], 'quantity': line['amount'], 'unit': 'g', 'category': line['category']}
+            for line in ctx.ingredient_lines(rng.randint(2, 6))
+        ],
+    }
+
+
+GENERATORS = {
+    'users': gen_users,
+    'meals': gen_meals,
+    'daily_stats': gen_daily_stats,
+    'gardens': gen_gardens,
+    'restaurant_orders': gen_restaurant_orders,
+    'carbon_transactions': gen_carbon_transactions,
+    'user_messages': gen_user_messages,
+    'audit_logs': gen_audit_logs,
+    'behavior_records': gen_behavior_records,
+    'restaurants': gen_restaurants,
+    'restaurant_menu_items': gen_restaurant_menu_items,
+}
+
+
+# ---------------- 通用生成器（按索引字段推断取值） ----------------
+
+def _set_path(doc, path, value):
+    parts = path.split('.')
+    for part in parts[:-1]:
+        doc = doc.setdefault(part, {})
+    doc[parts[-1]] = value
+
+
+def _generic_value(ctx, field, i, unique):
+    rng = ctx.rng
+    name = field.split('.')[-1]
+    if unique:
+        return f"{name}_{i:010d}"
+    if name == 'userId':
+        return ctx.user_id()
+    if name == 'tenantId':
+        return ctx.tenant_id()
+    if name == 'restaurantId':
+        return ctx.restaurant_id()
+    if name in ('ingredientId', 'ingredientName', 'ingredient'):
+        return rng.choice(ctx.pools.ingredients)[0]
+    if name in ('recipeId',):
+        return rng.choice(ctx.pools.recipes)[0]
+    if name in ('plantId',):
+        return rng.choice(ctx.pools.plants)[0]
+    if name.endswith('At') or name in ('timestamp', 'date', 'startTime', 'endTime', 'start', 'issueDate'):
+        return iso(ctx.moment())
+    if name.startswith('is') or name.startswith('can') or name in ('enabled', 'success'):
+        return rng.random() < 0.5
+    if name.endswith('Id') or name.endswith('No'):
+        return f"{name}_{zipf_rank(rng, 100000, ctx.skew):06d}"
+    if name == 'category':
+        return rng.choice(ctx.pools.ingredient_categories)
+    if name in ('status', 'type', 'role', 'level', 'priority', 'direction', 'platform', 'source') \
+            or name.endswith('Type') or name.endswith('Status') or name.endswith('Level'):
+        return f"{name}_{zipf_rank(rng, 8, ctx.skew)}"
+    if name == 'city':
+        return rng.choice(CITIES)
+    return round(rng.paretovariate(1.5) * 10, 2)
+
+
+def make_generic(specs):
+    """为没有专用生成器的集合构造通用生成器"""
+    fields = {}
+    for spec in specs:
+        for position, (field, _) in enumerate(spec.keys):
+            is_unique = spec.unique and position == len(spec.keys) - 1
+            array, unique = fields.get(field, (False, False))
+            fields[field] = (array or field in spec.multikey_fields, unique or is_unique)
+
+    def generate(ctx, i):
+        doc = {'_id': f"{ctx.collection}_{i:010d}"}
+        for field, (is_array, unique) in fields.items():
+            if is_array:
+                value = [_generic_value(ctx, field, i, False) for _ in range(ctx.rng.randint(1, 4))]
+            else:
+                value = _generic_value(ctx, field, i, unique)
+            _set_path(doc, field, value)
+        return doc
+
+    return generate
+
+
+def generator_for(collection):
+    if collection in GENERATORS:
+        return GENERATORS[collection]
+    specs = indexes_by_collection(load_indexes()).get(collection)
+    if not specs:
+        raise ValueError(f"索引目录中没有集合 {collection}")
+    return make_generic(specs)
+
+
+def generate_documents(collection, start, stop, seed=0, shard_size=None, **options):
+    """
+    逐条产出序号 [start, stop) 的文档
+    随机源按分片（序号 // shard_size）划分，分片大小相同的串行和并行生成结果一致
+    """
+    generate = generator_for(collection)
+    shard_size = shard_size or max(stop - start, 1)
+    ctx = None
+    current_shard = None
+    for i in range(start, stop):
+        shard = i // shard_size
+        if shard != current_shard:
+            ctx = Context(collection, shard, seed, **options)
+            current_shard = shard
+        yield generate(ctx, i)
+
+
+def catalogue_collections():
+    return list(indexes_by_collection(load_indexes()).keys())
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+食材用量单位换算模块
+把食谱 / 菜单中的用量（g、ml、个、片、勺 ……）统一换算为 kg，供碳足迹和营养批量计算使用:
+    质量单位    直接换算
+    体积单位    按食材类别的密度（kg/L）换算，个别食材单独指定密度
+    计件单位    按食材的单件重量换算，未单独指定的按类别的单件重量
+食材类别来自食材库的 category 与因子库的 subCategory，都没有时按名称词尾推断（如 …油 → oils）。
+换算系数按 (食材, 单位) 去重后只计算一次，整列用量一次乘出；无法换算的记为 nan 并可汇总报告
+"""
+
+import json
+import os
+import unicodedata
+
+import numpy as np
+
+ROOT_DIR = os.path.join(os.path.dirname(__file__), '..')
+FACTORS_FILE = os.path.join(ROOT_DIR, 'cloudfunctions/database/all-reliable-factors.json')
+INGREDIENTS_FILE = os.path.join(ROOT_DIR, 'cloudfunctions/data-import/ingredients-data.json')
+
+# 质量单位 → kg
+MASS_UNITS = {
+    'mg': 1e-6, 'g': 0.001, '克': 0.001, 'kg': 1.0, '千克': 1.0, '公斤': 1.0, '斤': 0.5, '两': 0.05,
+}
+
+# 体积单位 → L（勺、杯等按常用厨房量具）
+VOLUME_UNITS = {
+    'ml': 0.001, '毫升': 0.001, 'l': 1.0, '升': 1.0,
+    '勺': 0.015, '大勺': 0.015, '汤匙': 0.015, '小勺': 0.005, '茶匙': 0.005, '杯': 0.24, '碗': 0.3,
+}
+
+# 食材类别的密度（kg/L），未列出的类别按水计算
+CATEGORY_DENSITY = {
+    'oils': 0.92,
+    'condiments': 1.1,
+    'sweeteners': 1.35,
+    'dairy': 1.03,
+    'grains': 0.6,
+    'spices': 0.5,
+    'nuts': 0.6,
+    'beans': 0.8,
+}
+DEFAULT_DENSITY = 1.0
+
+NAME_DENSITY = {
+    '豆浆': 1.03,
+    '椰浆': 0.97,
+    '蜂蜜': 1.42,
+    '料酒': 0.98,
+    '白葡萄酒': 0.99,
+}
+
+# 各类别的单件重量（kg）
+CATEGORY_PIECE_WEIGHT = {
+    'vegetables': {'个': 0.15, '根': 0.1, '片': 0.005, '颗': 0.01, '瓣': 0.005, '棵': 0.3, '朵': 0.02, '把': 0.1},
+    'fruits': {'个': 0.15, '片': 0.005, '颗': 0.01, '瓣': 0.01},
+    'eggs': {'个': 0.05, '只': 0.05, '颗': 0.05},
+    'grains': {'个': 0.08, '张': 0.02, '片': 0.03, '根': 0.06, '块': 0.05},
+    'beans': {'块': 0.1, '片': 0.02, '张': 0.02},
+    'spices': {'个': 0.002, '片': 0.0005, '颗': 0.0005, '根': 0.003, '瓣': 0.005},
+    'mushroom': {'个': 0.02, '朵': 0.02, '片': 0.003},
+    'seaweed': {'片': 0.003, '张': 0.003},
+}
+
+# 单独指定的单件重量（kg），优先于类别
+NAME_PIECE_WEIGHT = {
+    '鸡蛋': {'个': 0.05, '只': 0.05},
+    '大蒜': {'瓣': 0.005, '个': 0.04, '头': 0.04},
+    '八角': {'个': 0.001},
+    '海苔': {'片': 0.003, '张': 0.003},
+    '柠檬叶': {'片': 0.0005},
+    '全麦面包': {'片': 0.035},
+    '汉堡胚': {'个': 0.06},
+    '烧卖皮': {'张': 0.006},
+    '春卷皮': {'张': 0.01},
+    '玉米饼': {'张': 0.03},
+    '油条': {'根': 0.06},
+}
+
+# 因子库 subCategory → 统一类别
+SUBCATEGORY_ALIASES = {
+    'vegetable': 'vegetables', 'fruit': 'fruits', 'grain': 'grains', 'oil': 'oils', 'nut': 'nuts',
+    'bean_product': 'beans', 'condiment': 'condiments', 'spice': 'spices', 'mushrooms': 'mushroom',
+}
+
+# 名称词尾 → 类别（食材库和因子库都没有收录时使用）
+NAME_SUFFIX_CATEGORIES = [
+    ('油', 'oils'),
+    ('酱', 'condiments'), ('醋', 'condiments'), ('酒', 'condiments'), ('汁', 'condiments'),
+    ('糖', 'sweeteners'), ('蜜', 'sweeteners'),
+    ('奶', 'dairy'), ('浆', 'dairy'),
+    ('粉', 'grains'), ('面', 'grains'), ('皮', 'grains'), ('饼', 'grains'), ('包', 'grains'), ('胚', 'grains'),
+    ('米', 'grains'),
+    ('蛋', 'eggs'),
+    ('菇', 'mushroom'), ('耳', 'mushroom'),
+    ('苔', 'seaweed'), ('带', 'seaweed'),
+    ('叶', 'vegetables'), ('菜', 'vegetables'), ('笋', 'vegetables'),
+    ('椒', 'spices'), ('角', 'spices'),
+]
+
+
+def normalize_unit(unit):
+    return unicodedata.normalize('NFKC', unit or '').strip().lower()
+
+
+class UnitNormalizer:
+    """
+    用法:
+        normalizer = UnitNormalizer.from_files()
+        normalizer.factor('植物油', 'ml')                    # 每单位的 kg 数，无法换算为 nan
+        kg = normalizer.to_kg(amounts, name_idx, unit_idx, names, units)
+    categories 为 {食材名称: 类别}；resolver 可选（factor_resolver.NameResolver），
+    用于把自由文本名称匹配到已知食材后再取类别
+    """
+
+    def __init__(self, categories=None, resolver=None, name_density=None, name_piece_weight=None):
+        self.categories = dict(categories or {})
+        self.resolver = resolver
+        self.name_density = NAME_DENSITY if name_density is None else name_density
+        self.name_piece_weight = NAME_PIECE_WEIGHT if name_piece_weight is None else name_piece_weight
+
+    @classmethod
+    def from_files(cls, ingredients_path=INGREDIENTS_FILE, factors_path=FACTORS_FILE, resolver=None):
+        categories = {}
+        if factors_path and os.path.exists(factors_path):
+            with open(factors_path, 'r', encoding='utf-8') as f:
+                for factor in json.load(f):
+                    if factor.get('category') not in ('ingredient', 'material'):
+                        continue
+                    sub = factor.get('subCategory')
+                    category = SUBCATEGORY_ALIASES.get(sub, sub)
+                    for name in [factor['name']] + (factor.get('alias') or []):
+                        categories.setdefault(name, category)
+        if ingredients_path and os.path.exists(ingredients_path):
+            with open(ingredients_path, 'r', encoding='utf-8') as f:
+                for item in json.load(f):
+                    if item.get('category'):
+                        # 食材库的分类更细（如 oils / sweeteners），优先于因子库
+                        categories[item['name']] = item['category']
+        return cls(categories, resolver)
+
+    def category_of(self, name):
+        category = self.categories.get(name)
+        if category:
+            return category
+        for suffix, category in NAME_SUFFIX_CATEGORIES:
+            if name.endswith(suffix):
+                return category
+        if self.resolver is not None:
+            match = self.resolver.resolve(name)
+            if match is not None:
+                return self.categories.get(match['name'])
+        return None
+
+    def factor(self, name, unit):
+        """name 的 1 个 unit 折合多少 kg，无法换算返回 nan"""
+        unit = normalize_unit(unit)
+        if unit in MASS_UNITS:
+            return MASS_UNITS[unit]
+        if unit in VOLUME_UNITS:
+            density = self.name_density.get(name)
+            if density is None:
+                density = CATEGORY_DENSITY.get(self.category_of(name), DEFAULT_DENSITY)
+            return VOLUME_UNITS[unit] * density
+        weight = self.name_piece_weight.get(name, {}).get(unit)
+        if weight is None:
+            weight = CATEGORY_PIECE_WEIGHT.get(self.category_of(name), {}).get(unit)
+        return np.nan if weight is None else weight
+
+    def compile(self, name_idx, unit_idx, names, units):
+        """
+        对出现过的 (食材, 单位) 组合各计算一次系数，返回 (系数数组, 每行对应的组合序号, 组合编码)
+        组合编码 = 食材编码 × 单位数 + 单位编码
+        """
+        span = max(len(units), 1)
+        codes = np.asarray(name_idx, dtype=np.int64) * span + np.asarray(unit_idx, dtype=np.int64)
+        pairs, inverse = np.unique(codes, return_inverse=True)
+        factors = np.array([self.factor(names[p // span], units[p % span]) for p in pairs], dtype=np.float64)
+        return factors, inverse.reshape(-1), pairs
+
+    def to_kg(self, amounts, name_idx, unit_idx, names, units):
+        """整列用量换算为 kg；name_idx / unit_idx 为每行食材和单位在 names / units 中的序号"""
+        factors, inverse, _ = self.compile(name_idx, unit_idx, names, units)
+        return np.asarray(amounts, dtype=np.float64) * factors[inverse]
+
+    def unconvertible(self, name_idx, unit_idx, names, units):
+        """无法换算的 (食材, 单位, 行数)，按行数从多到少"""
+        factors, inverse, pairs = self.compile(name_idx, unit_idx, names, units)
+        counts = np.bincount(inverse, minlength=len(pairs))
+        span = max(len(units), 1)
+        bad = np.flatnonzero(np.isnan(factors))
+        bad = bad[np.argsort(-counts[bad], kind='stable')]
+        return [(names[pairs[i] // span], units[pairs[i] % span], int(counts[i])) for i in bad]
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+种子数据校验脚本
+用 schema_validator.py 中编译好的结构校验各云函数目录下的种子数据文件，
+错误按类型和字段聚合输出；任一文件有错误时以非零状态退出
+
+用法:
+    python scripts/validate-seed-data.py
+    python scripts/validate-seed-data.py --dataset recipes=/tmp/recipe-data.json --json validation.json
+"""
+
+import argparse
+import json
+import os
+import sys
+
+from schema_validator import DATASETS, validate
+
+ROOT_DIR = os.path.join(os.path.dirname(__file__), '..')
+SEED_FILES = {
+    'plants': os.path.join(ROOT_DIR, 'cloudfunctions/plant-templates/plant-data.json'),
+    'recipes': os.path.join(ROOT_DIR, 'cloudfunctions/recipe-data-import/recipe-data.json'),
+    'ingredients': os.path.join(ROOT_DIR, 'cloudfunctions/data-import/ingredients-data.json'),
+    'meat': os.path.join(ROOT_DIR, 'cloudfunctions/meat-data-import/meat-data.json'),
+    'factors': os.path.join(ROOT_DIR, 'cloudfunctions/database/all-reliable-factors.json'),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='校验种子数据文件的结构与一致性')
+    parser.add_argument('--dataset', action='append', default=[], metavar='NAME=PATH',
+                        help=f"只校验指定数据集，可重复指定（{', '.join(DATASETS)}）")
+    parser.add_argument('--limit', type=int, default=20, help='每个数据集最多显示的问题组数')
+    parser.add_argument('--json', dest='json_output', help='把完整报告写入 JSON 文件')
+    args = parser.parse_args()
+
+    targets = dict(item.split('=', 1) for item in args.dataset) if args.dataset else SEED_FILES
+    reports = []
+    for name, path in targets.items():
+        if name not in DATASETS:
+            print(f"❌ 未知的数据集: {name}")
+            sys.exit(1)
+        with open(path, 'r', encoding='utf-8') as f:
+            records = json.load(f)
+        report = validate(name, records)
+        report.print_summary(args.limit)
+        reports.append(dict(report.to_dict(), path=os.path.normpath(path)))
+
+    failed = [r['dataset'] for r in reports if r['errors']]
+    print(f"\n📊 共校验 {sum(r['records'] for r in reports)} 条记录，"
+          f"错误 {sum(r['errors'] for r in reports)}，警告 {sum(r['warnings'] for r in reports)}")
+
+    if args.json_output:
+        with open(args.json_output, 'w', encoding='utf-8') as f:
+            json.dump(reports, f, ensure_ascii=False, indent=2)
+        print(f"📁 报告已保存至: {args.json_output}")
+
+    if failed:
+        print(f"❌ 校验未通过: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()